@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库解密引擎基准测试（SQLCipher 4 / WeChat 4.x 格式，离线）。
+
+对每个解密引擎、每个场景在独立子进程中运行一次解密，报告 pages/s、MB/s、峰值 RSS：
+- ok：正确密钥，解密后做往返校验（integrity_check + 逻辑内容一致）
+- wrong_key：错误密钥，所有页 HMAC 校验失败（测量失败路径开销）
+- corrupt_pages：正确密钥，但按 --corrupt-ratio 比例篡改部分页的密文
+
+引擎：
+- python：wechat_decrypt_tool.wechat_decrypt.WeChatDatabaseDecryptor
+- 也可以用 `module:attr` 指定任意引擎；attr 是 `factory(key_hex)`（返回带 decrypt_database(src, dst) 的对象）
+
+用法:
+  python -m benchmarks.decrypt_benchmark
+  python -m benchmarks.decrypt_benchmark --db path/to/plain.db --engine python --engine mypkg.fast:Decryptor
+  python -m benchmarks.decrypt_benchmark --conversations 200 --messages 1000 --out decrypt.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from benchmarks.sqlcipher_fixture import (  # noqa: E402  pylint: disable=wrong-import-position
+    DEFAULT_KEY_HEX,
+    PAGE_SIZE,
+    encrypt_sqlite_database,
+    verify_round_trip,
+)
+from benchmarks.synthetic_account import (  # noqa: E402  pylint: disable=wrong-import-position
+    add_spec_arguments,
+    build_synthetic_account,
+    spec_from_args,
+)
+
+SCENARIOS = ("ok", "wrong_key", "corrupt_pages")
+WRONG_KEY_HEX = "ff" * 32
+
+
+def _python_engine(key_hex: str):
+    from wechat_decrypt_tool.wechat_decrypt import WeChatDatabaseDecryptor
+
+    return WeChatDatabaseDecryptor(key_hex)
+
+
+ENGINES: dict[str, Callable[[str], Any]] = {
+    "python": _python_engine,
+}
+
+
+def resolve_engine(spec: str) -> Callable[[str], Any]:
+    name = str(spec or "").strip()
+    if name in ENGINES:
+        return ENGINES[name]
+    if ":" not in name:
+        raise ValueError(f"unknown engine: {name!r} (known: {', '.join(ENGINES)}; or use module:attr)")
+    module_name, attr = name.split(":", 1)
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the current process (0 when the platform does not expose it)."""
+
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", None)  # Windows
+        if peak:
+            return int(peak)
+    except Exception:
+        pass
+    try:
+        import resource
+
+        v = int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        # Linux reports KiB, macOS bytes.
+        return v if sys.platform == "darwin" else v * 1024
+    except Exception:
+        return 0
+
+
+def corrupt_pages(src: Path, dst: Path, *, ratio: float) -> int:
+    """Flip one ciphertext byte in every ~1/ratio page; returns the number of damaged pages."""
+
+    data = bytearray(src.read_bytes())
+    pages = len(data) // PAGE_SIZE
+    if pages <= 0 or ratio <= 0:
+        dst.write_bytes(bytes(data))
+        return 0
+    step = max(1, int(round(1.0 / min(1.0, float(ratio)))))
+    damaged = 0
+    for i in range(0, pages, step):
+        data[i * PAGE_SIZE + 100] ^= 0xFF
+        damaged += 1
+    dst.write_bytes(bytes(data))
+    return damaged
+
+
+def _child_decrypt(engine_spec: str, key_hex: str, src: str, dst: str, data_dir: str, conn) -> None:
+    os.environ["WECHAT_TOOL_DATA_DIR"] = data_dir
+    os.environ.setdefault("WECHAT_TOOL_LOG_LEVEL", "ERROR")
+    try:
+        factory = resolve_engine(engine_spec)
+        engine = factory(key_hex)
+        rss_before = peak_rss_bytes()
+        t0 = time.perf_counter()
+        ok = engine.decrypt_database(src, dst)
+        sec = time.perf_counter() - t0
+        conn.send({"ok": True, "returned": bool(ok), "sec": sec, "peakRss": peak_rss_bytes(), "rssBefore": rss_before})
+    except Exception as e:
+        conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_decrypt_once(engine_spec: str, key_hex: str, src: Path, dst: Path, *, data_dir: Path) -> dict[str, Any]:
+    """Decrypt `src` in a fresh process so peak RSS reflects only this engine run."""
+
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child_decrypt, args=(engine_spec, key_hex, str(src), str(dst), str(data_dir), child))
+    proc.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"ok": False, "error": "engine process exited without a result"}
+    proc.join()
+    if proc.exitcode not in (0, None) and result.get("ok"):
+        result = {"ok": False, "error": f"engine process exit code {proc.exitcode}"}
+    return result
+
+
+def bench_engine(
+    engine_spec: str,
+    *,
+    plain_path: Path,
+    encrypted_path: Path,
+    work_dir: Path,
+    scenarios: tuple[str, ...] = SCENARIOS,
+    corrupt_ratio: float = 0.1,
+    key_hex: str = DEFAULT_KEY_HEX,
+) -> list[dict[str, Any]]:
+    size = encrypted_path.stat().st_size
+    pages = size // PAGE_SIZE
+    safe_name = "".join(c if c.isalnum() else "_" for c in engine_spec)
+    rows: list[dict[str, Any]] = []
+    for scenario in scenarios:
+        src = encrypted_path
+        key = key_hex
+        damaged = 0
+        if scenario == "wrong_key":
+            key = WRONG_KEY_HEX
+            damaged = pages
+        elif scenario == "corrupt_pages":
+            src = work_dir / f"{encrypted_path.stem}.corrupt.db"
+            damaged = corrupt_pages(encrypted_path, src, ratio=corrupt_ratio)
+        dst = work_dir / f"{encrypted_path.stem}.{scenario}.{safe_name}.out.db"
+        if dst.exists():
+            dst.unlink()
+
+        r = run_decrypt_once(engine_spec, key, src, dst, data_dir=work_dir)
+        row: dict[str, Any] = {"engine": engine_spec, "scenario": scenario, "pages": pages, "bytes": size}
+        if not r.get("ok"):
+            row.update({"ok": False, "error": r.get("error")})
+            rows.append(row)
+            continue
+
+        sec = max(1e-9, float(r["sec"]))
+        out_size = dst.stat().st_size if dst.exists() else 0
+        row.update(
+            {
+                "ok": True,
+                "returned": r["returned"],
+                "sec": round(sec, 4),
+                "pagesPerSec": round(pages / sec, 1),
+                "mbPerSec": round(size / sec / (1024 * 1024), 2),
+                "peakRssMb": round(int(r["peakRss"]) / (1024 * 1024), 1),
+                "rssBeforeMb": round(int(r["rssBefore"]) / (1024 * 1024), 1),
+                "damagedPages": damaged,
+                "outputPages": out_size // PAGE_SIZE,
+            }
+        )
+        if scenario == "ok":
+            try:
+                row["roundTrip"] = verify_round_trip(plain_path, dst)
+            except Exception as e:
+                row["roundTrip"] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            if not row["roundTrip"].get("ok"):
+                row["ok"] = False
+        rows.append(row)
+        try:
+            dst.unlink()
+        except Exception:
+            pass
+    return rows
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="数据库解密引擎基准测试（SQLCipher 4 / WeChat 4.x）")
+    parser.add_argument("--db", default="", help="明文 SQLite 数据库（默认生成合成 message_0.db）")
+    parser.add_argument("--engine", action="append", default=[], help="引擎名或 module:attr，可重复")
+    parser.add_argument("--scenario", action="append", default=[], choices=SCENARIOS, help="可重复，默认全部")
+    parser.add_argument("--corrupt-ratio", type=float, default=0.1)
+    parser.add_argument("--out", default="", help="结果 JSON 输出路径（默认只打印）")
+    add_spec_arguments(parser)
+    args = parser.parse_args(argv)
+
+    engines = list(args.engine) or ["python"]
+    scenarios = tuple(args.scenario) or SCENARIOS
+
+    with tempfile.TemporaryDirectory(prefix="wechat-decrypt-bench-") as td:
+        work = Path(td)
+        if args.db:
+            plain = Path(args.db).resolve()
+        else:
+            acc = build_synthetic_account(work, spec_from_args(args))
+            plain = acc.message_db_paths[0]
+        encrypted = work / "encrypted.db"
+        t0 = time.perf_counter()
+        stats = encrypt_sqlite_database(plain, encrypted, DEFAULT_KEY_HEX, seed=1)
+        print(
+            f"[decrypt-bench] fixture pages={stats['pages']} bytes={stats['bytes']} "
+            f"encrypt={time.perf_counter() - t0:.2f}s",
+            file=sys.stderr,
+        )
+
+        rows: list[dict[str, Any]] = []
+        for engine in engines:
+            for row in bench_engine(
+                engine,
+                plain_path=plain,
+                encrypted_path=encrypted,
+                work_dir=work,
+                scenarios=scenarios,
+                corrupt_ratio=float(args.corrupt_ratio),
+            ):
+                rows.append(row)
+                if row.get("ok"):
+                    print(
+                        f"[decrypt-bench] {engine:<12} {row['scenario']:<14} {row['pagesPerSec']:>10.1f} pages/s "
+                        f"{row['mbPerSec']:>8.2f} MB/s  peak={row['peakRssMb']:.1f}MB  out_pages={row['outputPages']}",
+                        file=sys.stderr,
+                    )
+                else:
+                    print(
+                        f"[decrypt-bench] {engine:<12} {row['scenario']:<14} FAILED "
+                        f"{row.get('error') or row.get('roundTrip')}",
+                        file=sys.stderr,
+                    )
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "timestamp": int(time.time()),
+            "fixturePages": stats["pages"],
+            "fixtureBytes": stats["bytes"],
+        },
+        "results": rows,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0 if all(r.get("ok") for r in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
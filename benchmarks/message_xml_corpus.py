@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+消息 XML 语料（appmsg / sysmsg / 图片 / 视频 / 表情 / 语音 / 位置 / 通话 / 聊天记录 …），结构取自真实 WeChat 4.x 负载，
+内容为虚构数据。
+
+- `message_xml_corpus()`：返回 (名称, local_type, 原始文本) 列表；含一条几十 KB 的合并转发聊天记录。
+- `render_probe(local_type, text)`：按聊天页渲染路径调用全部 XML 解析函数，返回可比较的结果 dict，
+  供正确性测试（扫描索引 vs 正则参考实现）与基准 `engine.message_xml.*` 共用。
+- `regex_lookups()`：把 `chat_helpers` 的标签/属性查找切回逐次正则（旧实现），用于对照。
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+def _chat_history_payload(items: int) -> str:
+    data_items = []
+    for i in range(items):
+        if i % 5 == 3:
+            data_items.append(
+                f'<dataitem datatype="5" dataid="{i:032x}"><datatitle>链接标题 {i}</datatitle>'
+                f"<datadesc>https://mp.weixin.qq.com/s?__biz=MzA{i:08d}&amp;mid={i}</datadesc>"
+                f"<sourcename>成员{i % 7}</sourcename><sourcetime>2024-05-0{1 + i % 9} 12:{i % 60:02d}</sourcetime>"
+                f'<weburlitem><title>链接标题 {i}</title><link>https://example.com/{i}</link></weburlitem>'
+                f"<fromnewmsgid>{7000000000000000000 + i}</fromnewmsgid></dataitem>"
+            )
+        elif i % 5 == 4:
+            data_items.append(
+                f'<dataitem datatype="2" dataid="{i:032x}"><datafmt>jpg</datafmt>'
+                f"<cdnthumburl>3057020100044b3049020100020{i:08d}</cdnthumburl><cdnthumbkey>{i:032x}</cdnthumbkey>"
+                f"<fullmd5>{i:032x}</fullmd5><thumbfullmd5>{(i * 7):032x}</thumbfullmd5>"
+                f"<sourcename>成员{i % 7}</sourcename><sourcetime>2024-05-0{1 + i % 9} 12:{i % 60:02d}</sourcetime>"
+                f"<fromnewmsgid>{7000000000000000000 + i}</fromnewmsgid></dataitem>"
+            )
+        else:
+            data_items.append(
+                f'<dataitem datatype="1" dataid="{i:032x}"><datadesc>第 {i} 条消息，内容比较长一点'
+                f"用来模拟真实的聊天记录 {'哈' * (i % 11)}</datadesc>"
+                f"<sourcename>成员{i % 7}</sourcename><sourcetime>2024-05-0{1 + i % 9} 12:{i % 60:02d}</sourcetime>"
+                f"<fromnewmsgid>{7000000000000000000 + i}</fromnewmsgid></dataitem>"
+            )
+    record = (
+        "<recordinfo><title>群聊的聊天记录</title>"
+        "<desc>成员0: 第 0 条消息\n成员1: 第 1 条消息\n成员2: 第 2 条消息</desc>"
+        f"<datalist count=\"{items}\">{''.join(data_items)}</datalist>"
+        "<favcreatetime>1714550400000</favcreatetime></recordinfo>"
+    )
+    return (
+        '<?xml version="1.0"?>\n<msg>\n\t<appmsg appid="" sdkver="0">\n'
+        "\t\t<title>群聊的聊天记录</title>\n"
+        "\t\t<des>成员0: 第 0 条消息\n成员1: 第 1 条消息\n成员2: 第 2 条消息</des>\n"
+        "\t\t<type>19</type>\n\t\t<url>https://support.weixin.qq.com/cgi-bin/mmsupport-bin/readtemplate?t=page/favorite_record__w_unsupport</url>\n"
+        "\t\t<appattach><totallen>0</totallen><attachid></attachid><fileext></fileext></appattach>\n"
+        f"\t\t<recorditem><![CDATA[{record}]]></recorditem>\n"
+        "\t</appmsg>\n\t<fromusername>wxid_member000001</fromusername>\n\t<scene>0</scene>\n</msg>"
+    )
+
+
+def message_xml_corpus() -> list[tuple[str, int, str]]:
+    link_official = (
+        '<?xml version="1.0"?>\n<msg>\n\t<appmsg appid="" sdkver="0">\n'
+        "\t\t<title>一篇公众号文章的标题</title>\n\t\t<des>#话题# #另一个话题# 文章摘要</des>\n"
+        "\t\t<action>view</action>\n\t\t<type>5</type>\n\t\t<showtype>0</showtype>\n"
+        "\t\t<url>https://mp.weixin.qq.com/s?__biz=MzA5MTM2NjYxMQ==&amp;mid=2651&amp;idx=1&amp;sn=abc&amp;"
+        "exptype=masonry_feed_brief_content_elite_for_pcfeeds_u2i</url>\n"
+        "\t\t<thumburl>https://mmbiz.qpic.cn/mmbiz_jpg/abcdef/0?wx_fmt=jpeg</thumburl>\n"
+        "\t\t<appattach><totallen>0</totallen><attachid /><fileext /><cdnthumburl>3057020100044b3049</cdnthumburl>"
+        '<cdnthumbmd5>0123456789abcdef0123456789abcdef</cdnthumbmd5><cdnthumblength>12345</cdnthumblength>'
+        "<cdnthumbheight>100</cdnthumbheight><cdnthumbwidth>100</cdnthumbwidth></appattach>\n"
+        "\t\t<sourceusername>gh_0123456789ab</sourceusername>\n"
+        "\t\t<sourcedisplayname><![CDATA[某某公众号]]></sourcedisplayname>\n"
+        "\t\t<mmreader><category type=\"20\" count=\"1\"><name><![CDATA[某某公众号]]></name>"
+        "<item><itemshowtype>0</itemshowtype><title><![CDATA[一篇公众号文章的标题]]></title>"
+        "<url><![CDATA[https://mp.weixin.qq.com/s?__biz=MzA5MTM2NjYxMQ==&mid=2651]]></url>"
+        "<cover><![CDATA[https://mmbiz.qpic.cn/mmbiz_jpg/cover/0]]></cover></item></category></mmreader>\n"
+        "\t</appmsg>\n\t<fromusername>wxid_member000002</fromusername>\n\t<scene>0</scene>\n"
+        "\t<appinfo><version>1</version><appname></appname></appinfo>\n\t<commenturl></commenturl>\n</msg>"
+    )
+    link_bilibili = (
+        '<msg><appmsg appid="wx7564fd5313d24844" sdkver="0"><title>视频标题</title><des>UP主：某人\n播放：1.2万</des>'
+        "<type>4</type><url>https://b23.tv/abcdef</url><lowurl></lowurl>"
+        "<thumburl>https://i0.hdslb.com/bfs/archive/abc.jpg</thumburl>"
+        "<patMsg><chatUser></chatUser><records><recordNum>0</recordNum></records></patMsg>"
+        "</appmsg><appinfo><version>1</version><appname>哔哩哔哩</appname></appinfo></msg>"
+    )
+    finder = (
+        '<msg><appmsg appid="" sdkver="0"><title>当前版本不支持展示该内容，请升级至最新版本。</title><type>51</type>'
+        "<url>https://support.weixin.qq.com/update/</url>"
+        "<finderFeed><objectId>1400000000000000000</objectId><nickname>视频号作者</nickname>"
+        "<username>v2_060000231003b20faec8c7e@finder</username><desc>视频号的描述文字 #标签</desc>"
+        "<mediaList><media><thumbUrl>https://finder.video.qq.com/thumb?x=1&amp;y=2</thumbUrl>"
+        "<coverUrl>https://finder.video.qq.com/cover</coverUrl><url>https://finder.video.qq.com/play</url>"
+        "</media></mediaList></finderFeed></appmsg></msg>"
+    )
+    mini_program = (
+        "<msg><appmsg appid='' sdkver='0'><title>小程序卡片标题</title><des></des>"
+        "<weappinfo><type>0</type><username><![CDATA[gh_abcdef@app]]></username><appid>wx1234567890</appid>"
+        "<weappiconurl><![CDATA[https://example.com/icon.png]]></weappiconurl>"
+        "<pagepath><![CDATA[pages/index/index.html?id=1]]></pagepath></weappinfo>"
+        "<type>33</type><url></url><thumburl>https://example.com/thumb.jpg</thumburl>"
+        "<sourcedisplayname><![CDATA[某小程序]]></sourcedisplayname></appmsg></msg>"
+    )
+    file_msg = (
+        '<?xml version="1.0"?>\n<msg><appmsg appid="" sdkver="0"><title>季度报告-final.pdf</title><des></des>'
+        "<type>6</type><appattach><totallen>1048576</totallen><attachid>@cdn_3057_abc_1</attachid>"
+        "<fileext>pdf</fileext><cdnattachurl>3057020100044b30490201000204</cdnattachurl>"
+        "<aeskey>0123456789abcdef0123456789abcdef</aeskey></appattach>"
+        "<md5>fedcba9876543210fedcba9876543210</md5></appmsg><fromusername>wxid_member000003</fromusername></msg>"
+    )
+    quote_link = (
+        '<msg><appmsg appid="" sdkver="0"><title>看看这个</title><type>57</type>'
+        "<refermsg><type>49</type><svrid>1173057991425172913</svrid>"
+        "<fromusr>44372432598@chatroom</fromusr><chatusr>wxid_member000004</chatusr>"
+        "<displayname><![CDATA[群成员四]]></displayname>"
+        "<content>wxid_member000004:\n&lt;msg&gt;&lt;appmsg appid=\"\" sdkver=\"0\"&gt;&lt;title&gt;被引用的链接&lt;/title&gt;"
+        "&lt;type&gt;5&lt;/type&gt;&lt;thumburl&gt;https://example.com/q.jpg&lt;/thumburl&gt;&lt;/appmsg&gt;&lt;/msg&gt;</content>"
+        "</refermsg></appmsg><fromusername>wxid_member000005</fromusername></msg>"
+    )
+    quote_voice = (
+        '<msg><appmsg appid="" sdkver="0"><title>收到</title><type>57</type>'
+        "<refermsg><type>34</type><svrid>1173057991425172914</svrid><fromusr>wxid_friend0001</fromusr>"
+        "<displayname>好友一</displayname><content>wxid_friend0001:15369:1:</content></refermsg></appmsg></msg>"
+    )
+    quote_nested = (
+        '<msg><appmsg appid="" sdkver="0"><title>一松一紧</title><des></des><type>57</type>'
+        "<refermsg><type>57</type><svrid>1173057991425172915</svrid><fromusr>44372432598@chatroom</fromusr>"
+        "<displayname><![CDATA[ㅤ磁父]]></displayname>"
+        '<content><![CDATA[<msg><appmsg appid="" sdkver="0"><title>那里紧？哪里张？</title><des></des>'
+        "<type>57</type></appmsg></msg>]]></content></refermsg></appmsg></msg>"
+    )
+    transfer = (
+        '<msg><appmsg appid="" sdkver=""><title><![CDATA[微信转账]]></title><des><![CDATA[收到转账0.01元。]]></des>'
+        "<type>2000</type><url><![CDATA[https://support.weixin.qq.com/cgi-bin/mmsupport-bin/readtemplate?t=page/common_page__upgrade]]></url>"
+        "<wcpayinfo><paysubtype>3</paysubtype><feedesc><![CDATA[￥0.01]]></feedesc>"
+        "<transcationid><![CDATA[1000050001202405010000000000001]]></transcationid>"
+        "<transferid><![CDATA[1000050001240501000000000000001]]></transferid>"
+        "<invalidtime><![CDATA[1714636800]]></invalidtime><begintransfertime><![CDATA[1714550400]]></begintransfertime>"
+        "<effectivedate><![CDATA[1]]></effectivedate><pay_memo><![CDATA[午饭钱]]></pay_memo>"
+        "<receiver_username><![CDATA[wxid_benchself]]></receiver_username><payer_username><![CDATA[]]></payer_username>"
+        "</wcpayinfo></appmsg></msg>"
+    )
+    red_packet = (
+        '<msg><appmsg appid="" sdkver=""><des><![CDATA[我给你发了一个红包，赶紧去拆!]]></des><url><![CDATA['
+        "https://wxapp.tenpay.com/mmpayhb/wxhb_personalreceive?showwxpaytitle=1&msgtype=1&channelid=1&sendid=100]]></url>"
+        "<type><![CDATA[2001]]></type><title><![CDATA[微信红包]]></title>"
+        "<thumburl><![CDATA[https://wx.gtimg.com/hongbao/1800/hb.png]]></thumburl>"
+        "<wcpayinfo><templateid><![CDATA[7a2a165d31da7fce6dd77e05c300028a]]></templateid>"
+        "<receivertitle><![CDATA[恭喜发财，大吉大利]]></receivertitle><sendertitle><![CDATA[恭喜发财，大吉大利]]></sendertitle>"
+        "<scenetext><![CDATA[微信红包]]></scenetext><senderdes><![CDATA[查看红包]]></senderdes>"
+        "<receiverdes><![CDATA[领取红包]]></receiverdes><innertype><![CDATA[0]]></innertype></wcpayinfo></appmsg></msg>"
+    )
+    pat_app = (
+        '<msg><appmsg appid="" sdkver="0"><title><![CDATA["好友一" 拍了拍我]]></title><type>62</type>'
+        "<patinfo><fromusername>wxid_friend0001</fromusername><chatusername>wxid_benchself</chatusername>"
+        "<pattedusername>wxid_benchself</pattedusername><patsuffix><![CDATA[]]></patsuffix></patinfo></appmsg></msg>"
+    )
+    pat_sys = (
+        '<sysmsg type="pat"><pat><fromusername>wxid_friend0001</fromusername>'
+        "<chatusername>44372432598@chatroom</chatusername><pattedusername>wxid_benchself</pattedusername>"
+        "<template><![CDATA[\"${wxid_friend0001}\" 拍了拍 \"${wxid_benchself}\" 的肩膀]]></template></pat></sysmsg>"
+    )
+    revoke = (
+        '<sysmsg type="revokemsg"><revokemsg><session>44372432598@chatroom</session><msgid>1234567</msgid>'
+        "<newmsgid>7000000000000000123</newmsgid><replacemsg><![CDATA[\"群成员六\" 撤回了一条消息]]></replacemsg>"
+        "<announcement_id><![CDATA[]]></announcement_id></revokemsg></sysmsg>"
+    )
+    top_msg = (
+        '<sysmsg type="mmchatroomtopmsg"><mmchatroomtopmsg><chatroomname>44372432598@chatroom</chatroomname>'
+        "<op>1</op><username>wxid_member000007</username><nickname>群成员七</nickname>"
+        "<msgsvrid>7000000000000000456</msgsvrid></mmchatroomtopmsg></sysmsg>"
+    )
+    sys_template = (
+        '<sysmsg type="sysmsgtemplate"><sysmsgtemplate><content_template type="tmpl_type_profile">'
+        '<plain><![CDATA[]]></plain><template><![CDATA["$username$"邀请"$names$"加入了群聊]]></template>'
+        '<link_list><link name="username" type="link_profile"><memberlist><member><username><![CDATA[wxid_member000008]]>'
+        "</username><nickname><![CDATA[群成员八]]></nickname></member></memberlist></link>"
+        '<link name="names" type="link_profile"><memberlist><member><username><![CDATA[wxid_member000009]]></username>'
+        "<nickname><![CDATA[群成员九]]></nickname></member></memberlist><separator><![CDATA[、]]></separator></link>"
+        "</link_list></content_template></sysmsgtemplate></sysmsg>"
+    )
+    image = (
+        '<?xml version="1.0"?>\n<msg>\n\t<img aeskey="0123456789abcdef0123456789abcdef" encryver="1" '
+        'cdnthumbaeskey="0123456789abcdef0123456789abcdef" cdnthumburl="3057020100044b30490201000204abcdef" '
+        'cdnthumblength="4321" cdnthumbheight="120" cdnthumbwidth="90" cdnmidheight="0" cdnmidwidth="0" '
+        'cdnhdheight="0" cdnhdwidth="0" cdnmidimgurl="3057020100044b30490201000204abcdef" length="123456" '
+        'md5="c503bd67d0fd7d4252a03697bc78aabe" hevc_mid_size="54321" originsourcemd5="aa11bb22cc33dd44ee55ff6677889900" />\n'
+        '\t<platform_signature></platform_signature>\n\t<imgdatahash></imgdatahash>\n</msg>'
+    )
+    video = (
+        '<?xml version="1.0"?>\n<msg>\n\t<videomsg aeskey="0123456789abcdef0123456789abcdef" '
+        'cdnvideourl="3057020100044b30490201000204videoid" cdnthumbaeskey="fedcba9876543210fedcba9876543210" '
+        'cdnthumburl="3057020100044b30490201000204thumbid" length="2345678" playlength="12" cdnthumblength="8765" '
+        'cdnthumbwidth="288" cdnthumbheight="512" fromusername="wxid_friend0001" md5="11223344556677889900aabbccddeeff" '
+        'newmd5="ffeeddccbbaa00998877665544332211" isplaceholder="0" rawmd5="" rawlength="0" '
+        'cdnrawvideourl="" cdnrawvideoaeskey="" overwritenewmsgid="0" originsourcemd5="" isad="0" />\n</msg>'
+    )
+    emoji = (
+        '<msg><emoji fromusername="wxid_friend0001" tousername="wxid_benchself" type="2" '
+        'idbuffer="media:0_0" md5="b71b5f9fb036748d8dad0c92e3a807ed" len="54321" productid="" '
+        'androidmd5="b71b5f9fb036748d8dad0c92e3a807ed" androidlen="54321" s60v3md5="b71b5f9fb036748d8dad0c92e3a807ed" '
+        's60v3len="54321" s60v5md5="b71b5f9fb036748d8dad0c92e3a807ed" s60v5len="54321" '
+        'cdnurl="http://wxapp.tc.qq.com/262/20304/stodownload?m=b71b5f9fb036748d8dad0c92e3a807ed&amp;filekey=abc" '
+        'designerid="" thumburl="" encrypturl="http://wxapp.tc.qq.com/262/20304/stodownload?m=enc" '
+        'aeskey="0123456789abcdef0123456789abcdef" externurl="" externmd5="" width="240" height="240" /></msg>'
+    )
+    voice = (
+        '<msg><voicemsg endflag="1" cancelflag="0" forwardflag="0" voiceformat="4" voicelength="5210" '
+        'length="8342" bufid="0" aeskey="0123456789abcdef" voiceurl="3052020100044b3049" '
+        'voicemd5="" clientmsgid="41636363" fromusername="wxid_friend0001" /></msg>'
+    )
+    location = (
+        '<?xml version="1.0"?>\n<msg>\n\t<location x="31.230416" y="121.473701" scale="15" '
+        'label="上海市黄浦区人民大道200号" maptype="roadmap" poiname="人民广场" poiid="qqmap_1234567890" '
+        'buildingId="" floorName="" poiCategoryTips="" poiBusinessHour="" poiPhone="" poiPriceTips="" isFromPoiList="true" '
+        'adcode="310101" cityname="上海市" fromusername="wxid_friend0001" />\n</msg>'
+    )
+    voip = (
+        '<voipmsg type="VoIPBubbleMsg"><VoIPBubbleMsg><msg><![CDATA[通话时长 01:23]]></msg>'
+        "<room_type>1</room_type><red_dot>false</red_dot><roomid>123456</roomid><roomkey>0</roomkey>"
+        "<inviteid>1714550400</inviteid><msg_type>100</msg_type><timestamp>1714550483000</timestamp>"
+        "<identity><![CDATA[1234567890]]></identity><duration>83</duration></VoIPBubbleMsg></voipmsg>"
+    )
+    group_text_xml = (
+        "wxid_member000010:\n"
+        '<msg><appmsg appid="" sdkver="0"><title>群里的链接</title><type>5</type>'
+        "<url>https://example.com/a?b=1&amp;c=2</url></appmsg><fromusername>wxid_member000010</fromusername></msg>"
+    )
+    malformed = (
+        '<msg><appmsg appid="" sdkver="0"><title>未闭合的 <b>标签<title>嵌套</title><type>5<type>'
+        "<url>https://example.com/x</url><des>md5 = 'not-an-attr' md5=\"\" cdnthumbmd5='aabb'</des>"
+        "<![CDATA[<title>cdata 里的标题</title>]]></appmsg"
+    )
+    return [
+        ("link.official_article", 49, link_official),
+        ("link.bilibili_patmsg_block", 49, link_bilibili),
+        ("link.finder", 49, finder),
+        ("link.mini_program", 49, mini_program),
+        ("file", 49, file_msg),
+        ("quote.link", 49, quote_link),
+        ("quote.voice", 49, quote_voice),
+        ("quote.nested", 244813135921, quote_nested),
+        ("transfer", 49, transfer),
+        ("red_packet", 49, red_packet),
+        ("pat.appmsg", 49, pat_app),
+        ("pat.sysmsg", 266287972401, pat_sys),
+        ("system.revoke", 10000, revoke),
+        ("system.top_message", 10000, top_msg),
+        ("system.template", 10000, sys_template),
+        ("image", 3, image),
+        ("video", 43, video),
+        ("emoji", 47, emoji),
+        ("voice", 34, voice),
+        ("location", 48, location),
+        ("voip", 50, voip),
+        ("group.text_prefix_xml", 49, group_text_xml),
+        ("malformed", 49, malformed),
+        ("chat_history.small", 49, _chat_history_payload(6)),
+        ("chat_history.large", 49, _chat_history_payload(300)),
+    ]
+
+
+_IMAGE_MD5_KEYS = ("md5", "cdnthumbmd5", "cdnthumd5", "cdnmidimgmd5", "cdnbigimgmd5", "hdmd5", "hevc_mid_md5", "hevc_md5")
+
+
+def render_probe(local_type: int, text: str) -> dict[str, Any]:
+    """Every XML lookup the chat page renderer does for one message (see `routers/chat.py::_collect_chat_messages`)."""
+
+    from wechat_decrypt_tool import chat_helpers as h
+
+    out: dict[str, Any] = {
+        "sender": h._extract_sender_from_group_xml(text),
+        "app": h._parse_app_message(text),
+        "system": h._parse_system_message_content(text),
+        "location": h._parse_location_message(text),
+        "top": h._extract_chatroom_top_message_metadata(text),
+        "template": h._extract_xml_tag_text(text, "template"),
+        "transferid": h._extract_xml_tag_or_attr(text, "transferid"),
+    }
+    if local_type in (3, 43, 62, 47, 34):
+        out["attrs"] = {k: h._extract_xml_attr(text, k) for k in _IMAGE_MD5_KEYS}
+        out["tags"] = {k: h._extract_xml_tag_text(text, k) for k in _IMAGE_MD5_KEYS}
+        out["urls"] = [
+            h._extract_xml_tag_or_attr(text, k)
+            for k in ("cdnthumburl", "cdnmidimgurl", "cdnbigimgurl", "cdnvideourl", "cdnurl", "cdn_url", "voicelength")
+        ]
+    return out
+
+
+@contextmanager
+def regex_lookups() -> Iterator[None]:
+    """Route `chat_helpers` tag/attr lookups through the per-lookup regex reference (the pre-index behavior)."""
+
+    from unittest import mock
+
+    from wechat_decrypt_tool import chat_helpers as h
+    from wechat_decrypt_tool.message_xml import regex_attr, regex_tag_text
+
+    def tag_text(xml_text: str, tag: str) -> str:
+        return h._strip_cdata(regex_tag_text(xml_text, tag))
+
+    with (
+        mock.patch.object(h, "_extract_xml_tag_text", side_effect=tag_text),
+        mock.patch.object(h, "_extract_xml_attr", side_effect=regex_attr),
+    ):
+        yield
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后端性能基准测试（离线、可重复、可跨提交对比）。
+
+流程：
+1. 在临时数据目录下用 `benchmarks.synthetic_account` 生成一个合成账号（或用 --data-dir 复用已有目录）
+2. 以该目录作为 WECHAT_TOOL_DATA_DIR 导入后端（不启动 uvicorn，直接用 TestClient / 引擎函数）
+3. 每个基准先预热一次，再重复 --repeat 次，记录 min/median/mean/p95/max（毫秒）
+4. 结果写成 JSON（含 git 提交、Python/平台、合成参数），可用 --compare 与历史结果对比
+
+用法:
+  python -m benchmarks.run_benchmarks --out bench.json
+  python -m benchmarks.run_benchmarks --only api.sessions,engine.search_index_build --repeat 10
+  python -m benchmarks.run_benchmarks --conversations 400 --messages 2000 --shards 6 --out big.json
+  python -m benchmarks.run_benchmarks --compare bench_prev.json --threshold 0.2
+
+新增基准：在本文件（或被导入的模块）中用 @benchmark("group.name") 装饰一个接收 BenchContext 的函数即可。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from benchmarks.synthetic_account import (  # noqa: E402  pylint: disable=wrong-import-position
+    SyntheticAccount,
+    add_spec_arguments,
+    build_synthetic_account,
+    spec_from_args,
+)
+
+RESULT_FORMAT_VERSION = 1
+
+
+@dataclass
+class BenchContext:
+    data_dir: Path
+    synthetic: SyntheticAccount
+    repeat: int
+    _client: Any = None
+    state: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def account(self) -> str:
+        return self.synthetic.spec.account
+
+    @property
+    def account_dir(self) -> Path:
+        return self.synthetic.account_dir
+
+    @property
+    def year(self) -> int:
+        return int(time.gmtime(int(self.synthetic.spec.start_ts)).tm_year)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from fastapi.testclient import TestClient
+
+            from wechat_decrypt_tool.api import app
+
+            self._client = TestClient(app)
+        return self._client
+
+    def get_json(self, path: str, **params: Any) -> Any:
+        resp = self.client.get(path, params={"account": self.account, **params})
+        if resp.status_code != 200:
+            raise RuntimeError(f"GET {path} -> {resp.status_code}: {resp.text[:300]}")
+        return resp.json()
+
+    def first_conversation(self, *, group: bool) -> str:
+        for u in self.synthetic.conversations:
+            if u.endswith("@chatroom") == bool(group):
+                return u
+        return self.synthetic.conversations[0]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    fn: Callable[[BenchContext], Any]
+    setup: Optional[Callable[[BenchContext], Any]] = None
+    repeat: Optional[int] = None
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, *, setup: Optional[Callable[[BenchContext], Any]] = None, repeat: Optional[int] = None):
+    """Register a benchmark. `repeat` overrides --repeat for very slow cases (e.g. full index builds)."""
+
+    def deco(fn: Callable[[BenchContext], Any]) -> Callable[[BenchContext], Any]:
+        if name in BENCHMARKS:
+            raise ValueError(f"duplicate benchmark: {name}")
+        BENCHMARKS[name] = Benchmark(name=name, fn=fn, setup=setup, repeat=repeat)
+        return fn
+
+    return deco
+
+
+# ---- chat endpoints ----
+
+
+@benchmark("api.sessions")
+def _bench_sessions(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/sessions", limit=400)
+
+
+@benchmark("api.messages.first_page")
+def _bench_messages_first_page(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/messages", username=ctx.first_conversation(group=True), limit=50, order="desc")
+
+
+@benchmark("api.messages.deep_page")
+def _bench_messages_deep_page(ctx: BenchContext) -> None:
+    k = int(ctx.synthetic.spec.messages_per_conversation)
+    ctx.get_json(
+        "/api/chat/messages",
+        username=ctx.first_conversation(group=True),
+        limit=50,
+        offset=max(0, k - 100),
+        order="desc",
+    )
+
+
+@benchmark("engine.collect_chat_messages")
+def _bench_collect_chat_messages(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_helpers import _iter_message_db_paths
+    from wechat_decrypt_tool.routers.chat import _collect_chat_messages
+
+    _collect_chat_messages(
+        username=ctx.first_conversation(group=True),
+        account_dir=ctx.account_dir,
+        db_paths=list(_iter_message_db_paths(ctx.account_dir)),
+        resource_conn=None,
+        resource_chat_id=None,
+        take=200,
+        want_types=None,
+    )
+
+
+@benchmark("api.daily_counts")
+def _bench_daily_counts(ctx: BenchContext) -> None:
+    ctx.get_json(
+        "/api/chat/messages/daily_counts",
+        username=ctx.first_conversation(group=False),
+        year=ctx.year,
+        month=6,
+    )
+
+
+@benchmark("api.contacts")
+def _bench_contacts(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/contacts")
+
+
+@benchmark("api.contacts.keyword")
+def _bench_contacts_keyword(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/contacts", keyword="小")
+
+
+# ---- search index ----
+
+
+@benchmark("engine.search_index_build", repeat=3)
+def _bench_search_index_build(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_search_index import _build_worker
+
+    _build_worker(ctx.account_dir, True)
+
+
+def _ensure_search_index(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_search_index import _build_worker, get_chat_search_index_status
+
+    status = get_chat_search_index_status(ctx.account_dir)
+    if not (status.get("index") or {}).get("ready"):
+        _build_worker(ctx.account_dir, True)
+
+
+@benchmark("api.search", setup=_ensure_search_index)
+def _bench_search(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/search", q="项目", limit=50)
+
+
+@benchmark("api.search.in_chat", setup=_ensure_search_index)
+def _bench_search_in_chat(ctx: BenchContext) -> None:
+    ctx.get_json("/api/chat/search", q="好的", username=ctx.first_conversation(group=True), limit=50)
+
+
+def _bench_search_fts_query(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_helpers import _build_fts_query
+    from wechat_decrypt_tool.chat_search_index import get_chat_search_index_db_path
+    from wechat_decrypt_tool.routers.chat import _build_search_fts_where, _query_search_hit_keys
+
+    where_sql, params = _build_search_fts_where(
+        _build_fts_query("好的"),
+        username=None,
+        session_type=None,
+        sender=None,
+        want_types=None,
+        start_ts=None,
+        end_ts=None,
+        include_hidden=False,
+        include_official=False,
+    )
+    _query_search_hit_keys(
+        get_chat_search_index_db_path(ctx.account_dir), where_sql=where_sql, params=params, offset=0, limit=50
+    )
+
+
+def _ensure_fragmented_search_index(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_search_index import _build_worker
+
+    # Keep the post-build background optimize from running in the middle of the measurement.
+    prev = os.environ.get("WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS")
+    os.environ["WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS"] = str(1 << 30)
+    try:
+        _build_worker(ctx.account_dir, True)
+    finally:
+        if prev is None:
+            os.environ.pop("WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS", None)
+        else:
+            os.environ["WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS"] = prev
+
+
+def _ensure_optimized_search_index(ctx: BenchContext) -> None:
+    from wechat_decrypt_tool.chat_search_index import optimize_chat_search_index
+
+    _ensure_search_index(ctx)
+    optimize_chat_search_index(ctx.account_dir, mode="optimize", vacuum=True)
+
+
+# Uncached FTS query cost before/after `optimize_chat_search_index` (the hit-key cache is bypassed).
+benchmark("engine.search_fts.fresh_build", setup=_ensure_fragmented_search_index)(_bench_search_fts_query)
+benchmark("engine.search_fts.optimized", setup=_ensure_optimized_search_index)(_bench_search_fts_query)
+
+
+# ---- database decryption (see benchmarks/decrypt_benchmark.py for RSS / failure-path runs) ----
+
+
+def _ensure_encrypted_fixture(ctx: BenchContext) -> None:
+    from benchmarks.sqlcipher_fixture import DEFAULT_KEY_HEX, encrypt_sqlite_database
+
+    if "encrypted_db" in ctx.state:
+        return
+    out = ctx.data_dir / "bench_encrypted" / "message_0.db"
+    encrypt_sqlite_database(ctx.synthetic.message_db_paths[0], out, DEFAULT_KEY_HEX, seed=1)
+    ctx.state["encrypted_db"] = out
+
+
+@benchmark("engine.decrypt_database", setup=_ensure_encrypted_fixture, repeat=3)
+def _bench_decrypt_database(ctx: BenchContext) -> None:
+    from benchmarks.sqlcipher_fixture import DEFAULT_KEY_HEX
+    from wechat_decrypt_tool.wechat_decrypt import WeChatDatabaseDecryptor
+
+    src = ctx.state["encrypted_db"]
+    if not WeChatDatabaseDecryptor(DEFAULT_KEY_HEX).decrypt_database(str(src), str(src.with_suffix(".out.db"))):
+        raise RuntimeError("decrypt_database returned False")
+
+
+# ---- message XML parsing (corpus in benchmarks/message_xml_corpus.py) ----
+
+
+def _make_message_xml_bench(name: str, *, regex: bool) -> None:
+    def _run(ctx: BenchContext) -> None:
+        from contextlib import nullcontext
+
+        from benchmarks.message_xml_corpus import message_xml_corpus, regex_lookups, render_probe
+        from wechat_decrypt_tool.message_xml import _parse_cached
+
+        corpus = ctx.state.setdefault("message_xml_corpus", message_xml_corpus())
+        with regex_lookups() if regex else nullcontext():
+            for _ in range(20):
+                # Cold index per pass: every payload is tokenized once, like a page of freshly loaded rows.
+                _parse_cached.cache_clear()
+                for _name, local_type, text in corpus:
+                    render_probe(local_type, text)
+
+    benchmark(name)(_run)
+
+
+_make_message_xml_bench("engine.message_xml.scan", regex=False)
+_make_message_xml_bench("engine.message_xml.regex", regex=True)
+
+
+# ---- Wrapped ----
+
+
+def _make_wrapped_card_bench(card_id: int) -> None:
+    def _run(ctx: BenchContext) -> None:
+        from wechat_decrypt_tool.wrapped.service import build_wrapped_annual_card
+
+        build_wrapped_annual_card(account=ctx.account, year=ctx.year, card_id=card_id, refresh=True)
+
+    benchmark(f"wrapped.card.{card_id}", repeat=3)(_run)
+
+
+for _cid in range(8):
+    _make_wrapped_card_bench(_cid)
+
+
+# ---- realtime sync (WCDB replaced by benchmarks.wcdb_standin; registered last since it appends messages) ----
+
+
+def _ensure_wcdb_standin(ctx: BenchContext) -> None:
+    from benchmarks.wcdb_standin import LocalWCDBStandIn
+
+    if "wcdb_standin" not in ctx.state:
+        ctx.state["wcdb_standin"] = LocalWCDBStandIn.from_decrypted_account(
+            ctx.account_dir, ctx.data_dir / "bench_db_storage"
+        )
+
+
+def _make_realtime_sync_bench(name: str, *, batched: bool) -> None:
+    def _run(ctx: BenchContext) -> None:
+        from unittest import mock
+
+        from wechat_decrypt_tool.routers import chat as chat_router
+
+        standin = ctx.state["wcdb_standin"]
+        # Each run sees a few new messages in half of the conversations, like a busy account between two syncs.
+        standin.append_messages(ctx.synthetic.conversations[::2], count=5)
+        env = {"WECHAT_TOOL_REALTIME_SYNC_BATCHED": "1" if batched else "0"}
+        with standin.patch(chat_router), mock.patch.dict(os.environ, env):
+            res = chat_router.sync_chat_realtime_messages_all(None, account=ctx.account, max_scan=200)
+        if not res.get("insertedTotal") or res.get("errors"):
+            raise RuntimeError(f"realtime sync_all did not sync: {res}")
+
+    benchmark(name, setup=_ensure_wcdb_standin)(_run)
+
+
+_make_realtime_sync_bench("engine.realtime.sync_all", batched=True)
+_make_realtime_sync_bench("engine.realtime.sync_all.per_session", batched=False)
+
+
+# ---- runner ----
+
+
+def _summarize(samples_ms: list[float]) -> dict[str, Any]:
+    xs = sorted(float(x) for x in samples_ms)
+    if not xs:
+        return {"n": 0}
+    p95_idx = min(len(xs) - 1, max(0, int(round(0.95 * (len(xs) - 1)))))
+    return {
+        "n": len(xs),
+        "minMs": round(xs[0], 3),
+        "medianMs": round(statistics.median(xs), 3),
+        "meanMs": round(statistics.fmean(xs), 3),
+        "p95Ms": round(xs[p95_idx], 3),
+        "maxMs": round(xs[-1], 3),
+    }
+
+
+def run_one(ctx: BenchContext, bench: Benchmark) -> dict[str, Any]:
+    try:
+        if bench.setup is not None:
+            bench.setup(ctx)
+        bench.fn(ctx)  # warm-up (imports, OS page cache, lazy routers)
+        n = max(1, int(bench.repeat if bench.repeat is not None else ctx.repeat))
+        samples: list[float] = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            bench.fn(ctx)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+    except Exception as e:
+        return {"name": bench.name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"name": bench.name, "ok": True, **_summarize(samples)}
+
+
+def select_benchmarks(only: Optional[str]) -> list[Benchmark]:
+    if not only:
+        return list(BENCHMARKS.values())
+    wanted = [s.strip() for s in str(only).split(",") if s.strip()]
+    out: list[Benchmark] = []
+    for name, bench in BENCHMARKS.items():
+        # Exact names or group prefixes ("wrapped" / "api.messages").
+        if any(name == w or name.startswith(w.rstrip(".") + ".") for w in wanted):
+            out.append(bench)
+    return out
+
+
+def _git_commit() -> str:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(ROOT),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return proc.stdout.strip() if proc.returncode == 0 else ""
+    except Exception:
+        return ""
+
+
+def compare_results(current: dict[str, Any], baseline: dict[str, Any], *, threshold: float) -> list[dict[str, Any]]:
+    """Compare medians by name; `regressed` when current is slower than baseline by more than `threshold`."""
+
+    base = {r.get("name"): r for r in (baseline.get("results") or []) if r.get("ok")}
+    rows: list[dict[str, Any]] = []
+    for r in current.get("results") or []:
+        b = base.get(r.get("name"))
+        if not r.get("ok") or not b:
+            continue
+        cur_ms = float(r.get("medianMs") or 0.0)
+        base_ms = float(b.get("medianMs") or 0.0)
+        ratio = (cur_ms / base_ms) if base_ms > 0 else 0.0
+        rows.append(
+            {
+                "name": r["name"],
+                "baselineMs": base_ms,
+                "currentMs": cur_ms,
+                "ratio": round(ratio, 3),
+                "regressed": bool(base_ms > 0 and ratio > 1.0 + float(threshold)),
+            }
+        )
+    return rows
+
+
+def run_benchmarks(
+    *,
+    data_dir: Path,
+    synthetic: SyntheticAccount,
+    benches: list[Benchmark],
+    repeat: int,
+    log: Callable[[str], Any] = lambda s: None,
+) -> dict[str, Any]:
+    ctx = BenchContext(data_dir=data_dir, synthetic=synthetic, repeat=repeat)
+    results: list[dict[str, Any]] = []
+    for bench in benches:
+        r = run_one(ctx, bench)
+        results.append(r)
+        if r.get("ok"):
+            log(f"{bench.name:<32} median={r['medianMs']:>10.2f}ms  p95={r['p95Ms']:>10.2f}ms  n={r['n']}")
+        else:
+            log(f"{bench.name:<32} FAILED {r.get('error')}")
+    return {
+        "formatVersion": RESULT_FORMAT_VERSION,
+        "meta": {
+            "gitCommit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "timestamp": int(time.time()),
+            "repeat": int(repeat),
+            "dataset": synthetic.summary(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="运行后端性能基准测试（合成账号，离线）")
+    parser.add_argument("--out", default="", help="结果 JSON 输出路径（默认只打印）")
+    parser.add_argument("--only", default="", help="逗号分隔的基准名或分组前缀，例如 api.sessions,wrapped")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default="", help="数据目录（默认临时目录，结束后删除）")
+    parser.add_argument("--compare", default="", help="与历史结果 JSON 对比（按 median）")
+    parser.add_argument("--threshold", type=float, default=0.25, help="对比时判定回退的相对阈值")
+    parser.add_argument("--list", action="store_true", help="列出所有基准并退出")
+    add_spec_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+
+    benches = select_benchmarks(args.only)
+    if not benches:
+        print(f"no benchmark matches --only={args.only!r}", file=sys.stderr)
+        return 2
+
+    tmp: Optional[tempfile.TemporaryDirectory] = None
+    if args.data_dir:
+        data_dir = Path(args.data_dir).resolve()
+        data_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="wechat-bench-")
+        data_dir = Path(tmp.name)
+
+    try:
+        # Must be set before the backend is imported (output paths are resolved at import time).
+        os.environ["WECHAT_TOOL_DATA_DIR"] = str(data_dir)
+        # Per-request INFO logs would dominate the timings of fast endpoints.
+        os.environ.setdefault("WECHAT_TOOL_LOG_LEVEL", "WARNING")
+        synthetic = build_synthetic_account(data_dir, spec_from_args(args))
+        print(
+            f"[bench] dataset messages={synthetic.total_messages} conversations={len(synthetic.conversations)} "
+            f"shards={len(synthetic.message_db_paths)} build={synthetic.build_sec:.2f}s",
+            file=sys.stderr,
+        )
+        result = run_benchmarks(
+            data_dir=data_dir,
+            synthetic=synthetic,
+            benches=benches,
+            repeat=int(args.repeat),
+            log=lambda s: print(f"[bench] {s}", file=sys.stderr),
+        )
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    code = 0 if all(r.get("ok") for r in result["results"]) else 1
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare_results(result, baseline, threshold=float(args.threshold))
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else ""
+            print(
+                f"[bench] {row['name']:<32} {row['baselineMs']:>10.2f}ms -> {row['currentMs']:>10.2f}ms "
+                f"x{row['ratio']:.2f} {flag}",
+                file=sys.stderr,
+            )
+        if any(r["regressed"] for r in rows):
+            code = 1
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
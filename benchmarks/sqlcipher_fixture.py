@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+把明文 SQLite 数据库加密成 WeChat 4.x 使用的 SQLCipher 4 格式，用于离线测试/基准测试解密引擎。
+
+格式（与 `WeChatDatabaseDecryptor.decrypt_database` 完全对应）：
+- 页大小 4096，每页末尾 80 字节保留区 = IV(16) + HMAC-SHA512(64)
+- 加密密钥 = PBKDF2-SHA512(key, salt, 256000 轮, 32 字节)；salt 为文件前 16 字节
+- MAC 密钥 = PBKDF2-SHA512(加密密钥, salt ^ 0x3a, 2 轮, 32 字节)
+- 第 1 页跳过 salt 后加密 [16, 4016)，其余页加密 [0, 4016)，AES-256-CBC，无填充
+- HMAC = HMAC-SHA512(mac_key, 密文 + IV + 页号(小端 4 字节，从 1 开始))
+
+SQLCipher 要求明文库本身就预留了 80 字节/页（文件头第 20 字节），所以先把源库逐表复制到一个
+reserve=80 的新库里再加密。
+
+用法:
+  python -m benchmarks.sqlcipher_fixture --in plain.db --out encrypted.db --key <64位hex>
+  python -m benchmarks.sqlcipher_fixture --in plain.db --out encrypted.db --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+PAGE_SIZE = 4096
+SALT_SIZE = 16
+IV_SIZE = 16
+HMAC_SIZE = 64
+RESERVE_SIZE = 80  # IV + HMAC-SHA512, already a multiple of the AES block size
+KDF_ITERATIONS = 256000
+MAC_KDF_ITERATIONS = 2
+
+# Fixed default key so fixtures are reproducible; never a real account key.
+DEFAULT_KEY_HEX = "00112233445566778899aabbccddeeff" * 2
+
+
+def derive_keys(key_bytes: bytes, salt: bytes) -> tuple[bytes, bytes]:
+    enc_key = PBKDF2HMAC(
+        algorithm=hashes.SHA512(),
+        length=32,
+        salt=salt,
+        iterations=KDF_ITERATIONS,
+        backend=default_backend(),
+    ).derive(key_bytes)
+    mac_salt = bytes(b ^ 0x3A for b in salt)
+    mac_key = PBKDF2HMAC(
+        algorithm=hashes.SHA512(),
+        length=32,
+        salt=mac_salt,
+        iterations=MAC_KDF_ITERATIONS,
+        backend=default_backend(),
+    ).derive(enc_key)
+    return enc_key, mac_key
+
+
+def _write_empty_database(path: Path, *, page_size: int = PAGE_SIZE, reserve: int = RESERVE_SIZE) -> None:
+    """Write page 1 of an empty database with `reserve` bytes per page (what SQLCipher creates)."""
+
+    page = bytearray(page_size)
+    page[0:16] = SQLITE_HEADER
+    struct.pack_into(">H", page, 16, page_size)
+    page[18] = 1  # file format write version (legacy/rollback journal)
+    page[19] = 1  # read version
+    page[20] = reserve
+    page[21], page[22], page[23] = 64, 32, 32  # payload fractions (fixed by the file format)
+    struct.pack_into(">I", page, 24, 1)  # file change counter
+    struct.pack_into(">I", page, 28, 1)  # database size in pages
+    struct.pack_into(">I", page, 44, 4)  # schema format number
+    struct.pack_into(">I", page, 56, 1)  # text encoding: UTF-8
+    struct.pack_into(">I", page, 92, 1)  # version-valid-for
+    v = sqlite3.sqlite_version_info
+    struct.pack_into(">I", page, 96, v[0] * 1_000_000 + v[1] * 1000 + v[2])
+    # Empty sqlite_schema: table b-tree leaf, no cells, content area starts at the usable end.
+    page[100] = 0x0D
+    struct.pack_into(">H", page, 105, page_size - reserve)
+    path.write_bytes(bytes(page))
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def copy_with_reserve(src_path: Path, dst_path: Path, *, reserve: int = RESERVE_SIZE) -> None:
+    """Copy every table/index/view/trigger of `src_path` into a new database that keeps `reserve` bytes per page.
+
+    `backup`/`VACUUM INTO` keep the source's reserve, so this rebuilds the schema and copies rows instead.
+    """
+
+    dst_path = Path(dst_path)
+    if dst_path.exists():
+        dst_path.unlink()
+    _write_empty_database(dst_path, reserve=reserve)
+
+    conn = sqlite3.connect(str(dst_path))
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (str(src_path),))
+        rows = conn.execute(
+            "SELECT type, name, tbl_name, sql FROM src.sqlite_master WHERE sql IS NOT NULL ORDER BY rowid"
+        ).fetchall()
+
+        virtual = [r[1] for r in rows if r[0] == "table" and str(r[3]).upper().startswith("CREATE VIRTUAL TABLE")]
+        # Shadow tables of virtual tables (e.g. FTS5 "<name>_data") are recreated by the module itself.
+        shadow_prefixes = tuple(f"{v}_" for v in virtual)
+
+        tables: list[str] = []
+        for typ, name, _tbl, sql in rows:
+            if typ != "table" or name.startswith("sqlite_") or name.startswith(shadow_prefixes):
+                continue
+            conn.execute(sql)
+            tables.append(name)
+        for name in tables:
+            q = _quote_ident(name)
+            conn.execute(f"INSERT INTO main.{q} SELECT * FROM src.{q}")
+        if conn.execute("SELECT 1 FROM src.sqlite_master WHERE name='sqlite_sequence'").fetchone():
+            conn.execute("DELETE FROM main.sqlite_sequence")
+            conn.execute("INSERT INTO main.sqlite_sequence SELECT * FROM src.sqlite_sequence")
+        for typ, name, tbl, sql in rows:
+            if typ in ("index", "view", "trigger") and not str(tbl).startswith(shadow_prefixes):
+                conn.execute(sql)
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+
+def encrypt_database_bytes(plain: bytes, key_hex: str, *, salt: Optional[bytes] = None, seed: Optional[int] = None) -> bytes:
+    """Encrypt raw SQLite bytes (4096-byte pages, 80-byte reserve) into the WeChat 4.x SQLCipher layout.
+
+    `seed` makes salt/IVs deterministic so fixtures are byte-identical across runs.
+    """
+
+    if len(plain) < PAGE_SIZE or len(plain) % PAGE_SIZE != 0:
+        raise ValueError("明文数据库大小必须是 4096 的整数倍")
+    if not plain.startswith(SQLITE_HEADER):
+        raise ValueError("输入不是 SQLite 数据库")
+    if struct.unpack_from(">H", plain, 16)[0] != PAGE_SIZE:
+        raise ValueError("明文数据库页大小必须是 4096")
+    if plain[20] != RESERVE_SIZE:
+        raise ValueError(f"明文数据库每页保留区必须是 {RESERVE_SIZE} 字节（先调用 copy_with_reserve）")
+
+    key_bytes = bytes.fromhex(key_hex)
+    if len(key_bytes) != 32:
+        raise ValueError("密钥必须是64位十六进制字符串")
+
+    if seed is not None:
+        stream = hashlib.shake_256(f"sqlcipher-fixture:{int(seed)}".encode("ascii"))
+        total = len(plain) // PAGE_SIZE
+        random_bytes = stream.digest(SALT_SIZE + IV_SIZE * total)
+        salt = salt or random_bytes[:SALT_SIZE]
+        ivs = [random_bytes[SALT_SIZE + i * IV_SIZE : SALT_SIZE + (i + 1) * IV_SIZE] for i in range(total)]
+    else:
+        salt = salt or os.urandom(SALT_SIZE)
+        ivs = None
+    if len(salt) != SALT_SIZE:
+        raise ValueError("salt 必须是 16 字节")
+
+    enc_key, mac_key = derive_keys(key_bytes, salt)
+    out = bytearray()
+    data_end = PAGE_SIZE - RESERVE_SIZE
+    for i in range(len(plain) // PAGE_SIZE):
+        page = plain[i * PAGE_SIZE : (i + 1) * PAGE_SIZE]
+        offset = SALT_SIZE if i == 0 else 0
+        iv = ivs[i] if ivs is not None else os.urandom(IV_SIZE)
+
+        encryptor = Cipher(algorithms.AES(enc_key), modes.CBC(iv), backend=default_backend()).encryptor()
+        ciphertext = encryptor.update(page[offset:data_end]) + encryptor.finalize()
+
+        mac = hmac.new(mac_key, digestmod=hashlib.sha512)
+        mac.update(ciphertext)
+        mac.update(iv)
+        mac.update((i + 1).to_bytes(4, "little"))
+
+        if i == 0:
+            out += salt
+        out += ciphertext
+        out += iv
+        out += mac.digest()
+    return bytes(out)
+
+
+def encrypt_sqlite_database(
+    plain_path: Path,
+    out_path: Path,
+    key_hex: str = DEFAULT_KEY_HEX,
+    *,
+    seed: Optional[int] = None,
+) -> dict:
+    """Encrypt a plaintext SQLite file as WeChat 4.x would store it; returns basic stats."""
+
+    plain_path = Path(plain_path)
+    out_path = Path(out_path)
+    with tempfile.TemporaryDirectory(prefix="sqlcipher-fixture-") as td:
+        staged = Path(td) / "plain_reserve.db"
+        raw = plain_path.read_bytes()
+        if (
+            raw.startswith(SQLITE_HEADER)
+            and len(raw) >= PAGE_SIZE
+            and raw[20] == RESERVE_SIZE
+            and struct.unpack_from(">H", raw, 16)[0] == PAGE_SIZE
+        ):
+            shutil.copyfile(plain_path, staged)
+        else:
+            copy_with_reserve(plain_path, staged)
+        plain = staged.read_bytes()
+
+    encrypted = encrypt_database_bytes(plain, key_hex, seed=seed)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(encrypted)
+    return {"pages": len(encrypted) // PAGE_SIZE, "bytes": len(encrypted), "path": str(out_path)}
+
+
+def logical_dump_digest(db_path: Path) -> str:
+    """Digest of `iterdump()`; equal digests mean the same schema and rows regardless of page layout."""
+
+    conn = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True)
+    try:
+        h = hashlib.sha256()
+        for line in conn.iterdump():
+            h.update(line.encode("utf-8"))
+            h.update(b"\n")
+        return h.hexdigest()
+    finally:
+        conn.close()
+
+
+def verify_round_trip(plain_path: Path, decrypted_path: Path) -> dict:
+    """Check a decrypted database against its plaintext source (integrity + identical logical content)."""
+
+    conn = sqlite3.connect(f"file:{Path(decrypted_path).as_posix()}?mode=ro", uri=True)
+    try:
+        integrity = str(conn.execute("PRAGMA integrity_check").fetchone()[0])
+    finally:
+        conn.close()
+    same = logical_dump_digest(plain_path) == logical_dump_digest(decrypted_path)
+    return {"ok": bool(integrity == "ok" and same), "integrity": integrity, "contentMatches": bool(same)}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="把明文 SQLite 加密为 WeChat 4.x SQLCipher 4 格式")
+    parser.add_argument("--in", dest="src", required=True, help="明文 SQLite 数据库")
+    parser.add_argument("--out", required=True, help="输出的加密数据库")
+    parser.add_argument("--key", default=DEFAULT_KEY_HEX, help="64位十六进制密钥（默认固定测试密钥）")
+    parser.add_argument("--seed", type=int, default=None, help="固定 salt/IV，生成可复现的文件")
+    parser.add_argument("--verify", action="store_true", help="用 WeChatDatabaseDecryptor 解密并校验往返一致")
+    args = parser.parse_args(argv)
+
+    stats = encrypt_sqlite_database(Path(args.src), Path(args.out), args.key, seed=args.seed)
+    print(f"encrypted pages={stats['pages']} bytes={stats['bytes']} -> {stats['path']}")
+
+    if args.verify:
+        root = Path(__file__).resolve().parents[1]
+        if str(root / "src") not in sys.path:
+            sys.path.insert(0, str(root / "src"))
+        from wechat_decrypt_tool.wechat_decrypt import WeChatDatabaseDecryptor
+
+        with tempfile.TemporaryDirectory(prefix="sqlcipher-verify-") as td:
+            out = Path(td) / "decrypted.db"
+            if not WeChatDatabaseDecryptor(args.key).decrypt_database(str(args.out), str(out)):
+                print("round trip: decrypt failed", file=sys.stderr)
+                return 1
+            result = verify_round_trip(Path(args.src), out)
+        print(f"round trip: {result}")
+        return 0 if result["ok"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成合成的“已解密”微信账号目录，用于离线性能基准测试（不需要真实微信数据）。
+
+生成内容（与 WeChat 4.x 解密后的结构一致）：
+- message_{0..N-1}.db：按时间切片的消息分库，每库自带 Name2Id；会话表 Msg_<md5(username)>
+  XML 类消息（图片/表情/语音/链接/引用）以 zstd 压缩后写入 message_content（WCDB_CT_message_content=4）
+- session.db：SessionTable
+- contact.db：contact / stranger / chat_room（含群名片 ext_buffer）
+- head_image.db：head_image（小尺寸占位头像）
+
+用法:
+  python -m benchmarks.synthetic_account --out /tmp/bench --shards 4 --conversations 200 --messages 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import zstandard as zstd  # type: ignore
+except Exception:  # pragma: no cover - zstandard is a hard dependency of the backend
+    zstd = None
+
+
+# Local types observed in WeChat 4.x message tables (app messages encode the appmsg type in the high 32 bits).
+LOCAL_TYPE_TEXT = 1
+LOCAL_TYPE_IMAGE = 3
+LOCAL_TYPE_VOICE = 34
+LOCAL_TYPE_EMOJI = 47
+LOCAL_TYPE_LINK = (5 << 32) | 49
+LOCAL_TYPE_QUOTE = (57 << 32) | 49
+LOCAL_TYPE_SYSTEM = 10000
+
+# Rough type mix of a real account (text-heavy, with a tail of media/app messages).
+_TYPE_WEIGHTS: tuple[tuple[int, int], ...] = (
+    (LOCAL_TYPE_TEXT, 70),
+    (LOCAL_TYPE_IMAGE, 8),
+    (LOCAL_TYPE_EMOJI, 7),
+    (LOCAL_TYPE_VOICE, 3),
+    (LOCAL_TYPE_LINK, 5),
+    (LOCAL_TYPE_QUOTE, 5),
+    (LOCAL_TYPE_SYSTEM, 2),
+)
+
+_WORDS = (
+    "好的", "在吗", "收到", "哈哈哈", "明天见", "晚安", "开会", "吃饭了吗", "周末", "项目", "进度", "文档",
+    "下班", "加油", "谢谢", "辛苦了", "没问题", "稍等", "马上", "电影", "天气", "地铁", "咖啡", "快递",
+    "meeting", "deploy", "review", "release", "bug", "coffee", "weekend", "ticket",
+)
+_NICK_PARTS = ("小", "阿", "老", "大")
+_NAME_CHARS = "张王李赵刘陈杨黄周吴徐孙马朱胡郭何林罗高郑梁谢宋唐许韩冯邓曹彭曾肖田董潘袁蔡蒋余杜叶程苏魏吕丁任沈姚卢"
+
+_SQLITE_MESSAGE_COLUMNS = (
+    "local_id, server_id, local_type, sort_seq, real_sender_id, create_time, status, source, "
+    "message_content, compress_content, packed_info_data, WCDB_CT_message_content"
+)
+
+
+@dataclass
+class SyntheticAccountSpec:
+    account: str = "wxid_benchself"
+    shards: int = 2
+    conversations: int = 50
+    messages_per_conversation: int = 200
+    group_ratio: float = 0.25
+    group_members: int = 30
+    contacts_extra: int = 0
+    start_ts: int = 1704067200  # 2024-01-01 00:00:00 UTC
+    span_days: int = 365
+    seed: int = 20240101
+
+
+@dataclass
+class SyntheticAccount:
+    spec: SyntheticAccountSpec
+    account_dir: Path
+    conversations: list[str] = field(default_factory=list)
+    groups: list[str] = field(default_factory=list)
+    message_db_paths: list[Path] = field(default_factory=list)
+    total_messages: int = 0
+    build_sec: float = 0.0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "spec": asdict(self.spec),
+            "accountDir": str(self.account_dir),
+            "conversations": len(self.conversations),
+            "groups": len(self.groups),
+            "messageDbs": [p.name for p in self.message_db_paths],
+            "totalMessages": int(self.total_messages),
+            "buildSec": round(float(self.build_sec), 3),
+        }
+
+
+def msg_table_name(username: str) -> str:
+    return f"Msg_{hashlib.md5(username.encode('utf-8')).hexdigest()}"
+
+
+def _zstd_compress(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    if zstd is None:
+        return raw
+    return zstd.ZstdCompressor(level=3).compress(raw)
+
+
+def _enc_varint(n: int) -> bytes:
+    v = int(n)
+    out = bytearray()
+    while True:
+        b = v & 0x7F
+        v >>= 7
+        if v:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _enc_len(field_no: int, data: bytes) -> bytes:
+    return _enc_varint((int(field_no) << 3) | 2) + _enc_varint(len(data)) + data
+
+
+def build_chatroom_ext_buffer(members: dict[str, str]) -> bytes:
+    """contact.db chat_room.ext_buffer: repeated submessages {1: username, 2: group nickname}."""
+
+    out = bytearray()
+    for username, display in members.items():
+        inner = _enc_len(1, username.encode("utf-8"))
+        if display:
+            inner += _enc_len(2, display.encode("utf-8"))
+        out += _enc_len(1, inner)
+    return bytes(out)
+
+
+def _rand_name(rnd: random.Random) -> str:
+    if rnd.random() < 0.3:
+        return rnd.choice(_NICK_PARTS) + rnd.choice(_NAME_CHARS)
+    return rnd.choice(_NAME_CHARS) + "".join(rnd.choice(_NAME_CHARS) for _ in range(rnd.randint(1, 2)))
+
+
+def _rand_text(rnd: random.Random) -> str:
+    n = rnd.randint(1, 8)
+    return "".join(rnd.choice(_WORDS) + ("，" if rnd.random() < 0.2 else "") for _ in range(n))
+
+
+def _md5_hex(rnd: random.Random) -> str:
+    return "%032x" % rnd.getrandbits(128)
+
+
+def _build_payload(rnd: random.Random, local_type: int, *, sender: str, peer: str) -> tuple[Any, Optional[int]]:
+    """Return (message_content, WCDB_CT_message_content)."""
+
+    if local_type == LOCAL_TYPE_TEXT:
+        return _rand_text(rnd), None
+    if local_type == LOCAL_TYPE_SYSTEM:
+        return f"\"{_rand_name(rnd)}\"邀请\"{_rand_name(rnd)}\"加入了群聊", None
+
+    if local_type == LOCAL_TYPE_IMAGE:
+        md5 = _md5_hex(rnd)
+        xml = (
+            '<?xml version="1.0"?>\n<msg>\n'
+            f'\t<img aeskey="{_md5_hex(rnd)}" encryver="1" cdnthumbaeskey="{_md5_hex(rnd)}" '
+            f'cdnthumburl="3057020100044b30490201000204{_md5_hex(rnd)}" cdnthumblength="{rnd.randint(2000, 9000)}" '
+            f'cdnthumbheight="120" cdnthumbwidth="90" length="{rnd.randint(20000, 900000)}" md5="{md5}" />\n'
+            "</msg>"
+        )
+    elif local_type == LOCAL_TYPE_EMOJI:
+        xml = (
+            f'<msg><emoji fromusername="{sender}" tousername="{peer}" type="2" md5="{_md5_hex(rnd)}" '
+            f'len="{rnd.randint(1000, 90000)}" productid="" androidmd5="{_md5_hex(rnd)}" width="240" height="240" '
+            f'cdnurl="http://wxapp.tc.qq.com/262/20304/stodownload?m={_md5_hex(rnd)}&amp;filekey={_md5_hex(rnd)}" '
+            "/></msg>"
+        )
+    elif local_type == LOCAL_TYPE_VOICE:
+        xml = (
+            f'<msg><voicemsg endflag="1" cancelflag="0" forwardflag="0" voiceformat="4" '
+            f'voicelength="{rnd.randint(1000, 59000)}" length="{rnd.randint(2000, 60000)}" '
+            f'bufid="0" aeskey="{_md5_hex(rnd)}" voiceurl="{_md5_hex(rnd)}" fromusername="{sender}" /></msg>'
+        )
+    elif local_type == LOCAL_TYPE_LINK:
+        title = _rand_text(rnd)[:30]
+        xml = (
+            '<?xml version="1.0"?>\n<msg>\n\t<appmsg appid="" sdkver="0">\n'
+            f"\t\t<title>{title}</title>\n\t\t<des>{_rand_text(rnd)}</des>\n"
+            "\t\t<type>5</type>\n"
+            f"\t\t<url>https://mp.weixin.qq.com/s?__biz={_md5_hex(rnd)[:16]}&amp;mid={rnd.randint(1, 10**9)}&amp;idx=1</url>\n"
+            f"\t\t<thumburl>https://mmbiz.qpic.cn/mmbiz_jpg/{_md5_hex(rnd)}/0</thumburl>\n"
+            f"\t\t<sourcedisplayname>{_rand_name(rnd)}的公众号</sourcedisplayname>\n"
+            "\t</appmsg>\n"
+            f"\t<fromusername>{sender}</fromusername>\n\t<scene>0</scene>\n</msg>"
+        )
+    elif local_type == LOCAL_TYPE_QUOTE:
+        xml = (
+            '<?xml version="1.0"?>\n<msg>\n\t<appmsg appid="" sdkver="0">\n'
+            f"\t\t<title>{_rand_text(rnd)}</title>\n\t\t<type>57</type>\n"
+            "\t\t<refermsg>\n\t\t\t<type>1</type>\n"
+            f"\t\t\t<svrid>{rnd.randint(10**17, 10**18)}</svrid>\n"
+            f"\t\t\t<fromusr>{peer}</fromusr>\n\t\t\t<chatusr>{sender}</chatusr>\n"
+            f"\t\t\t<displayname>{_rand_name(rnd)}</displayname>\n"
+            f"\t\t\t<content>{_rand_text(rnd)}</content>\n"
+            "\t\t</refermsg>\n\t</appmsg>\n"
+            f"\t<fromusername>{sender}</fromusername>\n</msg>"
+        )
+    else:
+        return _rand_text(rnd), None
+
+    # WeChat 4.x stores XML payloads zstd-compressed (WCDB compression type 4).
+    return _zstd_compress(xml), 4
+
+
+def _create_message_table(conn: sqlite3.Connection, table: str) -> None:
+    q = '"' + table.replace('"', '""') + '"'
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {q}(
+            local_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            server_id INTEGER,
+            local_type INTEGER,
+            sort_seq INTEGER,
+            real_sender_id INTEGER,
+            create_time INTEGER,
+            status INTEGER,
+            upload_status INTEGER,
+            download_status INTEGER,
+            server_seq INTEGER,
+            origin_source INTEGER,
+            source TEXT,
+            message_content TEXT,
+            compress_content TEXT,
+            packed_info_data BLOB,
+            WCDB_CT_message_content INTEGER DEFAULT NULL,
+            WCDB_CT_source INTEGER DEFAULT NULL
+        )
+        """
+    )
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_SENDERID" ON {q}(real_sender_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_SERVERID" ON {q}(server_id)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_SORTSEQ" ON {q}(sort_seq)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_TYPE_SEQ" ON {q}(local_type, sort_seq)')
+
+
+def _write_contact_db(
+    path: Path,
+    *,
+    account: str,
+    names: dict[str, str],
+    group_members: dict[str, dict[str, str]],
+    rnd: random.Random,
+) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        for table in ("contact", "stranger"):
+            conn.execute(
+                f"""
+                CREATE TABLE {table}(
+                    username TEXT PRIMARY KEY,
+                    local_type INTEGER,
+                    alias TEXT,
+                    remark TEXT,
+                    nick_name TEXT,
+                    big_head_url TEXT,
+                    small_head_url TEXT,
+                    verify_flag INTEGER,
+                    flag INTEGER
+                )
+                """
+            )
+        conn.execute("CREATE TABLE chat_room(id INTEGER PRIMARY KEY, username TEXT, owner TEXT, ext_buffer BLOB)")
+
+        rows = []
+        for username, nick in names.items():
+            is_group = username.endswith("@chatroom")
+            remark = "" if is_group or rnd.random() < 0.6 else f"{nick}（备注）"
+            alias = "" if is_group or rnd.random() < 0.5 else f"wx_{hashlib.md5(username.encode()).hexdigest()[:10]}"
+            head = f"https://wx.qlogo.cn/mmhead/ver_1/{hashlib.md5(username.encode()).hexdigest()}/132"
+            rows.append((username, 2 if is_group else 1, alias, remark, nick, head, head, 0, 3))
+        conn.executemany("INSERT INTO contact VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        for i, (room, members) in enumerate(group_members.items(), start=1):
+            conn.execute(
+                "INSERT INTO chat_room(id, username, owner, ext_buffer) VALUES (?, ?, ?, ?)",
+                (i, room, account, build_chatroom_ext_buffer(members)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _write_head_image_db(path: Path, usernames: list[str]) -> None:
+    # A tiny valid JPEG header is enough for mime sniffing; size matters more than pixels here.
+    blob = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"\x00" * 1500 + b"\xff\xd9"
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute("CREATE TABLE head_image(username TEXT PRIMARY KEY, md5 TEXT, image_buffer BLOB, update_time INTEGER)")
+        conn.executemany(
+            "INSERT INTO head_image VALUES (?, ?, ?, ?)",
+            [(u, hashlib.md5(u.encode()).hexdigest(), blob, 1704067200) for u in usernames],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_synthetic_account(output_root: Path, spec: Optional[SyntheticAccountSpec] = None) -> SyntheticAccount:
+    """Create `<output_root>/output/databases/<account>` with synthetic decrypted databases."""
+
+    spec = spec or SyntheticAccountSpec()
+    t0 = time.perf_counter()
+    rnd = random.Random(int(spec.seed))
+
+    account_dir = Path(output_root) / "output" / "databases" / spec.account
+    account_dir.mkdir(parents=True, exist_ok=True)
+
+    n_groups = int(round(max(0, spec.conversations) * max(0.0, min(1.0, float(spec.group_ratio)))))
+    conversations: list[str] = []
+    groups: list[str] = []
+    for i in range(max(0, spec.conversations)):
+        if i < n_groups:
+            u = f"{10**10 + i}@chatroom"
+            groups.append(u)
+        else:
+            u = f"wxid_bench{i:06d}"
+        conversations.append(u)
+
+    # Group members are drawn from a shared pool so senders overlap across groups (like real accounts).
+    member_pool = [f"wxid_member{i:06d}" for i in range(max(spec.group_members * 3, 10))]
+    names: dict[str, str] = {spec.account: "我"}
+    for u in conversations:
+        names[u] = (_rand_name(rnd) + "的群") if u.endswith("@chatroom") else _rand_name(rnd)
+    for u in member_pool:
+        names.setdefault(u, _rand_name(rnd))
+    for i in range(max(0, spec.contacts_extra)):
+        names.setdefault(f"wxid_extra{i:06d}", _rand_name(rnd))
+
+    group_members: dict[str, dict[str, str]] = {}
+    for g in groups:
+        members = rnd.sample(member_pool, min(len(member_pool), max(2, spec.group_members)))
+        group_members[g] = {m: (f"群名片{_rand_name(rnd)}" if rnd.random() < 0.4 else "") for m in members}
+
+    # Name2Id is per shard; assign the same rowids everywhere to keep the generator simple.
+    all_users = list(names.keys())
+    rowid_of = {u: i + 1 for i, u in enumerate(all_users)}
+
+    shards = max(1, int(spec.shards))
+    span = max(1, int(spec.span_days)) * 86400
+    slice_len = span / shards
+    db_paths = [account_dir / f"message_{i}.db" for i in range(shards)]
+    conns = [sqlite3.connect(str(p)) for p in db_paths]
+    last_ts: dict[str, int] = {}
+    last_text: dict[str, str] = {}
+    total = 0
+    server_id = 7_000_000_000_000_000_000
+    type_choices = [t for t, _ in _TYPE_WEIGHTS]
+    type_weights = [w for _, w in _TYPE_WEIGHTS]
+    try:
+        for conn in conns:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE Name2Id(user_name TEXT PRIMARY KEY, is_session INTEGER DEFAULT 1)")
+            conn.executemany(
+                "INSERT INTO Name2Id(rowid, user_name, is_session) VALUES (?, ?, 1)",
+                [(rowid_of[u], u) for u in all_users],
+            )
+
+        insert_cols = _SQLITE_MESSAGE_COLUMNS
+        for conv in conversations:
+            is_group = conv.endswith("@chatroom")
+            senders = [spec.account] + (list(group_members.get(conv, {}).keys()) if is_group else [conv])
+            k = max(0, int(spec.messages_per_conversation))
+            stamps = sorted(int(spec.start_ts) + rnd.randrange(span) for _ in range(k))
+            per_shard: dict[int, list[tuple[Any, ...]]] = {}
+            for ts in stamps:
+                shard = min(shards - 1, int((ts - int(spec.start_ts)) / slice_len))
+                sender = spec.account if rnd.random() < 0.45 else rnd.choice(senders[1:] or senders)
+                local_type = rnd.choices(type_choices, weights=type_weights, k=1)[0]
+                if local_type == LOCAL_TYPE_SYSTEM:
+                    sender = ""
+                content, ct = _build_payload(rnd, local_type, sender=sender or conv, peer=conv)
+                if is_group and sender and sender != spec.account and isinstance(content, str):
+                    # Group messages from others carry a "wxid:\n" prefix in message_content.
+                    content = f"{sender}:\n{content}"
+                server_id += 1
+                rows = per_shard.setdefault(shard, [])
+                rows.append(
+                    (
+                        len(rows) + 1,
+                        server_id,
+                        local_type,
+                        ts * 1000 + len(rows),
+                        rowid_of.get(sender, 0),
+                        ts,
+                        2 if sender == spec.account else 3,
+                        "",
+                        content,
+                        None,
+                        None,
+                        ct,
+                    )
+                )
+                last_ts[conv] = ts
+                if local_type == LOCAL_TYPE_TEXT and isinstance(content, str):
+                    last_text[conv] = content
+            for shard, rows in per_shard.items():
+                table = msg_table_name(conv)
+                conn = conns[shard]
+                _create_message_table(conn, table)
+                conn.executemany(
+                    f'INSERT INTO "{table}" ({insert_cols}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+                total += len(rows)
+        for conn in conns:
+            conn.commit()
+    finally:
+        for conn in conns:
+            conn.close()
+
+    session_conn = sqlite3.connect(str(account_dir / "session.db"))
+    try:
+        session_conn.execute(
+            """
+            CREATE TABLE SessionTable(
+                username TEXT PRIMARY KEY,
+                type INTEGER,
+                unread_count INTEGER,
+                unread_first_msg_srv_id INTEGER,
+                is_hidden INTEGER,
+                summary TEXT,
+                draft TEXT,
+                status INTEGER,
+                last_timestamp INTEGER,
+                sort_timestamp INTEGER,
+                last_clear_unread_timestamp INTEGER,
+                last_msg_locald_id INTEGER,
+                last_msg_type INTEGER,
+                last_msg_sub_type INTEGER,
+                last_msg_sender TEXT,
+                last_sender_display_name TEXT
+            )
+            """
+        )
+        rows = []
+        for conv in conversations:
+            ts = int(last_ts.get(conv) or spec.start_ts)
+            rows.append(
+                (conv, 0, rnd.randint(0, 3), 0, 0, last_text.get(conv, "")[:60], "", 0, ts, ts, 0, 0, 1, 0, "", "")
+            )
+        session_conn.executemany(
+            "INSERT INTO SessionTable VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        session_conn.commit()
+    finally:
+        session_conn.close()
+
+    _write_contact_db(
+        account_dir / "contact.db",
+        account=spec.account,
+        names=names,
+        group_members=group_members,
+        rnd=rnd,
+    )
+    _write_head_image_db(account_dir / "head_image.db", all_users)
+
+    return SyntheticAccount(
+        spec=spec,
+        account_dir=account_dir,
+        conversations=conversations,
+        groups=groups,
+        message_db_paths=db_paths,
+        total_messages=total,
+        build_sec=time.perf_counter() - t0,
+    )
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    d = SyntheticAccountSpec()
+    parser.add_argument("--account", default=d.account)
+    parser.add_argument("--shards", type=int, default=d.shards, help="message_N.db 分库数量")
+    parser.add_argument("--conversations", type=int, default=d.conversations, help="会话数量")
+    parser.add_argument("--messages", type=int, default=d.messages_per_conversation, help="每个会话的消息数")
+    parser.add_argument("--group-ratio", type=float, default=d.group_ratio)
+    parser.add_argument("--group-members", type=int, default=d.group_members)
+    parser.add_argument("--contacts-extra", type=int, default=d.contacts_extra, help="额外的非会话联系人数量")
+    parser.add_argument("--seed", type=int, default=d.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> SyntheticAccountSpec:
+    return SyntheticAccountSpec(
+        account=str(args.account),
+        shards=int(args.shards),
+        conversations=int(args.conversations),
+        messages_per_conversation=int(args.messages),
+        group_ratio=float(args.group_ratio),
+        group_members=int(args.group_members),
+        contacts_extra=int(args.contacts_extra),
+        seed=int(args.seed),
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="生成合成微信账号（已解密）数据库")
+    parser.add_argument("--out", required=True, help="数据根目录（等价于 WECHAT_TOOL_DATA_DIR）")
+    add_spec_arguments(parser)
+    args = parser.parse_args(argv)
+
+    acc = build_synthetic_account(Path(args.out), spec_from_args(args))
+    print(json.dumps(acc.summary(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+WCDB 实时接口的本地替身（纯 sqlite，不需要 wcdb_api.dll / Windows），用于在 Linux 上基准测试实时同步。
+
+把一个已解密账号的消息库复制成“活库”（db_storage/message/*.db），并实现 routers/chat.py 用到的
+get_sessions / get_messages / exec_query；append_messages() 模拟新消息到达（写入活库并推进会话时间戳）。
+
+用法:
+  standin = LocalWCDBStandIn.from_decrypted_account(account_dir, tmp_dir / "db_storage")
+  standin.append_messages(usernames, count=5)
+  with standin.patch(chat_router):
+      chat_router.sync_chat_realtime_messages_all(None, account=account_dir.name)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from unittest import mock
+
+from benchmarks.synthetic_account import msg_table_name
+
+_MESSAGE_COLUMNS = (
+    "local_id",
+    "server_id",
+    "local_type",
+    "sort_seq",
+    "real_sender_id",
+    "create_time",
+    "message_content",
+    "compress_content",
+    "packed_info_data",
+)
+
+
+class LocalWCDBStandIn:
+    """Serves a db_storage-shaped directory of plain sqlite files through the WCDB realtime call signatures."""
+
+    def __init__(self, db_storage_dir: Path, *, account: str) -> None:
+        self.db_storage_dir = Path(db_storage_dir)
+        self.message_dir = self.db_storage_dir / "message"
+        self.account = str(account)
+        # The stand-in doubles as the WCDBRealtimeConnection returned by ensure_connected().
+        self.handle = 1
+        self.lock = threading.Lock()
+        self._sessions: dict[str, dict[str, Any]] = {}
+        self._table_db: dict[str, Optional[Path]] = {}
+        self._server_id = 9_000_000_000_000_000_000
+        self._load_sessions()
+
+    @classmethod
+    def from_decrypted_account(cls, account_dir: Path, db_storage_dir: Path) -> "LocalWCDBStandIn":
+        """Copy a decrypted account's message/session databases into a fresh live db_storage directory."""
+
+        db_storage_dir = Path(db_storage_dir)
+        if db_storage_dir.exists():
+            shutil.rmtree(db_storage_dir)
+        (db_storage_dir / "message").mkdir(parents=True)
+        (db_storage_dir / "session").mkdir(parents=True)
+        for p in sorted(Path(account_dir).glob("*.db")):
+            if p.name == "session.db":
+                shutil.copy2(p, db_storage_dir / "session" / "session.db")
+            elif "message" in p.name.lower():
+                shutil.copy2(p, db_storage_dir / "message" / p.name)
+        return cls(db_storage_dir, account=Path(account_dir).name)
+
+    def _load_sessions(self) -> None:
+        path = self.db_storage_dir / "session" / "session.db"
+        if not path.exists():
+            return
+        conn = sqlite3.connect(str(path))
+        conn.row_factory = sqlite3.Row
+        try:
+            for r in conn.execute("SELECT * FROM SessionTable").fetchall():
+                row = dict(r)
+                self._sessions[str(row.get("username") or "")] = row
+        finally:
+            conn.close()
+
+    def _connect(self, db_path: Path) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _db_for(self, username: str) -> Optional[Path]:
+        # Same pick as chat_router._resolve_decrypted_message_tables: the first DB (by name) holding the table.
+        if username not in self._table_db:
+            table = msg_table_name(username)
+            found: Optional[Path] = None
+            for p in sorted(self.message_dir.glob("*.db"), key=lambda x: x.name):
+                conn = sqlite3.connect(str(p))
+                try:
+                    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                        found = p
+                        break
+                finally:
+                    conn.close()
+            self._table_db[username] = found
+        return self._table_db[username]
+
+    # ---- WCDB realtime API ----
+
+    def get_sessions(self, _handle: int) -> list[dict[str, Any]]:
+        return [dict(r) for r in self._sessions.values()]
+
+    def get_messages(self, _handle: int, username: str, *, limit: int = 50, offset: int = 0) -> list[dict[str, Any]]:
+        db_path = self._db_for(username)
+        if db_path is None:
+            return []
+        cols = ", ".join(f"m.{c}" for c in _MESSAGE_COLUMNS)
+        conn = self._connect(db_path)
+        try:
+            rows = conn.execute(
+                f'SELECT {cols}, COALESCE(n.user_name, "") AS sender_username FROM "{msg_table_name(username)}" AS m '
+                "LEFT JOIN Name2Id AS n ON n.rowid = m.real_sender_id "
+                "ORDER BY m.local_id DESC LIMIT ? OFFSET ?",
+                (int(limit), int(offset)),
+            ).fetchall()
+            return [dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    def exec_query(self, _handle: int, *, kind: str, path: Optional[str], sql: str) -> list[dict[str, Any]]:
+        if kind != "message" or not path:
+            raise RuntimeError(f"unsupported exec_query kind={kind!r}")
+        db_path = self.message_dir / Path(str(path)).name
+        if not db_path.exists():
+            raise RuntimeError(f"no such live database: {db_path.name}")
+        conn = self._connect(db_path)
+        try:
+            return [dict(r) for r in conn.execute(sql).fetchall()]
+        finally:
+            conn.close()
+
+    # ---- driving the live side ----
+
+    def append_messages(self, usernames: list[str], *, count: int = 1, db_name: Optional[str] = None) -> int:
+        """Append `count` text messages to each conversation and bump its session timestamps.
+
+        Messages go to the conversation's first live shard, or to `db_name` (e.g. "message_1.db") when given;
+        the table is created there if the conversation has none yet, like a chat continuing in a newer shard.
+        """
+
+        by_db: dict[Path, list[str]] = {}
+        for u in usernames:
+            home = self._db_for(u)
+            db_path = (self.message_dir / db_name) if (db_name and home is not None) else home
+            if db_path is not None:
+                by_db.setdefault(db_path, []).append(u)
+
+        now = int(time.time())
+        added = 0
+        for db_path, users in by_db.items():
+            conn = sqlite3.connect(str(db_path))
+            try:
+                me = conn.execute("SELECT rowid FROM Name2Id WHERE user_name = ?", (self.account,)).fetchone()
+                sender_id = int(me[0]) if me else 0
+                for u in users:
+                    table = msg_table_name(u)
+                    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                        home = sqlite3.connect(str(self._db_for(u)))
+                        try:
+                            ddl = home.execute("SELECT sql FROM sqlite_master WHERE name=?", (table,)).fetchone()[0]
+                        finally:
+                            home.close()
+                        conn.execute(ddl)
+                    row = conn.execute(f'SELECT MAX(local_id), MAX(create_time) FROM "{table}"').fetchone()
+                    local_id = int(row[0] or 0)
+                    ts = max(int(row[1] or 0), int(self._sessions.get(u, {}).get("last_timestamp") or 0), now)
+                    values = []
+                    for i in range(int(count)):
+                        local_id += 1
+                        ts += 1
+                        self._server_id += 1
+                        values.append((local_id, self._server_id, 1, ts * 1000, sender_id, ts, f"realtime {local_id}"))
+                    conn.executemany(
+                        f'INSERT INTO "{table}" (local_id, server_id, local_type, sort_seq, real_sender_id, create_time, '
+                        "message_content) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        values,
+                    )
+                    added += len(values)
+                    session = self._sessions.setdefault(u, {"username": u})
+                    session.update(
+                        {
+                            "last_timestamp": ts,
+                            "sort_timestamp": ts,
+                            "last_msg_locald_id": local_id,
+                            "last_msg_type": 1,
+                            "summary": f"realtime {local_id}",
+                        }
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+        return added
+
+    @contextlib.contextmanager
+    def patch(self, chat_module: Any) -> Iterator["LocalWCDBStandIn"]:
+        """Route `routers.chat`'s WCDB calls (and db_storage path resolution) to this stand-in."""
+
+        def _resolve_paths(_account_dir: Path, db_stem: str) -> tuple[Path, Path]:
+            return self.message_dir / f"{db_stem}.db", self.message_dir / "message_resource.db"
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(mock.patch.object(chat_module.WCDB_REALTIME, "ensure_connected", return_value=self))
+            stack.enter_context(mock.patch.object(chat_module, "_wcdb_get_sessions", side_effect=self.get_sessions))
+            stack.enter_context(mock.patch.object(chat_module, "_wcdb_get_messages", side_effect=self.get_messages))
+            stack.enter_context(mock.patch.object(chat_module, "_wcdb_exec_query", side_effect=self.exec_query))
+            stack.enter_context(mock.patch.object(chat_module, "_resolve_db_storage_message_paths", side_effect=_resolve_paths))
+            yield self
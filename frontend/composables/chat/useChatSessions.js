@@ -1,4 +1,5 @@
 import { computed, onMounted, ref } from 'vue'
+import { getCachedAvatar, loadAvatarsBatch } from '~/lib/chat/avatar-batch'
 import { normalizeSessionPreview } from '~/lib/chat/formatters'
 
 const SESSION_LIST_WIDTH_KEY = 'ui.chat.session_list_width_physical'
@@ -145,10 +146,11 @@ export const useChatSessions = ({ chatAccounts, selectedAccount, realtimeEnabled
   })
 
   const mapSessions = (sessions) => {
+    const account = selectedAccount.value
     return sessions.map((session) => ({
       id: session.id,
       name: session.name || session.username || session.id,
-      avatar: session.avatar || null,
+      avatar: getCachedAvatar(account, session.username) || session.avatar || null,
       lastMessage: normalizeSessionPreview(session.lastMessage || ''),
       lastMessageTime: session.lastMessageTime || '',
       unreadCount: session.unreadCount || 0,
@@ -158,6 +160,10 @@ export const useChatSessions = ({ chatAccounts, selectedAccount, realtimeEnabled
     }))
   }
 
+  const prefetchSessionAvatars = (account, list) => {
+    void loadAvatarsBatch({ api, account, list, isCurrent: () => selectedAccount.value === account })
+  }
+
   const clearContactsState = (errorMessage = '') => {
     contacts.value = []
     selectedContact.value = null
@@ -196,6 +202,7 @@ export const useChatSessions = ({ chatAccounts, selectedAccount, realtimeEnabled
     const sessions = Array.isArray(sessionsResp?.sessions) ? sessionsResp.sessions : []
     contacts.value = mapSessions(sessions)
     contactsError.value = ''
+    prefetchSessionAvatars(selectedAccount.value, contacts.value)
     return contacts.value
   }
 
@@ -235,6 +242,7 @@ export const useChatSessions = ({ chatAccounts, selectedAccount, realtimeEnabled
     const sessions = Array.isArray(sessionsResp?.sessions) ? sessionsResp.sessions : []
     const nextContacts = mapSessions(sessions)
     contacts.value = nextContacts
+    prefetchSessionAvatars(selectedAccount.value, contacts.value)
 
     if (previousUsername) {
       const matched = nextContacts.find((contact) => contact.username === previousUsername)
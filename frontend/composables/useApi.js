@@ -98,6 +98,14 @@ export const useApi = () => {
     return await request(url)
   }
 
+  // Batch avatars for session/contact lists (one request instead of one per avatar).
+  const getChatAvatarsBatch = async (payload = {}) => {
+    return await request('/chat/avatars', {
+      method: 'POST',
+      body: payload
+    })
+  }
+
   const listChatMessages = async (params = {}) => {
     const query = new URLSearchParams()
     if (params && params.account) query.set('account', params.account)
@@ -225,6 +233,9 @@ export const useApi = () => {
     if (params && params.render_types) query.set('render_types', params.render_types)
     if (params && params.include_hidden != null) query.set('include_hidden', String(!!params.include_hidden))
     if (params && params.include_official != null) query.set('include_official', String(!!params.include_official))
+    if (params && params.sort) query.set('sort', params.sort)
+    if (params && params.half_life_days != null) query.set('half_life_days', String(params.half_life_days))
+    if (params && params.conversation_weights) query.set('conversation_weights', params.conversation_weights)
     if (params && params.session_limit != null) query.set('session_limit', String(params.session_limit))
     if (params && params.per_chat_scan != null) query.set('per_chat_scan', String(params.per_chat_scan))
     if (params && params.scan_limit != null) query.set('scan_limit', String(params.scan_limit))
@@ -260,10 +271,21 @@ export const useApi = () => {
     const query = new URLSearchParams()
     if (params && params.account) query.set('account', params.account)
     if (params && params.rebuild != null) query.set('rebuild', String(!!params.rebuild))
+    if (params && params.shards) query.set('shards', Array.isArray(params.shards) ? params.shards.join(',') : params.shards)
     const url = '/chat/search-index/build' + (query.toString() ? `?${query.toString()}` : '')
     return await request(url, { method: 'POST' })
   }
 
+  const optimizeChatSearchIndex = async (params = {}) => {
+    const query = new URLSearchParams()
+    if (params && params.account) query.set('account', params.account)
+    if (params && params.mode) query.set('mode', params.mode)
+    if (params && params.merge_pages != null) query.set('merge_pages', String(params.merge_pages))
+    if (params && params.vacuum != null) query.set('vacuum', String(!!params.vacuum))
+    const url = '/chat/search-index/optimize' + (query.toString() ? `?${query.toString()}` : '')
+    return await request(url, { method: 'POST' })
+  }
+
   const getChatMessagesAround = async (params = {}) => {
     const query = new URLSearchParams()
     if (params && params.account) query.set('account', params.account)
@@ -610,6 +632,7 @@ export const useApi = () => {
     getChatAccountInfo,
     deleteChatAccount,
     listChatSessions,
+    getChatAvatarsBatch,
     listChatMessages,
     getChatMessageRaw,
     editChatMessage,
@@ -626,6 +649,7 @@ export const useApi = () => {
     searchChatMessages,
     getChatSearchIndexStatus,
     buildChatSearchIndex,
+    optimizeChatSearchIndex,
     listChatSearchSenders,
     getChatMessagesAround,
     getChatMessageDailyCounts,
@@ -0,0 +1,68 @@
+// Shared client for POST /chat/avatars (session list + contacts page).
+// Only the current account's avatars are kept, capped LRU-style so long sessions don't grow without bound.
+
+const AVATAR_BATCH_SIZE = 200
+const AVATAR_CACHE_MAX = 2000
+
+let cachedAccount = ''
+const avatarDataUrls = new Map() // username -> data URL (insertion order = recency)
+
+const useAccount = (account) => {
+  const key = String(account || '')
+  if (key !== cachedAccount) {
+    avatarDataUrls.clear()
+    cachedAccount = key
+  }
+}
+
+export const getCachedAvatar = (account, username) => {
+  if (!username || String(account || '') !== cachedAccount) return null
+  const url = avatarDataUrls.get(username)
+  if (!url) return null
+  avatarDataUrls.delete(username)
+  avatarDataUrls.set(username, url)
+  return url
+}
+
+const rememberAvatar = (username, url) => {
+  avatarDataUrls.delete(username)
+  avatarDataUrls.set(username, url)
+  while (avatarDataUrls.size > AVATAR_CACHE_MAX) {
+    avatarDataUrls.delete(avatarDataUrls.keys().next().value)
+  }
+}
+
+// Fetch avatars for `list` items still pointing at /chat/avatar and patch `item.avatar` in place.
+// `isCurrent()` lets callers stop patching once the user switched account.
+export const loadAvatarsBatch = async ({ api, account, list, isCurrent = () => true }) => {
+  if (!process.client || !account || typeof api?.getChatAvatarsBatch !== 'function') return
+  useAccount(account)
+  const items = Array.isArray(list) ? list : []
+  const pending = []
+  for (const item of items) {
+    if (!item?.username) continue
+    const cached = getCachedAvatar(account, item.username)
+    if (cached) {
+      if (item.avatar !== cached) item.avatar = cached
+    } else if (String(item.avatar || '').includes('/chat/avatar?')) {
+      pending.push(item.username)
+    }
+  }
+  for (let i = 0; i < pending.length; i += AVATAR_BATCH_SIZE) {
+    let resp = null
+    try {
+      resp = await api.getChatAvatarsBatch({ account, usernames: pending.slice(i, i + AVATAR_BATCH_SIZE) })
+    } catch {
+      return
+    }
+    if (!isCurrent()) return
+    useAccount(account)
+    for (const row of Array.isArray(resp?.avatars) ? resp.avatars : []) {
+      if (row?.username && row?.dataUrl) rememberAvatar(row.username, row.dataUrl)
+    }
+    for (const item of items) {
+      const url = item?.username ? avatarDataUrls.get(item.username) : null
+      if (url && item.avatar !== url) item.avatar = url
+    }
+  }
+}
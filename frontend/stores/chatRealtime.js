@@ -14,10 +14,16 @@ export const useChatRealtimeStore = defineStore('chatRealtime', () => {
   const toggleSeq = ref(0)
   const lastToggleAction = ref('')
   const changeSeq = ref(0)
+  // db_storage buckets (message/session/contact/...) changed since the last changeSeq bump (empty: unknown).
+  const changedBuckets = ref([])
   const priorityUsername = ref('')
 
   let eventSource = null
   let changeDebounceTimer = null
+  let pendingBuckets = new Set()
+
+  // Buckets whose changes affect the session list / message views; avatar-only (head_image) or sns churn is ignored.
+  const REFRESH_BUCKETS = new Set(['message', 'session', 'contact', 'bizchat', ''])
 
   const getAccount = () => String(chatAccounts.selectedAccount || '').trim()
 
@@ -71,12 +77,16 @@ export const useChatRealtimeStore = defineStore('chatRealtime', () => {
       } catch {}
       changeDebounceTimer = null
     }
+    pendingBuckets = new Set()
   }
 
-  const bumpChangeSeqDebounced = () => {
+  const bumpChangeSeqDebounced = (buckets) => {
+    for (const b of buckets || []) pendingBuckets.add(String(b))
     if (changeDebounceTimer) return
     changeDebounceTimer = setTimeout(() => {
       changeDebounceTimer = null
+      changedBuckets.value = Array.from(pendingBuckets)
+      pendingBuckets = new Set()
       changeSeq.value += 1
     }, 500)
   }
@@ -103,7 +113,11 @@ export const useChatRealtimeStore = defineStore('chatRealtime', () => {
       try {
         const data = JSON.parse(String(ev.data || '{}'))
         if (String(data?.type || '') === 'change') {
-          bumpChangeSeqDebounced()
+          const buckets = Array.isArray(data?.buckets) ? data.buckets.map((b) => String(b ?? '')) : null
+          // Older backends send no buckets: treat every change as relevant.
+          if (!buckets || buckets.some((b) => REFRESH_BUCKETS.has(b))) {
+            bumpChangeSeqDebounced(buckets)
+          }
         }
       } catch {}
     }
@@ -211,6 +225,7 @@ export const useChatRealtimeStore = defineStore('chatRealtime', () => {
     toggleSeq,
     lastToggleAction,
     changeSeq,
+    changedBuckets,
     priorityUsername,
 
     setPriorityUsername,
@@ -34,6 +34,13 @@ def main():
     print("按 Ctrl+C 停止服务")
     print("=" * 60)
     
+    if os.environ.get("WECHAT_TOOL_PROFILE_STARTUP", "0") == "1":
+        # 启动耗时分析：在独立进程中冷启动导入 api 模块，打印每个模块的导入耗时
+        from wechat_decrypt_tool.startup_profile import format_report, profile_cold_import
+
+        print(format_report(profile_cold_import()))
+        print("=" * 60)
+
     repo_root = Path(__file__).resolve().parent
     enable_reload = os.environ.get("WECHAT_TOOL_RELOAD", "0") == "1"
 
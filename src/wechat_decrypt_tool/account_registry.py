@@ -0,0 +1,220 @@
+"""Cached registry of decrypted accounts under `output/databases`.
+
+Almost every API request resolves its account directory first, and image-heavy pages do that hundreds of times per
+second. Listing accounts used to `iterdir` the output directory and read the SQLite header of every account's
+session.db + contact.db on each call. The registry keeps the validated account set and per-account derived data:
+
+- the account list is revalidated by `stat`-ing the output directory and the known account directories (a new,
+  removed or rewritten-by-rename database changes one of those mtimes);
+- per account: resolved directory, message DB list (keyed by the account directory mtime), `_media_keys.json` and
+  `_source.json` contents (keyed by the file's mtime/size).
+
+Decrypt and delete-account call `invalidate()` explicitly, so in-place rewrites are picked up immediately too.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+from .app_paths import get_output_databases_dir
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def _is_valid_decrypted_sqlite(path: Path) -> bool:
+    try:
+        if not path.exists() or (not path.is_file()):
+            return False
+        with path.open("rb") as f:
+            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    except Exception:
+        return False
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return int(os.stat(path).st_mtime_ns)
+    except OSError:
+        return -1
+
+
+def _file_sig(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return int(st.st_mtime_ns), int(st.st_size)
+
+
+def scan_message_db_paths(account_dir: Path) -> list[Path]:
+    if not account_dir.exists():
+        return []
+
+    candidates: list[Path] = []
+    for p in account_dir.glob("*.db"):
+        n = p.name
+        ln = n.lower()
+        if ln in {"session.db", "contact.db", "head_image.db"}:
+            continue
+        if ln == "message_resource.db":
+            continue
+        if ln == "message_fts.db":
+            continue
+
+        if re.match(r"^message(_\d+)?\.db$", ln):
+            candidates.append(p)
+            continue
+        if re.match(r"^biz_message(_\d+)?\.db$", ln):
+            candidates.append(p)
+            continue
+        if "message" in ln and ln.endswith(".db"):
+            candidates.append(p)
+            continue
+    candidates.sort(key=lambda x: x.name)
+    return candidates
+
+
+@dataclass
+class _AccountEntry:
+    path: Path
+    resolved: Path
+    dir_mtime_ns: int
+    message_dbs: Optional[tuple[int, list[Path]]] = None
+    json_files: dict[str, tuple[Optional[tuple[int, int]], dict[str, Any]]] = field(default_factory=dict)
+
+
+class AccountRegistry:
+    def __init__(self) -> None:
+        self._mu = threading.Lock()
+        self._root: Optional[Path] = None
+        self._root_mtime_ns = -1
+        self._accounts: dict[str, _AccountEntry] = {}
+        self._names: list[str] = []
+
+    def invalidate(self, account: Optional[str] = None) -> None:
+        """Drop cached state (everything, or one account's derived data)."""
+
+        with self._mu:
+            if account is None:
+                self._root = None
+                self._root_mtime_ns = -1
+                self._accounts = {}
+                self._names = []
+                return
+            entry = self._accounts.get(str(account or "").strip())
+            if entry is not None:
+                entry.message_dbs = None
+                entry.json_files.clear()
+            self._root_mtime_ns = -1
+
+    def _is_fresh(self, root: Path) -> bool:
+        if self._root != root or self._root_mtime_ns < 0:
+            return False
+        if _mtime_ns(root) != self._root_mtime_ns:
+            return False
+        return all(_mtime_ns(e.path) == e.dir_mtime_ns for e in self._accounts.values())
+
+    def _refresh(self, root: Path) -> None:
+        root_mtime = _mtime_ns(root)
+        accounts: dict[str, _AccountEntry] = {}
+        if root_mtime >= 0:
+            for p in root.iterdir():
+                if not p.is_dir():
+                    continue
+                if not (_is_valid_decrypted_sqlite(p / "session.db") and _is_valid_decrypted_sqlite(p / "contact.db")):
+                    continue
+                dir_mtime = _mtime_ns(p)
+                prev = self._accounts.get(p.name)
+                if prev is not None and prev.dir_mtime_ns == dir_mtime:
+                    accounts[p.name] = prev
+                    continue
+                entry = _AccountEntry(path=p, resolved=p.resolve(), dir_mtime_ns=dir_mtime)
+                if prev is not None:
+                    # Only the directory listing changed; JSON files are revalidated by their own signature.
+                    entry.json_files = prev.json_files
+                accounts[p.name] = entry
+        self._root = root
+        self._root_mtime_ns = root_mtime
+        self._accounts = accounts
+        self._names = sorted(accounts)
+
+    def _snapshot(self) -> tuple[Path, list[str], dict[str, _AccountEntry]]:
+        root = get_output_databases_dir()
+        with self._mu:
+            if not self._is_fresh(root):
+                self._refresh(root)
+            return root, list(self._names), self._accounts
+
+    def list_accounts(self) -> list[str]:
+        return self._snapshot()[1]
+
+    def resolve_account_dir(self, account: Optional[str]) -> Path:
+        root, names, entries = self._snapshot()
+        if not names:
+            raise HTTPException(
+                status_code=404,
+                detail="No decrypted databases found. Please decrypt first.",
+            )
+
+        selected = str(account or "").strip() or names[0]
+        entry = entries.get(selected)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Account not found.")
+        base = root.resolve()
+        candidate = entry.resolved
+        if candidate != base and base not in candidate.parents:
+            raise HTTPException(status_code=400, detail="Invalid account path.")
+        return candidate
+
+    def _entry_for(self, account_dir: Path) -> Optional[_AccountEntry]:
+        _root, _names, entries = self._snapshot()
+        entry = entries.get(account_dir.name)
+        if entry is None or (entry.resolved != account_dir and entry.path != account_dir):
+            return None
+        return entry
+
+    def message_db_paths(self, account_dir: Path) -> list[Path]:
+        entry = self._entry_for(account_dir)
+        if entry is None:
+            return scan_message_db_paths(account_dir)
+        cached = entry.message_dbs
+        if cached is None or cached[0] != entry.dir_mtime_ns:
+            cached = (entry.dir_mtime_ns, scan_message_db_paths(account_dir))
+            entry.message_dbs = cached
+        return list(cached[1])
+
+    def _load_json(self, account_dir: Path, name: str) -> dict[str, Any]:
+        p = account_dir / name
+        sig = _file_sig(p)
+        entry = self._entry_for(account_dir)
+        if entry is not None:
+            cached = entry.json_files.get(name)
+            if cached is not None and cached[0] == sig:
+                return dict(cached[1])
+        data: dict[str, Any] = {}
+        if sig is not None:
+            try:
+                loaded = json.loads(p.read_text(encoding="utf-8"))
+                data = loaded if isinstance(loaded, dict) else {}
+            except Exception:
+                data = {}
+        if entry is not None:
+            entry.json_files[name] = (sig, data)
+        return dict(data)
+
+    def media_keys(self, account_dir: Path) -> dict[str, Any]:
+        return self._load_json(account_dir, "_media_keys.json")
+
+    def source_info(self, account_dir: Path) -> dict[str, Any]:
+        return self._load_json(account_dir, "_source.json")
+
+
+ACCOUNT_REGISTRY = AccountRegistry()
@@ -20,23 +20,21 @@ request_logger = get_logger("wechat_decrypt_tool.request")
 from . import __version__ as APP_VERSION
 from .path_fix import PathFixRoute
 from .chat_realtime_autosync import CHAT_REALTIME_AUTOSYNC
+from .db_storage_changes import DB_STORAGE_CHANGES
 from .routers.chat import router as _chat_router
 from .routers.chat_contacts import router as _chat_contacts_router
-from .routers.chat_export import router as _chat_export_router
 from .routers.chat_media import router as _chat_media_router
 from .routers.decrypt import router as _decrypt_router
 from .routers.health import router as _health_router
 from .routers.admin import router as _admin_router
 from .routers.keys import router as _keys_router
 from .routers.media import router as _media_router
-from .routers.sns import router as _sns_router
-from .routers.sns_export import router as _sns_export_router
 from .routers.wechat_detection import router as _wechat_detection_router
-from .routers.wrapped import router as _wrapped_router
+from .lazy_routers import LazyRouterRegistry, lazy_routers_enabled
 from .request_logging import log_server_errors_middleware
+from .request_metrics import request_metrics_middleware
 from .sns_stage_timing import add_sns_stage_timing_headers
 from .wcdb_realtime import WCDB_REALTIME, shutdown as _wcdb_shutdown
-from .routers.biz import router as _biz_router
 
 app = FastAPI(
     title="微信数据库解密工具",
@@ -54,7 +52,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-SNS-Source", "X-SNS-Hit-Type", "X-SNS-X-Enc"],
+    expose_headers=["X-SNS-Source", "X-SNS-Hit-Type", "X-SNS-X-Enc", "Server-Timing"],
 )
 
 
@@ -84,6 +82,58 @@ async def _log_server_errors(request: Request, call_next):
     return await log_server_errors_middleware(request_logger, request, call_next)
 
 
+# Heavy subsystems (Wrapped/jieba, exports, SNS) are imported on first use; see `lazy_routers.py`.
+LAZY_ROUTERS = LazyRouterRegistry(app)
+
+
+def _load_wrapped_router():
+    from .routers.wrapped import router  # pylint: disable=import-outside-toplevel
+
+    return router
+
+
+def _load_chat_export_router():
+    from .routers.chat_export import router  # pylint: disable=import-outside-toplevel
+
+    return router
+
+
+def _load_sns_router():
+    from .routers.sns import router  # pylint: disable=import-outside-toplevel
+
+    return router
+
+
+def _load_sns_export_router():
+    from .routers.sns_export import router  # pylint: disable=import-outside-toplevel
+
+    return router
+
+
+def _load_biz_router():
+    from .routers.biz import router  # pylint: disable=import-outside-toplevel
+
+    return router
+
+
+LAZY_ROUTERS.register("wrapped", ("/api/wrapped",), _load_wrapped_router)
+LAZY_ROUTERS.register("chat_export", ("/api/chat/exports",), _load_chat_export_router)
+LAZY_ROUTERS.register("sns", ("/api/sns",), _load_sns_router)
+LAZY_ROUTERS.register("sns_export", ("/api/sns/exports",), _load_sns_export_router)
+LAZY_ROUTERS.register("biz", ("/api/biz",), _load_biz_router)
+
+
+@app.middleware("http")
+async def _load_lazy_routers(request: Request, call_next):
+    return await LAZY_ROUTERS.middleware(request, call_next)
+
+
+# Registered last so it is the outermost middleware and also covers lazy router loading.
+@app.middleware("http")
+async def _request_metrics(request: Request, call_next):
+    return await request_metrics_middleware(request_logger, request, call_next)
+
+
 app.include_router(_health_router)
 app.include_router(_admin_router)
 app.include_router(_wechat_detection_router)
@@ -92,12 +142,10 @@ app.include_router(_keys_router)
 app.include_router(_media_router)
 app.include_router(_chat_router)
 app.include_router(_chat_contacts_router)
-app.include_router(_chat_export_router)
 app.include_router(_chat_media_router)
-app.include_router(_sns_router)
-app.include_router(_sns_export_router)
-app.include_router(_wrapped_router)
-app.include_router(_biz_router)
+
+if not lazy_routers_enabled():
+    LAZY_ROUTERS.load_all()
 
 
 class _SPAStaticFiles(StaticFiles):
@@ -205,6 +253,10 @@ async def _shutdown_wcdb_realtime() -> None:
         CHAT_REALTIME_AUTOSYNC.stop()
     except Exception:
         pass
+    try:
+        DB_STORAGE_CHANGES.close_all()
+    except Exception:
+        pass
     close_ok = False
     lock_timeout_s: float | None = 0.2
     try:
@@ -12,6 +12,7 @@ from urllib.parse import urlsplit, urlunsplit
 
 from .app_paths import get_output_dir
 from .logging_config import get_logger
+from .request_metrics import record_cache
 
 logger = get_logger(__name__)
 
@@ -155,6 +156,46 @@ def get_avatar_cache_user_entry(account: str, username: str) -> Optional[dict[st
     return get_avatar_cache_entry(account, cache_key_for_avatar_user(username))
 
 
+def get_avatar_cache_user_entries(account: str, usernames: list[str]) -> dict[str, dict[str, Any]]:
+    """Batch form of `get_avatar_cache_user_entry`: one connection, chunked IN queries; keyed by username."""
+
+    if not is_avatar_cache_enabled():
+        return {}
+    key_to_user: dict[str, str] = {}
+    for u in usernames:
+        u = str(u or "").strip()
+        if u:
+            key_to_user[cache_key_for_avatar_user(u)] = u
+    if not key_to_user:
+        return {}
+    try:
+        conn = _connect(account)
+    except Exception:
+        return {}
+    out: dict[str, dict[str, Any]] = {}
+    try:
+        keys = list(key_to_user)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            rows = conn.execute(
+                f"SELECT * FROM avatar_cache_entries WHERE account = ? AND cache_key IN ({placeholders})",
+                [str(account or ""), *chunk],
+            ).fetchall()
+            for row in rows:
+                entry = _row_to_dict(row)
+                if entry:
+                    out[key_to_user[str(entry.get("cache_key") or "")]] = entry
+        return out
+    except Exception:
+        return out
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 def get_avatar_cache_url_entry(account: str, source_url: str) -> Optional[dict[str, Any]]:
     if not source_url:
         return None
@@ -181,14 +222,15 @@ def resolve_avatar_cache_entry_path(account: str, entry: Optional[dict[str, Any]
 
 def avatar_cache_entry_file_exists(account: str, entry: Optional[dict[str, Any]]) -> Optional[Path]:
     p = resolve_avatar_cache_entry_path(account, entry)
-    if not p:
-        return None
-    try:
-        if p.exists() and p.is_file():
-            return p
-    except Exception:
-        return None
-    return None
+    found: Optional[Path] = None
+    if p:
+        try:
+            if p.exists() and p.is_file():
+                found = p
+        except Exception:
+            found = None
+    record_cache("avatar", hit=found is not None)
+    return found
 
 
 def avatar_cache_entry_is_fresh(entry: Optional[dict[str, Any]], now_ts: Optional[int] = None) -> bool:
@@ -4,6 +4,7 @@ This avoids dynamic import strings like "pkg.module:app" which some bundlers
 cannot detect reliably.
 """
 
+import multiprocessing
 import os
 
 import uvicorn
@@ -19,4 +20,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Needed for worker processes (e.g. voice transcoding) in the frozen onefile build.
+    multiprocessing.freeze_support()
     main()
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from .app_paths import get_output_dir
+from .rendered_message_cache import invalidate_rendered_conversation
 
 _HEX_RE = re.compile(r"^[0-9a-fA-F]+$")
 
@@ -79,6 +80,11 @@ def _now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def _invalidate_rendered(account: str, session_id: str) -> None:
+    # Store writes accompany message row changes; cached renders of the conversation are stale.
+    invalidate_rendered_conversation(account, session_id)
+
+
 def format_message_id(db: str, table_name: str, local_id: int) -> str:
     return f"{str(db or '').strip()}:{str(table_name or '').strip()}:{int(local_id or 0)}"
 
@@ -205,6 +211,7 @@ def upsert_original_once(
                 (ts, a, sid, db_norm, t, lid),
             )
         conn.commit()
+        _invalidate_rendered(a, sid)
     finally:
         try:
             if conn is not None:
@@ -283,6 +290,7 @@ def merge_edited_columns(
             (payload, a, sid, db_norm, t, lid),
         )
         conn.commit()
+        _invalidate_rendered(a, sid)
         return True
     finally:
         try:
@@ -434,6 +442,7 @@ def delete_message_edit(account: str, session_id: str, message_id: str) -> bool:
             (a, sid, db, table_name, int(local_id)),
         )
         conn.commit()
+        _invalidate_rendered(a, sid)
         return int(getattr(cur, "rowcount", 0) or 0) > 0
     finally:
         try:
@@ -476,6 +485,7 @@ def update_message_edit_local_id(
             (new_lid, a, sid, db_norm, t, old_lid),
         )
         conn.commit()
+        _invalidate_rendered(a, sid)
         return int(getattr(cur, "rowcount", 0) or 0) > 0
     except Exception:
         return False
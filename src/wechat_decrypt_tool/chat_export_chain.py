@@ -0,0 +1,358 @@
+"""Delta (incremental) chat exports and chain consolidation.
+
+JSON/NDJSON/TXT export archives record, in `manifest.json`, a per-conversation watermark (the newest exported `create_time`
+plus the `(db_stem, local_id)` rows exported at that second) and the media/avatar entries they reference. A delta
+export started from such an archive ("base") only writes messages past each watermark and media that is not in the
+chain yet; its manifest links to the base export:
+
+    full.zip  <-  delta_1.zip  <-  delta_2.zip
+
+`merge_export_chain` consolidates a chain into one archive equivalent to a full export of the same range. The merged
+archive keeps the newest export id, so it can be the base of further deltas.
+
+Messages inserted later with a `create_time` older than the watermark (e.g. history synced from another device) are
+not picked up by a delta; run a full export for those.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from .logging_config import get_logger
+from .ndjson_export import NDJSON_INDEX_FILE, NDJSON_MESSAGES_FILE, NdjsonDayIndex
+
+logger = get_logger(__name__)
+
+DELTA_EXPORT_FORMATS = {"json", "ndjson", "txt"}
+
+_MESSAGE_FILES = {"json": "messages.json", "ndjson": NDJSON_MESSAGES_FILE, "txt": "messages.txt"}
+
+
+def conversation_key(username: str) -> str:
+    """Manifest key of a conversation (md5 of its username, like the `Msg_<md5>` tables)."""
+
+    return hashlib.md5(str(username or "").strip().encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ConversationWatermark:
+    create_time: int = 0
+    # (db_stem, local_id) of the rows already exported at `create_time`; WeChat timestamps are in seconds.
+    boundary: set[tuple[str, int]] = field(default_factory=set)
+
+    def covers(self, create_time: int, db_stem: str, local_id: int) -> bool:
+        ct = int(create_time or 0)
+        if ct != self.create_time:
+            return ct < self.create_time
+        return (str(db_stem), int(local_id)) in self.boundary
+
+    def advance(self, create_time: int, db_stem: str, local_id: int) -> None:
+        ct = int(create_time or 0)
+        if ct > self.create_time:
+            self.create_time = ct
+            self.boundary = set()
+        if ct == self.create_time:
+            self.boundary.add((str(db_stem), int(local_id)))
+
+    def track(self, rows: Iterable[Any]) -> Iterator[Any]:
+        """Drop rows the watermark covers and advance it over the rest (rows must be in create_time order)."""
+
+        for r in rows:
+            if self.covers(r.create_time, r.db_stem, r.local_id):
+                continue
+            self.advance(r.create_time, r.db_stem, r.local_id)
+            yield r
+
+    def copy(self) -> "ConversationWatermark":
+        return ConversationWatermark(create_time=self.create_time, boundary=set(self.boundary))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "createTime": int(self.create_time),
+            "boundary": [[stem, local_id] for stem, local_id in sorted(self.boundary)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "ConversationWatermark":
+        if not isinstance(data, dict):
+            return cls()
+        boundary: set[tuple[str, int]] = set()
+        for item in data.get("boundary") or []:
+            try:
+                boundary.add((str(item[0]), int(item[1])))
+            except Exception:
+                continue
+        try:
+            create_time = int(data.get("createTime") or 0)
+        except Exception:
+            create_time = 0
+        return cls(create_time=create_time, boundary=boundary)
+
+
+@dataclass
+class BaseExport:
+    """What a delta export needs from the previous archive of its chain."""
+
+    path: Path
+    export_id: str
+    file_name: str
+    format: str
+    account: str
+    privacy_mode: bool
+    filters: dict[str, Any] = field(default_factory=dict)
+    options: dict[str, Any] = field(default_factory=dict)
+    chain: list[str] = field(default_factory=list)
+    conv_dirs: dict[str, str] = field(default_factory=dict)
+    watermarks: dict[str, ConversationWatermark] = field(default_factory=dict)
+    media: dict[str, str] = field(default_factory=dict)
+    avatars: dict[str, str] = field(default_factory=dict)
+
+    def watermark_for(self, username: str) -> ConversationWatermark:
+        wm = self.watermarks.get(conversation_key(username))
+        return wm.copy() if wm is not None else ConversationWatermark()
+
+
+def read_export_manifest(zip_path: Path) -> dict[str, Any]:
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            manifest = json.loads(zf.read("manifest.json").decode("utf-8"))
+    except FileNotFoundError:
+        raise ValueError(f"Export archive not found: {zip_path}")
+    except KeyError:
+        raise ValueError(f"Not a chat export archive (missing manifest.json): {zip_path}")
+    except (zipfile.BadZipFile, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid chat export archive {zip_path}: {e}")
+    if not isinstance(manifest, dict):
+        raise ValueError(f"Invalid chat export manifest: {zip_path}")
+    return manifest
+
+
+def _chain_ids(manifest: dict[str, Any]) -> list[str]:
+    delta = manifest.get("delta") or {}
+    return [str(x) for x in (delta.get("chain") or [])] + [str(manifest.get("exportId") or "")]
+
+
+def load_base_export(zip_path: Path) -> BaseExport:
+    path = Path(zip_path)
+    manifest = read_export_manifest(path)
+    fmt = str(manifest.get("format") or "")
+    if fmt not in DELTA_EXPORT_FORMATS:
+        raise ValueError(f"Delta export needs a json/ndjson/txt base archive, got format={fmt or 'unknown'}.")
+    if not isinstance(manifest.get("conversations"), list):
+        raise ValueError("Base archive has no conversation watermarks; export it again with this version first.")
+
+    base = BaseExport(
+        path=path,
+        export_id=str(manifest.get("exportId") or ""),
+        file_name=path.name,
+        format=fmt,
+        account=str(manifest.get("account") or ""),
+        privacy_mode=bool((manifest.get("options") or {}).get("privacyMode")),
+        filters=dict(manifest.get("filters") or {}),
+        options=dict(manifest.get("options") or {}),
+        chain=_chain_ids(manifest),
+        media={str(k): str(v) for k, v in (manifest.get("media") or {}).items()},
+        avatars={str(k): str(v) for k, v in (manifest.get("avatars") or {}).items()},
+    )
+    for item in manifest["conversations"]:
+        key = str((item or {}).get("key") or "")
+        if not key:
+            continue
+        base.conv_dirs[key] = str(item.get("convDir") or "")
+        base.watermarks[key] = ConversationWatermark.from_dict(item.get("watermark"))
+    return base
+
+
+def _merge_json_messages(parts: list[Path], name: str, out_path: Path) -> None:
+    # One part document is in memory at a time; the merged header (newest part, oldest startTime) is only known at
+    # the end, so messages are spooled to a side file first.
+    header: dict[str, Any] = {}
+    start_time = None
+    body_path = out_path.with_name(out_path.name + ".body")
+    with open(body_path, "w", encoding="utf-8", newline="\n") as body:
+        first = True
+        for i, archive in enumerate(parts):
+            with zipfile.ZipFile(archive, "r") as zf:
+                doc = json.loads(zf.read(name).decode("utf-8"))
+            if i == 0:
+                start_time = (doc.get("filters") or {}).get("startTime")
+            for msg in doc.pop("messages", None) or []:
+                if not first:
+                    body.write(",\n")
+                body.write("    " + json.dumps(msg, ensure_ascii=False))
+                first = False
+            header = doc
+    header["filters"] = dict(header.get("filters") or {})
+    header["filters"]["startTime"] = start_time
+    with open(out_path, "w", encoding="utf-8", newline="\n") as tw:
+        tw.write("{\n")
+        for k, v in header.items():
+            tw.write(f"  {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)},\n")
+        tw.write('  "messages": [\n')
+        with open(body_path, "r", encoding="utf-8") as body:
+            shutil.copyfileobj(body, tw)
+        tw.write("\n  ]\n" if not first else "  ]\n")
+        tw.write("}\n")
+    body_path.unlink(missing_ok=True)
+
+
+def _merge_txt_messages(parts: list[Path], name: str, out_path: Path) -> None:
+    with open(out_path, "w", encoding="utf-8", newline="\n") as tw:
+        for i, archive in enumerate(parts):
+            with zipfile.ZipFile(archive, "r") as zf, zf.open(name) as raw:
+                # `_write_conversation_txt` ends its header with an empty line; keep only the first part's.
+                in_header = i > 0
+                for line in io.TextIOWrapper(raw, encoding="utf-8", newline="\n"):
+                    if in_header:
+                        in_header = line != "\n"
+                        continue
+                    tw.write(line)
+
+
+def _merge_ndjson_messages(parts: list[Path], name: str, out_path: Path) -> dict[str, Any]:
+    day_index = NdjsonDayIndex()
+    header_bytes = 0
+    with open(out_path, "wb") as tw:
+        for i, archive in enumerate(parts):
+            with zipfile.ZipFile(archive, "r") as zf, zf.open(name) as raw:
+                header = raw.readline()
+                if i == 0:
+                    tw.write(header)
+                    header_bytes = tw.tell()
+                for line in raw:
+                    offset = tw.tell()
+                    tw.write(line)
+                    day_index.add(int(json.loads(line).get("createTime") or 0), offset, len(line))
+        total = tw.tell()
+    return day_index.to_dict(header_bytes=header_bytes, total_bytes=total)
+
+
+def merge_export_chain(zip_paths: list[Path], out_path: Path) -> dict[str, Any]:
+    """Consolidate a chain of json/ndjson/txt export archives (oldest first) into `out_path`."""
+
+    paths = [Path(p) for p in zip_paths]
+    if not paths:
+        raise ValueError("No export archives to merge.")
+    manifests = [read_export_manifest(p) for p in paths]
+    fmt = str(manifests[0].get("format") or "")
+    if fmt not in DELTA_EXPORT_FORMATS:
+        raise ValueError(f"Only json/ndjson/txt export chains can be merged, got format={fmt or 'unknown'}.")
+    for prev, cur, p in zip(manifests, manifests[1:], paths[1:]):
+        if str(cur.get("format") or "") != fmt:
+            raise ValueError(f"Export format differs within the chain: {p.name}")
+        base_id = str((cur.get("delta") or {}).get("baseExportId") or "")
+        if base_id != str(prev.get("exportId") or ""):
+            raise ValueError(f"{p.name} is not a delta of the archive before it (base={base_id or 'none'}).")
+
+    msg_file = _MESSAGE_FILES[fmt]
+    # convDir -> archives holding a part of its messages (in chain order); parts are streamed at merge time.
+    message_parts: dict[str, list[Path]] = {}
+    meta_by_dir: dict[str, dict[str, Any]] = {}
+    counts_by_dir: dict[str, int] = {}
+    report: dict[str, Any] = {}
+    written: set[str] = set()
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_zip = out_path.with_name(f".{out_path.name}.{os.getpid()}.part")
+    try:
+        with zipfile.ZipFile(tmp_zip, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as out:
+            for p in paths:
+                with zipfile.ZipFile(p, "r") as zf:
+                    for info in zf.infolist():
+                        name = info.filename
+                        if info.is_dir() or name == "manifest.json":
+                            continue
+                        conv_dir, _, leaf = name.rpartition("/")
+                        if name == "report.json":
+                            part = json.loads(zf.read(name).decode("utf-8"))
+                            for k, v in part.items():
+                                if isinstance(v, list):
+                                    report.setdefault(k, []).extend(v)
+                                else:
+                                    report[k] = v
+                        elif conv_dir.startswith("conversations/") and leaf == msg_file:
+                            message_parts.setdefault(conv_dir, []).append(p)
+                        elif conv_dir.startswith("conversations/") and leaf == NDJSON_INDEX_FILE:
+                            continue
+                        elif conv_dir.startswith("conversations/") and leaf == "meta.json":
+                            meta = json.loads(zf.read(name).decode("utf-8"))
+                            counts_by_dir[conv_dir] = counts_by_dir.get(conv_dir, 0) + int(meta.get("messageCount") or 0)
+                            meta_by_dir[conv_dir] = meta
+                        elif name not in written:
+                            # Media and avatars are content-addressed; the first copy wins.
+                            with zf.open(info) as src, out.open(name, "w") as dst:
+                                while True:
+                                    chunk = src.read(1024 * 1024)
+                                    if not chunk:
+                                        break
+                                    dst.write(chunk)
+                            written.add(name)
+
+            with tempfile.TemporaryDirectory(prefix="wechat_chat_export_merge_") as tmp_dir:
+                for conv_dir, parts in message_parts.items():
+                    tmp_path = Path(tmp_dir) / msg_file
+                    name = f"{conv_dir}/{msg_file}"
+                    if fmt == "json":
+                        _merge_json_messages(parts, name, tmp_path)
+                    elif fmt == "ndjson":
+                        index = _merge_ndjson_messages(parts, name, tmp_path)
+                        out.writestr(f"{conv_dir}/{NDJSON_INDEX_FILE}", json.dumps(index, ensure_ascii=False, indent=2))
+                    else:
+                        _merge_txt_messages(parts, name, tmp_path)
+                    out.write(str(tmp_path), f"{conv_dir}/{msg_file}")
+
+            for conv_dir, meta in meta_by_dir.items():
+                meta = dict(meta)
+                meta["messageCount"] = counts_by_dir.get(conv_dir, 0)
+                out.writestr(f"{conv_dir}/meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
+
+            manifest = dict(manifests[-1])
+            manifest["delta"] = manifests[0].get("delta")
+            manifest["mergedFrom"] = [str(m.get("exportId") or "") for m in manifests]
+            manifest["filters"] = dict(manifest.get("filters") or {})
+            manifest["filters"]["startTime"] = (manifests[0].get("filters") or {}).get("startTime")
+            stats: dict[str, Any] = dict(manifest.get("stats") or {})
+            for k in ("messagesExported", "mediaCopied", "mediaMissing"):
+                stats[k] = sum(int((m.get("stats") or {}).get(k) or 0) for m in manifests)
+            conversations: dict[str, dict[str, Any]] = {}
+            for m in manifests:
+                for item in m.get("conversations") or []:
+                    key = str((item or {}).get("key") or "")
+                    prev_item = conversations.get(key)
+                    merged = dict(item)
+                    merged["messageCount"] = int(item.get("messageCount") or 0) + (
+                        int(prev_item.get("messageCount") or 0) if prev_item else 0
+                    )
+                    conversations[key] = merged
+            stats["conversations"] = len(meta_by_dir)
+            manifest["stats"] = stats
+            manifest["conversations"] = list(conversations.values())
+            out.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+            if report:
+                out.writestr("report.json", json.dumps(report, ensure_ascii=False, indent=2))
+        os.replace(tmp_zip, out_path)
+    finally:
+        try:
+            tmp_zip.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    logger.info("[export_chain] merged archives=%s conversations=%s out=%s", len(paths), len(meta_by_dir), out_path)
+    return {
+        "status": "success",
+        "zipPath": str(out_path),
+        "archives": len(paths),
+        "exportId": str(manifests[-1].get("exportId") or ""),
+        "conversations": len(meta_by_dir),
+        "messages": sum(counts_by_dir.values()),
+    }
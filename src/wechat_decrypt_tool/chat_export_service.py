@@ -24,6 +24,13 @@ from urllib.parse import urljoin, urlparse
 
 import requests
 
+from .chat_export_chain import (
+    DELTA_EXPORT_FORMATS,
+    BaseExport,
+    ConversationWatermark,
+    conversation_key,
+    load_base_export,
+)
 from .chat_helpers import (
     _decode_message_content,
     _decode_sqlite_text,
@@ -34,7 +41,6 @@ from .chat_helpers import (
     _format_session_time,
     _infer_message_brief_by_local_type,
     _infer_transfer_status_text,
-    _iter_message_db_paths,
     _list_decrypted_accounts,
     _load_contact_rows,
     _load_latest_message_previews,
@@ -51,6 +57,7 @@ from .chat_helpers import (
     _should_keep_session,
     _split_group_sender_prefix,
 )
+from .group_member_names import get_chatroom_member_names
 from .logging_config import get_logger
 from .media_helpers import (
     _convert_silk_to_browser_audio,
@@ -62,10 +69,13 @@ from .media_helpers import (
     _resolve_media_path_for_kind,
     _try_find_decrypted_resource,
 )
+from .message_shard_directory import conversation_message_db_paths
+from .ndjson_export import NDJSON_INDEX_FILE, NDJSON_MESSAGES_FILE, NdjsonDayIndex
+from .voice_transcode_cache import load_transcoded_voice, store_transcoded_voice, transcode_conversation_voices
 
 logger = get_logger(__name__)
 
-ExportFormat = Literal["json", "txt", "html"]
+ExportFormat = Literal["json", "ndjson", "txt", "html"]
 ExportScope = Literal["selected", "all", "groups", "singles"]
 ExportStatus = Literal["queued", "running", "done", "error", "cancelled"]
 MediaKind = Literal["image", "emoji", "video", "video_thumb", "voice", "file"]
@@ -2400,6 +2410,55 @@ def _resolve_effective_media_kinds(
     return True, kinds
 
 
+def _check_delta_matches_base(
+    base: BaseExport,
+    *,
+    start_time: Optional[int],
+    end_time: Optional[int],
+    include_hidden: bool,
+    include_official: bool,
+    include_media: bool,
+    media_kinds: list[MediaKind],
+    message_types: list[str],
+    privacy_mode: bool,
+) -> None:
+    """Reject a delta export whose filters/media options differ from its base archive's manifest.
+
+    The base watermarks only say what the base exported under its own options; a delta with other message types,
+    media or start time would leave holes (or duplicates) in the merged chain. The end time may only move forward.
+    """
+
+    want_types = {t for t in (_normalize_render_type_key(x) for x in (message_types or [])) if t}
+    eff_media, eff_kinds = _resolve_effective_media_kinds(
+        include_media=include_media,
+        media_kinds=media_kinds,
+        selected_render_types=want_types or None,
+        privacy_mode=privacy_mode,
+    )
+    requested = {
+        "startTime": int(start_time) if start_time else None,
+        "messageTypes": sorted(want_types) or None,
+        "includeHidden": bool(include_hidden),
+        "includeOfficial": bool(include_official),
+        "includeMedia": bool(eff_media),
+        "mediaKinds": sorted(eff_kinds),
+    }
+    in_base = {
+        "startTime": int(base.filters.get("startTime") or 0) or None,
+        "messageTypes": sorted(base.filters.get("messageTypes") or []) or None,
+        "includeHidden": bool(base.filters.get("includeHidden")),
+        "includeOfficial": bool(base.filters.get("includeOfficial")),
+        "includeMedia": bool(base.options.get("includeMedia")),
+        "mediaKinds": sorted(base.options.get("mediaKinds") or []),
+    }
+    differ = [k for k in requested if requested[k] != in_base[k]]
+    if differ:
+        raise ValueError(f"Delta export options must match the base archive ({', '.join(differ)}).")
+    base_end = int(base.filters.get("endTime") or 0)
+    if end_time and base_end and int(end_time) < base_end:
+        raise ValueError("Delta export end time is before the base archive's end time.")
+
+
 @dataclass
 class ExportProgress:
     conversations_total: int = 0
@@ -2472,6 +2531,14 @@ class ChatExportManager:
         with self._lock:
             return self._jobs.get(export_id)
 
+    def resolve_zip_path(self, ref: str) -> Path:
+        """Archive of a finished job by export id, otherwise `ref` taken as a zip path."""
+
+        job = self.get_job(str(ref or "").strip())
+        if job is not None and job.zip_path:
+            return Path(job.zip_path)
+        return Path(str(ref or "").strip())
+
     def cancel_job(self, export_id: str) -> bool:
         with self._lock:
             job = self._jobs.get(export_id)
@@ -2503,10 +2570,38 @@ class ChatExportManager:
         html_page_size: int = 1000,
         privacy_mode: bool,
         file_name: Optional[str],
+        base_export: Optional[str] = None,
     ) -> ExportJob:
         account_dir = _resolve_account_dir(account)
         export_id = uuid.uuid4().hex[:12]
 
+        # Delta export: `base_export` is the previous archive of the chain (export id of a job or a zip path).
+        base_export_path = ""
+        base_ref = str(base_export or "").strip()
+        if base_ref:
+            if export_format not in DELTA_EXPORT_FORMATS:
+                raise ValueError("Delta export supports json/ndjson/txt only.")
+            base_path = self.resolve_zip_path(base_ref)
+            base = load_base_export(base_path)
+            if base.format != export_format:
+                raise ValueError(f"Delta export format must match the base archive ({base.format}).")
+            if base.privacy_mode != bool(privacy_mode):
+                raise ValueError("Delta export privacy mode must match the base archive.")
+            if (not privacy_mode) and base.account != account_dir.name:
+                raise ValueError(f"Base archive belongs to another account: {base.account}")
+            _check_delta_matches_base(
+                base,
+                start_time=start_time,
+                end_time=end_time,
+                include_hidden=include_hidden,
+                include_official=include_official,
+                include_media=include_media,
+                media_kinds=media_kinds,
+                message_types=message_types,
+                privacy_mode=privacy_mode,
+            )
+            base_export_path = str(base_path.resolve())
+
         job = ExportJob(
             export_id=export_id,
             account=account_dir.name,
@@ -2528,6 +2623,7 @@ class ChatExportManager:
                 "htmlPageSize": int(html_page_size) if int(html_page_size or 0) > 0 else int(html_page_size or 0),
                 "privacyMode": bool(privacy_mode),
                 "fileName": str(file_name or "").strip(),
+                "baseExport": base_export_path,
             },
         )
 
@@ -2568,7 +2664,7 @@ class ChatExportManager:
         opts = dict(job.options or {})
         scope: ExportScope = str(opts.get("scope") or "selected")  # type: ignore[assignment]
         export_format_raw = str(opts.get("format") or "json").strip() or "json"
-        if export_format_raw not in {"json", "txt", "html"}:
+        if export_format_raw not in {"json", "ndjson", "txt", "html"}:
             raise ValueError(f"Unsupported export format: {export_format_raw}")
         export_format: ExportFormat = export_format_raw  # type: ignore[assignment]
         include_hidden = bool(opts.get("includeHidden"))
@@ -2609,6 +2705,11 @@ class ChatExportManager:
             privacy_mode=privacy_mode,
         )
 
+        base: Optional[BaseExport] = None
+        base_export_path = str(opts.get("baseExport") or "").strip()
+        if base_export_path:
+            base = load_base_export(Path(base_export_path))
+
         local_types = None
         estimate_local_types = None
 
@@ -2693,6 +2794,19 @@ class ChatExportManager:
 
         media_written: dict[str, str] = {}
         avatar_written: dict[str, str] = {}
+        # conversation_key -> manifest entry (json/ndjson/txt only); a delta carries the base entries forward.
+        conv_entries: dict[str, dict[str, Any]] = {}
+        if base is not None:
+            # Media/avatars already in the chain are referenced, not copied again.
+            media_written.update(base.media)
+            avatar_written.update(base.avatars)
+            for key, conv_dir0 in base.conv_dirs.items():
+                conv_entries[key] = {
+                    "key": key,
+                    "convDir": conv_dir0,
+                    "messageCount": 0,
+                    "watermark": base.watermarks[key].to_dict(),
+                }
         report: dict[str, Any] = {
             "schemaVersion": 1,
             "exportId": job.export_id,
@@ -2856,9 +2970,22 @@ class ChatExportManager:
                     conv_row = contact_row_cache.get(conv_username)
                     conv_name = _pick_display_name(conv_row, conv_username)
                     conv_is_group = bool(conv_username.endswith("@chatroom"))
+                    conv_resolve_display_name = resolve_display_name
+                    if conv_is_group:
+                        # Group senders show as remark > group nickname > nickname, like in the chat page.
+                        conv_resolve_display_name = get_chatroom_member_names(contact_db_path, conv_username).display_name
 
                     conv_dir = f"conversations/{_conversation_dir_name(idx, conv_name, conv_username, conv_is_group, privacy_mode)}"
 
+                    conv_key = conversation_key(conv_username)
+                    watermark = base.watermark_for(conv_username) if base is not None else ConversationWatermark()
+                    if base is not None and base.conv_dirs.get(conv_key):
+                        # Same directory as in the base archive, so `merge_export_chain` can line the parts up.
+                        conv_dir = base.conv_dirs[conv_key]
+                    conv_st = st
+                    if watermark.create_time > 0:
+                        conv_st = max(int(st or 0), watermark.create_time)
+
                     with self._lock:
                         job.progress.current_conversation_index = idx
                         job.progress.current_conversation_username = conv_username
@@ -2866,20 +2993,46 @@ class ChatExportManager:
                         job.progress.current_conversation_messages_exported = 0
                         job.progress.current_conversation_messages_total = 0
 
+                    estimate_ok = True
                     try:
                         estimated_total = _estimate_conversation_message_count(
                             account_dir=account_dir,
                             conv_username=conv_username,
-                            start_time=st,
+                            start_time=conv_st,
                             end_time=et,
                             local_types=estimate_local_types,
                         )
                     except Exception:
                         estimated_total = 0
+                        estimate_ok = False
+
+                    # Rows at the watermark second that were exported already are counted too.
+                    estimated_total = max(0, int(estimated_total) - len(watermark.boundary))
+                    if base is not None and estimate_ok and estimated_total == 0:
+                        # Nothing new since the base archive: leave the conversation out of the delta.
+                        with self._lock:
+                            job.progress.conversations_done += 1
+                        continue
 
                     with self._lock:
                         job.progress.current_conversation_messages_total = int(estimated_total)
 
+                    if include_media and ("voice" in media_kinds):
+                        # Transcode the conversation's voices in parallel up front; `_materialize_voice` then
+                        # reads them from the account's voice cache.
+                        try:
+                            transcode_conversation_voices(
+                                account_dir,
+                                conv_username,
+                                start_time=conv_st,
+                                end_time=et,
+                                should_cancel=lambda: self._should_cancel(job),
+                            )
+                        except Exception:
+                            logger.warning(
+                                f"[export] voice pre-transcode failed conv={conv_username}", exc_info=True
+                            )
+
                     chat_id = None
                     try:
                         if resource_conn is not None:
@@ -2912,7 +3065,7 @@ class ChatExportManager:
                             resource_conn=resource_conn,
                             resource_chat_id=chat_id,
                             head_image_conn=head_image_conn,
-                            resolve_display_name=resolve_display_name,
+                            resolve_display_name=conv_resolve_display_name,
                             privacy_mode=privacy_mode,
                             include_media=include_media,
                             media_kinds=media_kinds,
@@ -2923,6 +3076,7 @@ class ChatExportManager:
                             media_db_path=media_db_path,
                             job=job,
                             lock=self._lock,
+                            watermark=watermark,
                         )
                     elif export_format == "html":
                         exported_count = _write_conversation_html(
@@ -2945,7 +3099,35 @@ class ChatExportManager:
                             resource_conn=resource_conn,
                             resource_chat_id=chat_id,
                             head_image_conn=head_image_conn,
-                            resolve_display_name=resolve_display_name,
+                            resolve_display_name=conv_resolve_display_name,
+                            privacy_mode=privacy_mode,
+                            include_media=include_media,
+                            media_kinds=media_kinds,
+                            media_written=media_written,
+                            avatar_written=avatar_written,
+                            report=report,
+                            allow_process_key_extract=allow_process_key_extract,
+                            media_db_path=media_db_path,
+                            job=job,
+                            lock=self._lock,
+                        )
+                    elif export_format == "ndjson":
+                        exported_count = _write_conversation_ndjson(
+                            zf=zf,
+                            conv_dir=conv_dir,
+                            account_dir=account_dir,
+                            conv_username=conv_username,
+                            conv_name=conv_name,
+                            conv_avatar_path=conv_avatar_path,
+                            conv_is_group=conv_is_group,
+                            start_time=st,
+                            end_time=et,
+                            want_types=want_types,
+                            local_types=local_types,
+                            resource_conn=resource_conn,
+                            resource_chat_id=chat_id,
+                            head_image_conn=head_image_conn,
+                            resolve_display_name=conv_resolve_display_name,
                             privacy_mode=privacy_mode,
                             include_media=include_media,
                             media_kinds=media_kinds,
@@ -2956,7 +3138,9 @@ class ChatExportManager:
                             media_db_path=media_db_path,
                             job=job,
                             lock=self._lock,
+                            watermark=watermark,
                         )
+
                     else:
                         exported_count = _write_conversation_json(
                             zf=zf,
@@ -2973,7 +3157,7 @@ class ChatExportManager:
                             resource_conn=resource_conn,
                             resource_chat_id=chat_id,
                             head_image_conn=head_image_conn,
-                            resolve_display_name=resolve_display_name,
+                            resolve_display_name=conv_resolve_display_name,
                             privacy_mode=privacy_mode,
                             include_media=include_media,
                             media_kinds=media_kinds,
@@ -2984,6 +3168,7 @@ class ChatExportManager:
                             media_db_path=media_db_path,
                             job=job,
                             lock=self._lock,
+                            watermark=watermark,
                         )
 
                     meta = {
@@ -2998,6 +3183,13 @@ class ChatExportManager:
                     zf.writestr(f"{conv_dir}/meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
                     if export_format == "html":
                         html_index_items.append({"convDir": conv_dir, "meta": meta})
+                    if export_format in DELTA_EXPORT_FORMATS:
+                        conv_entries[conv_key] = {
+                            "key": conv_key,
+                            "convDir": conv_dir,
+                            "messageCount": int(exported_count),
+                            "watermark": watermark.to_dict(),
+                        }
 
                     with self._lock:
                         job.progress.current_conversation_messages_exported = int(exported_count)
@@ -3100,6 +3292,16 @@ class ChatExportManager:
                     },
                     "accountsAvailable": _list_decrypted_accounts(),
                 }
+                if export_format in DELTA_EXPORT_FORMATS:
+                    # Watermarks and media entries for delta exports chained onto this archive.
+                    manifest["delta"] = (
+                        {"baseExportId": base.export_id, "baseFileName": base.file_name, "chain": base.chain}
+                        if base is not None
+                        else None
+                    )
+                    manifest["conversations"] = list(conv_entries.values())
+                    manifest["media"] = media_written
+                    manifest["avatars"] = avatar_written
                 zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
                 zf.writestr("report.json", json.dumps(report, ensure_ascii=False, indent=2))
 
@@ -3202,7 +3404,8 @@ def _estimate_conversation_message_count(
     local_types: Optional[set[int]] = None,
 ) -> int:
     total = 0
-    for db_path in _iter_message_db_paths(account_dir):
+    db_paths = conversation_message_db_paths(account_dir, conv_username, start_time=start_time, end_time=end_time)
+    for db_path in db_paths:
         conn = sqlite3.connect(str(db_path))
         try:
             table = _resolve_msg_table_name(conn, conv_username)
@@ -3253,8 +3456,11 @@ def _iter_rows_for_conversation(
     start_time: Optional[int],
     end_time: Optional[int],
     local_types: Optional[set[int]] = None,
+    watermark: Optional[ConversationWatermark] = None,
 ) -> Iterable[_Row]:
-    db_paths = _iter_message_db_paths(account_dir)
+    if watermark is not None and watermark.create_time > 0:
+        start_time = max(int(start_time or 0), watermark.create_time)
+    db_paths = conversation_message_db_paths(account_dir, conv_username, start_time=start_time, end_time=end_time)
     if not db_paths:
         return []
 
@@ -3375,7 +3581,10 @@ def _iter_rows_for_conversation(
     def sort_key(r: _Row) -> tuple[int, int, int]:
         return (int(r.create_time or 0), int(r.sort_seq or 0), int(r.local_id or 0))
 
-    return heapq.merge(*streams, key=sort_key)
+    merged = heapq.merge(*streams, key=sort_key)
+    if watermark is not None:
+        return watermark.track(merged)
+    return merged
 
 
 def _parse_message_for_export(
@@ -3830,6 +4039,7 @@ def _write_conversation_json(
     media_db_path: Path,
     job: ExportJob,
     lock: threading.Lock,
+    watermark: Optional[ConversationWatermark] = None,
 ) -> int:
     arcname = f"{conv_dir}/messages.json"
     exported = 0
@@ -3911,6 +4121,7 @@ def _write_conversation_json(
                 start_time=start_time,
                 end_time=end_time,
                 local_types=local_types,
+                watermark=watermark,
             ):
                 scanned += 1
 
@@ -3998,6 +4209,193 @@ def _write_conversation_json(
     return exported
 
 
+def _write_conversation_ndjson(
+    *,
+    zf: zipfile.ZipFile,
+    conv_dir: str,
+    account_dir: Path,
+    conv_username: str,
+    conv_name: str,
+    conv_avatar_path: str,
+    conv_is_group: bool,
+    start_time: Optional[int],
+    end_time: Optional[int],
+    want_types: Optional[set[str]],
+    local_types: Optional[set[int]],
+    resource_conn: Optional[sqlite3.Connection],
+    resource_chat_id: Optional[int],
+    head_image_conn: Optional[sqlite3.Connection],
+    resolve_display_name: Any,
+    privacy_mode: bool,
+    include_media: bool,
+    media_kinds: list[MediaKind],
+    media_written: dict[str, str],
+    avatar_written: dict[str, str],
+    report: dict[str, Any],
+    allow_process_key_extract: bool,
+    media_db_path: Path,
+    job: ExportJob,
+    lock: threading.Lock,
+    watermark: Optional[ConversationWatermark] = None,
+) -> int:
+    arcname = f"{conv_dir}/{NDJSON_MESSAGES_FILE}"
+    exported = 0
+    day_index = NdjsonDayIndex()
+
+    contact_conn: Optional[sqlite3.Connection] = None
+    alias_cache: dict[str, str] = {}
+    if conv_is_group:
+        try:
+            contact_db_path = account_dir / "contact.db"
+            if contact_db_path.exists():
+                contact_conn = sqlite3.connect(str(contact_db_path))
+        except Exception:
+            contact_conn = None
+
+    def lookup_alias(username: str) -> str:
+        u = str(username or "").strip()
+        if not u or contact_conn is None:
+            return ""
+        if u in alias_cache:
+            return alias_cache[u]
+
+        alias = ""
+        try:
+            r = contact_conn.execute("SELECT alias FROM contact WHERE username = ? LIMIT 1", (u,)).fetchone()
+            if r is not None and r[0] is not None:
+                alias = str(r[0] or "").strip()
+            if not alias:
+                r = contact_conn.execute("SELECT alias FROM stranger WHERE username = ? LIMIT 1", (u,)).fetchone()
+                if r is not None and r[0] is not None:
+                    alias = str(r[0] or "").strip()
+        except Exception:
+            alias = ""
+
+        alias_cache[u] = alias
+        return alias
+
+    # Same as JSON: write to temp file first to avoid zip interleaving writes. Lines are written as they are built,
+    # so memory stays flat however long the conversation is.
+    with tempfile.TemporaryDirectory(prefix="wechat_chat_export_") as tmp_dir:
+        tmp_path = Path(tmp_dir) / NDJSON_MESSAGES_FILE
+        with open(tmp_path, "wb") as tw:
+            header = {
+                "schemaVersion": 1,
+                "format": "ndjson",
+                "exportedAt": _now_iso(),
+                "account": "hidden" if privacy_mode else account_dir.name,
+                "conversation": {
+                    "username": "" if privacy_mode else conv_username,
+                    "displayName": "已隐藏" if privacy_mode else conv_name,
+                    "avatarPath": "" if privacy_mode else (conv_avatar_path or ""),
+                    "isGroup": bool(conv_is_group),
+                },
+                "filters": {
+                    "startTime": int(start_time) if start_time else None,
+                    "endTime": int(end_time) if end_time else None,
+                    "messageTypes": sorted(want_types) if want_types else None,
+                },
+            }
+            tw.write((json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8"))
+            header_bytes = tw.tell()
+
+            sender_alias_map: dict[str, int] = {}
+            offset = header_bytes
+            scanned = 0
+            for row in _iter_rows_for_conversation(
+                account_dir=account_dir,
+                conv_username=conv_username,
+                start_time=start_time,
+                end_time=end_time,
+                local_types=local_types,
+                watermark=watermark,
+            ):
+                scanned += 1
+
+                sender_alias = ""
+                if conv_is_group and row.raw_text and (not row.raw_text.startswith("<")) and (not row.raw_text.startswith('"<')):
+                    sep = row.raw_text.find(":\n")
+                    if sep > 0:
+                        prefix = row.raw_text[:sep].strip()
+                        su = str(row.sender_username or "").strip()
+                        if prefix and su and prefix != su:
+                            strong_hint = prefix.startswith("wxid_") or prefix.endswith("@chatroom") or "@" in prefix
+                            if not strong_hint:
+                                body_probe = row.raw_text[sep + 2 :].lstrip("\n").lstrip()
+                                body_is_xml = body_probe.startswith("<") or body_probe.startswith('"<')
+                                if not body_is_xml:
+                                    sender_alias = lookup_alias(su)
+
+                msg = _parse_message_for_export(
+                    row=row,
+                    conv_username=conv_username,
+                    is_group=conv_is_group,
+                    resource_conn=resource_conn,
+                    resource_chat_id=resource_chat_id,
+                    sender_alias=sender_alias,
+                    resolve_display_name=resolve_display_name,
+                )
+                if not _is_render_type_selected(msg.get("renderType"), want_types):
+                    continue
+
+                su = str(msg.get("senderUsername") or "").strip()
+                if privacy_mode:
+                    _privacy_scrub_message(msg, conv_is_group=conv_is_group, sender_alias_map=sender_alias_map)
+                else:
+                    msg["senderDisplayName"] = resolve_display_name(su) if su else ""
+                    msg["senderAvatarPath"] = (
+                        _materialize_avatar(
+                            zf=zf,
+                            head_image_conn=head_image_conn,
+                            username=su,
+                            avatar_written=avatar_written,
+                        )
+                        if (su and head_image_conn is not None)
+                        else ""
+                    )
+
+                if include_media:
+                    _attach_offline_media(
+                        zf=zf,
+                        account_dir=account_dir,
+                        conv_username=conv_username,
+                        msg=msg,
+                        media_written=media_written,
+                        report=report,
+                        media_kinds=media_kinds,
+                        allow_process_key_extract=allow_process_key_extract,
+                        media_db_path=media_db_path,
+                        lock=lock,
+                        job=job,
+                    )
+
+                line = (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
+                tw.write(line)
+                day_index.add(row.create_time, offset, len(line))
+                offset += len(line)
+
+                exported += 1
+                with lock:
+                    job.progress.messages_exported += 1
+                    job.progress.current_conversation_messages_exported = exported
+
+                if scanned % 500 == 0 and job.cancel_requested:
+                    raise _JobCancelled()
+
+            tw.flush()
+
+        zf.write(str(tmp_path), arcname)
+    index = day_index.to_dict(header_bytes=header_bytes, total_bytes=offset)
+    zf.writestr(f"{conv_dir}/{NDJSON_INDEX_FILE}", json.dumps(index, ensure_ascii=False, indent=2))
+    if contact_conn is not None:
+        try:
+            contact_conn.close()
+        except Exception:
+            pass
+
+    return exported
+
+
 def _write_conversation_txt(
     *,
     zf: zipfile.ZipFile,
@@ -4025,6 +4423,7 @@ def _write_conversation_txt(
     media_db_path: Path,
     job: ExportJob,
     lock: threading.Lock,
+    watermark: Optional[ConversationWatermark] = None,
 ) -> int:
     arcname = f"{conv_dir}/messages.txt"
     exported = 0
@@ -4091,6 +4490,7 @@ def _write_conversation_txt(
                 start_time=start_time,
                 end_time=end_time,
                 local_types=local_types,
+                watermark=watermark,
             ):
                 scanned += 1
                 sender_alias = ""
@@ -5216,6 +5616,7 @@ def _write_conversation_html(
                         try:
                             arc, is_new = _materialize_voice(
                                 zf=zf,
+                                account_dir=account_dir,
                                 media_db_path=media_db_path,
                                 server_id=int(qsid),
                                 media_written=media_written,
@@ -5928,6 +6329,7 @@ def _attach_offline_media(
         if server_id > 0:
             arc, is_new = _materialize_voice(
                 zf=zf,
+                account_dir=account_dir,
                 media_db_path=media_db_path,
                 server_id=server_id,
                 media_written=media_written,
@@ -6025,9 +6427,44 @@ def _materialize_avatar(
     return arc
 
 
+# `media_written` is the job-wide media store: besides the per-message keys (`<kind>:<md5|file_id>`, `voice:<server_id>`)
+# it maps each source file (`source:`) and each written payload (`content:` md5 + size) to its archive entry, so content
+# forwarded into several conversations, or reachable through both md5 and file_id, is decrypted and stored once.
+def _media_content_key(data: bytes, *, prefix: str = "content") -> str:
+    return f"{prefix}:{hashlib.md5(data).hexdigest()}:{len(data)}"
+
+
+def _file_content_key(path: Path) -> str:
+    h = hashlib.md5()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return f"content:{h.hexdigest()}:{size}"
+
+
+def _media_source_key(path: Path) -> str:
+    try:
+        st = path.stat()
+        sig = f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    except Exception:
+        sig = str(path)
+    return "source:" + hashlib.md5(sig.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def _reuse_media(media_written: dict[str, str], lookup_key: str, *alias_keys: str) -> str:
+    existing = media_written.get(lookup_key) or ""
+    if existing:
+        for k in alias_keys:
+            media_written[k] = existing
+    return existing
+
+
 def _materialize_voice(
     *,
     zf: zipfile.ZipFile,
+    account_dir: Path,
     media_db_path: Path,
     server_id: int,
     media_written: dict[str, str],
@@ -6058,13 +6495,26 @@ def _materialize_voice(
     if not isinstance(data, (bytes, bytearray)):
         data = bytes(data)
 
-    payload, ext, _media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+    # Forwarded voice messages get new server ids but keep the SILK payload.
+    silk_key = _media_content_key(bytes(data), prefix="voice_silk")
+    existing = _reuse_media(media_written, silk_key, key)
+    if existing:
+        return existing, False
+
+    cached = load_transcoded_voice(account_dir, data, preferred_format="mp3")
+    if cached is not None:
+        payload, ext, _media_type = cached
+    else:
+        payload, ext, _media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+        if payload and ext != "silk":
+            store_transcoded_voice(account_dir, data, payload, ext)
     if not payload:
         return "", False
 
     arc = f"media/voices/voice_{int(server_id)}.{ext}"
     zf.writestr(arc, payload)
     media_written[key] = arc
+    media_written[silk_key] = arc
     return arc, True
 
 
@@ -6129,6 +6579,11 @@ def _materialize_media(
     except Exception:
         return "", False
 
+    source_key = _media_source_key(src)
+    existing = _reuse_media(media_written, source_key, key)
+    if existing:
+        return existing, False
+
     try:
         with open(src, "rb") as f:
             head = f.read(64)
@@ -6185,6 +6640,13 @@ def _materialize_media(
         should_stream_copy = ext == "mp4" and looks_like_mp4
 
     if should_stream_copy or (kind not in {"image", "emoji", "video", "video_thumb"}):
+        try:
+            content_key = _file_content_key(src)
+        except Exception:
+            return "", False
+        existing = _reuse_media(media_written, content_key, key, source_key)
+        if existing:
+            return existing, False
         try:
             zf.write(src, arcname=arc)
         except Exception:
@@ -6194,12 +6656,22 @@ def _materialize_media(
             data, mt = _read_and_maybe_decrypt_media(src, account_dir=account_dir)
         except Exception:
             try:
+                content_key = _file_content_key(src)
+                existing = _reuse_media(media_written, content_key, key, source_key)
+                if existing:
+                    return existing, False
                 zf.write(src, arcname=arc)
             except Exception:
                 return "", False
-            media_written[key] = arc
+            for k in (key, source_key, content_key):
+                media_written[k] = arc
             return arc, True
 
+        content_key = _media_content_key(data)
+        existing = _reuse_media(media_written, content_key, key, source_key)
+        if existing:
+            return existing, False
+
         mt = str(mt or "").strip()
         if mt == "image/png":
             ext2 = "png"
@@ -6228,7 +6700,8 @@ def _materialize_media(
         except Exception:
             return "", False
 
-    media_written[key] = arc
+    for k in (key, source_key, content_key):
+        media_written[k] = arc
     return arc, True
 
 
@@ -10,10 +10,10 @@ from pathlib import Path
 from typing import Any, Callable, Optional
 from urllib.parse import parse_qs, quote, urlparse
 
-from fastapi import HTTPException
-
-from .app_paths import get_output_databases_dir
+from .account_registry import ACCOUNT_REGISTRY
 from .logging_config import get_logger
+from .message_xml import message_xml, regex_attr, regex_tag_text
+from .request_metrics import timed_stage
 
 try:
     import zstandard as zstd  # type: ignore
@@ -22,62 +22,15 @@ except Exception:
 
 logger = get_logger(__name__)
 
-_OUTPUT_DATABASES_DIR = get_output_databases_dir()
 _DEBUG_SESSIONS = os.environ.get("WECHAT_TOOL_DEBUG_SESSIONS", "0") == "1"
-_SQLITE_HEADER = b"SQLite format 3\x00"
-
-
-def _is_valid_decrypted_sqlite(path: Path) -> bool:
-    try:
-        if not path.exists() or (not path.is_file()):
-            return False
-        with path.open("rb") as f:
-            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
-    except Exception:
-        return False
 
 
 def _list_decrypted_accounts() -> list[str]:
-    if not _OUTPUT_DATABASES_DIR.exists():
-        return []
-
-    accounts: list[str] = []
-    for p in _OUTPUT_DATABASES_DIR.iterdir():
-        if not p.is_dir():
-            continue
-        if _is_valid_decrypted_sqlite(p / "session.db") and _is_valid_decrypted_sqlite(p / "contact.db"):
-            accounts.append(p.name)
-
-    accounts.sort()
-    return accounts
+    return ACCOUNT_REGISTRY.list_accounts()
 
 
 def _resolve_account_dir(account: Optional[str]) -> Path:
-    accounts = _list_decrypted_accounts()
-    if not accounts:
-        raise HTTPException(
-            status_code=404,
-            detail="No decrypted databases found. Please decrypt first.",
-        )
-
-    selected = str(account or "").strip() or accounts[0]
-    if selected not in accounts:
-        raise HTTPException(status_code=404, detail="Account not found.")
-    base = _OUTPUT_DATABASES_DIR.resolve()
-    candidate = (_OUTPUT_DATABASES_DIR / selected).resolve()
-
-    if candidate != base and base not in candidate.parents:
-        raise HTTPException(status_code=400, detail="Invalid account path.")
-
-    if not candidate.exists() or not candidate.is_dir():
-        raise HTTPException(status_code=404, detail="Account not found.")
-
-    if not (candidate / "session.db").exists():
-        raise HTTPException(status_code=404, detail="session.db not found for this account.")
-    if not (candidate / "contact.db").exists():
-        raise HTTPException(status_code=404, detail="contact.db not found for this account.")
-
-    return candidate
+    return ACCOUNT_REGISTRY.resolve_account_dir(account)
 
 
 def _should_keep_session(username: str, include_official: bool) -> bool:
@@ -275,6 +228,7 @@ def _resolve_msg_table_name(conn: sqlite3.Connection, username: str) -> Optional
     return None
 
 
+@timed_stage("sqlite")
 def _query_head_image_usernames(head_image_db_path: Path, usernames: list[str]) -> set[str]:
     uniq = list(dict.fromkeys([u for u in usernames if u]))
     if not uniq:
@@ -701,21 +655,19 @@ def _classify_link_share(*, app_type: int, url: str, source_username: str, desc:
 def _extract_xml_tag_text(xml_text: str, tag: str) -> str:
     if not xml_text or not tag:
         return ""
-    m = re.search(
-        rf"<{re.escape(tag)}>(.*?)</{re.escape(tag)}>",
-        xml_text,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
-    if not m:
-        return ""
-    return _strip_cdata(m.group(1) or "")
+    doc = message_xml(xml_text)
+    if doc is None:
+        return _strip_cdata(regex_tag_text(xml_text, tag))
+    return _strip_cdata(doc.tag_text(tag))
 
 
 def _extract_xml_attr(xml_text: str, attr: str) -> str:
     if not xml_text or not attr:
         return ""
-    m = re.search(rf"{re.escape(attr)}\s*=\s*['\"]([^'\"]+)['\"]", xml_text, flags=re.IGNORECASE)
-    return (m.group(1) or "").strip() if m else ""
+    doc = message_xml(xml_text)
+    if doc is None:
+        return regex_attr(xml_text, attr)
+    return doc.attr(attr)
 
 
 def _extract_xml_tag_or_attr(xml_text: str, name: str) -> str:
@@ -1514,31 +1466,7 @@ def _parse_app_message(text: str) -> dict[str, Any]:
 
 
 def _iter_message_db_paths(account_dir: Path) -> list[Path]:
-    if not account_dir.exists():
-        return []
-
-    candidates: list[Path] = []
-    for p in account_dir.glob("*.db"):
-        n = p.name
-        ln = n.lower()
-        if ln in {"session.db", "contact.db", "head_image.db"}:
-            continue
-        if ln == "message_resource.db":
-            continue
-        if ln == "message_fts.db":
-            continue
-
-        if re.match(r"^message(_\d+)?\.db$", ln):
-            candidates.append(p)
-            continue
-        if re.match(r"^biz_message(_\d+)?\.db$", ln):
-            candidates.append(p)
-            continue
-        if "message" in ln and ln.endswith(".db"):
-            candidates.append(p)
-            continue
-    candidates.sort(key=lambda x: x.name)
-    return candidates
+    return ACCOUNT_REGISTRY.message_db_paths(account_dir)
 
 
 def _resolve_msg_table_name_by_map(lower_to_actual: dict[str, str], username: str) -> Optional[str]:
@@ -1926,6 +1854,27 @@ def _pick_display_name(contact_row: Optional[sqlite3.Row], fallback_username: st
     return fallback_username
 
 
+def _pick_group_member_display_name(
+    contact_row: Optional[sqlite3.Row],
+    username: str,
+    group_nickname: str = "",
+) -> str:
+    """Name of a group member as WeChat shows it: remark > group nickname > nickname > alias > username."""
+
+    if contact_row is not None:
+        try:
+            remark = contact_row["remark"]
+        except Exception:
+            remark = None
+        if isinstance(remark, str) and remark.strip():
+            return remark.strip()
+
+    gn = str(group_nickname or "").strip()
+    if gn:
+        return gn
+    return _pick_display_name(contact_row, username)
+
+
 def _pick_avatar_url(contact_row: Optional[sqlite3.Row]) -> Optional[str]:
     if contact_row is None:
         return None
@@ -1941,6 +1890,7 @@ def _pick_avatar_url(contact_row: Optional[sqlite3.Row]) -> Optional[str]:
     return None
 
 
+@timed_stage("sqlite")
 def _load_contact_rows(contact_db_path: Path, usernames: list[str]) -> dict[str, sqlite3.Row]:
     uniq = list(dict.fromkeys([u for u in usernames if u]))
     if not uniq:
@@ -1984,17 +1934,26 @@ def _load_group_nickname_map_from_contact_db(
 
     Notes:
     - Best-effort: never raises; returns {} on any failure.
-    - Only resolves usernames included in `sender_usernames` to keep parsing cheap.
+    - Parses the whole blob; use `group_member_names.get_chatroom_member_names` to reuse it across calls.
     """
 
-    chatroom = str(chatroom_id or "").strip()
-    if not chatroom.endswith("@chatroom"):
-        return {}
-
     targets = list(dict.fromkeys([str(x or "").strip() for x in sender_usernames if str(x or "").strip()]))
     if not targets:
         return {}
-    target_set = set(targets)
+    nicknames = _load_chat_room_member_nicknames(contact_db_path, chatroom_id)
+    return {u: nicknames[u] for u in targets if u in nicknames}
+
+
+def _load_chat_room_member_nicknames(contact_db_path: Path, chatroom_id: str) -> dict[str, str]:
+    """Parse `chat_room.ext_buffer` of one chatroom into { string -> group_nickname }.
+
+    Member entries do not mark which string is the username, so every string of an entry is a key (usernames
+    among them); the first entry that yields a nickname for a string wins. Never raises; returns {} on failure.
+    """
+
+    chatroom = str(chatroom_id or "").strip()
+    if not chatroom.endswith("@chatroom"):
+        return {}
 
     def decode_varint(raw: bytes, offset: int) -> tuple[Optional[int], int]:
         value = 0
@@ -2153,16 +2112,12 @@ def _load_group_nickname_map_from_contact_db(
             if not strings:
                 continue
 
-            present = [v for _, v in strings if v in target_set and v not in out]
-            if not present:
-                continue
-
-            for target in present:
-                disp = pick_display(strings, target)
+            for _, candidate in strings:
+                if candidate in out:
+                    continue
+                disp = pick_display(strings, candidate)
                 if disp:
-                    out[target] = disp
-            if len(out) >= len(target_set):
-                break
+                    out[candidate] = disp
 
         return out
     except Exception:
@@ -6,9 +6,13 @@ Why:
 - Previously we only synced realtime -> decrypted when the UI toggled realtime off, which caused `/api/chat/messages`
   to lag behind while realtime was enabled.
 
-This module runs a lightweight background poller that watches db_storage mtime changes and triggers an incremental
+This module runs a lightweight background poller that watches db_storage changes and triggers an incremental
 sync_all into decrypted sqlite. It is intentionally conservative (debounced + rate-limited) to avoid hammering the
 backend or the sqlite files.
+
+Each account holds a poll subscription on the shared `DB_STORAGE_CHANGES` producer (the same watcher the SSE
+stream uses: inotify on Linux, a cached mtime tree elsewhere), so an idle account costs almost nothing per tick,
+and only changes in the buckets sync_all reads (`message`, `session`) schedule a sync. Several accounts can sync concurrently (WECHAT_TOOL_REALTIME_AUTOSYNC_WORKERS).
 """
 
 from __future__ import annotations
@@ -16,13 +20,15 @@ from __future__ import annotations
 import os
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional
 
 from fastapi import HTTPException
 
 from .chat_helpers import _list_decrypted_accounts, _resolve_account_dir
+from .db_storage_changes import DB_STORAGE_CHANGES
+from .db_storage_watch import ROOT_BUCKET
 from .logging_config import get_logger
 from .wcdb_realtime import WCDB_REALTIME
 
@@ -49,58 +55,18 @@ def _env_int(name: str, default: int, *, min_v: int, max_v: int) -> int:
     return v
 
 
-def _scan_db_storage_mtime_ns(db_storage_dir: Path) -> int:
-    """Best-effort scan of db_storage for a "latest mtime" signal.
-
-    We intentionally restrict to common database buckets to reduce walk cost.
-    """
-
-    try:
-        base = str(db_storage_dir)
-    except Exception:
-        return 0
-
-    max_ns = 0
-    try:
-        for root, dirs, files in os.walk(base):
-            if root == base:
-                allow = {"message", "session", "contact", "head_image", "bizchat", "sns", "general", "favorite"}
-                dirs[:] = [d for d in dirs if str(d or "").lower() in allow]
-
-            for fn in files:
-                name = str(fn or "").lower()
-                if not name.endswith((".db", ".db-wal", ".db-shm")):
-                    continue
-                if not (
-                    ("message" in name)
-                    or ("session" in name)
-                    or ("contact" in name)
-                    or ("name2id" in name)
-                    or ("head_image" in name)
-                ):
-                    continue
-
-                try:
-                    st = os.stat(os.path.join(root, fn))
-                    m_ns = int(getattr(st, "st_mtime_ns", 0) or 0)
-                    if m_ns <= 0:
-                        m_ns = int(float(getattr(st, "st_mtime", 0.0) or 0.0) * 1_000_000_000)
-                    if m_ns > max_ns:
-                        max_ns = m_ns
-                except Exception:
-                    continue
-    except Exception:
-        return 0
-
-    return max_ns
+# Buckets whose changes sync_all can pick up; e.g. an avatar-only change (head_image) does not need a sync.
+_SYNC_BUCKETS = frozenset({"message", "session", ROOT_BUCKET})
 
 
 @dataclass
 class _AccountState:
-    last_mtime_ns: int = 0
     due_at: float = 0.0
     last_sync_end_at: float = 0.0
     thread: Optional[threading.Thread] = None
+    changes: Any = None
+    watch_root: str = ""
+    pending_buckets: set[str] = field(default_factory=set)
 
 
 class ChatRealtimeAutoSyncService:
@@ -111,7 +77,7 @@ class ChatRealtimeAutoSyncService:
         self._min_sync_interval_ms = _env_int(
             "WECHAT_TOOL_REALTIME_AUTOSYNC_MIN_SYNC_INTERVAL_MS", 800, min_v=0, max_v=60_000
         )
-        self._workers = _env_int("WECHAT_TOOL_REALTIME_AUTOSYNC_WORKERS", 1, min_v=1, max_v=4)
+        self._workers = _env_int("WECHAT_TOOL_REALTIME_AUTOSYNC_WORKERS", 2, min_v=1, max_v=4)
 
         # Sync strategy defaults: cheap incremental write into decrypted sqlite.
         self._sync_max_scan = _env_int("WECHAT_TOOL_REALTIME_AUTOSYNC_MAX_SCAN", 200, min_v=20, max_v=5000)
@@ -162,8 +128,38 @@ class ChatRealtimeAutoSyncService:
         except Exception:
             pass
 
+        with self._mu:
+            for st in self._states.values():
+                self._close_watcher(st)
+
         logger.info("[realtime-autosync] stopped")
 
+    @staticmethod
+    def _close_watcher(st: _AccountState) -> None:
+        sub = st.changes
+        st.changes = None
+        st.watch_root = ""
+        if sub is not None:
+            try:
+                DB_STORAGE_CHANGES.unsubscribe(sub)
+            except Exception:
+                pass
+
+    def _poll_changes(self, acc: str, db_storage_dir: Path) -> set[str]:
+        """Changed buckets for one account since its previous poll (subscribed on first use)."""
+
+        with self._mu:
+            st = self._states.setdefault(acc, _AccountState())
+            if st.changes is not None and st.watch_root != str(db_storage_dir):
+                self._close_watcher(st)
+            sub = st.changes
+        if sub is None:
+            sub = DB_STORAGE_CHANGES.subscribe_poll(acc, db_storage_dir, interval_ms=self._interval_ms)
+            with self._mu:
+                st.changes = sub
+                st.watch_root = str(db_storage_dir)
+        return sub.poll()
+
     def _run(self) -> None:
         while not self._stop.is_set():
             tick_t0 = time.perf_counter()
@@ -205,15 +201,19 @@ class ChatRealtimeAutoSyncService:
                 continue
 
             scan_t0 = time.perf_counter()
-            mtime_ns = _scan_db_storage_mtime_ns(db_storage_dir)
+            try:
+                changed = self._poll_changes(acc, db_storage_dir)
+            except Exception:
+                logger.exception("[realtime-autosync] change poll failed account=%s", acc)
+                continue
             scan_ms = (time.perf_counter() - scan_t0) * 1000.0
             if scan_ms > 2000:
                 logger.warning("[realtime-autosync] scan slow account=%s ms=%.1f", acc, scan_ms)
 
-            with self._mu:
-                st = self._states.setdefault(acc, _AccountState())
-                if mtime_ns and mtime_ns != st.last_mtime_ns:
-                    st.last_mtime_ns = int(mtime_ns)
+            if changed & _SYNC_BUCKETS:
+                with self._mu:
+                    st = self._states.setdefault(acc, _AccountState())
+                    st.pending_buckets |= changed & _SYNC_BUCKETS
                     st.due_at = now + (float(self._debounce_ms) / 1000.0)
 
         # Schedule daemon threads. (Important: do NOT use ThreadPoolExecutor here; its threads are non-daemon on
@@ -224,7 +224,7 @@ class ChatRealtimeAutoSyncService:
             keep = set(accounts)
             for acc in list(self._states.keys()):
                 if acc not in keep:
-                    self._states.pop(acc, None)
+                    self._close_watcher(self._states.pop(acc))
 
             # Clean up finished threads and compute current concurrency.
             running = 0
@@ -250,6 +250,7 @@ class ChatRealtimeAutoSyncService:
                     continue
 
                 st.due_at = 0.0
+                st.pending_buckets = set()
                 th = threading.Thread(
                     target=self._sync_account_runner,
                     args=(acc,),
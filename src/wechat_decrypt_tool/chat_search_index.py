@@ -1,7 +1,9 @@
+import json
 import os
 import sqlite3
 import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Optional
 
@@ -22,9 +24,13 @@ _SCHEMA_VERSION = 1
 _INDEX_DB_NAME = "chat_search_index.db"
 _INDEX_DB_TMP_NAME = "chat_search_index.tmp.db"
 _LEGACY_INDEX_DB_NAME = "message_fts.db"
+_PAYLOAD_TABLE = "message_payload"
+_SHARD_DIR_NAME = "chat_search_index"
 
 _BUILD_LOCK = threading.Lock()
 _BUILD_STATE: dict[str, dict[str, Any]] = {}
+_MAINT_STATE: dict[str, dict[str, Any]] = {}
+_LAST_QUERY_AT: dict[str, float] = {}
 
 
 def _account_key(account_dir: Path) -> str:
@@ -58,6 +64,77 @@ def get_chat_search_index_db_path(account_dir: Path) -> Path:
     return preferred
 
 
+def is_search_index_sharded() -> bool:
+    v = str(os.environ.get("WECHAT_TOOL_SEARCH_INDEX_SHARDED", "0") or "").strip().lower()
+    return v not in {"", "0", "false", "off", "no"}
+
+
+def _shard_dir(account_dir: Path) -> Path:
+    return account_dir / _SHARD_DIR_NAME
+
+
+def get_chat_search_index_shard_paths(account_dir: Path) -> dict[str, Path]:
+    """Sharded layout: {account}/chat_search_index/{message_db_stem}.db, one FTS index per message DB."""
+
+    shard_dir = _shard_dir(account_dir)
+    if not shard_dir.is_dir():
+        return {}
+    out: dict[str, Path] = {}
+    for p in sorted(shard_dir.glob("*.db")):
+        if p.name.endswith(".tmp.db"):
+            continue
+        out[p.stem] = p
+    return out
+
+
+def get_chat_search_index_db_paths(account_dir: Path) -> list[Path]:
+    """Every index file a search has to consult: the shards when sharding is enabled, else the single DB."""
+
+    if is_search_index_sharded():
+        return list(get_chat_search_index_shard_paths(account_dir).values())
+    return [get_chat_search_index_db_path(account_dir)]
+
+
+def open_chat_search_index_reader(account_dir: Path) -> Optional[sqlite3.Connection]:
+    """
+    Connection whose `message_fts` covers the whole index, for aggregate reads (no MATCH / bm25).
+
+    Sharded layout: the first shard is opened as `main`, the others are attached and a TEMP view
+    named `message_fts` unions them all. Returns None when the index (or any live shard) is missing,
+    so callers keep their own fallback.
+    """
+
+    if not is_search_index_sharded():
+        index_path = get_chat_search_index_db_path(account_dir)
+        return sqlite3.connect(str(index_path)) if index_path.exists() else None
+
+    paths = get_chat_search_index_shard_paths(account_dir)
+    if not paths or any(p.stem not in paths for p in _iter_message_db_paths(account_dir)):
+        return None
+    shard_paths = list(paths.values())
+    conn = sqlite3.connect(str(shard_paths[0]))
+    try:
+        schemas = ["main"]
+        for i, p in enumerate(shard_paths[1:], start=1):
+            conn.execute(f"ATTACH DATABASE ? AS shard_{i}", (str(p),))
+            schemas.append(f"shard_{i}")
+        for schema in schemas:
+            row = conn.execute(
+                f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.close()
+                return None
+        union = " UNION ALL ".join(f"SELECT * FROM {schema}.message_fts" for schema in schemas)
+        conn.execute(f"CREATE TEMP VIEW message_fts AS {union}")
+        return conn
+    except Exception as e:
+        # Typically more shards than SQLITE_MAX_ATTACHED allows.
+        logger.info("Search index shards not readable as one view: account=%s err=%s", account_dir.name, e)
+        conn.close()
+        return None
+
+
 def _read_meta(index_path: Path) -> dict[str, str]:
     if not index_path.exists():
         return {}
@@ -85,9 +162,17 @@ def _inspect_index(index_path: Path) -> dict[str, Any]:
             "ready": False,
             "hasFtsTable": False,
             "hasMetaTable": False,
+            "hasPayloads": False,
             "schemaVersion": None,
+            "segmentCount": None,
+            "sizeBytes": 0,
         }
 
+    try:
+        size_bytes = int(index_path.stat().st_size)
+    except Exception:
+        size_bytes = 0
+
     conn = sqlite3.connect(str(index_path))
     try:
         try:
@@ -98,6 +183,7 @@ def _inspect_index(index_path: Path) -> dict[str, Any]:
 
         has_meta = "meta" in names
         has_fts = "message_fts" in names
+        has_payloads = _PAYLOAD_TABLE in names
 
         schema_version: Optional[int] = None
         if has_meta:
@@ -109,13 +195,17 @@ def _inspect_index(index_path: Path) -> dict[str, Any]:
                 schema_version = None
 
         ready = bool(has_fts and (schema_version is None or schema_version >= _SCHEMA_VERSION))
+        segment_count = _count_fts_segments(conn) if "message_fts_idx" in names else None
 
         return {
             "exists": True,
             "ready": ready,
             "hasFtsTable": bool(has_fts),
             "hasMetaTable": bool(has_meta),
+            "hasPayloads": bool(has_payloads),
             "schemaVersion": schema_version,
+            "segmentCount": segment_count,
+            "sizeBytes": size_bytes,
         }
     except Exception:
         return {
@@ -123,19 +213,100 @@ def _inspect_index(index_path: Path) -> dict[str, Any]:
             "ready": False,
             "hasFtsTable": False,
             "hasMetaTable": False,
+            "hasPayloads": False,
             "schemaVersion": None,
+            "segmentCount": None,
+            "sizeBytes": size_bytes,
         }
     finally:
         conn.close()
 
 
+def _source_signature(db_paths: list[Path]) -> str:
+    """(size, mtime) of the message DBs an index file was built from; a re-decrypt or realtime sync changes it."""
+
+    parts: list[str] = []
+    for p in db_paths:
+        try:
+            st = p.stat()
+        except Exception:
+            return ""
+        parts.append(f"{p.name}:{int(st.st_size)}:{int(st.st_mtime_ns)}")
+    return ";".join(parts)
+
+
+def _get_sharded_index_status(account_dir: Path) -> dict[str, Any]:
+    live_paths = {p.stem: p for p in _iter_message_db_paths(account_dir)}
+    live = list(live_paths)
+    paths = get_chat_search_index_shard_paths(account_dir)
+    shards: list[dict[str, Any]] = []
+    stale: list[str] = []
+    versions: list[int] = []
+    message_count = 0
+    built_at = 0
+    for stem, path in paths.items():
+        insp = _inspect_index(path)
+        meta = _read_meta(path)
+        if insp.get("schemaVersion") is not None:
+            versions.append(insp["schemaVersion"])
+        # Shards built before the signature was recorded are not reported stale.
+        source_sig = str(meta.get("source_sig") or "")
+        if source_sig and stem in live_paths and source_sig != _source_signature([live_paths[stem]]):
+            stale.append(stem)
+        try:
+            n = int(meta.get("message_count") or 0)
+        except Exception:
+            n = 0
+        try:
+            built_at = max(built_at, int(meta.get("built_at") or 0))
+        except Exception:
+            pass
+        message_count += n
+        shards.append(
+            {
+                "stem": stem,
+                "ready": bool(insp.get("ready")),
+                "hasPayloads": bool(insp.get("hasPayloads")),
+                "segmentCount": insp.get("segmentCount"),
+                "sizeBytes": int(insp.get("sizeBytes") or 0),
+                "messageCount": n,
+                "stale": stem in stale,
+            }
+        )
+    missing = [stem for stem in live if stem not in paths]
+    return {
+        "path": str(_shard_dir(account_dir)),
+        "exists": bool(shards),
+        "ready": bool(shards) and not missing and all(x["ready"] for x in shards),
+        "hasFtsTable": bool(shards) and all(x["ready"] for x in shards),
+        "hasMetaTable": bool(shards),
+        "hasPayloads": bool(shards) and all(x["hasPayloads"] for x in shards),
+        "schemaVersion": min(versions, default=None),
+        "segmentCount": sum(int(x["segmentCount"] or 0) for x in shards),
+        "sizeBytes": sum(x["sizeBytes"] for x in shards),
+        "meta": {"message_count": str(message_count), "built_at": str(built_at)} if shards else {},
+        "sharded": True,
+        "shards": shards,
+        "missingShards": missing,
+        "staleShards": stale,
+    }
+
+
 def get_chat_search_index_status(account_dir: Path) -> dict[str, Any]:
     key = _account_key(account_dir)
+    if is_search_index_sharded():
+        index = _get_sharded_index_status(account_dir)
+        with _BUILD_LOCK:
+            index["build"] = dict(_BUILD_STATE.get(key) or {})
+            index["maintenance"] = dict(_MAINT_STATE.get(key) or {})
+        return {"status": "success", "account": account_dir.name, "index": index}
+
     index_path = get_chat_search_index_db_path(account_dir)
     inspect = _inspect_index(index_path)
     meta = _read_meta(index_path)
     with _BUILD_LOCK:
         state = dict(_BUILD_STATE.get(key) or {})
+        maintenance = dict(_MAINT_STATE.get(key) or {})
     return {
         "status": "success",
         "account": account_dir.name,
@@ -145,14 +316,210 @@ def get_chat_search_index_status(account_dir: Path) -> dict[str, Any]:
             "ready": bool(inspect.get("ready")),
             "hasFtsTable": bool(inspect.get("hasFtsTable")),
             "hasMetaTable": bool(inspect.get("hasMetaTable")),
+            "hasPayloads": bool(inspect.get("hasPayloads")),
             "schemaVersion": inspect.get("schemaVersion"),
+            "segmentCount": inspect.get("segmentCount"),
+            "sizeBytes": int(inspect.get("sizeBytes") or 0),
             "meta": meta,
+            "sharded": False,
             "build": state,
+            "maintenance": maintenance,
         },
     }
 
 
-def start_chat_search_index_build(account_dir: Path, *, rebuild: bool = False) -> dict[str, Any]:
+def get_chat_search_index_build_state(account_dir: Path) -> dict[str, Any]:
+    with _BUILD_LOCK:
+        return dict(_BUILD_STATE.get(_account_key(account_dir)) or {})
+
+
+def get_chat_search_index_version(account_dir: Path) -> Optional[tuple[tuple[str, int, int], ...]]:
+    """Cheap identity of the current index file(s) (path, size, mtime); changes whenever a build replaces one."""
+
+    out: list[tuple[str, int, int]] = []
+    for index_path in get_chat_search_index_db_paths(account_dir):
+        try:
+            st = index_path.stat()
+        except Exception:
+            return None
+        out.append((str(index_path), int(st.st_size), int(st.st_mtime_ns)))
+    return tuple(out) if out else None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(str(os.environ.get(name, "") or "").strip() or default))
+    except Exception:
+        return int(default)
+
+
+class SearchHitCache:
+    """Bounded LRU of ordered FTS hit keys per (account, query, filters), tagged with the index version.
+
+    Paging through results or repeating a query then only hydrates the rows on the requested page.
+    Bounded both by entry count and by the total number of cached keys.
+    """
+
+    def __init__(self, *, max_entries: int, max_total_keys: int) -> None:
+        self.max_entries = int(max_entries)
+        self.max_total_keys = int(max_total_keys)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple[Any, dict[str, Any]]]" = OrderedDict()
+        self._total_keys = 0
+
+    def get(self, key: tuple, version: Any) -> Optional[dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] != version:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key: tuple, version: Any, value: dict[str, Any]) -> None:
+        size = len(value.get("keys") or ())
+        if self.max_entries <= 0 or size > self.max_total_keys:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, value)
+            self._total_keys += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_keys > self.max_total_keys
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_account(self, account: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k and k[0] == account]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_keys = 0
+
+    def _drop(self, key: tuple) -> None:
+        _version, value = self._entries.pop(key)
+        self._total_keys -= len(value.get("keys") or ())
+
+
+SEARCH_HIT_CACHE = SearchHitCache(
+    max_entries=_env_int("WECHAT_TOOL_SEARCH_CACHE_ENTRIES", 64),
+    max_total_keys=_env_int("WECHAT_TOOL_SEARCH_CACHE_KEYS", 200_000),
+)
+
+
+def is_search_payload_store_enabled() -> bool:
+    v = str(os.environ.get("WECHAT_TOOL_SEARCH_PAYLOADS", "1") or "").strip().lower()
+    return v not in {"", "0", "false", "off", "no"}
+
+
+# Hit fields that are already stored as `message_fts` columns (or derived from them), so the payload
+# side table does not need to repeat them.
+_PAYLOAD_COLUMN_FIELDS = frozenset(
+    {"id", "db", "table", "username", "localId", "serverId", "type", "createTime", "sortSeq", "senderUsername", "renderType"}
+)
+
+# Field order and defaults of `_row_to_search_hit`; defaults are dropped from stored payloads.
+_PAYLOAD_DEFAULTS: dict[str, Any] = {
+    "isSent": False,
+    "content": "",
+    "title": "",
+    "url": "",
+    "linkType": "",
+    "linkStyle": "",
+    "quoteUsername": "",
+    "quoteTitle": "",
+    "quoteContent": "",
+    "quoteThumbUrl": "",
+    "amount": "",
+    "paySubType": "",
+    "transferStatus": "",
+    "voipType": "",
+    "locationLat": None,
+    "locationLng": None,
+    "locationPoiname": "",
+    "locationLabel": "",
+    "_rawText": "",
+}
+
+
+def _pack_search_hit_payload(hit: dict[str, Any]) -> str:
+    compact = {
+        k: v
+        for k, v in hit.items()
+        if k not in _PAYLOAD_COLUMN_FIELDS and v != _PAYLOAD_DEFAULTS.get(k, "") and v is not None
+    }
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_search_hit_payloads(index_path: Path, rowids: list[int]) -> dict[int, dict[str, Any]]:
+    """Rebuild display hits (same shape as `_row_to_search_hit`) for FTS rowids from the payload side table.
+
+    Rows without a stored payload are left out; callers fall back to the source message DBs for them.
+    """
+
+    uniq = list(dict.fromkeys(int(x) for x in rowids if int(x) > 0))
+    if not uniq:
+        return {}
+
+    out: dict[int, dict[str, Any]] = {}
+    conn = sqlite3.connect(str(index_path))
+    try:
+        for i in range(0, len(uniq), 500):
+            chunk = uniq[i : i + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            rows = conn.execute(
+                "SELECT p.rowid, f.username, f.db_stem, f.table_name, f.local_id, f.server_id, f.local_type, "
+                "f.create_time, f.sort_seq, f.sender_username, f.render_type, p.payload "
+                f"FROM {_PAYLOAD_TABLE} p JOIN message_fts f ON f.rowid = p.rowid "
+                f"WHERE p.rowid IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for r in rows:
+                try:
+                    extra = json.loads(r[11] or "{}")
+                except Exception:
+                    continue
+                db_stem = str(r[2] or "")
+                table_name = str(r[3] or "")
+                local_id = int(r[4] or 0)
+                hit: dict[str, Any] = {
+                    "id": f"{db_stem}:{table_name}:{local_id}",
+                    "db": db_stem,
+                    "table": table_name,
+                    "username": str(r[1] or ""),
+                    "localId": local_id,
+                    "serverId": int(r[5] or 0),
+                    "type": int(r[6] or 0),
+                    "createTime": int(r[7] or 0),
+                    "sortSeq": int(r[8] or 0),
+                    "senderUsername": str(r[9] or ""),
+                    "isSent": False,
+                    "renderType": str(r[10] or ""),
+                }
+                for k, default in _PAYLOAD_DEFAULTS.items():
+                    if k != "isSent":
+                        hit[k] = default
+                hit.update(extra)
+                out[int(r[0])] = hit
+    finally:
+        conn.close()
+    return out
+
+
+def start_chat_search_index_build(
+    account_dir: Path,
+    *,
+    rebuild: bool = False,
+    shards: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Build the index in the background. With sharding enabled, `shards` limits the build to those message DB stems."""
+
     key = _account_key(account_dir)
     now = int(time.time())
     with _BUILD_LOCK:
@@ -162,6 +529,7 @@ def start_chat_search_index_build(account_dir: Path, *, rebuild: bool = False) -
         _BUILD_STATE[key] = {
             "status": "building",
             "rebuild": bool(rebuild),
+            "shards": list(shards or []),
             "startedAt": now,
             "finishedAt": None,
             "indexedMessages": 0,
@@ -172,7 +540,7 @@ def start_chat_search_index_build(account_dir: Path, *, rebuild: bool = False) -
 
     t = threading.Thread(
         target=_build_worker,
-        args=(account_dir, bool(rebuild)),
+        args=(account_dir, bool(rebuild), list(shards) if shards else None),
         daemon=True,
         name=f"chat-search-index:{key}",
     )
@@ -180,6 +548,53 @@ def start_chat_search_index_build(account_dir: Path, *, rebuild: bool = False) -
     return get_chat_search_index_status(account_dir)
 
 
+def pending_chat_search_index_shards(index: dict[str, Any]) -> list[str]:
+    """Stems a sharded index still needs built: missing shards plus shards that aren't ready (empty if unsharded)."""
+
+    if not index.get("sharded"):
+        return []
+    out = [str(x) for x in (index.get("missingShards") or [])]
+    out += [str(x.get("stem")) for x in (index.get("shards") or []) if not x.get("ready")]
+    return list(dict.fromkeys(out))
+
+
+def _refresh_min_interval_sec() -> int:
+    return _env_int("WECHAT_TOOL_SEARCH_INDEX_REFRESH_INTERVAL_SEC", 300)
+
+
+def refresh_chat_search_index_shards(account_dir: Path, stems: list[str], *, force: bool = False) -> bool:
+    """Rebuild the index shards of message DBs that changed (re-decrypt, realtime sync) in the background.
+
+    Only with the sharded layout and only for shards that already exist, so it never starts a first build. Unless
+    `force`, shards rebuilt less than `WECHAT_TOOL_SEARCH_INDEX_REFRESH_INTERVAL_SEC` ago are left alone (the status
+    keeps listing them in `staleShards`). Returns whether a build was started.
+    """
+
+    if not is_search_index_sharded():
+        return False
+    paths = get_chat_search_index_shard_paths(account_dir)
+    min_interval = 0 if force else _refresh_min_interval_sec()
+    now = int(time.time())
+    due: list[str] = []
+    for stem in dict.fromkeys(str(x) for x in stems):
+        path = paths.get(stem)
+        if path is None:
+            continue
+        try:
+            built_at = int(_read_meta(path).get("built_at") or 0)
+        except Exception:
+            built_at = 0
+        if now - built_at >= min_interval:
+            due.append(stem)
+    if not due:
+        return False
+    with _BUILD_LOCK:
+        if str((_BUILD_STATE.get(_account_key(account_dir)) or {}).get("status") or "") == "building":
+            return False
+    start_chat_search_index_build(account_dir, rebuild=True, shards=due)
+    return True
+
+
 def _update_build_state(account_key: str, **kwargs: Any) -> None:
     with _BUILD_LOCK:
         st = _BUILD_STATE.get(account_key)
@@ -214,7 +629,7 @@ def _load_sessions_for_index(account_dir: Path) -> dict[str, dict[str, Any]]:
     return out
 
 
-def _init_index_db(conn: sqlite3.Connection) -> None:
+def _init_index_db(conn: sqlite3.Connection, *, with_payloads: bool = False) -> None:
     # NOTE: This index DB is built as a temporary file and then atomically swapped in.
     # Using WAL here would create `-wal/-shm` side files that are *not* swapped together,
     # which can lead to a final DB missing schema/data (e.g. "no such table: message_fts").
@@ -243,6 +658,9 @@ def _init_index_db(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    if with_payloads:
+        # Optional display payload per FTS row (same rowid), so search pages never touch message_N.db.
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {_PAYLOAD_TABLE} (rowid INTEGER PRIMARY KEY, payload TEXT NOT NULL)")
     conn.execute(
         "INSERT INTO meta(key, value) VALUES(?, ?) "
         "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
@@ -261,19 +679,264 @@ def _safe_begin(conn: sqlite3.Connection) -> None:
         raise
 
 
-def _build_worker(account_dir: Path, rebuild: bool) -> None:
-    key = _account_key(account_dir)
-    started = time.time()
-    tmp_path = _index_db_tmp_path(account_dir)
-    final_path = _index_db_path(account_dir)
+class _IndexWriter:
+    """Batched inserts into one index DB (FTS rows + optional payload rows sharing the same rowid)."""
 
+    _INSERT_SQL = (
+        "INSERT INTO message_fts("
+        "rowid, text, username, render_type, create_time, sort_seq, local_id, server_id, local_type, "
+        "db_stem, table_name, sender_username, is_hidden, is_official"
+        ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    _PAYLOAD_SQL = f"INSERT INTO {_PAYLOAD_TABLE}(rowid, payload) VALUES (?, ?)"
+
+    def __init__(self, conn: sqlite3.Connection, *, with_payloads: bool, on_progress: Any = None) -> None:
+        self.conn = conn
+        self.with_payloads = bool(with_payloads)
+        self.on_progress = on_progress
+        self.indexed = 0
+        self._next_rowid = 1
+        self._batch: list[tuple[Any, ...]] = []
+        self._payload_batch: list[tuple[int, str]] = []
+
+    def add(
+        self,
+        *,
+        token_text: str,
+        hit: dict[str, Any],
+        conv_username: str,
+        db_stem: str,
+        table_name: str,
+        sess_info: dict[str, Any],
+    ) -> None:
+        rowid = self._next_rowid
+        self._next_rowid += 1
+        if self.with_payloads:
+            self._payload_batch.append((rowid, _pack_search_hit_payload(hit)))
+        self._batch.append(
+            (
+                rowid,
+                token_text,
+                conv_username,
+                str(hit.get("renderType") or ""),
+                int(hit.get("createTime") or 0),
+                int(hit.get("sortSeq") or 0),
+                int(hit.get("localId") or 0),
+                int(hit.get("serverId") or 0),
+                int(hit.get("type") or 0),
+                str(db_stem),
+                str(table_name),
+                str(hit.get("senderUsername") or ""),
+                int(sess_info.get("is_hidden") or 0),
+                int(sess_info.get("is_official") or 0),
+            )
+        )
+        if len(self._batch) >= 1000:
+            self.flush()
+            if self.indexed % 20000 == 0:
+                self.conn.commit()
+                _safe_begin(self.conn)
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        self.conn.executemany(self._INSERT_SQL, self._batch)
+        if self._payload_batch:
+            self.conn.executemany(self._PAYLOAD_SQL, self._payload_batch)
+            self._payload_batch.clear()
+        self.indexed += len(self._batch)
+        self._batch.clear()
+        if self.on_progress is not None:
+            self.on_progress(self.indexed)
+
+
+def _index_message_db(
+    writer: _IndexWriter,
+    *,
+    db_path: Path,
+    account_dir: Path,
+    sessions: dict[str, dict[str, Any]],
+    key: str,
+) -> None:
+    msg_conn = sqlite3.connect(str(db_path))
+    msg_conn.row_factory = sqlite3.Row
+    msg_conn.text_factory = bytes
     try:
+        try:
+            trows = msg_conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+            lower_to_actual: dict[str, str] = {}
+            for x in trows:
+                if not x or x[0] is None:
+                    continue
+                nm = _decode_sqlite_text(x[0]).strip()
+                if not nm:
+                    continue
+                lower_to_actual[nm.lower()] = nm
+        except Exception:
+            lower_to_actual = {}
+
+        my_rowid = None
+        try:
+            r2 = msg_conn.execute(
+                "SELECT rowid FROM Name2Id WHERE user_name = ? LIMIT 1",
+                (account_dir.name,),
+            ).fetchone()
+            if r2 is not None and r2[0] is not None:
+                my_rowid = int(r2[0])
+        except Exception:
+            my_rowid = None
+
+        for conv_username, sess_info in sessions.items():
+            _update_build_state(key, currentConversation=str(conv_username))
+            table_name = _resolve_msg_table_name_by_map(lower_to_actual, conv_username)
+            if not table_name:
+                continue
+
+            is_group = bool(conv_username.endswith("@chatroom"))
+            quoted_table = _quote_ident(table_name)
+
+            sql_with_join = (
+                "SELECT "
+                "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
+                "m.message_content, m.compress_content, n.user_name AS sender_username "
+                f"FROM {quoted_table} m "
+                "LEFT JOIN Name2Id n ON m.real_sender_id = n.rowid"
+            )
+            sql_no_join = (
+                "SELECT "
+                "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
+                "m.message_content, m.compress_content, '' AS sender_username "
+                f"FROM {quoted_table} m "
+            )
+
+            try:
+                cursor = msg_conn.execute(sql_with_join)
+            except Exception:
+                cursor = msg_conn.execute(sql_no_join)
+
+            for r in cursor:
+                try:
+                    hit = _row_to_search_hit(
+                        r,
+                        db_path=db_path,
+                        table_name=table_name,
+                        username=conv_username,
+                        account_dir=account_dir,
+                        is_group=is_group,
+                        my_rowid=my_rowid,
+                    )
+                except Exception:
+                    continue
+
+                hay_items = [
+                    str(hit.get("content") or ""),
+                    str(hit.get("title") or ""),
+                    str(hit.get("url") or ""),
+                    str(hit.get("quoteTitle") or ""),
+                    str(hit.get("quoteContent") or ""),
+                    str(hit.get("amount") or ""),
+                ]
+                haystack = "\n".join([x for x in hay_items if x.strip()])
+                if not haystack.strip():
+                    continue
+
+                token_text = _to_char_token_text(haystack)
+                if not token_text:
+                    continue
+
+                writer.add(
+                    token_text=token_text,
+                    hit=hit,
+                    conv_username=conv_username,
+                    db_stem=str(db_path.stem),
+                    table_name=str(table_name),
+                    sess_info=sess_info,
+                )
+    finally:
+        msg_conn.close()
+
+
+def _write_index_db(
+    tmp_path: Path,
+    final_path: Path,
+    *,
+    db_paths: list[Path],
+    account_dir: Path,
+    sessions: dict[str, dict[str, Any]],
+    key: str,
+    indexed_before: int = 0,
+) -> int:
+    """Index `db_paths` into `tmp_path`, then atomically swap it into `final_path`. Returns rows indexed."""
+
+    try:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    except Exception:
+        pass
+
+    conn_fts = sqlite3.connect(str(tmp_path))
+    conn_fts.isolation_level = None  # manual transaction control (prevents implicit BEGIN)
+    try:
+        with_payloads = is_search_payload_store_enabled()
+        _init_index_db(conn_fts, with_payloads=with_payloads)
+        try:
+            conn_fts.commit()
+        except Exception:
+            pass
+
+        # Taken before reading, so writes that land during the build still mark the index stale afterwards.
+        source_sig = _source_signature(db_paths)
+        writer = _IndexWriter(conn_fts, with_payloads=with_payloads)
+        writer.on_progress = lambda n: _update_build_state(key, indexedMessages=int(indexed_before + n))
+
+        _safe_begin(conn_fts)
+        for db_path in db_paths:
+            _update_build_state(key, currentDb=str(db_path.name))
+            _index_message_db(writer, db_path=db_path, account_dir=account_dir, sessions=sessions, key=key)
+        writer.flush()
+        conn_fts.commit()
+
+        finished_at = int(time.time())
+        conn_fts.execute(
+            "INSERT INTO meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            ("built_at", str(finished_at)),
+        )
+        conn_fts.execute(
+            "INSERT INTO meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            ("message_count", str(writer.indexed)),
+        )
+        conn_fts.execute(
+            "INSERT INTO meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            ("source_sig", source_sig),
+        )
+        conn_fts.commit()
+    except BaseException:
+        conn_fts.close()
         try:
             if tmp_path.exists():
                 tmp_path.unlink()
         except Exception:
             pass
+        raise
+    conn_fts.close()
+
+    try:
+        os.replace(str(tmp_path), str(final_path))
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    return writer.indexed
 
+
+def _build_worker(account_dir: Path, rebuild: bool, shards: Optional[list[str]] = None) -> None:
+    key = _account_key(account_dir)
+    started = time.time()
+
+    try:
         sessions = _load_sessions_for_index(account_dir)
         if not sessions:
             raise RuntimeError("No sessions found (session.db empty or missing).")
@@ -282,177 +945,41 @@ def _build_worker(account_dir: Path, rebuild: bool) -> None:
         if not db_paths:
             raise RuntimeError("No message databases found for this account.")
 
-        conn_fts = sqlite3.connect(str(tmp_path))
-        conn_fts.isolation_level = None  # manual transaction control (prevents implicit BEGIN)
-        try:
-            _init_index_db(conn_fts)
-            try:
-                conn_fts.commit()
-            except Exception:
-                pass
-            insert_sql = (
-                "INSERT INTO message_fts("
-                "text, username, render_type, create_time, sort_seq, local_id, server_id, local_type, "
-                "db_stem, table_name, sender_username, is_hidden, is_official"
-                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
-            )
-
-            batch: list[tuple[Any, ...]] = []
+        if is_search_index_sharded():
+            shard_dir = _shard_dir(account_dir)
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            wanted = {str(x) for x in shards} if shards else None
             indexed = 0
-
-            _safe_begin(conn_fts)
-
             for db_path in db_paths:
-                _update_build_state(key, currentDb=str(db_path.name))
-                msg_conn = sqlite3.connect(str(db_path))
-                msg_conn.row_factory = sqlite3.Row
-                msg_conn.text_factory = bytes
-                try:
-                    try:
-                        trows = msg_conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-                        lower_to_actual: dict[str, str] = {}
-                        for x in trows:
-                            if not x or x[0] is None:
-                                continue
-                            nm = _decode_sqlite_text(x[0]).strip()
-                            if not nm:
-                                continue
-                            lower_to_actual[nm.lower()] = nm
-                    except Exception:
-                        lower_to_actual = {}
-
-                    my_rowid = None
+                if wanted is not None and db_path.stem not in wanted:
+                    continue
+                indexed += _write_index_db(
+                    shard_dir / f"{db_path.stem}.tmp.db",
+                    shard_dir / f"{db_path.stem}.db",
+                    db_paths=[db_path],
+                    account_dir=account_dir,
+                    sessions=sessions,
+                    key=key,
+                    indexed_before=indexed,
+                )
+            live = {p.stem for p in db_paths}
+            for stem, path in get_chat_search_index_shard_paths(account_dir).items():
+                if stem not in live:
                     try:
-                        r2 = msg_conn.execute(
-                            "SELECT rowid FROM Name2Id WHERE user_name = ? LIMIT 1",
-                            (account_dir.name,),
-                        ).fetchone()
-                        if r2 is not None and r2[0] is not None:
-                            my_rowid = int(r2[0])
+                        path.unlink()
                     except Exception:
-                        my_rowid = None
-
-                    for conv_username, sess_info in sessions.items():
-                        _update_build_state(key, currentConversation=str(conv_username))
-                        table_name = _resolve_msg_table_name_by_map(lower_to_actual, conv_username)
-                        if not table_name:
-                            continue
-
-                        is_group = bool(conv_username.endswith("@chatroom"))
-                        quoted_table = _quote_ident(table_name)
-
-                        sql_with_join = (
-                            "SELECT "
-                            "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
-                            "m.message_content, m.compress_content, n.user_name AS sender_username "
-                            f"FROM {quoted_table} m "
-                            "LEFT JOIN Name2Id n ON m.real_sender_id = n.rowid"
-                        )
-                        sql_no_join = (
-                            "SELECT "
-                            "m.local_id, m.server_id, m.local_type, m.sort_seq, m.real_sender_id, m.create_time, "
-                            "m.message_content, m.compress_content, '' AS sender_username "
-                            f"FROM {quoted_table} m "
-                        )
-
-                        try:
-                            cursor = msg_conn.execute(sql_with_join)
-                        except Exception:
-                            cursor = msg_conn.execute(sql_no_join)
-
-                        for r in cursor:
-                            try:
-                                hit = _row_to_search_hit(
-                                    r,
-                                    db_path=db_path,
-                                    table_name=table_name,
-                                    username=conv_username,
-                                    account_dir=account_dir,
-                                    is_group=is_group,
-                                    my_rowid=my_rowid,
-                                )
-                            except Exception:
-                                continue
-
-                            hay_items = [
-                                str(hit.get("content") or ""),
-                                str(hit.get("title") or ""),
-                                str(hit.get("url") or ""),
-                                str(hit.get("quoteTitle") or ""),
-                                str(hit.get("quoteContent") or ""),
-                                str(hit.get("amount") or ""),
-                            ]
-                            haystack = "\n".join([x for x in hay_items if x.strip()])
-                            if not haystack.strip():
-                                continue
-
-                            token_text = _to_char_token_text(haystack)
-                            if not token_text:
-                                continue
-
-                            batch.append(
-                                (
-                                    token_text,
-                                    conv_username,
-                                    str(hit.get("renderType") or ""),
-                                    int(hit.get("createTime") or 0),
-                                    int(hit.get("sortSeq") or 0),
-                                    int(hit.get("localId") or 0),
-                                    int(hit.get("serverId") or 0),
-                                    int(hit.get("type") or 0),
-                                    str(db_path.stem),
-                                    str(table_name),
-                                    str(hit.get("senderUsername") or ""),
-                                    int(sess_info.get("is_hidden") or 0),
-                                    int(sess_info.get("is_official") or 0),
-                                )
-                            )
-
-                            if len(batch) >= 1000:
-                                conn_fts.executemany(insert_sql, batch)
-                                indexed += len(batch)
-                                batch.clear()
-                                _update_build_state(key, indexedMessages=int(indexed))
-
-                                if indexed % 20000 == 0:
-                                    conn_fts.commit()
-                                    _safe_begin(conn_fts)
-                finally:
-                    msg_conn.close()
-
-            if batch:
-                conn_fts.executemany(insert_sql, batch)
-                indexed += len(batch)
-                batch.clear()
-                _update_build_state(key, indexedMessages=int(indexed))
-
-            conn_fts.commit()
-
-            finished_at = int(time.time())
-            conn_fts.execute(
-                "INSERT INTO meta(key, value) VALUES(?, ?) "
-                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
-                ("built_at", str(finished_at)),
-            )
-            conn_fts.execute(
-                "INSERT INTO meta(key, value) VALUES(?, ?) "
-                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
-                ("message_count", str(indexed)),
-            )
-            conn_fts.commit()
-        finally:
-            conn_fts.close()
-
-        if rebuild or final_path.exists():
-            try:
-                os.replace(str(tmp_path), str(final_path))
-            except Exception:
-                if tmp_path.exists():
-                    tmp_path.unlink()
-                raise
+                        pass
         else:
-            os.replace(str(tmp_path), str(final_path))
+            _write_index_db(
+                _index_db_tmp_path(account_dir),
+                _index_db_path(account_dir),
+                db_paths=db_paths,
+                account_dir=account_dir,
+                sessions=sessions,
+                key=key,
+            )
 
+        SEARCH_HIT_CACHE.invalidate_account(account_dir.name)
         duration = max(0.0, time.time() - started)
         _update_build_state(
             key,
@@ -463,16 +990,163 @@ def _build_worker(account_dir: Path, rebuild: bool) -> None:
             error="",
             durationSec=round(duration, 3),
         )
+        schedule_chat_search_index_maintenance(account_dir)
     except Exception as e:
         logger.exception("Failed to build chat search index")
-        try:
-            if tmp_path.exists():
-                tmp_path.unlink()
-        except Exception:
-            pass
         _update_build_state(
             key,
             status="error",
             finishedAt=int(time.time()),
             error=str(e),
         )
+
+
+# ---- maintenance (FTS5 optimize/merge + VACUUM while the index is idle) ----
+
+
+def _count_fts_segments(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        r = conn.execute("SELECT COUNT(DISTINCT segid) FROM message_fts_idx").fetchone()
+        return int(r[0] or 0) if r is not None else 0
+    except Exception:
+        return None
+
+
+def note_chat_search_index_query(account_dir: Path) -> None:
+    """Record search activity so background maintenance waits for the index to go idle."""
+
+    with _BUILD_LOCK:
+        _LAST_QUERY_AT[_account_key(account_dir)] = time.monotonic()
+
+
+def _maintenance_idle_sec() -> int:
+    return _env_int("WECHAT_TOOL_SEARCH_INDEX_IDLE_SEC", 30)
+
+
+def _maintenance_min_segments() -> int:
+    return _env_int("WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS", 8)
+
+
+def optimize_chat_search_index(
+    account_dir: Path,
+    *,
+    mode: str = "optimize",
+    merge_pages: int = 500,
+    vacuum: bool = True,
+) -> dict[str, Any]:
+    """Compact the search index in place.
+
+    `optimize` merges all FTS5 segments into one; `merge` does a bounded amount of incremental merge
+    work (`merge_pages` pages), which is cheaper to run often. `VACUUM` then drops the free pages
+    left behind. Skipped while a build is running, since the build replaces the file anyway.
+    """
+
+    mode = str(mode or "optimize").strip().lower()
+    if mode not in {"optimize", "merge"}:
+        raise ValueError(f"Unsupported maintenance mode: {mode}")
+
+    key = _account_key(account_dir)
+    index_paths = get_chat_search_index_db_paths(account_dir)
+    with _BUILD_LOCK:
+        if str((_BUILD_STATE.get(key) or {}).get("status") or "") == "building":
+            return {"status": "skipped", "reason": "building"}
+        maint = _MAINT_STATE.setdefault(key, {})
+        if maint.get("status") == "running":
+            return {"status": "skipped", "reason": "running"}
+        maint.update({"status": "running", "mode": mode, "startedAt": int(time.time()), "error": ""})
+
+    started = time.time()
+    try:
+        before = [_inspect_index(p) for p in index_paths]
+        if not before or not all(x.get("ready") for x in before):
+            raise RuntimeError("Search index is not built.")
+
+        # Shards are compacted one at a time so searches keep working on the others.
+        for index_path in index_paths:
+            conn = sqlite3.connect(str(index_path), timeout=30)
+            conn.isolation_level = None
+            try:
+                if mode == "optimize":
+                    conn.execute("INSERT INTO message_fts(message_fts) VALUES('optimize')")
+                else:
+                    conn.execute("INSERT INTO message_fts(message_fts, rank) VALUES('merge', ?)", (int(merge_pages),))
+                if vacuum:
+                    conn.execute("VACUUM")
+            finally:
+                conn.close()
+
+        after = [_inspect_index(p) for p in index_paths]
+        SEARCH_HIT_CACHE.invalidate_account(account_dir.name)
+        result = {
+            "status": "success",
+            "mode": mode,
+            "vacuum": bool(vacuum),
+            "segmentsBefore": sum(int(x.get("segmentCount") or 0) for x in before),
+            "segmentsAfter": sum(int(x.get("segmentCount") or 0) for x in after),
+            "sizeBefore": sum(int(x.get("sizeBytes") or 0) for x in before),
+            "sizeAfter": sum(int(x.get("sizeBytes") or 0) for x in after),
+            "durationSec": round(max(0.0, time.time() - started), 3),
+        }
+        with _BUILD_LOCK:
+            _MAINT_STATE.setdefault(key, {}).update(
+                {**result, "status": "idle", "finishedAt": int(time.time()), "lastResult": "success"}
+            )
+        return result
+    except Exception as e:
+        logger.exception("Failed to optimize chat search index")
+        with _BUILD_LOCK:
+            _MAINT_STATE.setdefault(key, {}).update(
+                {"status": "idle", "finishedAt": int(time.time()), "lastResult": "error", "error": str(e)}
+            )
+        return {"status": "error", "mode": mode, "error": str(e)}
+
+
+def _maintenance_worker(account_dir: Path) -> None:
+    key = _account_key(account_dir)
+    try:
+        while True:
+            idle_sec = _maintenance_idle_sec()
+            with _BUILD_LOCK:
+                last = _LAST_QUERY_AT.get(key)
+                building = str((_BUILD_STATE.get(key) or {}).get("status") or "") == "building"
+            if building:
+                # The running build schedules maintenance again when it finishes.
+                return
+            waited = time.monotonic() - last if last is not None else float(idle_sec)
+            if waited >= idle_sec:
+                break
+            time.sleep(max(0.05, min(5.0, idle_sec - waited)))
+
+        optimize_chat_search_index(account_dir, mode="optimize", vacuum=True)
+    finally:
+        with _BUILD_LOCK:
+            _MAINT_STATE.setdefault(key, {})["scheduled"] = False
+
+
+def schedule_chat_search_index_maintenance(account_dir: Path, *, force: bool = False) -> bool:
+    """Optimize the index in the background once it has been idle for a while.
+
+    Only scheduled when an index file has more than `WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS` FTS5 segments
+    (unless `force`); at most one pending run per account.
+    """
+
+    key = _account_key(account_dir)
+    if not force:
+        segments = [_inspect_index(p).get("segmentCount") for p in get_chat_search_index_db_paths(account_dir)]
+        if max([int(x) for x in segments if x is not None], default=0) <= _maintenance_min_segments():
+            return False
+
+    with _BUILD_LOCK:
+        maint = _MAINT_STATE.setdefault(key, {})
+        if maint.get("scheduled"):
+            return False
+        maint["scheduled"] = True
+
+    t = threading.Thread(
+        target=_maintenance_worker,
+        args=(account_dir,),
+        daemon=True,
+        name=f"chat-search-index-maint:{key}",
+    )
+    t.start()
+    return True
@@ -0,0 +1,269 @@
+"""Shared per-account db_storage change producer.
+
+Every SSE client of `/api/chat/realtime/stream` and the realtime autosync service used to run their own scan of the
+same db_storage tree. `DB_STORAGE_CHANGES` keeps one `db_storage_watch` watcher per (account, db_storage dir) and fans
+its change events out to any number of subscribers:
+
+- `subscribe_async()` -> an asyncio queue per SSE client. A background producer thread polls the watcher while at
+  least one async subscriber exists (at the smallest interval they asked for) and hands events to each subscriber's
+  event loop with `call_soon_threadsafe`. A slow client never blocks the producer: when its queue is full the oldest
+  event is folded into the new one.
+- `subscribe_poll()` -> for threaded callers (autosync). `poll()` polls the shared watcher on demand (skipped when
+  someone else polled within the interval) and returns the buckets changed since the previous call.
+
+Events: `{"type": "change", "account", "buckets": [...], "seq", "initial", "ts"}`. `buckets` are the top-level
+db_storage folders that changed (`message`, `session`, `contact`, `head_image`, ...). The first event after subscribing
+has `initial: true` and lists every bucket holding a database, matching the old "first scan is a change" behaviour.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from .db_storage_watch import create_db_storage_watcher
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncChangeSubscription:
+    def __init__(self, producer: "_AccountProducer", loop: asyncio.AbstractEventLoop, *, interval_ms: int) -> None:
+        self.producer = producer
+        self.interval_ms = int(interval_ms)
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=32)
+        self._loop = loop
+
+    @property
+    def kind(self) -> str:
+        return self.producer.kind
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._offer, event)
+        except RuntimeError:
+            # Event loop already closed; the subscriber is going away.
+            pass
+
+    def _offer(self, event: dict[str, Any]) -> None:
+        if self.queue.full():
+            try:
+                old = self.queue.get_nowait()
+                event = {**event, "buckets": sorted(set(old.get("buckets") or []) | set(event.get("buckets") or []))}
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PollChangeSubscription:
+    def __init__(self, producer: "_AccountProducer", *, interval_ms: int) -> None:
+        self.producer = producer
+        self.interval_ms = int(interval_ms)
+        self._mu = threading.Lock()
+        self._pending: set[str] = set()
+
+    @property
+    def kind(self) -> str:
+        return self.producer.kind
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        with self._mu:
+            self._pending |= set(event.get("buckets") or [])
+
+    def poll(self) -> set[str]:
+        self.producer.poll(max_age_ms=self.interval_ms / 2)
+        with self._mu:
+            out = self._pending
+            self._pending = set()
+        return out
+
+
+class _AccountProducer:
+    def __init__(self, account: str, root: Path) -> None:
+        self.account = account
+        self.root = root
+        self.seq = 0
+        self._mu = threading.Lock()
+        self._poll_mu = threading.Lock()
+        self._watcher: Any = None
+        self._subs: list[Any] = []
+        self._seen: set[str] = set()
+        self._polled = False
+        self._last_poll = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def kind(self) -> str:
+        w = self._watcher
+        return str(getattr(w, "kind", "") or "")
+
+    def _event(self, buckets: set[str], *, initial: bool) -> dict[str, Any]:
+        return {
+            "type": "change",
+            "account": self.account,
+            "buckets": sorted(buckets),
+            "seq": int(self.seq),
+            "initial": bool(initial),
+            "ts": int(time.time() * 1000),
+        }
+
+    def poll(self, *, max_age_ms: float = 0.0) -> None:
+        with self._poll_mu:
+            if self._polled and (time.monotonic() - self._last_poll) * 1000.0 < float(max_age_ms):
+                return
+            if self._watcher is None:
+                self._watcher = create_db_storage_watcher(self.root)
+                logger.info("[db-storage-changes] watching account=%s kind=%s dir=%s", self.account, self.kind, self.root)
+            t0 = time.perf_counter()
+            buckets = self._watcher.poll()
+            poll_ms = (time.perf_counter() - t0) * 1000.0
+            if poll_ms > 1000:
+                logger.warning("[db-storage-changes] poll slow account=%s ms=%.1f", self.account, poll_ms)
+            self._last_poll = time.monotonic()
+            initial = not self._polled
+            self._polled = True
+            if not buckets:
+                return
+            with self._mu:
+                self._seen |= buckets
+                self.seq += 1
+                event = self._event(buckets, initial=initial)
+                subs = list(self._subs)
+            for sub in subs:
+                sub.deliver(event)
+
+    def add(self, sub: Any) -> None:
+        with self._poll_mu, self._mu:
+            self._subs.append(sub)
+            if self._polled and self._seen:
+                sub.deliver(self._event(set(self._seen), initial=True))
+            if isinstance(sub, AsyncChangeSubscription) and self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name=f"db-storage-changes-{self.account}", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, sub: Any) -> int:
+        with self._mu:
+            if sub in self._subs:
+                self._subs.remove(sub)
+            return len(self._subs)
+
+    def _run(self) -> None:
+        while True:
+            with self._mu:
+                intervals = [s.interval_ms for s in self._subs if isinstance(s, AsyncChangeSubscription)]
+                if self._stop.is_set() or not intervals:
+                    # Cleared under the lock, so add() starts a fresh thread for the next async subscriber.
+                    self._thread = None
+                    return
+            interval_ms = min(intervals)
+            try:
+                self.poll(max_age_ms=interval_ms / 2)
+            except Exception:
+                logger.exception("[db-storage-changes] poll failed account=%s", self.account)
+            self._stop.wait(timeout=interval_ms / 1000.0)
+
+    def close(self) -> None:
+        self._stop.set()
+        th = self._thread
+        if th is not None and th is not threading.current_thread():
+            th.join(timeout=2.0)
+        with self._poll_mu:
+            w = self._watcher
+            self._watcher = None
+            if w is not None:
+                try:
+                    w.close()
+                except Exception:
+                    pass
+
+
+class DbStorageChangeBroadcaster:
+    def __init__(self) -> None:
+        self._mu = threading.Lock()
+        self._producers: dict[tuple[str, str], _AccountProducer] = {}
+
+    def _subscribe(self, account: str, root: Path, make_sub) -> Any:
+        key = (str(account or "").strip(), str(root))
+        # Attach under the registry lock so a concurrent last-unsubscribe cannot close the producer in between.
+        with self._mu:
+            producer = self._producers.get(key)
+            if producer is None:
+                producer = _AccountProducer(key[0], Path(root))
+                self._producers[key] = producer
+            sub = make_sub(producer)
+            producer.add(sub)
+            return sub
+
+    def subscribe_async(
+        self,
+        account: str,
+        root: Path,
+        *,
+        interval_ms: int = 500,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> AsyncChangeSubscription:
+        """Subscribe for an event loop (SSE handlers).
+
+        Attaching waits for an in-flight poll, so handlers call this from a worker thread and pass their `loop`;
+        it defaults to the running loop.
+        """
+
+        loop = loop or asyncio.get_running_loop()
+        return self._subscribe(account, root, lambda p: AsyncChangeSubscription(p, loop, interval_ms=interval_ms))
+
+    def subscribe_poll(self, account: str, root: Path, *, interval_ms: int = 1000) -> PollChangeSubscription:
+        return self._subscribe(account, root, lambda p: PollChangeSubscription(p, interval_ms=interval_ms))
+
+    def unsubscribe(self, sub: Any) -> None:
+        """Detach `sub`. Dropping the last subscriber joins the producer thread, so keep this off the event loop."""
+
+        producer = getattr(sub, "producer", None)
+        if producer is None:
+            return
+        with self._mu:
+            if producer.remove(sub) > 0:
+                return
+            self._producers.pop((producer.account, str(producer.root)), None)
+        producer.close()
+
+    def status(self) -> list[dict[str, Any]]:
+        with self._mu:
+            producers = list(self._producers.values())
+        out = []
+        for p in producers:
+            with p._mu:
+                subs = list(p._subs)
+            out.append(
+                {
+                    "account": p.account,
+                    "dbStorageDir": str(p.root),
+                    "kind": p.kind,
+                    "seq": int(p.seq),
+                    "asyncSubscribers": sum(1 for s in subs if isinstance(s, AsyncChangeSubscription)),
+                    "pollSubscribers": sum(1 for s in subs if isinstance(s, PollChangeSubscription)),
+                }
+            )
+        return out
+
+    def close_all(self) -> None:
+        with self._mu:
+            producers = list(self._producers.values())
+            self._producers.clear()
+        for p in producers:
+            p.close()
+
+
+DB_STORAGE_CHANGES = DbStorageChangeBroadcaster()
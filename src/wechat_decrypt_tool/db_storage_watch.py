@@ -0,0 +1,260 @@
+"""Change detection for a WeChat `db_storage` directory.
+
+The realtime pollers only need to know *which buckets* (top-level folders such as `message`, `session`,
+`head_image`) changed since the last poll. Walking the whole tree and stat-ing every file on every tick gets
+expensive with many accounts, so a watcher keeps per-directory state between polls:
+
+- On Linux, `inotify` (via libc, no extra dependency): an idle poll is a single non-blocking `read()`.
+- Elsewhere (or when inotify is unavailable / out of watches), a cached directory-mtime tree: directories are
+  only re-listed when their own mtime changes; otherwise just the known database files are stat-ed.
+
+Both return the set of changed buckets from `poll()`. The first poll reports every bucket that currently holds a
+database file, so callers get an initial "changed" signal just like the previous mtime scan did.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Optional
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+WATCH_BUCKETS = frozenset({"message", "session", "contact", "head_image", "bizchat", "sns", "general", "favorite"})
+
+# Files directly under db_storage (rare) are reported under this bucket name.
+ROOT_BUCKET = ""
+
+
+def is_tracked_db_file(name: str) -> bool:
+    n = str(name or "").lower()
+    if not n.endswith((".db", ".db-wal", ".db-shm")):
+        return False
+    return ("message" in n) or ("session" in n) or ("contact" in n) or ("name2id" in n) or ("head_image" in n)
+
+
+def _bucket_of(root: str, d: str) -> str:
+    """Bucket of a directory inside `root` (files are attributed to the directory that holds them)."""
+
+    rel = os.path.relpath(d, root)
+    if rel in {".", ""}:
+        return ROOT_BUCKET
+    return rel.split(os.sep, 1)[0].lower()
+
+
+class MtimeTreeWatcher:
+    kind = "mtime-tree"
+
+    def __init__(self, root: Path) -> None:
+        self.root = str(root)
+        # dir -> (dir mtime_ns, subdirs, tracked file names)
+        self._dirs: dict[str, tuple[int, list[str], list[str]]] = {}
+        # file path -> (mtime_ns, size)
+        self._files: dict[str, tuple[int, int]] = {}
+
+    def _list_dir(self, d: str) -> tuple[list[str], list[str]]:
+        subdirs: list[str] = []
+        files: list[str] = []
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if d != self.root or e.name.lower() in WATCH_BUCKETS:
+                                subdirs.append(e.name)
+                        elif is_tracked_db_file(e.name):
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirs, files
+
+    def poll(self) -> set[str]:
+        changed: set[str] = set()
+        seen_dirs: set[str] = set()
+        seen_files: set[str] = set()
+        stack = [self.root]
+        while stack:
+            d = stack.pop()
+            try:
+                d_mtime = int(os.stat(d).st_mtime_ns)
+            except OSError:
+                continue
+            seen_dirs.add(d)
+            cached = self._dirs.get(d)
+            if cached is None or cached[0] != d_mtime:
+                subdirs, files = self._list_dir(d)
+                self._dirs[d] = (d_mtime, subdirs, files)
+            else:
+                _, subdirs, files = cached
+
+            for fn in files:
+                fp = os.path.join(d, fn)
+                try:
+                    st = os.stat(fp)
+                except OSError:
+                    continue
+                sig = (int(st.st_mtime_ns), int(st.st_size))
+                seen_files.add(fp)
+                if self._files.get(fp) != sig:
+                    self._files[fp] = sig
+                    changed.add(_bucket_of(self.root, d))
+            stack.extend(os.path.join(d, x) for x in subdirs)
+
+        for fp in [x for x in self._files if x not in seen_files]:
+            self._files.pop(fp, None)
+            changed.add(_bucket_of(self.root, os.path.dirname(fp)))
+        for d in [x for x in self._dirs if x not in seen_dirs]:
+            self._dirs.pop(d, None)
+        return changed
+
+    def close(self) -> None:
+        self._dirs.clear()
+        self._files.clear()
+
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+_LIBC: Optional[ctypes.CDLL] = None
+
+
+def _libc() -> ctypes.CDLL:
+    global _LIBC
+    if _LIBC is None:
+        lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        lib.inotify_init1.argtypes = [ctypes.c_int]
+        lib.inotify_init1.restype = ctypes.c_int
+        lib.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        lib.inotify_add_watch.restype = ctypes.c_int
+        _LIBC = lib
+    return _LIBC
+
+
+class InotifyWatcher:
+    kind = "inotify"
+
+    def __init__(self, root: Path) -> None:
+        self.root = str(root)
+        lib = _libc()
+        fd = lib.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._wd_to_dir: dict[int, str] = {}
+        self._initial: set[str] = set()
+        try:
+            self._watch_tree(self.root, initial=self._initial)
+        except Exception:
+            self.close()
+            raise
+
+    def _add_watch(self, d: str) -> None:
+        wd = _libc().inotify_add_watch(self._fd, os.fsencode(d), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({d}): {os.strerror(err)}")
+        self._wd_to_dir[int(wd)] = d
+
+    def _watch_tree(self, top: str, *, initial: Optional[set[str]] = None) -> None:
+        for d, dirs, files in os.walk(top):
+            if d == self.root:
+                dirs[:] = [x for x in dirs if x.lower() in WATCH_BUCKETS]
+            self._add_watch(d)
+            if initial is not None and any(is_tracked_db_file(f) for f in files):
+                initial.add(_bucket_of(self.root, d))
+
+    def poll(self) -> set[str]:
+        changed: set[str] = set()
+        if self._initial:
+            changed |= self._initial
+            self._initial = set()
+
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            off = 0
+            while off + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(buf, off)
+                off += _EVENT_HEADER.size
+                name = buf[off : off + name_len].split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+                off += name_len
+
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were dropped: report everything we watch.
+                    changed |= {_bucket_of(self.root, d) for d in self._wd_to_dir.values()}
+                    continue
+                d = self._wd_to_dir.get(int(wd))
+                if d is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    self._wd_to_dir.pop(int(wd), None)
+                    continue
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and (d != self.root or name.lower() in WATCH_BUCKETS):
+                        sub = os.path.join(d, name)
+                        try:
+                            found: set[str] = set()
+                            self._watch_tree(sub, initial=found)
+                            changed |= found
+                        except OSError:
+                            logger.warning("[db-storage-watch] failed to watch new dir %s", sub)
+                    continue
+                if name and is_tracked_db_file(name):
+                    changed.add(_bucket_of(self.root, d))
+        return changed
+
+    def close(self) -> None:
+        fd = getattr(self, "_fd", -1)
+        self._fd = -1
+        if fd >= 0:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def create_db_storage_watcher(root: Path, *, mode: Optional[str] = None) -> "InotifyWatcher | MtimeTreeWatcher":
+    """Pick the cheapest watcher available. `mode` (or env WECHAT_TOOL_FS_WATCH): auto | inotify | poll."""
+
+    mode = str(mode or os.environ.get("WECHAT_TOOL_FS_WATCH", "") or "auto").strip().lower()
+    if mode in {"auto", "inotify"} and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except Exception as e:
+            logger.warning("[db-storage-watch] inotify unavailable for %s, falling back to polling: %s", root, e)
+    return MtimeTreeWatcher(root)
@@ -0,0 +1,181 @@
+"""Bounded worker pools for blocking work called from async routes.
+
+Async handlers must not run SQLite queries, file reads or media decryption on the event loop: one slow search
+or image decrypt would stall every other request, including the realtime SSE streams. Route code hands such
+work to one of two pools instead:
+
+    rows = await run_io(_query_rows, db_path, ...)        # SQLite / filesystem
+    data = await run_cpu(_decrypt_payload, raw, key)      # decoding / decryption / transcoding
+
+The pools are separate so a burst of CPU-heavy media decrypts can't starve cheap database reads. Each pool
+has a bounded queue; when it is full the request fails fast with 503 instead of piling up unbounded work.
+Workers are daemon threads (like the autosync services) so a stuck task never blocks process exit.
+
+Queue depth, in-flight counts and wait times are exposed via `executor_stats()` (served by
+`/api/admin/metrics`), and per-request queue wait is recorded as a `*_wait` Server-Timing stage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException
+
+from .logging_config import get_logger
+from .request_metrics import record_stage
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def _env_int(name: str, default: int, *, min_v: int, max_v: int) -> int:
+    raw = str(os.environ.get(name, "") or "").strip()
+    try:
+        v = int(raw)
+    except Exception:
+        v = int(default)
+    return max(min_v, min(max_v, v))
+
+
+class ExecutorSaturatedError(RuntimeError):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, *, max_workers: int, max_queue: int) -> None:
+        self.name = str(name)
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(1, int(max_queue))
+        self._queue: "queue.Queue[tuple[Future, Callable[[], Any], float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_queue_seen = 0
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+
+    # ---- workers ----
+
+    def _ensure_threads(self, pending: int) -> None:
+        # Start workers lazily, only when every existing one is busy (idle pools stay small).
+        if len(self._threads) >= self.max_workers or pending < len(self._threads):
+            return
+        th = threading.Thread(target=self._worker, name=f"{self.name}-{len(self._threads)}", daemon=True)
+        self._threads.append(th)
+        th.start()
+
+    def _worker(self) -> None:
+        while True:
+            fut, fn, enqueued = self._queue.get()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_ms_total += (started - enqueued) * 1000.0
+            error: BaseException | None = None
+            result: Any = None
+            try:
+                result = fn()
+            except BaseException as e:  # noqa: BLE001 - forwarded to the awaiting caller
+                error = e
+            # Update counters before resolving the future so callers observe consistent stats.
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                if error is not None:
+                    self._failed += 1
+                self._run_ms_total += (time.perf_counter() - started) * 1000.0
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+    # ---- submit ----
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Queue `fn(*args, **kwargs)` with the caller's contextvars (request trace, etc.)."""
+
+        ctx = contextvars.copy_context()
+        fut: Future = Future()
+        with self._lock:
+            depth = self._queue.qsize()
+            if depth >= self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturatedError(f"{self.name} executor queue is full ({depth})")
+            self._submitted += 1
+            self._max_queue_seen = max(self._max_queue_seen, depth + 1)
+            self._ensure_threads(self._running + depth)
+            self._queue.put((fut, lambda: ctx.run(fn, *args, **kwargs), time.perf_counter()))
+        return fut
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        t0 = time.perf_counter()
+
+        def _timed() -> T:
+            record_stage(f"{self.name}_wait", (time.perf_counter() - t0) * 1000.0)
+            return fn(*args, **kwargs)
+
+        try:
+            fut = self.submit(_timed)
+        except ExecutorSaturatedError as e:
+            logger.warning("[executor] %s", e)
+            raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试") from e
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            done = max(1, self._completed)
+            return {
+                "name": self.name,
+                "maxWorkers": self.max_workers,
+                "threads": len(self._threads),
+                "maxQueue": self.max_queue,
+                "queueDepth": self._queue.qsize(),
+                "maxQueueDepthSeen": self._max_queue_seen,
+                "running": self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "meanWaitMs": round(self._wait_ms_total / done, 2) if self._completed else 0.0,
+                "meanRunMs": round(self._run_ms_total / done, 2) if self._completed else 0.0,
+            }
+
+
+_CPU_COUNT = os.cpu_count() or 4
+
+IO_EXECUTOR = BoundedExecutor(
+    "io",
+    max_workers=_env_int("WECHAT_TOOL_IO_WORKERS", min(32, _CPU_COUNT * 4), min_v=1, max_v=256),
+    max_queue=_env_int("WECHAT_TOOL_IO_QUEUE", 1024, min_v=1, max_v=100_000),
+)
+CPU_EXECUTOR = BoundedExecutor(
+    "cpu",
+    max_workers=_env_int("WECHAT_TOOL_CPU_WORKERS", max(2, _CPU_COUNT), min_v=1, max_v=256),
+    max_queue=_env_int("WECHAT_TOOL_CPU_QUEUE", 256, min_v=1, max_v=100_000),
+)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await IO_EXECUTOR.run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await CPU_EXECUTOR.run(fn, *args, **kwargs)
+
+
+def executor_stats() -> list[dict[str, Any]]:
+    return [IO_EXECUTOR.stats(), CPU_EXECUTOR.stats()]
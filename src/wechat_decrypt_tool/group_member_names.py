@@ -0,0 +1,101 @@
+"""Per-chatroom member name cache.
+
+Group nicknames live in `contact.db.chat_room.ext_buffer` (a protobuf-like blob, ~100 KB for a 500-member group).
+Chat pages, search results and exports used to parse that blob again for every page / conversation. Entries here are
+parsed once per (contact.db, chatroom) and reused until contact.db changes (size + mtime); the cache is bounded.
+
+Each entry also memoizes the member display name WeChat shows in a group:
+remark > group nickname > nickname > alias > username.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable
+
+from .chat_helpers import _load_chat_room_member_nicknames, _load_contact_rows, _pick_group_member_display_name
+from .request_metrics import record_cache
+
+_CACHE_MAX = 64
+_LOCK = threading.Lock()
+_CACHE: "OrderedDict[tuple[str, str], ChatroomMemberNames]" = OrderedDict()
+
+
+def _file_sig(path: Path) -> tuple[int, int]:
+    try:
+        st = path.stat()
+    except Exception:
+        return 0, 0
+    return int(st.st_size), int(st.st_mtime_ns)
+
+
+def _clean_usernames(usernames: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys([str(u or "").strip() for u in usernames if str(u or "").strip()]))
+
+
+class ChatroomMemberNames:
+    """Group nicknames of one chatroom plus lazily resolved member display names."""
+
+    __slots__ = ("sig", "contact_db_path", "chatroom", "group_nicknames", "_display_names")
+
+    def __init__(self, sig: tuple[int, int], contact_db_path: Path, chatroom: str) -> None:
+        self.sig = sig
+        self.contact_db_path = contact_db_path
+        self.chatroom = chatroom
+        self.group_nicknames = _load_chat_room_member_nicknames(contact_db_path, chatroom)
+        self._display_names: dict[str, str] = {}
+
+    def nicknames_for(self, usernames: Iterable[str]) -> dict[str, str]:
+        """{ username -> group nickname } for the members that have one."""
+
+        nicknames = self.group_nicknames
+        return {u: nicknames[u] for u in _clean_usernames(usernames) if u in nicknames}
+
+    def display_names(self, usernames: Iterable[str]) -> dict[str, str]:
+        """{ username -> display name }; contact rows are loaded once per member and kept with the entry."""
+
+        uniq = _clean_usernames(usernames)
+        missing = [u for u in uniq if u not in self._display_names]
+        if missing:
+            try:
+                rows = _load_contact_rows(self.contact_db_path, missing)
+            except Exception:
+                rows = {}
+            for u in missing:
+                self._display_names[u] = _pick_group_member_display_name(rows.get(u), u, self.group_nicknames.get(u, ""))
+        return {u: self._display_names[u] for u in uniq}
+
+    def display_name(self, username: str) -> str:
+        u = str(username or "").strip()
+        if not u:
+            return ""
+        return self.display_names([u]).get(u, u)
+
+
+def get_chatroom_member_names(contact_db_path: Path, chatroom_id: str) -> ChatroomMemberNames:
+    path = Path(contact_db_path)
+    chatroom = str(chatroom_id or "").strip()
+    key = (str(path), chatroom)
+    sig = _file_sig(path)
+    with _LOCK:
+        cached = _CACHE.get(key)
+        if cached is not None and cached.sig == sig:
+            _CACHE.move_to_end(key)
+            record_cache("group_member_names", hit=True)
+            return cached
+
+    record_cache("group_member_names", hit=False)
+    entry = ChatroomMemberNames(sig, path, chatroom)
+    with _LOCK:
+        _CACHE[key] = entry
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_MAX:
+            _CACHE.popitem(last=False)
+    return entry
+
+
+def clear_chatroom_member_names_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
@@ -23,7 +23,6 @@ from pathlib import Path
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass
 from packaging import version as pkg_version  # 建议使用 packaging 库处理版本比较
-from .wechat_detection import detect_wechat_installation
 from .key_store import upsert_account_keys_in_store
 from .media_helpers import _resolve_account_dir, _resolve_account_wxid_dir
 
@@ -151,6 +150,9 @@ class WeChatKeyFetcher:
         if wx_key is None:
             raise RuntimeError("wx_key 模块未安装或加载失败")
 
+        # wechat_detection binds Win32 APIs at import time; only load it when a key fetch actually runs.
+        from .wechat_detection import detect_wechat_installation  # pylint: disable=import-outside-toplevel
+
         install_info = detect_wechat_installation()
         exe_path = install_info.get('wechat_exe_path')
         version = install_info.get('wechat_version')
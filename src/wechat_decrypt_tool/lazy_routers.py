@@ -0,0 +1,130 @@
+"""Import-on-first-use router mounting for heavy subsystems.
+
+Why:
+- `api.py` used to import every router at module load, which pulled in Wrapped (jieba/pypinyin), the export
+  services and the 3k-line SNS router before uvicorn could accept a single request. The desktop shell waits on
+  that on every launch.
+- Most sessions never touch Wrapped/SNS/export, so those routers are registered here by URL prefix and only
+  imported (and included into the app) the first time a matching request arrives.
+
+Loaders are plain functions containing literal `from .routers.xxx import router` statements so bundlers
+(PyInstaller) still discover the modules statically.
+
+Set `WECHAT_TOOL_LAZY_ROUTERS=0` to include everything eagerly at startup (old behavior).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from fastapi import APIRouter, FastAPI
+from starlette.routing import Mount
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Paths that need the full route table (OpenAPI schema / Swagger UI).
+_SCHEMA_PATHS = {"/openapi.json", "/docs", "/redoc"}
+
+
+def lazy_routers_enabled() -> bool:
+    raw = str(os.environ.get("WECHAT_TOOL_LAZY_ROUTERS", "") or "").strip().lower()
+    if not raw:
+        return True
+    return raw not in {"0", "false", "no", "off"}
+
+
+@dataclass
+class LazyRouter:
+    name: str
+    prefixes: tuple[str, ...]
+    loader: Callable[[], APIRouter]
+    loaded: bool = False
+    load_ms: float = 0.0
+
+    def matches(self, path: str) -> bool:
+        p = str(path or "")
+        for prefix in self.prefixes:
+            if p == prefix or p.startswith(prefix.rstrip("/") + "/"):
+                return True
+        return False
+
+
+@dataclass
+class LazyRouterRegistry:
+    app: FastAPI
+    routers: list[LazyRouter] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def register(self, name: str, prefixes: Iterable[str], loader: Callable[[], APIRouter]) -> None:
+        self.routers.append(LazyRouter(name=str(name), prefixes=tuple(prefixes), loader=loader))
+
+    def pending_for_path(self, path: str) -> list[LazyRouter]:
+        p = str(path or "")
+        if p in _SCHEMA_PATHS:
+            return [r for r in self.routers if not r.loaded]
+        return [r for r in self.routers if (not r.loaded) and r.matches(p)]
+
+    def _include(self, router: APIRouter) -> None:
+        routes = self.app.router.routes
+        before = len(routes)
+        self.app.include_router(router)
+        added = routes[before:]
+        if not added:
+            return
+
+        # Mounts (e.g. the SPA static files at "/") must stay last, otherwise they'd swallow `/api/*`.
+        del routes[before:]
+        insert_at = len(routes)
+        for i, r in enumerate(routes):
+            if isinstance(r, Mount):
+                insert_at = i
+                break
+        routes[insert_at:insert_at] = added
+
+    def load(self, entry: LazyRouter) -> None:
+        if entry.loaded:
+            return
+        with self._lock:
+            if entry.loaded:
+                return
+            t0 = time.perf_counter()
+            router = entry.loader()
+            self._include(router)
+            entry.load_ms = (time.perf_counter() - t0) * 1000.0
+            entry.loaded = True
+            # Routes changed; let FastAPI rebuild the schema on next access.
+            self.app.openapi_schema = None
+        logger.info("[lazy-router] loaded name=%s ms=%.1f", entry.name, entry.load_ms)
+
+    def load_for_path(self, path: str) -> None:
+        for entry in self.pending_for_path(path):
+            self.load(entry)
+
+    def load_all(self) -> None:
+        for entry in list(self.routers):
+            self.load(entry)
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": r.name,
+                "prefixes": list(r.prefixes),
+                "loaded": bool(r.loaded),
+                "loadMs": round(float(r.load_ms), 1),
+            }
+            for r in self.routers
+        ]
+
+    async def middleware(self, request, call_next):
+        path = str(request.url.path or "")
+        if self.pending_for_path(path):
+            # Importing a router module is blocking (and may take a few hundred ms); keep the loop free.
+            await asyncio.to_thread(self.load_for_path, path)
+        return await call_next(request)
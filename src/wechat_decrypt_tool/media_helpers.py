@@ -16,72 +16,25 @@ from urllib.parse import urlparse
 
 from fastapi import HTTPException
 
-from .app_paths import get_output_databases_dir
+from .account_registry import ACCOUNT_REGISTRY
 from .logging_config import get_logger
+from .request_metrics import record_cache, timed_stage
 
 logger = get_logger(__name__)
 
 
 # 运行时输出目录（桌面端可通过 WECHAT_TOOL_DATA_DIR 指向可写目录）
 _PACKAGE_ROOT = Path(__file__).resolve().parent
-_SQLITE_HEADER = b"SQLite format 3\x00"
-
-
-def _is_valid_decrypted_sqlite(path: Path) -> bool:
-    try:
-        if not path.exists() or (not path.is_file()):
-            return False
-        with path.open("rb") as f:
-            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
-    except Exception:
-        return False
 
 
 def _list_decrypted_accounts() -> list[str]:
     """列出已解密输出的账号目录名（仅保留包含 session.db + contact.db 的账号）"""
-    output_db_dir = get_output_databases_dir()
-    if not output_db_dir.exists():
-        return []
-
-    accounts: list[str] = []
-    for p in output_db_dir.iterdir():
-        if not p.is_dir():
-            continue
-        if _is_valid_decrypted_sqlite(p / "session.db") and _is_valid_decrypted_sqlite(p / "contact.db"):
-            accounts.append(p.name)
-
-    accounts.sort()
-    return accounts
+    return ACCOUNT_REGISTRY.list_accounts()
 
 
 def _resolve_account_dir(account: Optional[str]) -> Path:
     """解析账号目录，并进行路径安全校验（防止路径穿越）"""
-    output_db_dir = get_output_databases_dir()
-    accounts = _list_decrypted_accounts()
-    if not accounts:
-        raise HTTPException(
-            status_code=404,
-            detail="No decrypted databases found. Please decrypt first.",
-        )
-
-    selected = str(account or "").strip() or accounts[0]
-    if selected not in accounts:
-        raise HTTPException(status_code=404, detail="Account not found.")
-    base = output_db_dir.resolve()
-    candidate = (output_db_dir / selected).resolve()
-
-    if candidate != base and base not in candidate.parents:
-        raise HTTPException(status_code=400, detail="Invalid account path.")
-
-    if not candidate.exists() or not candidate.is_dir():
-        raise HTTPException(status_code=404, detail="Account not found.")
-
-    if not (candidate / "session.db").exists():
-        raise HTTPException(status_code=404, detail="session.db not found for this account.")
-    if not (candidate / "contact.db").exists():
-        raise HTTPException(status_code=404, detail="contact.db not found for this account.")
-
-    return candidate
+    return ACCOUNT_REGISTRY.resolve_account_dir(account)
 
 
 def _detect_image_media_type(data: bytes) -> str:
@@ -614,13 +567,7 @@ def _try_strip_media_prefix(data: bytes) -> tuple[bytes, str]:
 
 
 def _load_account_source_info(account_dir: Path) -> dict[str, Any]:
-    p = account_dir / "_source.json"
-    if not p.exists():
-        return {}
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
+    return ACCOUNT_REGISTRY.source_info(account_dir)
 
 
 def _guess_wxid_dir_from_common_paths(account_name: str) -> Optional[Path]:
@@ -1535,6 +1482,7 @@ def _save_media_keys(account_dir: Path, xor_key: int, aes_key16: Optional[bytes]
             json.dumps(payload, ensure_ascii=False, indent=2),
             encoding="utf-8",
         )
+        ACCOUNT_REGISTRY.invalidate(account_dir.name)
     except Exception:
         pass
 
@@ -1568,13 +1516,7 @@ def _decrypt_wechat_dat_v4(data: bytes, xor_key: int, aes_key: bytes) -> bytes:
 
 
 def _load_media_keys(account_dir: Path) -> dict[str, Any]:
-    p = account_dir / "_media_keys.json"
-    if not p.exists():
-        return {}
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
+    return ACCOUNT_REGISTRY.media_keys(account_dir)
 
 
 def _get_resource_dir(account_dir: Path) -> Path:
@@ -1619,15 +1561,19 @@ def _try_find_decrypted_resource(account_dir: Path, md5: str) -> Optional[Path]:
     sub_dir = md5[:2] if len(md5) >= 2 else "00"
     target_dir = resource_dir / sub_dir
     if not target_dir.exists():
+        record_cache("media", hit=False)
         return None
     # 查找匹配MD5的文件（可能有不同扩展名）
     for ext in ["jpg", "png", "gif", "webp", "mp4", "dat"]:
         p = target_dir / f"{md5}.{ext}"
         if p.exists():
+            record_cache("media", hit=True)
             return p
+    record_cache("media", hit=False)
     return None
 
 
+@timed_stage("media_decrypt")
 def _read_and_maybe_decrypt_media(
     path: Path,
     account_dir: Optional[Path] = None,
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from .chat_helpers import _iter_message_db_paths, _quote_ident
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_TABLE_NAME = "message_shard_directory"
+_META_TABLE_NAME = "message_shard_directory_meta"
+_TABLE_NAME_RE = re.compile(r"^(msg_|chat_)([0-9a-f]{32})$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ShardEntry:
+    db_stem: str
+    table_name: str
+    row_count: int
+    min_create_time: int
+    max_create_time: int
+
+
+@dataclass
+class _Directory:
+    # db_stem -> (mtime_ns, size) of the message DB when its entries were last scanned/updated.
+    sigs: dict[str, tuple[int, int]] = field(default_factory=dict)
+    # md5(username) -> entries (one per shard holding a table for that conversation).
+    by_md5: dict[str, list[ShardEntry]] = field(default_factory=dict)
+
+    def tables_for(
+        self,
+        account_dir: Path,
+        username: str,
+        *,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+    ) -> Optional[list[tuple[Path, str]]]:
+        uname = str(username or "").strip()
+        entries = self.by_md5.get(hashlib.md5(uname.encode("utf-8")).hexdigest()) if uname else None
+        if not entries:
+            return None
+
+        ranged = start_time is not None or end_time is not None
+        out: list[tuple[Path, str]] = []
+        for e in entries:
+            if ranged:
+                if e.row_count <= 0:
+                    continue
+                # Bounds of 0 mean create_time was missing; keep those shards.
+                if start_time is not None and e.max_create_time and e.max_create_time < int(start_time):
+                    continue
+                if end_time is not None and e.min_create_time and e.min_create_time > int(end_time):
+                    continue
+            out.append((Path(account_dir) / f"{e.db_stem}.db", e.table_name))
+        return out
+
+
+_CACHE: dict[str, _Directory] = {}
+_CACHE_MU = threading.Lock()
+_ACCOUNT_LOCKS: dict[str, threading.Lock] = {}
+
+
+def _account_lock(account_dir: Path) -> threading.Lock:
+    key = str(account_dir)
+    with _CACHE_MU:
+        lock = _ACCOUNT_LOCKS.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _ACCOUNT_LOCKS[key] = lock
+        return lock
+
+
+def _session_db_path(account_dir: Path) -> Path:
+    return Path(account_dir) / "session.db"
+
+
+def _file_sig(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return int(st.st_mtime_ns), int(st.st_size)
+
+
+def _ensure_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_TABLE_NAME} (
+            table_md5 TEXT NOT NULL,
+            db_stem TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            min_create_time INTEGER NOT NULL DEFAULT 0,
+            max_create_time INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_md5, db_stem)
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_META_TABLE_NAME} (
+            db_stem TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL DEFAULT 0,
+            size INTEGER NOT NULL DEFAULT 0,
+            built_at INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+
+def _scan_shard(db_path: Path) -> list[tuple[str, ShardEntry]]:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        md5_to_table: dict[str, str] = {}
+        for r in rows:
+            name = str(r[0] or "").strip() if r else ""
+            m = _TABLE_NAME_RE.match(name)
+            if not m:
+                continue
+            md5_hex = m.group(2).lower()
+            # Same preference as `_resolve_msg_table_name`: Msg_<md5> wins over Chat_<md5>.
+            if md5_hex not in md5_to_table or m.group(1).lower() == "msg_":
+                md5_to_table[md5_hex] = name
+
+        out: list[tuple[str, ShardEntry]] = []
+        for md5_hex, table_name in md5_to_table.items():
+            try:
+                cnt, min_ct, max_ct = conn.execute(
+                    "SELECT COUNT(1), MIN(CAST(create_time AS INTEGER)), MAX(CAST(create_time AS INTEGER)) "
+                    f"FROM {_quote_ident(table_name)}"
+                ).fetchone()
+            except Exception:
+                continue
+            out.append(
+                (
+                    md5_hex,
+                    ShardEntry(
+                        db_stem=db_path.stem,
+                        table_name=table_name,
+                        row_count=int(cnt or 0),
+                        min_create_time=int(min_ct or 0),
+                        max_create_time=int(max_ct or 0),
+                    ),
+                )
+            )
+        return out
+    finally:
+        conn.close()
+
+
+def _load_persisted(session_db_path: Path) -> _Directory:
+    d = _Directory()
+    if not session_db_path.exists():
+        return d
+    conn = sqlite3.connect(str(session_db_path))
+    try:
+        try:
+            meta = conn.execute(f"SELECT db_stem, mtime_ns, size FROM {_META_TABLE_NAME}").fetchall()
+            rows = conn.execute(
+                f"SELECT table_md5, db_stem, table_name, row_count, min_create_time, max_create_time FROM {_TABLE_NAME}"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Not built yet.
+            return d
+        for stem, mtime_ns, size in meta:
+            d.sigs[str(stem)] = (int(mtime_ns or 0), int(size or 0))
+        for md5_hex, stem, table_name, cnt, min_ct, max_ct in rows:
+            d.by_md5.setdefault(str(md5_hex), []).append(
+                ShardEntry(str(stem), str(table_name), int(cnt or 0), int(min_ct or 0), int(max_ct or 0))
+            )
+        return d
+    finally:
+        conn.close()
+
+
+def _refresh_locked(account_dir: Path, *, rebuild: bool) -> tuple[_Directory, int]:
+    """Bring the directory in line with the current message DBs. Caller holds the account lock."""
+
+    key = str(account_dir)
+    session_db_path = _session_db_path(account_dir)
+    with _CACHE_MU:
+        d = None if rebuild else _CACHE.get(key)
+    if d is None:
+        d = _Directory() if rebuild else _load_persisted(session_db_path)
+
+    db_paths = _iter_message_db_paths(account_dir)
+    current = {p.stem: (p, _file_sig(p)) for p in db_paths}
+    stale = [p for stem, (p, sig) in current.items() if sig is not None and d.sigs.get(stem) != sig]
+    removed = [stem for stem in d.sigs if stem not in current]
+    if not stale and not removed and not rebuild:
+        with _CACHE_MU:
+            _CACHE[key] = d
+        return d, 0
+
+    drop = {p.stem for p in stale} | set(removed)
+    scanned: dict[str, list[tuple[str, ShardEntry]]] = {}
+    for p in stale:
+        scanned[p.stem] = _scan_shard(p)
+
+    by_md5: dict[str, list[ShardEntry]] = {}
+    for md5_hex, entries in d.by_md5.items():
+        kept = [e for e in entries if e.db_stem not in drop]
+        if kept:
+            by_md5[md5_hex] = kept
+    for stem, items in scanned.items():
+        for md5_hex, entry in items:
+            by_md5.setdefault(md5_hex, []).append(entry)
+    order = {p.stem: i for i, p in enumerate(db_paths)}
+    for entries in by_md5.values():
+        entries.sort(key=lambda e: order.get(e.db_stem, len(order)))
+
+    sigs = {stem: sig for stem, sig in d.sigs.items() if stem not in drop}
+    for p in stale:
+        sig = current[p.stem][1]
+        if sig is not None:
+            sigs[p.stem] = sig
+    new_d = _Directory(sigs=sigs, by_md5=by_md5)
+
+    built_at = int(time.time())
+    conn = sqlite3.connect(str(session_db_path))
+    try:
+        _ensure_tables(conn)
+        if rebuild:
+            conn.execute(f"DELETE FROM {_TABLE_NAME}")
+            conn.execute(f"DELETE FROM {_META_TABLE_NAME}")
+        for stem in drop:
+            conn.execute(f"DELETE FROM {_TABLE_NAME} WHERE db_stem = ?", (stem,))
+            conn.execute(f"DELETE FROM {_META_TABLE_NAME} WHERE db_stem = ?", (stem,))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_TABLE_NAME}("
+            "table_md5, db_stem, table_name, row_count, min_create_time, max_create_time"
+            ") VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (md5_hex, e.db_stem, e.table_name, e.row_count, e.min_create_time, e.max_create_time)
+                for items in scanned.values()
+                for md5_hex, e in items
+            ],
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_META_TABLE_NAME}(db_stem, mtime_ns, size, built_at) VALUES (?, ?, ?, ?)",
+            [(p.stem, sigs[p.stem][0], sigs[p.stem][1], built_at) for p in stale if p.stem in sigs],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    with _CACHE_MU:
+        _CACHE[key] = new_d
+    return new_d, len(stale)
+
+
+def get_message_shard_directory(account_dir: Path) -> Optional[_Directory]:
+    """Current directory for the account (rescanning only message DBs changed since the last scan).
+
+    Returns None when it can't be built; callers then probe every message DB as before.
+    """
+
+    account_dir = Path(account_dir)
+    if not _session_db_path(account_dir).exists():
+        return None
+    try:
+        with _account_lock(account_dir):
+            d, rescanned = _refresh_locked(account_dir, rebuild=False)
+        if rescanned:
+            logger.info("[message_shard_directory] refreshed account=%s shards=%s", account_dir.name, rescanned)
+        return d
+    except Exception:
+        logger.exception("[message_shard_directory] refresh failed account=%s", account_dir.name)
+        return None
+
+
+def build_message_shard_directory(account_dir: Path, *, rebuild: bool = False) -> dict[str, Any]:
+    """
+    Build the per-account directory `{account}/session.db::{message_shard_directory}`.
+
+    One row per (conversation table, message DB) with its row count and create_time range, so per-conversation
+    queries open only the shards that hold that conversation (and, for time-bounded queries, that time range)
+    instead of opening every message_N.db / biz_message_N.db to look for its table.
+    """
+
+    account_dir = Path(account_dir)
+    if not _session_db_path(account_dir).exists():
+        return {"status": "error", "account": account_dir.name, "message": "session.db not found."}
+
+    started = time.time()
+    with _account_lock(account_dir):
+        d, rescanned = _refresh_locked(account_dir, rebuild=bool(rebuild))
+    duration = max(0.0, time.time() - started)
+    logger.info(
+        f"[message_shard_directory] build done account={account_dir.name} shards={rescanned} "
+        f"conversations={len(d.by_md5)} durationSec={round(duration, 3)}"
+    )
+    return {
+        "status": "success",
+        "account": account_dir.name,
+        "table": _TABLE_NAME,
+        "shards": len(d.sigs),
+        "scannedShards": rescanned,
+        "conversations": len(d.by_md5),
+        "durationSec": round(duration, 3),
+    }
+
+
+def conversation_message_tables(
+    account_dir: Path,
+    username: str,
+    *,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+) -> Optional[list[tuple[Path, str]]]:
+    """(db_path, table_name) for each shard holding `username`, in message DB order.
+
+    With `start_time`/`end_time` (inclusive, epoch seconds) shards whose create_time range cannot overlap are
+    skipped. Returns None when the directory does not know the conversation.
+    """
+
+    d = get_message_shard_directory(Path(account_dir))
+    if d is None:
+        return None
+    return d.tables_for(account_dir, username, start_time=start_time, end_time=end_time)
+
+
+def conversation_message_db_paths(
+    account_dir: Path,
+    username: str,
+    *,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+) -> list[Path]:
+    """Message DBs worth opening for one conversation (every message DB when the directory can't tell)."""
+
+    tables = conversation_message_tables(account_dir, username, start_time=start_time, end_time=end_time)
+    if tables is None:
+        return _iter_message_db_paths(Path(account_dir))
+    return [p for p, _ in tables]
+
+
+def note_message_rows_added(
+    account_dir: Path,
+    db_path: Path,
+    added: dict[str, tuple[int, int, int]],
+) -> None:
+    """Record rows written to `db_path` (table_name -> (count, min_create_time, max_create_time)).
+
+    Realtime sync calls this after committing so the directory stays current without rescanning the shard. A zero
+    count registers a newly created (empty) table; an empty `added` just restamps the shard after other writes that
+    don't move its rows (e.g. packed_info_data backfill).
+    """
+
+    account_dir = Path(account_dir)
+    key = str(account_dir)
+    stem = Path(db_path).stem
+    try:
+        with _account_lock(account_dir):
+            with _CACHE_MU:
+                d = _CACHE.get(key)
+            if d is None or stem not in d.sigs:
+                # Not loaded (or shard never scanned): the next lookup rescans it from disk anyway.
+                return
+
+            updates: list[tuple[str, ShardEntry]] = []
+            for table_name, (count, min_ct, max_ct) in added.items():
+                m = _TABLE_NAME_RE.match(str(table_name or ""))
+                if not m:
+                    # Unknown table naming: force a rescan of this shard on the next lookup.
+                    d.sigs.pop(stem, None)
+                    return
+                md5_hex = m.group(2).lower()
+                # Copy-on-write: readers iterate these lists without holding the lock.
+                entries = list(d.by_md5.get(md5_hex) or [])
+                prev = next((e for e in entries if e.db_stem == stem), None)
+                mins = [int(x) for x in (min_ct, prev.min_create_time if prev else 0) if int(x or 0) > 0]
+                entry = ShardEntry(
+                    db_stem=stem,
+                    table_name=prev.table_name if prev else str(table_name),
+                    row_count=(prev.row_count if prev else 0) + int(count or 0),
+                    min_create_time=min(mins) if mins else 0,
+                    max_create_time=max(int(max_ct or 0), prev.max_create_time if prev else 0),
+                )
+                if prev is not None:
+                    entries[entries.index(prev)] = entry
+                else:
+                    entries.append(entry)
+                    order = {p.stem: i for i, p in enumerate(_iter_message_db_paths(account_dir))}
+                    entries.sort(key=lambda e: order.get(e.db_stem, len(order)))
+                d.by_md5[md5_hex] = entries
+                updates.append((md5_hex, entry))
+
+            sig = _file_sig(Path(db_path))
+            if sig is None:
+                d.sigs.pop(stem, None)
+                return
+            d.sigs[stem] = sig
+            conn = sqlite3.connect(str(_session_db_path(account_dir)))
+            try:
+                _ensure_tables(conn)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {_TABLE_NAME}("
+                    "table_md5, db_stem, table_name, row_count, min_create_time, max_create_time"
+                    ") VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (md5_hex, e.db_stem, e.table_name, e.row_count, e.min_create_time, e.max_create_time)
+                        for md5_hex, e in updates
+                    ],
+                )
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {_META_TABLE_NAME}(db_stem, mtime_ns, size, built_at) VALUES (?, ?, ?, ?)",
+                    (stem, sig[0], sig[1], int(time.time())),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+    except Exception:
+        logger.exception("[message_shard_directory] update failed account=%s db=%s", account_dir.name, stem)
@@ -0,0 +1,134 @@
+"""Single-pass tag/attribute index for message XML payloads.
+
+`chat_helpers._extract_xml_tag_text` / `_extract_xml_attr` used to run one regex search over the whole payload per
+lookup, and `_parse_app_message` / `_parse_system_message_content` / `_parse_location_message` do dozens of lookups
+per message (large appmsg / recordinfo payloads are tens of KB).
+
+`MessageXml` tokenizes a payload once and answers every lookup from that index. It is deliberately *not* a real XML
+parser: payloads are frequently malformed, and the renderer relies on the regex semantics (tags inside CDATA are
+visible, `<tag>` only matches without attributes, `md5=` also matches `cdnthumbmd5=`). The lookups reproduce
+`regex_tag_text` / `regex_attr` exactly; those are kept as the reference implementation for tests and benchmarks.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+from functools import lru_cache
+from typing import Optional
+
+# `<name>` / `</name>`: the only shapes the regex lookups can match (no attributes, no whitespace).
+_TAG_TOKEN_RE = re.compile(r"<(/?)([^\s<>/]+)>")
+# Every `=` followed by a non-empty quoted value; lookahead so values containing `=` are still scanned.
+_ATTR_EQ_RE = re.compile(r"=(?=\s*['\"]([^'\"]+)['\"])")
+# Attribute names are matched as a suffix of the text before `=`; keep this much of it.
+_ATTR_NAME_WINDOW = 64
+# Lookup names the index can answer; anything else goes through the reference regex.
+_PLAIN_TAG_RE = re.compile(r"[^\s<>/]+")
+_PLAIN_ATTR_RE = re.compile(r"[^\s=]+")
+
+
+def regex_tag_text(xml_text: str, tag: str) -> str:
+    """Reference implementation: inner text of the first `<tag>...</tag>` (CDATA not stripped)."""
+
+    if not xml_text or not tag:
+        return ""
+    m = re.search(
+        rf"<{re.escape(tag)}>(.*?)</{re.escape(tag)}>",
+        xml_text,
+        flags=re.IGNORECASE | re.DOTALL,
+    )
+    if not m:
+        return ""
+    return m.group(1) or ""
+
+
+def regex_attr(xml_text: str, attr: str) -> str:
+    """Reference implementation: value of the first `attr="..."` (anywhere in the payload)."""
+
+    if not xml_text or not attr:
+        return ""
+    m = re.search(rf"{re.escape(attr)}\s*=\s*['\"]([^'\"]+)['\"]", xml_text, flags=re.IGNORECASE)
+    return (m.group(1) or "").strip() if m else ""
+
+
+class MessageXml:
+    __slots__ = ("text", "_opens", "_closes", "_attrs", "_tag_memo", "_attr_memo")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        opens: dict[str, tuple[int, int]] = {}
+        closes: dict[str, list[int]] = {}
+        for m in _TAG_TOKEN_RE.finditer(text):
+            name = m.group(2).lower()
+            if m.group(1):
+                closes.setdefault(name, []).append(m.start())
+            elif name not in opens:
+                opens[name] = (m.start(), m.end())
+        self._opens = opens
+        self._closes = closes
+
+        attrs: list[tuple[str, str]] = []
+        for m in _ATTR_EQ_RE.finditer(text):
+            j = m.start()
+            while j > 0 and text[j - 1].isspace():
+                j -= 1
+            if j > 0:
+                attrs.append((text[max(0, j - _ATTR_NAME_WINDOW) : j].lower(), m.group(1)))
+        self._attrs = attrs
+        self._tag_memo: dict[str, str] = {}
+        self._attr_memo: dict[str, str] = {}
+
+    def tag_text(self, tag: str) -> str:
+        """Same result as `regex_tag_text(self.text, tag)`."""
+
+        if not tag:
+            return ""
+        key = tag.lower()
+        hit = self._tag_memo.get(key)
+        if hit is not None:
+            return hit
+        if not tag.isascii() or not _PLAIN_TAG_RE.fullmatch(tag):
+            return regex_tag_text(self.text, tag)
+        out = ""
+        first_open = self._opens.get(key)
+        closes = self._closes.get(key)
+        if first_open is not None and closes:
+            # Later openings only see a subset of these closings, so the first opening decides the match.
+            i = bisect.bisect_left(closes, first_open[1])
+            if i < len(closes):
+                out = self.text[first_open[1] : closes[i]]
+        self._tag_memo[key] = out
+        return out
+
+    def attr(self, name: str) -> str:
+        """Same result as `regex_attr(self.text, name)`."""
+
+        if not name:
+            return ""
+        key = name.lower()
+        hit = self._attr_memo.get(key)
+        if hit is not None:
+            return hit
+        if len(name) > _ATTR_NAME_WINDOW or not name.isascii() or not _PLAIN_ATTR_RE.fullmatch(name):
+            return regex_attr(self.text, name)
+        out = ""
+        for tail, value in self._attrs:
+            if tail.endswith(key):
+                out = value.strip()
+                break
+        self._attr_memo[key] = out
+        return out
+
+
+@lru_cache(maxsize=64)
+def _parse_cached(text: str) -> MessageXml:
+    return MessageXml(text)
+
+
+def message_xml(text: str) -> Optional[MessageXml]:
+    """Index for `text` (cached: the same payload is usually queried many times in a row)."""
+
+    if not text or not isinstance(text, str):
+        return None
+    return _parse_cached(text)
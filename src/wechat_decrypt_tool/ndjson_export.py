@@ -0,0 +1,54 @@
+"""NDJSON conversation files for chat exports.
+
+`messages.ndjson` holds a header object on line 1, then one message object per line in `create_time` order; it is
+written straight from the message stream, so memory does not grow with the conversation. `messages.index.json` next to
+it lists, per local calendar day, the byte range and message count of that day's lines, so readers can split a file
+and parse the ranges in parallel (`f.seek(day["offset"]); f.read(day["length"])`).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+NDJSON_MESSAGES_FILE = "messages.ndjson"
+NDJSON_INDEX_FILE = "messages.index.json"
+
+
+class NdjsonDayIndex:
+    """Per-day byte ranges of an NDJSON message file (lines must arrive in create_time order)."""
+
+    def __init__(self) -> None:
+        self.days: list[dict[str, Any]] = []
+        self._day_start = 0.0
+        self._day_end = 0.0
+        self._current: Optional[dict[str, Any]] = None
+
+    def add(self, create_time: int, offset: int, length: int) -> None:
+        ts = int(create_time or 0)
+        cur = self._current
+        if cur is None or not (self._day_start <= ts < self._day_end):
+            try:
+                d = datetime.fromtimestamp(ts)
+            except Exception:
+                d = datetime.fromtimestamp(0)
+            start = datetime(d.year, d.month, d.day)
+            self._day_start = start.timestamp()
+            self._day_end = (start + timedelta(days=1)).timestamp()
+            date = start.strftime("%Y-%m-%d")
+            if cur is None or cur["date"] != date:
+                cur = {"date": date, "offset": int(offset), "length": 0, "messages": 0}
+                self.days.append(cur)
+                self._current = cur
+        cur["length"] += int(length)
+        cur["messages"] += 1
+
+    def to_dict(self, *, header_bytes: int, total_bytes: int) -> dict[str, Any]:
+        return {
+            "schemaVersion": 1,
+            "file": NDJSON_MESSAGES_FILE,
+            "headerBytes": int(header_bytes),
+            "bytes": int(total_bytes),
+            "messages": sum(int(d["messages"]) for d in self.days),
+            "days": self.days,
+        }
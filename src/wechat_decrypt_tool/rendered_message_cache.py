@@ -0,0 +1,228 @@
+"""Persistent cache of rendered chat message dicts.
+
+`/api/chat/messages` turns every raw row into the dict the frontend renders: zstd/text decode, group sender prefix,
+`_parse_app_message` XML parsing, `message_resource.db` md5 lookups... Re-opening a conversation used to repeat all of
+that for every page. This module keeps the per-row result in a sidecar SQLite DB per account
+(`output/render_cache/<account>/render_cache.db`), keyed by `(db_stem, table_name, local_id)`.
+
+Only the row-local rendering is cached. Contact names/avatars and transfer post-processing depend on other rows and
+other databases, so they still run on every request.
+
+Invalidation:
+- `RENDERER_VERSION` is stored in the DB; bump it whenever the row renderer output changes and old entries are dropped.
+- Message edits/resets (`chat_edit_store`) drop the whole conversation.
+- Realtime sync drops the rows whose `packed_info_data` it backfilled (new rows have new local_ids).
+- Re-decrypting an account drops the account's cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .app_paths import get_output_dir
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when the per-row rendering in `routers/chat.py::_collect_chat_messages` changes its output.
+RENDERER_VERSION = 1
+
+_SCHEMA_MU = threading.Lock()
+_SCHEMA_READY: set[str] = set()
+
+
+def is_render_cache_enabled() -> bool:
+    v = str(os.environ.get("WECHAT_TOOL_RENDER_CACHE_ENABLED", "1") or "").strip().lower()
+    return v not in {"", "0", "false", "off", "no"}
+
+
+def get_render_cache_root_dir() -> Path:
+    return get_output_dir() / "render_cache"
+
+
+def _safe_segment(value: str) -> str:
+    cleaned = re.sub(r"[^0-9A-Za-z._-]+", "_", str(value or "").strip())
+    cleaned = cleaned.strip("._-")
+    return cleaned or "default"
+
+
+def _db_path(account: str) -> Path:
+    return get_render_cache_root_dir() / _safe_segment(account) / "render_cache.db"
+
+
+def _conversation_table_name(username: str) -> str:
+    return f"msg_{hashlib.md5(str(username or '').encode('utf-8')).hexdigest()}"
+
+
+def _connect(account: str, *, create: bool) -> Optional[sqlite3.Connection]:
+    db_path = _db_path(account)
+    exists = db_path.exists()
+    if not create and not exists:
+        return None
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=5)
+    key = str(db_path)
+    with _SCHEMA_MU:
+        ready = exists and key in _SCHEMA_READY
+    if not ready:
+        _ensure_schema(conn)
+        with _SCHEMA_MU:
+            _SCHEMA_READY.add(key)
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except Exception:
+        pass
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rendered_messages (
+            db_stem TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            local_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (db_stem, table_name, local_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rendered_messages_table ON rendered_messages(table_name)")
+    conn.execute("CREATE TABLE IF NOT EXISTS rendered_messages_meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+    row = conn.execute("SELECT v FROM rendered_messages_meta WHERE k = 'renderer_version'").fetchone()
+    if row is None or str(row[0]) != str(RENDERER_VERSION):
+        conn.execute("DELETE FROM rendered_messages")
+        conn.execute(
+            "INSERT OR REPLACE INTO rendered_messages_meta(k, v) VALUES('renderer_version', ?)",
+            (str(RENDERER_VERSION),),
+        )
+    conn.commit()
+
+
+def load_rendered_messages(
+    account: str,
+    db_stem: str,
+    table_name: str,
+    local_ids: Iterable[int],
+) -> dict[int, tuple[dict[str, Any], list[str]]]:
+    """Return `{local_id: (message_dict, pat_usernames)}` for the cached subset of `local_ids`."""
+
+    ids = [int(x) for x in local_ids]
+    if not ids or not is_render_cache_enabled():
+        return {}
+    out: dict[int, tuple[dict[str, Any], list[str]]] = {}
+    conn: Optional[sqlite3.Connection] = None
+    try:
+        conn = _connect(account, create=False)
+        if conn is None:
+            return {}
+        table_key = str(table_name or "").lower()
+        # Stay well below SQLITE_MAX_VARIABLE_NUMBER on old builds.
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            rows = conn.execute(
+                "SELECT local_id, payload FROM rendered_messages "
+                f"WHERE db_stem = ? AND table_name = ? AND local_id IN ({placeholders})",
+                [str(db_stem), table_key, *chunk],
+            ).fetchall()
+            for local_id, payload in rows:
+                try:
+                    data = json.loads(payload)
+                    out[int(local_id)] = (dict(data["m"]), list(data.get("p") or []))
+                except Exception:
+                    continue
+    except Exception:
+        logger.debug("[render_cache] load failed account=%s db=%s", account, db_stem, exc_info=True)
+        return {}
+    finally:
+        if conn is not None:
+            conn.close()
+    return out
+
+
+def store_rendered_messages(
+    account: str,
+    db_stem: str,
+    table_name: str,
+    items: list[tuple[int, dict[str, Any], list[str]]],
+) -> None:
+    """Persist `(local_id, message_dict, pat_usernames)` tuples. Best-effort."""
+
+    if not items or not is_render_cache_enabled():
+        return
+    conn: Optional[sqlite3.Connection] = None
+    try:
+        conn = _connect(account, create=True)
+        table_key = str(table_name or "").lower()
+        values = [
+            (str(db_stem), table_key, int(local_id), json.dumps({"m": msg, "p": list(pats)}, ensure_ascii=False))
+            for local_id, msg, pats in items
+        ]
+        conn.executemany(
+            "INSERT OR REPLACE INTO rendered_messages(db_stem, table_name, local_id, payload) VALUES(?, ?, ?, ?)",
+            values,
+        )
+        conn.commit()
+    except Exception:
+        logger.debug("[render_cache] store failed account=%s db=%s", account, db_stem, exc_info=True)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def invalidate_rendered_rows(account: str, db_stem: str, table_name: str, local_ids: Iterable[int]) -> None:
+    ids = [int(x) for x in local_ids]
+    if not ids:
+        return
+    conn: Optional[sqlite3.Connection] = None
+    try:
+        conn = _connect(account, create=False)
+        if conn is None:
+            return
+        conn.executemany(
+            "DELETE FROM rendered_messages WHERE db_stem = ? AND table_name = ? AND local_id = ?",
+            [(str(db_stem), str(table_name or "").lower(), i) for i in ids],
+        )
+        conn.commit()
+    except Exception:
+        logger.warning("[render_cache] invalidate rows failed account=%s db=%s", account, db_stem, exc_info=True)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def invalidate_rendered_conversation(account: str, username: str) -> None:
+    """Drop every cached row of one conversation (all shards)."""
+
+    conn: Optional[sqlite3.Connection] = None
+    try:
+        conn = _connect(account, create=False)
+        if conn is None:
+            return
+        conn.execute("DELETE FROM rendered_messages WHERE table_name = ?", (_conversation_table_name(username),))
+        conn.commit()
+    except Exception:
+        logger.warning("[render_cache] invalidate failed account=%s username=%s", account, username, exc_info=True)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def drop_rendered_account(account: str) -> None:
+    db_path = _db_path(account)
+    with _SCHEMA_MU:
+        _SCHEMA_READY.discard(str(db_path))
+    if db_path.parent.exists():
+        try:
+            shutil.rmtree(db_path.parent)
+        except Exception:
+            logger.warning("[render_cache] drop failed account=%s", account, exc_info=True)
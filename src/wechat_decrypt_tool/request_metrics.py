@@ -0,0 +1,304 @@
+"""Per-request stage timing, `Server-Timing` headers and per-route latency histograms.
+
+Any code running inside a request (including `asyncio.to_thread` / threadpool work, which inherits the
+request's contextvars) can record where time went:
+
+    with stage("sqlite"):
+        rows = conn.execute(...).fetchall()
+    record_stage("wcdb", wcdb_ms)          # when the caller already measured it
+    record_cache("avatar", hit=True)
+
+    @timed_stage("sqlite")
+    def _load_contact_rows(...): ...
+
+Outside a request these calls are no-ops, so engine code can be instrumented unconditionally.
+
+`request_metrics_middleware` opens a trace per request, appends the stages to `Server-Timing`, feeds the
+per-route histograms served by `/api/admin/metrics`, and logs slow requests when
+`WECHAT_TOOL_SLOW_REQUEST_MS` is set.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from starlette.requests import Request
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_TOKEN_RE = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+class RequestTrace:
+    """Stage totals and cache counters collected for one request."""
+
+    __slots__ = ("started", "_lock", "stages", "caches")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: dict[str, list[float]] = {}  # name -> [total_ms, count]
+        self.caches: dict[str, list[int]] = {}  # name -> [hits, misses]
+
+    def add_stage(self, name: str, ms: float) -> None:
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [float(ms), 1]
+            else:
+                entry[0] += float(ms)
+                entry[1] += 1
+
+    def add_cache(self, name: str, hit: bool) -> None:
+        with self._lock:
+            entry = self.caches.setdefault(name, [0, 0])
+            entry[0 if hit else 1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def snapshot(self) -> tuple[dict[str, list[float]], dict[str, list[int]]]:
+        with self._lock:
+            return (
+                {k: list(v) for k, v in self.stages.items()},
+                {k: list(v) for k, v in self.caches.items()},
+            )
+
+
+_CURRENT: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "wechat_tool_request_trace", default=None
+)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _CURRENT.get()
+
+
+def record_stage(name: str, ms: float) -> None:
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.add_stage(name, ms)
+
+
+def record_cache(name: str, *, hit: bool) -> None:
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.add_cache(name, bool(hit))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    trace = _CURRENT.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def timed_stage(name: str):
+    """Decorator form of `stage()` for helpers whose whole body is one kind of work (e.g. a sqlite lookup)."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+@contextmanager
+def request_trace() -> Iterator[RequestTrace]:
+    """Open a trace for the current context (used by the middleware and by tests/benchmarks)."""
+
+    trace = RequestTrace()
+    token = _CURRENT.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT.reset(token)
+
+
+def _token(v: str) -> str:
+    safe = _TOKEN_RE.sub("_", str(v or "").strip().replace(" ", "_")).strip("_")
+    return safe[:64] or "unknown"
+
+
+def format_server_timing(trace: RequestTrace, *, total_ms: Optional[float] = None) -> str:
+    stages, caches = trace.snapshot()
+    parts: list[str] = []
+    if total_ms is not None:
+        parts.append(f"app;dur={float(total_ms):.1f}")
+    for name, (ms, count) in stages.items():
+        part = f"{_token(name)};dur={ms:.1f}"
+        if int(count) > 1:
+            part += f';desc="n={int(count)}"'
+        parts.append(part)
+    for name, (hits, misses) in caches.items():
+        parts.append(f'cache_{_token(name)};desc="hit={int(hits)} miss={int(misses)}"')
+    return ", ".join(parts)
+
+
+class RouteStats:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets", "stage_ms", "cache_hits", "cache_misses")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.stage_ms: dict[str, float] = {}
+        self.cache_hits: dict[str, int] = {}
+        self.cache_misses: dict[str, int] = {}
+
+    def observe(self, ms: float, *, status: int, trace: Optional[RequestTrace]) -> None:
+        self.count += 1
+        if int(status) >= 500:
+            self.errors += 1
+        self.total_ms += float(ms)
+        self.max_ms = max(self.max_ms, float(ms))
+        idx = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                idx = i
+                break
+        self.buckets[idx] += 1
+        if trace is None:
+            return
+        stages, caches = trace.snapshot()
+        for name, (stage_ms, _n) in stages.items():
+            self.stage_ms[name] = self.stage_ms.get(name, 0.0) + float(stage_ms)
+        for name, (hits, misses) in caches.items():
+            self.cache_hits[name] = self.cache_hits.get(name, 0) + int(hits)
+            self.cache_misses[name] = self.cache_misses.get(name, 0) + int(misses)
+
+    def percentile_ms(self, q: float) -> float:
+        """Approximate percentile from the histogram (bucket upper bound, capped at the observed max)."""
+
+        if self.count <= 0:
+            return 0.0
+        rank = max(1, int(round(float(q) * self.count)))
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(float(LATENCY_BUCKETS_MS[i]), self.max_ms) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"le_{int(b)}" for b in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "meanMs": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "maxMs": round(self.max_ms, 2),
+            "p50Ms": self.percentile_ms(0.5),
+            "p95Ms": self.percentile_ms(0.95),
+            "histogram": dict(zip(labels, self.buckets)),
+            "stageMs": {k: round(v, 2) for k, v in sorted(self.stage_ms.items())},
+            "cache": {
+                k: {"hit": self.cache_hits.get(k, 0), "miss": self.cache_misses.get(k, 0)}
+                for k in sorted(set(self.cache_hits) | set(self.cache_misses))
+            },
+        }
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: dict[str, RouteStats] = {}
+        self._since = time.time()
+
+    def observe(self, route: str, ms: float, *, status: int, trace: Optional[RequestTrace] = None) -> None:
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = RouteStats()
+                self._routes[route] = stats
+            stats.observe(ms, status=status, trace=trace)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            routes = {k: v.to_dict() for k, v in sorted(self._routes.items())}
+            since = self._since
+        return {
+            "since": int(since),
+            "bucketsMs": list(LATENCY_BUCKETS_MS),
+            "slowRequestMs": slow_request_threshold_ms(),
+            "routes": routes,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._since = time.time()
+
+
+REQUEST_METRICS = RequestMetrics()
+
+
+def slow_request_threshold_ms() -> float:
+    raw = str(os.environ.get("WECHAT_TOOL_SLOW_REQUEST_MS", "") or "").strip()
+    try:
+        return max(0.0, float(raw)) if raw else 0.0
+    except Exception:
+        return 0.0
+
+
+def route_template(request: Request) -> str:
+    """Route path template (e.g. `/api/chat/media/{kind}`) so metrics stay bounded per endpoint."""
+
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path and not getattr(route, "routes", None):
+        return f"{str(request.method or 'GET').upper()} {path}"
+    if str(request.url.path or "").startswith("/api/"):
+        return f"{str(request.method or 'GET').upper()} <unmatched>"
+    return "GET <static>"
+
+
+async def request_metrics_middleware(logger, request: Request, call_next):
+    # Note: for streaming responses this measures time to first byte (headers), not the full body.
+    with request_trace() as trace:
+        response = await call_next(request)
+        total_ms = trace.elapsed_ms()
+
+    route = route_template(request)
+    status = int(getattr(response, "status_code", 0) or 0)
+    REQUEST_METRICS.observe(route, total_ms, status=status, trace=trace)
+
+    try:
+        timing = format_server_timing(trace, total_ms=total_ms)
+        existing = str(response.headers.get("Server-Timing") or "").strip()
+        response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        if "Timing-Allow-Origin" not in response.headers:
+            response.headers["Timing-Allow-Origin"] = "*"
+    except Exception:
+        pass
+
+    threshold = slow_request_threshold_ms()
+    if threshold > 0 and total_ms >= threshold:
+        logger.warning(
+            "[slow-request] route=%s path=%s status=%s ms=%.1f timing=%s",
+            route,
+            str(request.url.path or ""),
+            status,
+            total_ms,
+            format_server_timing(trace),
+        )
+    return response
@@ -13,8 +13,10 @@ import httpx
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 from starlette.requests import Request
 
+from ..executors import executor_stats
 from ..logging_config import get_log_file_path, get_logger
 from ..path_fix import PathFixRoute
+from ..request_metrics import REQUEST_METRICS
 from ..runtime_settings import read_effective_backend_port, write_backend_port_env_file, write_backend_port_setting
 
 
@@ -206,6 +208,19 @@ async def log_frontend_server_error(payload: dict) -> dict:
     return {"success": True, "path": str(_get_current_log_file_path())}
 
 
+@router.get("/api/admin/metrics", summary="获取各接口耗时统计（直方图/阶段耗时/缓存命中/线程池队列）")
+async def get_request_metrics() -> dict:
+    snapshot = REQUEST_METRICS.snapshot()
+    snapshot["executors"] = executor_stats()
+    return snapshot
+
+
+@router.post("/api/admin/metrics/reset", summary="清空接口耗时统计")
+async def reset_request_metrics() -> dict:
+    REQUEST_METRICS.reset()
+    return {"success": True}
+
+
 @router.get("/api/admin/port", summary="获取后端端口（用于前端设置页）")
 async def get_backend_port() -> dict:
     port, source = read_effective_backend_port(default=DEFAULT_BACKEND_PORT)
@@ -2,10 +2,14 @@ import os
 import re
 import sqlite3
 import asyncio
+import contextlib
+import heapq
+import itertools
 import json
 import shutil
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from os import scandir
 from pathlib import Path
@@ -16,8 +20,18 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from ..logging_config import get_logger
 from ..chat_search_index import (
+    SEARCH_HIT_CACHE,
+    get_chat_search_index_build_state,
     get_chat_search_index_db_path,
+    get_chat_search_index_db_paths,
+    get_chat_search_index_shard_paths,
     get_chat_search_index_status,
+    get_chat_search_index_version,
+    load_search_hit_payloads,
+    note_chat_search_index_query,
+    optimize_chat_search_index,
+    pending_chat_search_index_shards,
+    refresh_chat_search_index_shards,
     start_chat_search_index_build,
 )
 from ..chat_helpers import (
@@ -42,7 +56,6 @@ from ..chat_helpers import (
     _make_snippet,
     _match_tokens,
     _load_contact_rows,
-    _load_group_nickname_map_from_contact_db,
     _load_usernames_by_display_names,
     _load_latest_message_previews,
     _build_group_sender_display_name_map,
@@ -56,6 +69,7 @@ from ..chat_helpers import (
     _parse_system_message_content,
     _parse_pat_message,
     _pick_display_name,
+    _pick_group_member_display_name,
     _query_head_image_usernames,
     _quote_ident,
     _resolve_account_dir,
@@ -67,11 +81,30 @@ from ..chat_helpers import (
     _split_group_sender_prefix,
     _to_char_token_text,
 )
+from ..db_storage_changes import DB_STORAGE_CHANGES
+from ..message_shard_directory import (
+    conversation_message_db_paths,
+    conversation_message_tables,
+    get_message_shard_directory,
+    note_message_rows_added,
+)
+from ..account_registry import ACCOUNT_REGISTRY
+from ..group_member_names import get_chatroom_member_names
+from ..rendered_message_cache import (
+    drop_rendered_account,
+    invalidate_rendered_conversation,
+    invalidate_rendered_rows,
+    is_render_cache_enabled,
+    load_rendered_messages,
+    store_rendered_messages,
+)
 from ..media_helpers import _resolve_account_db_storage_dir, _try_find_decrypted_resource
 from .. import chat_edit_store
 from ..app_paths import get_output_dir
+from ..executors import run_io
 from ..key_store import remove_account_keys_from_store
 from ..path_fix import PathFixRoute
+from ..request_metrics import record_cache, record_stage, stage
 from ..session_last_message import (
     build_session_last_message_table,
     get_session_last_message_status,
@@ -634,11 +667,8 @@ def _load_group_nickname_map(
 
     contact_map: dict[str, str] = {}
     try:
-        contact_map = _load_group_nickname_map_from_contact_db(
-            contact_db_path,
-            chatroom_id,
-            sender_usernames,
-        )
+        if str(chatroom_id or "").strip().endswith("@chatroom"):
+            contact_map = get_chatroom_member_names(contact_db_path, chatroom_id).nicknames_for(sender_usernames)
     except Exception:
         contact_map = {}
 
@@ -674,12 +704,8 @@ def _resolve_sender_display_name(
     if not su:
         return ""
 
-    gn = str((group_nicknames or {}).get(su) or "").strip()
-    if gn:
-        return gn
-
     row = sender_contact_rows.get(su)
-    display_name = _pick_display_name(row, su)
+    display_name = _pick_group_member_display_name(row, su, str((group_nicknames or {}).get(su) or ""))
     if display_name == su:
         wd = str(wcdb_display_names.get(su) or "").strip()
         if wd and wd != su:
@@ -798,48 +824,6 @@ def _lookup_contact_alias(
     return alias
 
 
-def _scan_db_storage_mtime_ns(db_storage_dir: Path) -> int:
-    try:
-        base = str(db_storage_dir)
-    except Exception:
-        return 0
-
-    max_ns = 0
-    try:
-        for root, dirs, files in os.walk(base):
-            # Most installs keep databases under these buckets.
-            if root == base:
-                allow = {"message", "session", "contact", "head_image", "bizchat", "sns", "general", "favorite"}
-                dirs[:] = [d for d in dirs if str(d or "").lower() in allow]
-
-            for fn in files:
-                name = str(fn or "").lower()
-                if not name.endswith((".db", ".db-wal", ".db-shm")):
-                    continue
-                if not (
-                    ("message" in name)
-                    or ("session" in name)
-                    or ("contact" in name)
-                    or ("name2id" in name)
-                    or ("head_image" in name)
-                ):
-                    continue
-
-                try:
-                    st = os.stat(os.path.join(root, fn))
-                    m_ns = int(getattr(st, "st_mtime_ns", 0) or 0)
-                    if m_ns <= 0:
-                        m_ns = int(float(getattr(st, "st_mtime", 0.0) or 0.0) * 1_000_000_000)
-                    if m_ns > max_ns:
-                        max_ns = m_ns
-                except Exception:
-                    continue
-    except Exception:
-        return 0
-
-    return max_ns
-
-
 @router.get("/api/chat/realtime/status", summary="实时模式状态")
 async def get_chat_realtime_status(account: Optional[str] = None):
     """检查当前账号是否具备实时模式条件（dll/密钥/db_storage）以及是否已连接。"""
@@ -851,6 +835,7 @@ async def get_chat_realtime_status(account: Optional[str] = None):
         "account": account_dir.name,
         "available": available,
         "realtime": info,
+        "changeWatchers": [w for w in DB_STORAGE_CHANGES.status() if w.get("account") == account_dir.name],
     }
 
 
@@ -860,7 +845,11 @@ async def stream_chat_realtime_events(
     account: Optional[str] = None,
     interval_ms: int = 500,
 ):
-    """监听 db_storage 目录的变更，通过 SSE 推送事件（用于前端触发增量刷新）。"""
+    """监听 db_storage 目录的变更，通过 SSE 推送事件（用于前端触发增量刷新）。
+
+    同一账号的所有连接共用一个变更检测器（见 db_storage_changes），事件带 buckets（message/session/contact/...），
+    前端可据此选择性刷新。
+    """
     if interval_ms < 100:
         interval_ms = 100
     if interval_ms > 5000:
@@ -880,58 +869,75 @@ async def stream_chat_realtime_events(
     )
 
     async def gen():
-        last_mtime_ns = 0
-        last_heartbeat = 0.0
-
-        # initial snapshot
-        initial = {
-            "type": "ready",
-            "account": account_dir.name,
-            "dbStorageDir": str(db_storage_dir),
-            "ts": int(time.time() * 1000),
-        }
-        yield f"data: {json.dumps(initial, ensure_ascii=False)}\n\n"
-
+        last_heartbeat = time.time()
+        sub = await run_io(
+            DB_STORAGE_CHANGES.subscribe_async,
+            account_dir.name,
+            db_storage_dir,
+            interval_ms=int(interval_ms),
+            loop=asyncio.get_running_loop(),
+        )
         try:
+            initial = {
+                "type": "ready",
+                "account": account_dir.name,
+                "dbStorageDir": str(db_storage_dir),
+                "ts": int(time.time() * 1000),
+            }
+            yield f"data: {json.dumps(initial, ensure_ascii=False)}\n\n"
+
             while True:
                 if await request.is_disconnected():
                     break
 
-                # Avoid blocking the event loop on a potentially large directory walk.
-                scan_t0 = time.perf_counter()
-                try:
-                    mtime_ns = await asyncio.to_thread(_scan_db_storage_mtime_ns, db_storage_dir)
-                except Exception:
-                    mtime_ns = 0
-                scan_ms = (time.perf_counter() - scan_t0) * 1000.0
-                if scan_ms > 1000:
-                    logger.warning("[realtime] SSE scan slow account=%s ms=%.1f", account_dir.name, scan_ms)
-
-                if mtime_ns and mtime_ns != last_mtime_ns:
-                    last_mtime_ns = mtime_ns
-                    payload = {
-                        "type": "change",
-                        "account": account_dir.name,
-                        "mtimeNs": int(mtime_ns),
-                        "ts": int(time.time() * 1000),
-                    }
-                    logger.info("[realtime] SSE change account=%s mtime_ns=%s", account_dir.name, int(mtime_ns))
-                    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                event = await sub.get(timeout=max(1.0, interval_ms / 1000.0))
+                if event is not None:
+                    logger.info(
+                        "[realtime] SSE change account=%s seq=%s buckets=%s",
+                        account_dir.name,
+                        event.get("seq"),
+                        ",".join(event.get("buckets") or []),
+                    )
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
 
                 now = time.time()
                 if now - last_heartbeat > 15:
                     last_heartbeat = now
                     yield ": ping\n\n"
-
-                await asyncio.sleep(interval_ms / 1000.0)
         finally:
+            # The last unsubscribe joins the producer thread: do it off the event loop (and without awaiting,
+            # since the generator may be closing because its task was cancelled).
+            threading.Thread(
+                target=DB_STORAGE_CHANGES.unsubscribe, args=(sub,), name="realtime-sse-unsubscribe", daemon=True
+            ).start()
             logger.info("[realtime] SSE stream closed account=%s", account_dir.name)
 
     headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
     return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
 
 
+def _note_message_row_updated(account_dir: Path, db_path: Path, table_name: str, updates: dict[str, Any]) -> None:
+    """Keep the shard directory current after an in-place UPDATE of a decrypted message row.
+
+    The write changes the shard file's size/mtime, which would otherwise make the next lookup rescan the
+    whole shard; an edited create_time widens the table's recorded time range.
+    """
+
+    ct = 0
+    for k, v in (updates or {}).items():
+        if str(k or "").strip().lower() == "create_time":
+            try:
+                ct = int(v or 0)
+            except Exception:
+                ct = 0
+    note_message_rows_added(account_dir, db_path, {table_name: (0, ct, ct)} if ct > 0 and table_name else {})
+
+
 def _resolve_decrypted_message_table(account_dir: Path, username: str) -> Optional[tuple[Path, str]]:
+    tables = conversation_message_tables(account_dir, username)
+    if tables:
+        return tables[0]
+
     db_paths = _iter_message_db_paths(account_dir)
     if not db_paths:
         return None
@@ -1010,6 +1016,45 @@ def _pick_message_db_for_new_table(account_dir: Path, username: str) -> Optional
     return other_paths[0] if other_paths else db_paths[0]
 
 
+def _create_decrypted_message_table(conn: sqlite3.Connection, table_name: str) -> None:
+    """Create an empty Msg_* table (schema + common indexes of WeChat's own tables); the caller commits."""
+
+    quoted_table = _quote_ident(table_name)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {quoted_table}(
+            local_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            server_id INTEGER,
+            local_type INTEGER,
+            sort_seq INTEGER,
+            real_sender_id INTEGER,
+            create_time INTEGER,
+            status INTEGER,
+            upload_status INTEGER,
+            download_status INTEGER,
+            server_seq INTEGER,
+            origin_source INTEGER,
+            source TEXT,
+            message_content TEXT,
+            compress_content TEXT,
+            packed_info_data BLOB,
+            WCDB_CT_message_content INTEGER DEFAULT NULL,
+            WCDB_CT_source INTEGER DEFAULT NULL
+        )
+        """
+    )
+
+    # Match the common indexes we observe on existing Msg_* tables for query performance.
+    idx_sender = _quote_ident(f"{table_name}_SENDERID")
+    idx_server = _quote_ident(f"{table_name}_SERVERID")
+    idx_sort = _quote_ident(f"{table_name}_SORTSEQ")
+    idx_type_seq = _quote_ident(f"{table_name}_TYPE_SEQ")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_sender} ON {quoted_table}(real_sender_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_server} ON {quoted_table}(server_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_sort} ON {quoted_table}(sort_seq)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_type_seq} ON {quoted_table}(local_type, sort_seq)")
+
+
 def _ensure_decrypted_message_table(account_dir: Path, username: str) -> tuple[Path, str]:
     """Ensure the decrypted sqlite has a Msg_<md5(username)> table for this conversation.
 
@@ -1036,48 +1081,15 @@ def _ensure_decrypted_message_table(account_dir: Path, username: str) -> tuple[P
 
     md5_hex = hashlib.md5(uname.encode("utf-8")).hexdigest()
     table_name = f"Msg_{md5_hex}"
-    quoted_table = _quote_ident(table_name)
 
     conn = sqlite3.connect(str(target_db))
     try:
-        conn.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {quoted_table}(
-                local_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                server_id INTEGER,
-                local_type INTEGER,
-                sort_seq INTEGER,
-                real_sender_id INTEGER,
-                create_time INTEGER,
-                status INTEGER,
-                upload_status INTEGER,
-                download_status INTEGER,
-                server_seq INTEGER,
-                origin_source INTEGER,
-                source TEXT,
-                message_content TEXT,
-                compress_content TEXT,
-                packed_info_data BLOB,
-                WCDB_CT_message_content INTEGER DEFAULT NULL,
-                WCDB_CT_source INTEGER DEFAULT NULL
-            )
-            """
-        )
-
-        # Match the common indexes we observe on existing Msg_* tables for query performance.
-        idx_sender = _quote_ident(f"{table_name}_SENDERID")
-        idx_server = _quote_ident(f"{table_name}_SERVERID")
-        idx_sort = _quote_ident(f"{table_name}_SORTSEQ")
-        idx_type_seq = _quote_ident(f"{table_name}_TYPE_SEQ")
-        conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_sender} ON {quoted_table}(real_sender_id)")
-        conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_server} ON {quoted_table}(server_id)")
-        conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_sort} ON {quoted_table}(sort_seq)")
-        conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_type_seq} ON {quoted_table}(local_type, sort_seq)")
-
+        _create_decrypted_message_table(conn, table_name)
         conn.commit()
     finally:
         conn.close()
 
+    note_message_rows_added(account_dir, target_db, {table_name: (0, 0, 0)})
     return target_db, table_name
 
 
@@ -1112,6 +1124,14 @@ def _resolve_decrypted_message_tables(
 
     remaining = {u for u in uniq if u}
     resolved: dict[str, tuple[Path, str]] = {}
+    directory = get_message_shard_directory(account_dir)
+    if directory is not None:
+        for u in uniq:
+            tables = directory.tables_for(account_dir, u)
+            if tables:
+                resolved[u] = tables[0]
+                remaining.discard(u)
+
     for db_path in db_paths:
         if not remaining:
             break
@@ -1514,6 +1534,7 @@ def _collect_realtime_rows_for_session(
             with rt_conn.lock:
                 raw_new_rows = _wcdb_exec_query(rt_conn.handle, kind="message", path=str(msg_db_path_real), sql=sql_new)
             wcdb_ms = (time.perf_counter() - wcdb_t0) * 1000.0
+            record_stage("wcdb", wcdb_ms)
             logger.info(
                 "%s wcdb_exec_query biz done account=%s username=%s mode=new_rows rows=%s ms=%.1f",
                 label,
@@ -1569,6 +1590,7 @@ def _collect_realtime_rows_for_session(
                         sql=sql_backfill,
                     )
                 backfill_ms = (time.perf_counter() - backfill_t0) * 1000.0
+                record_stage("wcdb", backfill_ms)
                 logger.info(
                     "%s wcdb_exec_query biz done account=%s username=%s mode=backfill rows=%s ms=%.1f",
                     label,
@@ -1631,6 +1653,7 @@ def _collect_realtime_rows_for_session(
         with rt_conn.lock:
             raw_rows = _wcdb_get_messages(rt_conn.handle, uname, limit=take, offset=offset)
         wcdb_ms = (time.perf_counter() - wcdb_t0) * 1000.0
+        record_stage("wcdb", wcdb_ms)
         log_fn(
             "%s wcdb_get_messages done account=%s username=%s rows=%s ms=%.1f",
             label,
@@ -1758,6 +1781,7 @@ def sync_chat_realtime_messages(
                     msg_db_path_real=msg_db_path_real,
                 )
                 sync_ms = (time.perf_counter() - sync_t0) * 1000.0
+                record_stage("sqlite", sync_ms)
                 name2id_synced = str(name2id_result.get("status") or "") in {"up_to_date", "refreshed"}
                 logger.info(
                     "[%s] Name2Id sync account=%s db=%s status=%s rows=%s ms=%.1f",
@@ -1832,10 +1856,17 @@ def sync_chat_realtime_messages(
                 # Insert older -> newer to keep sqlite btree locality similar to existing data.
                 values = [tuple(r.get(c) for c in insert_cols) for r in reversed(new_rows)]
                 insert_t0 = time.perf_counter()
+                before_insert = msg_conn.total_changes
                 msg_conn.executemany(insert_sql, values)
                 msg_conn.commit()
                 insert_ms = (time.perf_counter() - insert_t0) * 1000.0
+                record_stage("sqlite", insert_ms)
                 inserted = len(new_rows)
+                note_message_rows_added(
+                    account_dir,
+                    msg_db_path,
+                    {table_name: _realtime_rows_added(new_rows, msg_conn.total_changes - before_insert)},
+                )
                 logger.info(
                     "[%s] sqlite insert done account=%s username=%s inserted=%s ms=%.1f",
                     trace_id,
@@ -1869,7 +1900,13 @@ def sync_chat_realtime_messages(
                     )
                     msg_conn.commit()
                     update_ms = (time.perf_counter() - update_t0) * 1000.0
+                    record_stage("sqlite", update_ms)
                     backfilled = int(msg_conn.total_changes - before_changes)
+                    if backfilled:
+                        note_message_rows_added(account_dir, msg_db_path, {})
+                        invalidate_rendered_rows(
+                            account_dir.name, msg_db_path.stem, table_name, [lid for _, lid in update_values]
+                        )
                     logger.info(
                         "[%s] sqlite backfill done account=%s username=%s rows=%s ms=%.1f",
                         trace_id,
@@ -2001,27 +2038,336 @@ def sync_chat_realtime_messages(
             msg_conn.close()
 
 
-def _sync_chat_realtime_messages_for_table(
+def _is_realtime_sync_batched() -> bool:
+    v = str(os.environ.get("WECHAT_TOOL_REALTIME_SYNC_BATCHED", "1") or "").strip().lower()
+    return v not in {"", "0", "false", "off", "no"}
+
+
+_REALTIME_SYNC_WATERMARK_TABLE = "realtime_sync_watermark"
+
+
+def _ensure_realtime_sync_watermark_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_REALTIME_SYNC_WATERMARK_TABLE} (
+            username TEXT PRIMARY KEY,
+            last_timestamp INTEGER NOT NULL DEFAULT 0,
+            synced_at INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+
+def _load_realtime_sync_watermarks(conn: sqlite3.Connection, usernames: list[str]) -> dict[str, int]:
+    """Newest message create_time WCDB returned at the last successful sync of each conversation.
+
+    Complements session_last_message.create_time, which only moves when a sync inserts rows. It never takes the
+    raw session timestamp, so a session whose timestamp moved without a new message (pin, draft, unread reset)
+    is re-checked on each pass instead of hiding a message the previous pass missed.
+    """
+
+    uniq = list(dict.fromkeys([str(u or "").strip() for u in usernames if str(u or "").strip()]))
+    out: dict[str, int] = {}
+    for i in range(0, len(uniq), 900):
+        chunk = uniq[i : i + 900]
+        placeholders = ",".join(["?"] * len(chunk))
+        try:
+            rows = conn.execute(
+                f"SELECT username, last_timestamp FROM {_REALTIME_SYNC_WATERMARK_TABLE} WHERE username IN ({placeholders})",
+                chunk,
+            ).fetchall()
+        except Exception:
+            continue
+        for r in rows:
+            try:
+                out[str(r[0] or "").strip()] = int(r[1] or 0)
+            except Exception:
+                continue
+    return out
+
+
+def _store_realtime_sync_watermarks(account_dir: Path, watermarks: dict[str, int]) -> None:
+    if not watermarks:
+        return
+    now = int(time.time())
+    sconn = sqlite3.connect(str(account_dir / "session.db"))
+    try:
+        _ensure_realtime_sync_watermark_table(sconn)
+        sconn.executemany(
+            f"""
+            INSERT INTO {_REALTIME_SYNC_WATERMARK_TABLE}(username, last_timestamp, synced_at) VALUES (?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp),
+                synced_at = excluded.synced_at
+            """,
+            [(u, int(ts or 0), now) for u, ts in watermarks.items() if u],
+        )
+        sconn.commit()
+    finally:
+        sconn.close()
+
+
+_REALTIME_FETCH_COLS = (
+    "local_id",
+    "server_id",
+    "local_type",
+    "sort_seq",
+    "real_sender_id",
+    "create_time",
+    "message_content",
+    "compress_content",
+    "packed_info_data",
+)
+# Subqueries per exec_query call (SQLite caps compound SELECTs at 500 terms).
+_REALTIME_BULK_FETCH_CHUNK = 100
+
+
+def _fetch_realtime_rows_bulk(
+    *,
+    rt_conn: Any,
+    msg_db_path_real: Path,
+    plans: list[dict[str, Any]],
+    backfill_limit: int,
+) -> dict[str, dict[str, Any]]:
+    """Fetch new (and backfill) rows of many tables of one live message DB with a few exec_query calls.
+
+    Each plan is `{"table_name", "max_local_id", "max_scan"}`; the result per table has the same shape as
+    `_collect_realtime_rows_for_session` (new_rows newest first). Raises on any WCDB error so callers can fall
+    back to per-session fetching.
+    """
+
+    select_sql = ", ".join([f"m.{_quote_ident(c)}" for c in _REALTIME_FETCH_COLS])
+    parts: list[str] = []
+    for plan in plans:
+        table_name = str(plan["table_name"])
+        max_local_id = int(plan["max_local_id"])
+        head = (
+            f"SELECT {_sql_literal(table_name)} AS _tbl, {{part}} AS _part, {select_sql}, "
+            f"COALESCE(n.user_name, '') AS sender_username "
+            f"FROM {_quote_ident(table_name)} AS m LEFT JOIN Name2Id AS n ON n.rowid = m.real_sender_id"
+        )
+        parts.append(
+            "SELECT * FROM ("
+            + head.format(part=0)
+            + f" WHERE m.local_id > {max_local_id} ORDER BY m.local_id DESC LIMIT {int(plan['max_scan'])})"
+        )
+        if int(backfill_limit) > 0 and max_local_id > 0:
+            parts.append(
+                "SELECT * FROM ("
+                + head.format(part=1)
+                + f" WHERE m.local_id <= {max_local_id} ORDER BY m.local_id DESC LIMIT {int(backfill_limit)})"
+            )
+
+    out: dict[str, dict[str, Any]] = {
+        str(p["table_name"]): {"fetchMode": "bulk_exec_query", "scanned": 0, "new_rows": [], "backfill_rows": []}
+        for p in plans
+    }
+    for i in range(0, len(parts), _REALTIME_BULK_FETCH_CHUNK):
+        sql = " UNION ALL ".join(parts[i : i + _REALTIME_BULK_FETCH_CHUNK])
+        wcdb_t0 = time.perf_counter()
+        with rt_conn.lock:
+            raw_rows = _wcdb_exec_query(rt_conn.handle, kind="message", path=str(msg_db_path_real), sql=sql)
+        record_stage("wcdb", (time.perf_counter() - wcdb_t0) * 1000.0)
+        for item in raw_rows or []:
+            if not isinstance(item, dict):
+                continue
+            entry = out.get(str(_pick_case_insensitive_value(item, "_tbl") or ""))
+            if entry is None:
+                continue
+            entry["scanned"] += 1
+            norm = _normalize_realtime_message_item(item)
+            if int(norm.get("local_id") or 0) <= 0:
+                continue
+            part = int(_pick_case_insensitive_value(item, "_part") or 0)
+            entry["backfill_rows" if part else "new_rows"].append(norm)
+
+    # exec_query does not promise to keep UNION ALL term order; restore newest-first per table.
+    for entry in out.values():
+        entry["new_rows"].sort(key=lambda r: int(r.get("local_id") or 0), reverse=True)
+    return out
+
+
+def _list_live_message_tables(*, account_dir: Path, rt_conn: Any) -> Optional[dict[str, set[str]]]:
+    """Live message DB stem -> lower-cased Msg_ table names, read with one exec_query per live shard.
+
+    WCDB's get_messages merges a conversation across every live shard, while `_fetch_realtime_rows_bulk` reads
+    a single one; batched sync uses this map to spot conversations split across shards. Returns None when the
+    live shards can't be listed.
+    """
+
+    try:
+        live_dir = _resolve_db_storage_message_paths(account_dir, "message")[0].parent
+        live_paths = sorted(
+            p for p in live_dir.glob("*.db") if re.match(r"^(biz_)?message(_\d+)?\.db$", p.name.lower())
+        )
+        out: dict[str, set[str]] = {}
+        for p in live_paths:
+            with rt_conn.lock:
+                rows = _wcdb_exec_query(
+                    rt_conn.handle,
+                    kind="message",
+                    path=str(p),
+                    sql="SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'Msg_%'",
+                )
+            out[p.stem] = {
+                str(_pick_case_insensitive_value(r, "name") or "").lower() for r in (rows or []) if isinstance(r, dict)
+            }
+        return out
+    except Exception:
+        logger.warning("[realtime] list live message tables failed account=%s", account_dir.name, exc_info=True)
+        return None
+
+
+def _realtime_rows_added(rows: list[dict[str, Any]], count: int) -> tuple[int, int, int]:
+    """(count, min create_time, max create_time) of rows just written, for the message shard directory."""
+
+    cts = [int(r.get("create_time") or 0) for r in rows]
+    cts = [ct for ct in cts if ct > 0]
+    return int(count), (min(cts) if cts else 0), (max(cts) if cts else 0)
+
+
+def _summarize_realtime_newest_row(username: str, newest: Optional[dict[str, Any]]) -> dict[str, Any]:
+    if not newest:
+        return {"create_time": 0, "local_id": 0, "local_type": 0, "sort_seq": 0, "sender": "", "sub_type": 0, "preview": ""}
+
+    local_type = int(newest.get("local_type") or 0)
+    sender = str(newest.get("sender_username") or "").strip()
+    raw_text = _decode_message_content(newest.get("compress_content"), newest.get("message_content")).strip()
+    preview = _build_latest_message_preview(
+        username=username,
+        local_type=local_type,
+        raw_text=raw_text,
+        is_group=bool(username.endswith("@chatroom")),
+        sender_username=sender,
+    )
+    sub_type = 0
+    if local_type == 49 and raw_text:
+        try:
+            sub_type = int(str(_extract_xml_tag_text(raw_text, "type") or "0").strip() or "0")
+        except Exception:
+            sub_type = 0
+    return {
+        "create_time": int(newest.get("create_time") or 0),
+        "local_id": int(newest.get("local_id") or 0),
+        "local_type": local_type,
+        "sort_seq": int(newest.get("sort_seq") or 0),
+        "sender": sender,
+        "sub_type": sub_type,
+        "preview": preview or "",
+    }
+
+
+def _apply_realtime_session_updates(account_dir: Path, updates: list[dict[str, Any]]) -> None:
+    """Bump SessionTable + session_last_message for conversations that received new messages (one transaction)."""
+
+    if not updates:
+        return
+    built_at = int(time.time())
+    sconn = sqlite3.connect(str(account_dir / "session.db"))
+    try:
+        _ensure_session_last_message_table(sconn)
+        sconn.executemany(
+            "INSERT OR IGNORE INTO SessionTable(username) VALUES (?)", [(u["username"],) for u in updates]
+        )
+        sconn.executemany(
+            """
+            UPDATE SessionTable
+            SET
+                last_timestamp = CASE WHEN COALESCE(last_timestamp, 0) < ? THEN ? ELSE last_timestamp END,
+                sort_timestamp = CASE WHEN COALESCE(sort_timestamp, 0) < ? THEN ? ELSE sort_timestamp END,
+                last_msg_locald_id = ?,
+                last_msg_type = ?,
+                last_msg_sub_type = ?,
+                last_msg_sender = ?,
+                summary = ?
+            WHERE username = ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM session_last_message AS s WHERE s.username = SessionTable.username AND s.create_time > ?
+                )
+            """,
+            [
+                (
+                    u["create_time"],
+                    u["create_time"],
+                    u["create_time"],
+                    u["create_time"],
+                    u["local_id"],
+                    u["local_type"],
+                    u["sub_type"],
+                    u["sender"],
+                    u["preview"],
+                    u["username"],
+                    u["create_time"],
+                )
+                for u in updates
+            ],
+        )
+
+        # A conversation synced into several shards in one pass must not end up with an older shard's last message.
+        sconn.executemany(
+            """
+            INSERT INTO session_last_message (
+                username, sort_seq, local_id, create_time, local_type, sender_username,
+                preview, db_stem, table_name, built_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                sort_seq = excluded.sort_seq,
+                local_id = excluded.local_id,
+                create_time = excluded.create_time,
+                local_type = excluded.local_type,
+                sender_username = excluded.sender_username,
+                preview = excluded.preview,
+                db_stem = excluded.db_stem,
+                table_name = excluded.table_name,
+                built_at = excluded.built_at
+            WHERE excluded.create_time >= session_last_message.create_time
+            """,
+            [
+                (
+                    u["username"],
+                    u["sort_seq"],
+                    u["local_id"],
+                    u["create_time"],
+                    u["local_type"],
+                    u["sender"],
+                    u["preview"],
+                    u["db_stem"],
+                    u["table_name"],
+                    built_at,
+                )
+                for u in updates
+            ],
+        )
+        sconn.commit()
+    finally:
+        sconn.close()
+
+
+def _sync_chat_realtime_messages_for_db(
     *,
     account_dir: Path,
     rt_conn: Any,
-    username: str,
     msg_db_path: Path,
-    table_name: str,
-    max_scan: int,
+    sessions: list[tuple[str, str, int]],
     backfill_limit: int = 200,
-) -> dict[str, Any]:
-    if max_scan < 50:
-        max_scan = 50
-    if max_scan > 5000:
-        max_scan = 5000
+    bulk_fetch: bool = True,
+    per_session_fetch: Optional[set[str]] = None,
+) -> dict[str, dict[str, Any]]:
+    """Incrementally sync several conversations that live in the same decrypted message DB.
+
+    `sessions` holds `(username, table_name, max_scan)`. Name2Id is synced once, new rows are fetched with
+    `_fetch_realtime_rows_bulk` (per-session WCDB calls when `bulk_fetch` is off, the bulk query fails, or the
+    username is in `per_session_fetch`), and all inserts/backfills are written in a single transaction. Returns a
+    result dict per username; a session that could not be synced carries an `error` key instead of failing the
+    whole DB.
+    """
+
     if backfill_limit < 0:
         backfill_limit = 0
     if backfill_limit > 5000:
         backfill_limit = 5000
-    if backfill_limit > max_scan:
-        backfill_limit = max_scan
 
+    results: dict[str, dict[str, Any]] = {}
     msg_conn = sqlite3.connect(str(msg_db_path))
     msg_conn.row_factory = sqlite3.Row
     try:
@@ -2049,211 +2395,205 @@ def _sync_chat_realtime_messages_for_table(
                 str(e),
             )
 
-        quoted_table = _quote_ident(table_name)
-        row = msg_conn.execute(f"SELECT MAX(local_id) AS mx FROM {quoted_table}").fetchone()
-        try:
-            max_local_id = int((row["mx"] if row is not None else 0) or 0)
-        except Exception:
-            max_local_id = 0
-
-        cols = msg_conn.execute(f"PRAGMA table_info({quoted_table})").fetchall()
-        available_cols = {str(c[1] or "") for c in cols}
-        base_cols = [
-            "local_id",
-            "server_id",
-            "local_type",
-            "sort_seq",
-            "real_sender_id",
-            "create_time",
-            "message_content",
-            "compress_content",
-            "packed_info_data",
-        ]
-        insert_cols = [c for c in base_cols if c in available_cols]
-        if "local_id" not in insert_cols:
-            raise HTTPException(status_code=500, detail="Invalid message table schema (missing local_id).")
-
-        placeholders = ",".join(["?"] * len(insert_cols))
-        insert_sql = f"INSERT OR IGNORE INTO {quoted_table} ({','.join(insert_cols)}) VALUES ({placeholders})"
-        fetch_result = _collect_realtime_rows_for_session(
-            trace_id=None,
-            account_name=account_dir.name,
-            rt_conn=rt_conn,
-            username=username,
-            msg_db_path_real=msg_db_path_real,
-            table_name=table_name,
-            max_local_id=max_local_id,
-            max_scan=int(max_scan),
-            backfill_limit=int(backfill_limit),
-        )
-        scanned = int(fetch_result.get("scanned") or 0)
-        new_rows = list(fetch_result.get("new_rows") or [])
-        backfill_rows = list(fetch_result.get("backfill_rows") or [])
-
-        inserted = 0
-        backfilled = 0
-        if new_rows:
-            if not name2id_synced:
-                _best_effort_upsert_output_name2id_rows(
-                    msg_conn,
-                    account_name=account_dir.name,
-                    rows=new_rows,
-                )
+        plans: list[dict[str, Any]] = []
+        added_by_table: dict[str, tuple[int, int, int]] = {}
+        for username, table_name, max_scan in sessions:
+            max_scan = max(50, min(5000, int(max_scan)))
+            existing = msg_conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND lower(name) = lower(?)", (table_name,)
+            ).fetchone()
+            if existing is not None:
+                table_name = str(existing[0])
+            else:
+                # The conversation continues in a shard where the decrypted copy has no table yet.
+                _create_decrypted_message_table(msg_conn, table_name)
+                msg_conn.commit()
+                added_by_table[table_name] = (0, 0, 0)
+            quoted_table = _quote_ident(table_name)
+            row = msg_conn.execute(f"SELECT MAX(local_id) AS mx FROM {quoted_table}").fetchone()
+            try:
+                max_local_id = int((row["mx"] if row is not None else 0) or 0)
+            except Exception:
+                max_local_id = 0
 
-            values = [tuple(r.get(c) for c in insert_cols) for r in reversed(new_rows)]
-            insert_t0 = time.perf_counter()
-            msg_conn.executemany(insert_sql, values)
-            msg_conn.commit()
-            insert_ms = (time.perf_counter() - insert_t0) * 1000.0
-            inserted = len(new_rows)
-            logger.info(
-                "[realtime] sqlite insert done account=%s username=%s inserted=%s ms=%.1f",
-                account_dir.name,
-                username,
-                int(inserted),
-                insert_ms,
+            cols = msg_conn.execute(f"PRAGMA table_info({quoted_table})").fetchall()
+            available_cols = {str(c[1] or "") for c in cols}
+            insert_cols = [c for c in _REALTIME_FETCH_COLS if c in available_cols]
+            if "local_id" not in insert_cols:
+                results[username] = {"username": username, "error": "Invalid message table schema (missing local_id)."}
+                continue
+            plans.append(
+                {
+                    "username": username,
+                    "table_name": table_name,
+                    "max_local_id": max_local_id,
+                    "max_scan": max_scan,
+                    "insert_cols": insert_cols,
+                }
             )
-            if insert_ms > 1000:
-                logger.warning(
-                    "[realtime] sqlite insert slow account=%s username=%s ms=%.1f",
-                    account_dir.name,
-                    username,
-                    insert_ms,
-                )
 
-        if ("packed_info_data" in insert_cols) and backfill_rows:
-            update_values = []
-            for r in backfill_rows:
-                pdata = r.get("packed_info_data")
-                if not pdata:
-                    continue
-                update_values.append((pdata, int(r.get("local_id") or 0)))
-            if update_values:
-                before_changes = msg_conn.total_changes
-                update_t0 = time.perf_counter()
-                msg_conn.executemany(
-                    f"UPDATE {quoted_table} SET packed_info_data = ? WHERE local_id = ? AND (packed_info_data IS NULL OR length(packed_info_data) = 0)",
-                    update_values,
+        fetched: dict[str, dict[str, Any]] = {}
+        bulk_plans = [p for p in plans if p["username"] not in (per_session_fetch or set())]
+        if bulk_fetch and bulk_plans:
+            try:
+                fetched = _fetch_realtime_rows_bulk(
+                    rt_conn=rt_conn,
+                    msg_db_path_real=msg_db_path_real,
+                    plans=bulk_plans,
+                    backfill_limit=min(int(backfill_limit), min(p["max_scan"] for p in bulk_plans)),
                 )
-                msg_conn.commit()
-                update_ms = (time.perf_counter() - update_t0) * 1000.0
-                backfilled = int(msg_conn.total_changes - before_changes)
-                logger.info(
-                    "[realtime] sqlite backfill done account=%s username=%s rows=%s ms=%.1f",
+            except Exception as e:
+                logger.warning(
+                    "[realtime] bulk fetch failed account=%s db=%s tables=%s err=%s fallback=per_session",
                     account_dir.name,
-                    username,
-                    int(backfilled),
-                    update_ms,
+                    msg_db_path.stem,
+                    len(bulk_plans),
+                    str(e),
                 )
-                if update_ms > 1000:
-                    logger.warning(
-                        "[realtime] sqlite backfill slow account=%s username=%s ms=%.1f",
-                        account_dir.name,
-                        username,
-                        update_ms,
-                    )
+                fetched = {}
+        for plan in plans:
+            if plan["table_name"] in fetched:
+                continue
+            fetched[plan["table_name"]] = _collect_realtime_rows_for_session(
+                trace_id=None,
+                account_name=account_dir.name,
+                rt_conn=rt_conn,
+                username=plan["username"],
+                msg_db_path_real=msg_db_path_real,
+                table_name=plan["table_name"],
+                max_local_id=plan["max_local_id"],
+                max_scan=plan["max_scan"],
+                backfill_limit=min(int(backfill_limit), plan["max_scan"]),
+            )
 
-        newest = new_rows[0] if new_rows else None
-        preview = ""
-        newest_ts = 0
-        newest_local_id = 0
-        newest_type = 0
-        newest_sort_seq = 0
-        newest_sender = ""
-        newest_sub_type = 0
-
-        if newest:
-            newest_ts = int(newest.get("create_time") or 0)
-            newest_local_id = int(newest.get("local_id") or 0)
-            newest_type = int(newest.get("local_type") or 0)
-            newest_sort_seq = int(newest.get("sort_seq") or 0)
-            newest_sender = str(newest.get("sender_username") or "").strip()
-
-            raw_text = _decode_message_content(newest.get("compress_content"), newest.get("message_content")).strip()
-            is_group = bool(username.endswith("@chatroom"))
-            preview = _build_latest_message_preview(
-                username=username,
-                local_type=newest_type,
-                raw_text=raw_text,
-                is_group=is_group,
-                sender_username=newest_sender,
+        all_new_rows = [r for p in plans for r in (fetched[p["table_name"]].get("new_rows") or [])]
+        if all_new_rows and not name2id_synced:
+            _best_effort_upsert_output_name2id_rows(
+                msg_conn,
+                account_name=account_dir.name,
+                rows=all_new_rows,
             )
 
-            if newest_type == 49 and raw_text:
-                try:
-                    newest_sub_type = int(str(_extract_xml_tag_text(raw_text, "type") or "0").strip() or "0")
-                except Exception:
-                    newest_sub_type = 0
+        write_t0 = time.perf_counter()
+        inserted_total = 0
+        backfilled_total = 0
+        backfilled_by_table: dict[str, list[int]] = {}
+        session_updates: list[dict[str, Any]] = []
+        for plan in plans:
+            username = plan["username"]
+            table_name = plan["table_name"]
+            quoted_table = _quote_ident(table_name)
+            insert_cols = plan["insert_cols"]
+            fetch_result = fetched[table_name]
+            new_rows = list(fetch_result.get("new_rows") or [])
+            backfill_rows = list(fetch_result.get("backfill_rows") or [])
 
-        if inserted and newest_ts:
-            session_db_path = account_dir / "session.db"
-            sconn = sqlite3.connect(str(session_db_path))
-            try:
-                sconn.execute("INSERT OR IGNORE INTO SessionTable(username) VALUES (?)", (username,))
-                sconn.execute(
-                    """
-                    UPDATE SessionTable
-                    SET
-                        last_timestamp = CASE WHEN COALESCE(last_timestamp, 0) < ? THEN ? ELSE last_timestamp END,
-                        sort_timestamp = CASE WHEN COALESCE(sort_timestamp, 0) < ? THEN ? ELSE sort_timestamp END,
-                        last_msg_locald_id = ?,
-                        last_msg_type = ?,
-                        last_msg_sub_type = ?,
-                        last_msg_sender = ?,
-                        summary = ?
-                    WHERE username = ?
-                    """,
-                    (
-                        newest_ts,
-                        newest_ts,
-                        newest_ts,
-                        newest_ts,
-                        newest_local_id,
-                        newest_type,
-                        newest_sub_type,
-                        newest_sender,
-                        preview or "",
-                        username,
-                    ),
+            inserted = 0
+            if new_rows:
+                placeholders = ",".join(["?"] * len(insert_cols))
+                before_insert = msg_conn.total_changes
+                msg_conn.executemany(
+                    f"INSERT OR IGNORE INTO {quoted_table} ({','.join(insert_cols)}) VALUES ({placeholders})",
+                    [tuple(r.get(c) for c in insert_cols) for r in reversed(new_rows)],
                 )
+                inserted = len(new_rows)
+                inserted_total += inserted
+                added_by_table[table_name] = _realtime_rows_added(new_rows, msg_conn.total_changes - before_insert)
 
-                _ensure_session_last_message_table(sconn)
-                sconn.execute(
-                    """
-                    INSERT OR REPLACE INTO session_last_message (
-                        username, sort_seq, local_id, create_time, local_type, sender_username,
-                        preview, db_stem, table_name, built_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        username,
-                        newest_sort_seq,
-                        newest_local_id,
-                        newest_ts,
-                        newest_type,
-                        newest_sender,
-                        preview or "",
-                        str(msg_db_path.stem),
-                        str(table_name),
-                        int(time.time()),
-                    ),
+            backfilled = 0
+            if ("packed_info_data" in insert_cols) and backfill_rows:
+                update_values = [
+                    (r.get("packed_info_data"), int(r.get("local_id") or 0))
+                    for r in backfill_rows
+                    if r.get("packed_info_data")
+                ]
+                if update_values:
+                    before_changes = msg_conn.total_changes
+                    msg_conn.executemany(
+                        f"UPDATE {quoted_table} SET packed_info_data = ? WHERE local_id = ? AND (packed_info_data IS NULL OR length(packed_info_data) = 0)",
+                        update_values,
+                    )
+                    backfilled = int(msg_conn.total_changes - before_changes)
+                    backfilled_total += backfilled
+                    if backfilled:
+                        backfilled_by_table[table_name] = [lid for _, lid in update_values]
+
+            newest = _summarize_realtime_newest_row(username, new_rows[0] if new_rows else None)
+            if inserted and newest["create_time"]:
+                session_updates.append(
+                    {**newest, "username": username, "db_stem": str(msg_db_path.stem), "table_name": str(table_name)}
                 )
-                sconn.commit()
-            finally:
-                sconn.close()
+            results[username] = {
+                "username": username,
+                "scanned": int(fetch_result.get("scanned") or 0),
+                "fetchMode": str(fetch_result.get("fetchMode") or ""),
+                "maxLocalIdBefore": int(plan["max_local_id"]),
+                "inserted": int(inserted),
+                "backfilled": int(backfilled),
+                "newestCreateTime": max(
+                    [int(r.get("create_time") or 0) for r in new_rows + backfill_rows] or [0]
+                ),
+                "preview": newest["preview"],
+            }
+        msg_conn.commit()
+        write_ms = (time.perf_counter() - write_t0) * 1000.0
+        record_stage("sqlite", write_ms)
+        if inserted_total:
+            logger.info(
+                "[realtime] sqlite insert done account=%s db=%s sessions=%s inserted=%s ms=%.1f",
+                account_dir.name,
+                msg_db_path.stem,
+                len(plans),
+                int(inserted_total),
+                write_ms,
+            )
+        if write_ms > 1000:
+            logger.warning(
+                "[realtime] sqlite write slow account=%s db=%s sessions=%s ms=%.1f",
+                account_dir.name,
+                msg_db_path.stem,
+                len(plans),
+                write_ms,
+            )
 
-        return {
-            "username": username,
-            "scanned": int(scanned),
-            "maxLocalIdBefore": int(max_local_id),
-            "inserted": int(inserted),
-            "backfilled": int(backfilled),
-            "preview": preview or "",
-        }
+        if added_by_table or backfilled_total:
+            # Also restamps the shard after backfill-only writes so it isn't rescanned.
+            note_message_rows_added(account_dir, msg_db_path, added_by_table)
+        if inserted_total:
+            refresh_chat_search_index_shards(account_dir, [msg_db_path.stem])
+        for table_name, local_ids in backfilled_by_table.items():
+            invalidate_rendered_rows(account_dir.name, msg_db_path.stem, table_name, local_ids)
+        _apply_realtime_session_updates(account_dir, session_updates)
+        return results
     finally:
         msg_conn.close()
 
 
+def _sync_chat_realtime_messages_for_table(
+    *,
+    account_dir: Path,
+    rt_conn: Any,
+    username: str,
+    msg_db_path: Path,
+    table_name: str,
+    max_scan: int,
+    backfill_limit: int = 200,
+) -> dict[str, Any]:
+    if backfill_limit > max_scan:
+        backfill_limit = max_scan
+    result = _sync_chat_realtime_messages_for_db(
+        account_dir=account_dir,
+        rt_conn=rt_conn,
+        msg_db_path=msg_db_path,
+        sessions=[(username, table_name, int(max_scan))],
+        backfill_limit=int(backfill_limit),
+        bulk_fetch=False,
+    )[username]
+    if result.get("error"):
+        raise HTTPException(status_code=500, detail=str(result["error"]))
+    return result
+
+
 @router.post("/api/chat/realtime/sync_all", summary="实时消息同步到解密库（全会话增量）")
 def sync_chat_realtime_messages_all(
     request: Request,
@@ -2270,6 +2610,10 @@ def sync_chat_realtime_messages_all(
     全量会话同步（增量）：遍历会话列表，对每个会话调用与 /realtime/sync 相同的“遇到已同步 local_id 即停止”逻辑。
 
     说明：这是增量同步，不会每次全表扫描；priority_username 会优先同步并可设置更大的 priority_max_scan。
+    会话 last_timestamp 未超过水位（session_last_message / realtime_sync_watermark）的会话直接跳过
+    （sort_timestamp 会因置顶/草稿变化，只用于排序）；
+    默认按解密消息库分批：每个库一次 Name2Id 同步、批量拉取新消息、单事务写入
+    （WECHAT_TOOL_REALTIME_SYNC_BATCHED=0 可退回逐会话同步）。
     """
     account_dir = _resolve_account_dir(account)
     trace_id = f"rt-syncall-{int(time.time() * 1000)}-{threading.get_ident()}"
@@ -2318,6 +2662,7 @@ def sync_chat_realtime_messages_all(
             with rt_conn.lock:
                 raw_sessions = _wcdb_get_sessions(rt_conn.handle)
             wcdb_ms = (time.perf_counter() - wcdb_t0) * 1000.0
+            record_stage("wcdb", wcdb_ms)
             logger.info(
                 "[%s] wcdb_get_sessions done account=%s sessions=%s ms=%.1f",
                 trace_id,
@@ -2330,6 +2675,7 @@ def sync_chat_realtime_messages_all(
 
         sessions: list[tuple[int, str]] = []
         realtime_rows_by_user: dict[str, dict[str, Any]] = {}
+        last_ts_by_user: dict[str, int] = {}
         for item in raw_sessions:
             if not isinstance(item, dict):
                 continue
@@ -2357,6 +2703,12 @@ def sync_chat_realtime_messages_all(
                 if ts:
                     break
             sessions.append((ts, uname))
+            # sort_timestamp also moves on pin/draft; only last_timestamp tracks new messages.
+            try:
+                last_ts = int(item.get("last_timestamp", item.get("lastTimestamp", 0)) or 0)
+            except Exception:
+                last_ts = 0
+            last_ts_by_user[uname] = max(last_ts, int(last_ts_by_user.get(uname) or 0))
 
             # Keep a normalized SessionTable row for upserting into decrypted session.db.
             norm_row = {
@@ -2463,6 +2815,9 @@ def sync_chat_realtime_messages_all(
                             pass
 
                     decrypted_ts_by_user = _load_session_last_message_times(sconn, all_usernames)
+                    for u, wm in _load_realtime_sync_watermarks(sconn, all_usernames).items():
+                        if wm > int(decrypted_ts_by_user.get(u) or 0):
+                            decrypted_ts_by_user[u] = wm
                 finally:
                     try:
                         sconn.close()
@@ -2473,11 +2828,12 @@ def sync_chat_realtime_messages_all(
 
         sync_usernames: list[str] = []
         skipped_up_to_date = 0
-        for ts, u in sessions:
+        for sort_ts, u in sessions:
             if not u:
                 continue
+            ts = int(last_ts_by_user.get(u) or 0) or int(sort_ts or 0)
             local_ts = int(decrypted_ts_by_user.get(u) or 0)
-            if ts and local_ts and local_ts >= int(ts):
+            if ts and local_ts and local_ts >= ts:
                 skipped_up_to_date += 1
                 continue
             sync_usernames.append(u)
@@ -2508,7 +2864,43 @@ def sync_chat_realtime_messages_all(
         skipped_missing_table = 0
         updated_sessions = 0
         errors: list[str] = []
+        watermarks: dict[str, int] = {}
+        # Per-username results merged across the decrypted shards it was synced into.
+        merged: dict[str, dict[str, Any]] = {}
+        failed: set[str] = set()
+        batched = _is_realtime_sync_batched()
+
+        def _record(uname: str, result: dict[str, Any]) -> None:
+            nonlocal synced, scanned_total, inserted_total, updated_sessions
+            synced += 1
+            scanned_total += int(result.get("scanned") or 0)
+            ins = int(result.get("inserted") or 0)
+            inserted_total += ins
+            # Only what WCDB actually returned moves the watermark: the raw session timestamp may belong to a
+            # message this pass never saw.
+            newest = int(result.get("newestCreateTime") or 0)
+            if newest > 0 and uname not in failed:
+                watermarks[uname] = newest
+            if ins:
+                updated_sessions += 1
+                logger.info(
+                    "[%s] synced session account=%s username=%s inserted=%s scanned=%s",
+                    trace_id,
+                    account_dir.name,
+                    uname,
+                    ins,
+                    int(result.get("scanned") or 0),
+                )
 
+        # Batched mode: one Name2Id sync, one bulk fetch and one write transaction per decrypted message DB.
+        # Groups keep the need_sync order, so the priority session's DB is synced first.
+        # A conversation split across live shards is synced into each same-named decrypted shard, since the bulk
+        # fetch reads one live DB at a time. If a live shard has no decrypted counterpart (created after the
+        # decryption), that conversation keeps the per-session get_messages fetch, which merges every live shard.
+        live_tables = _list_live_message_tables(account_dir=account_dir, rt_conn=rt_conn) if batched else None
+        per_session_fetch: set[str] = set()
+        groups: list[tuple[Path, list[tuple[str, str, int]]]] = []
+        group_index: dict[Path, int] = {}
         for uname in sync_usernames:
             resolved = table_map.get(uname)
             if not resolved:
@@ -2516,52 +2908,97 @@ def sync_chat_realtime_messages_all(
                 continue
             msg_db_path, table_name = resolved
             cur_scan = priority_max_scan if (priority and uname == priority) else max_scan
+            item = (uname, table_name, int(cur_scan))
+            targets = [msg_db_path]
+            if live_tables is not None:
+                live_stems = [stem for stem, names in live_tables.items() if str(table_name).lower() in names]
+                mirrored = [account_dir / f"{stem}.db" for stem in live_stems if (account_dir / f"{stem}.db").exists()]
+                if mirrored and len(mirrored) == len(live_stems):
+                    targets = mirrored
+                else:
+                    per_session_fetch.add(uname)
+            for target in targets:
+                if batched and target in group_index:
+                    groups[group_index[target]][1].append(item)
+                    continue
+                group_index[target] = len(groups)
+                groups.append((target, [item]))
 
+        for msg_db_path, items in groups:
             try:
-                with _realtime_sync_lock(account_dir.name, uname):
-                    result = _sync_chat_realtime_messages_for_table(
-                        account_dir=account_dir,
-                        rt_conn=rt_conn,
-                        username=uname,
-                        msg_db_path=msg_db_path,
-                        table_name=table_name,
-                        max_scan=int(cur_scan),
-                        backfill_limit=int(backfill_limit),
-                    )
-                synced += 1
-                scanned_total += int(result.get("scanned") or 0)
-                ins = int(result.get("inserted") or 0)
-                inserted_total += ins
-                if ins:
-                    updated_sessions += 1
-                    logger.info(
-                        "[%s] synced session account=%s username=%s inserted=%s scanned=%s",
-                        trace_id,
-                        account_dir.name,
-                        uname,
-                        ins,
-                        int(result.get("scanned") or 0),
+                with contextlib.ExitStack() as stack:
+                    for uname in sorted(u for u, _, _ in items):
+                        stack.enter_context(_realtime_sync_lock(account_dir.name, uname))
+                    if batched:
+                        results = _sync_chat_realtime_messages_for_db(
+                            account_dir=account_dir,
+                            rt_conn=rt_conn,
+                            msg_db_path=msg_db_path,
+                            sessions=items,
+                            backfill_limit=int(backfill_limit),
+                            per_session_fetch=per_session_fetch,
+                        )
+                    else:
+                        uname, table_name, cur_scan = items[0]
+                        results = {
+                            uname: _sync_chat_realtime_messages_for_table(
+                                account_dir=account_dir,
+                                rt_conn=rt_conn,
+                                username=uname,
+                                msg_db_path=msg_db_path,
+                                table_name=table_name,
+                                max_scan=int(cur_scan),
+                                backfill_limit=int(backfill_limit),
+                            )
+                        }
+                for uname, result in results.items():
+                    if result.get("error"):
+                        errors.append(f"{uname}: {result['error']}")
+                        failed.add(uname)
+                        continue
+                    prev = merged.get(uname)
+                    if prev is None:
+                        merged[uname] = dict(result)
+                        continue
+                    for k in ("scanned", "inserted", "backfilled"):
+                        prev[k] = int(prev.get(k) or 0) + int(result.get(k) or 0)
+                    prev["newestCreateTime"] = max(
+                        int(prev.get("newestCreateTime") or 0), int(result.get("newestCreateTime") or 0)
                     )
             except HTTPException as e:
-                errors.append(f"{uname}: {str(e.detail or '')}".strip())
+                for uname, _, _ in items:
+                    errors.append(f"{uname}: {str(e.detail or '')}".strip())
+                    failed.add(uname)
                 logger.warning(
-                    "[%s] sync session failed account=%s username=%s err=%s",
+                    "[%s] sync failed account=%s db=%s sessions=%s err=%s",
                     trace_id,
                     account_dir.name,
-                    uname,
+                    msg_db_path.stem,
+                    len(items),
                     str(e.detail or "").strip(),
                 )
                 continue
             except Exception as e:
-                errors.append(f"{uname}: {str(e)}".strip())
+                for uname, _, _ in items:
+                    errors.append(f"{uname}: {str(e)}".strip())
+                    failed.add(uname)
                 logger.exception(
-                    "[%s] sync session crashed account=%s username=%s",
+                    "[%s] sync crashed account=%s db=%s sessions=%s",
                     trace_id,
                     account_dir.name,
-                    uname,
+                    msg_db_path.stem,
+                    len(items),
                 )
                 continue
 
+        for uname, result in merged.items():
+            _record(uname, result)
+
+        try:
+            _store_realtime_sync_watermarks(account_dir, watermarks)
+        except Exception:
+            logger.exception("[%s] failed to store sync watermarks account=%s", trace_id, account_dir.name)
+
         elapsed_ms = int((time.time() - started) * 1000)
         if len(errors) > 20:
             errors = errors[:20] + [f"... and {len(errors) - 20} more"]
@@ -2589,6 +3026,7 @@ def sync_chat_realtime_messages_all(
             "sessionsSynced": int(synced),
             "sessionsUpdated": int(updated_sessions),
             "sessionsSkippedMissingTable": int(skipped_missing_table),
+            "batched": bool(batched),
             "scannedTotal": int(scanned_total),
             "insertedTotal": int(inserted_total),
             "elapsedMs": int(elapsed_ms),
@@ -2625,9 +3063,38 @@ async def chat_search_index_status(account: Optional[str] = None):
 
 
 @router.post("/api/chat/search-index/build", summary="构建/重建消息搜索索引")
-async def chat_search_index_build(account: Optional[str] = None, rebuild: bool = False):
+async def chat_search_index_build(account: Optional[str] = None, rebuild: bool = False, shards: Optional[str] = None):
+    account_dir = _resolve_account_dir(account)
+    # `shards` (comma separated message DB stems) only applies to the sharded index layout.
+    stems = [x.strip() for x in str(shards or "").split(",") if x.strip()]
+    return start_chat_search_index_build(account_dir, rebuild=bool(rebuild), shards=stems or None)
+
+
+@router.post("/api/chat/search-index/optimize", summary="整理/压缩消息搜索索引")
+async def chat_search_index_optimize(
+    account: Optional[str] = None,
+    mode: str = "optimize",
+    merge_pages: int = 500,
+    vacuum: bool = True,
+):
+    mode = str(mode or "optimize").strip().lower()
+    if mode not in {"optimize", "merge"}:
+        raise HTTPException(status_code=400, detail="Invalid mode, use optimize or merge.")
+    if merge_pages <= 0:
+        raise HTTPException(status_code=400, detail="Invalid merge_pages.")
+    return await run_io(
+        _optimize_chat_search_index,
+        account,
+        mode=mode,
+        merge_pages=int(merge_pages),
+        vacuum=bool(vacuum),
+    )
+
+
+def _optimize_chat_search_index(account: Optional[str], *, mode: str, merge_pages: int, vacuum: bool) -> dict[str, Any]:
     account_dir = _resolve_account_dir(account)
-    return start_chat_search_index_build(account_dir, rebuild=bool(rebuild))
+    result = optimize_chat_search_index(account_dir, mode=mode, merge_pages=merge_pages, vacuum=vacuum)
+    return {"account": account_dir.name, **result, "index": get_chat_search_index_status(account_dir).get("index")}
 
 
 @router.get("/api/chat/session-last-message/status", summary="会话最后一条消息缓存表状态")
@@ -2697,13 +3164,21 @@ async def chat_search_index_senders(
     build_status = str(build.get("status") or "").strip()
 
     if (not index_ready) and build_status not in {"building", "error"}:
-        start_chat_search_index_build(account_dir, rebuild=bool(index_exists))
+        # Sharded layout: only the missing / unreadable shards are (re)built, not the whole index.
+        start_chat_search_index_build(
+            account_dir,
+            rebuild=bool(index_exists),
+            shards=pending_chat_search_index_shards(index) or None,
+        )
         index_status = get_chat_search_index_status(account_dir)
         index = dict(index_status.get("index") or {})
         build = dict(index.get("build") or {})
         build_status = str(build.get("status") or "").strip()
         index_exists = bool(index.get("exists"))
         index_ready = bool(index.get("ready"))
+    elif index.get("staleShards") and build_status != "building":
+        # Message DBs re-decrypted or synced since their shard was built: refresh those in the background.
+        refresh_chat_search_index_shards(account_dir, list(index["staleShards"]))
 
     if build_status == "error":
         return {
@@ -2738,81 +3213,90 @@ async def chat_search_index_senders(
             "message": "Provide message_q to list global senders.",
         }
 
-    index_db_path = get_chat_search_index_db_path(account_dir)
-    conn = sqlite3.connect(str(index_db_path))
-    conn.row_factory = sqlite3.Row
-    try:
-        where_parts: list[str] = ["sender_username <> ''"]
-        params: list[Any] = []
-
-        if message_q is not None:
-            fts_query = _build_fts_query(message_q)
-            if fts_query:
-                where_parts.insert(0, "message_fts MATCH ?")
-                params.append(fts_query)
-
-        if username is not None:
-            where_parts.append("username = ?")
-            params.append(username)
-        elif session_type_norm == "group":
-            where_parts.append("username LIKE ?")
-            params.append("%@chatroom")
-        elif session_type_norm == "single":
-            where_parts.append("username NOT LIKE ?")
-            params.append("%@chatroom")
-
-        if q is not None:
-            where_parts.append("sender_username LIKE ?")
-            params.append(f"%{q}%")
-
-        want_types: Optional[set[str]] = None
-        if render_types is not None:
-            parts = [p.strip() for p in str(render_types or "").split(",") if p.strip()]
-            want_types = {p for p in parts if p}
-            if not want_types:
-                want_types = None
-
-        if want_types is not None:
-            types_sorted = sorted(want_types)
-            placeholders = ",".join(["?"] * len(types_sorted))
-            where_parts.append(f"render_type IN ({placeholders})")
-            params.extend(types_sorted)
-
-        start_ts = int(start_time) if start_time is not None else None
-        end_ts = int(end_time) if end_time is not None else None
-        if start_ts is not None and start_ts < 0:
-            start_ts = 0
-        if end_ts is not None and end_ts < 0:
-            end_ts = 0
-
-        if start_ts is not None:
-            where_parts.append("CAST(create_time AS INTEGER) >= ?")
-            params.append(int(start_ts))
-        if end_ts is not None:
-            where_parts.append("CAST(create_time AS INTEGER) <= ?")
-            params.append(int(end_ts))
-
-        if not include_hidden:
-            where_parts.append("CAST(is_hidden AS INTEGER) = 0")
-        if not include_official:
-            where_parts.append("CAST(is_official AS INTEGER) = 0")
-
-        where_sql = " AND ".join(where_parts)
-        rows = conn.execute(
-            f"""
-            SELECT
-                sender_username AS sender_username,
-                COUNT(*) AS c
-            FROM message_fts
-            WHERE {where_sql}
-            GROUP BY sender_username
-            ORDER BY c DESC, sender_username ASC
-            LIMIT ?
-            """,
-            params + [int(limit)],
-        ).fetchall()
-    finally:
-        conn.close()
+    where_parts: list[str] = ["sender_username <> ''"]
+    params: list[Any] = []
+
+    if message_q is not None:
+        fts_query = _build_fts_query(message_q)
+        if fts_query:
+            where_parts.insert(0, "message_fts MATCH ?")
+            params.append(fts_query)
+
+    if username is not None:
+        where_parts.append("username = ?")
+        params.append(username)
+    elif session_type_norm == "group":
+        where_parts.append("username LIKE ?")
+        params.append("%@chatroom")
+    elif session_type_norm == "single":
+        where_parts.append("username NOT LIKE ?")
+        params.append("%@chatroom")
+
+    if q is not None:
+        where_parts.append("sender_username LIKE ?")
+        params.append(f"%{q}%")
+
+    want_types: Optional[set[str]] = None
+    if render_types is not None:
+        parts = [p.strip() for p in str(render_types or "").split(",") if p.strip()]
+        want_types = {p for p in parts if p}
+        if not want_types:
+            want_types = None
+
+    if want_types is not None:
+        types_sorted = sorted(want_types)
+        placeholders = ",".join(["?"] * len(types_sorted))
+        where_parts.append(f"render_type IN ({placeholders})")
+        params.extend(types_sorted)
+
+    start_ts = int(start_time) if start_time is not None else None
+    end_ts = int(end_time) if end_time is not None else None
+    if start_ts is not None and start_ts < 0:
+        start_ts = 0
+    if end_ts is not None and end_ts < 0:
+        end_ts = 0
+
+    if start_ts is not None:
+        where_parts.append("CAST(create_time AS INTEGER) >= ?")
+        params.append(int(start_ts))
+    if end_ts is not None:
+        where_parts.append("CAST(create_time AS INTEGER) <= ?")
+        params.append(int(end_ts))
+
+    if not include_hidden:
+        where_parts.append("CAST(is_hidden AS INTEGER) = 0")
+    if not include_official:
+        where_parts.append("CAST(is_official AS INTEGER) = 0")
+
+    where_sql = " AND ".join(where_parts)
+
+    # With a sharded index each shard is counted separately and the per-sender counts are summed.
+    counts: dict[str, int] = {}
+    for index_db_path in get_chat_search_index_db_paths(account_dir):
+        if not index_db_path.exists():
+            continue
+        conn = sqlite3.connect(str(index_db_path))
+        conn.row_factory = sqlite3.Row
+        try:
+            for r in conn.execute(
+                f"""
+                SELECT
+                    sender_username AS sender_username,
+                    COUNT(*) AS c
+                FROM message_fts
+                WHERE {where_sql}
+                GROUP BY sender_username
+                """,
+                params,
+            ):
+                su = str(r["sender_username"] or "")
+                counts[su] = counts.get(su, 0) + int(r["c"] or 0)
+        finally:
+            conn.close()
+    rows = [
+        {"sender_username": su, "c": c}
+        for su, c in sorted(counts.items(), key=lambda x: (-x[1], x[0]))[: int(limit)]
+    ]
 
     sender_usernames = [str(r["sender_username"] or "").strip() for r in rows if r and r["sender_username"]]
     sender_usernames = [u for u in sender_usernames if u]
@@ -3890,6 +4374,8 @@ def delete_chat_account(account: str):
     except Exception:
         removed_key_cache = False
 
+    drop_rendered_account(account_name)
+
     output_dir = get_output_dir()
     exports_dir = output_dir / "exports" / account_name
     if exports_dir.exists():
@@ -3903,6 +4389,9 @@ def delete_chat_account(account: str):
         shutil.rmtree(account_dir)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除账号数据失败：{e}")
+    finally:
+        # Even a partial removal may have invalidated the account.
+        ACCOUNT_REGISTRY.invalidate()
 
     accounts = _list_decrypted_accounts()
     return {
@@ -3960,6 +4449,7 @@ def list_chat_sessions(
             with conn.lock:
                 raw = _wcdb_get_sessions(conn.handle)
             wcdb_ms = (time.perf_counter() - wcdb_t0) * 1000.0
+            record_stage("wcdb", wcdb_ms)
             logger.info(
                 "[%s] wcdb_get_sessions done account=%s sessions=%s ms=%.1f",
                 trace_id,
@@ -4013,52 +4503,53 @@ def list_chat_sessions(
         logger.info("[%s] list_sessions realtime normalized account=%s rows=%s", trace_id, account_dir.name, len(rows))
     else:
         session_db_path = account_dir / "session.db"
-        sconn = sqlite3.connect(str(session_db_path))
-        sconn.row_factory = sqlite3.Row
-        try:
+        with stage("sqlite"):
+            sconn = sqlite3.connect(str(session_db_path))
+            sconn.row_factory = sqlite3.Row
             try:
-                rows = sconn.execute(
-                    """
-                    SELECT
-                        username,
-                        unread_count,
-                        is_hidden,
-                        summary,
-                        draft,
-                        last_timestamp,
-                        sort_timestamp,
-                        last_msg_locald_id,
-                        last_msg_type,
-                        last_msg_sub_type,
-                        last_msg_sender,
-                        last_sender_display_name
-                    FROM SessionTable
-                    ORDER BY sort_timestamp DESC
-                    LIMIT ?
-                    """,
-                    (int(limit),),
-                ).fetchall()
-            except sqlite3.OperationalError:
-                rows = sconn.execute(
-                    """
-                    SELECT
-                        username,
-                        unread_count,
-                        is_hidden,
-                        summary,
-                        draft,
-                        last_timestamp,
-                        sort_timestamp,
-                        last_msg_type,
-                        last_msg_sub_type
-                    FROM SessionTable
-                    ORDER BY sort_timestamp DESC
-                    LIMIT ?
-                    """,
-                    (int(limit),),
-                ).fetchall()
-        finally:
-            sconn.close()
+                try:
+                    rows = sconn.execute(
+                        """
+                        SELECT
+                            username,
+                            unread_count,
+                            is_hidden,
+                            summary,
+                            draft,
+                            last_timestamp,
+                            sort_timestamp,
+                            last_msg_locald_id,
+                            last_msg_type,
+                            last_msg_sub_type,
+                            last_msg_sender,
+                            last_sender_display_name
+                        FROM SessionTable
+                        ORDER BY sort_timestamp DESC
+                        LIMIT ?
+                        """,
+                        (int(limit),),
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    rows = sconn.execute(
+                        """
+                        SELECT
+                            username,
+                            unread_count,
+                            is_hidden,
+                            summary,
+                            draft,
+                            last_timestamp,
+                            sort_timestamp,
+                            last_msg_type,
+                            last_msg_sub_type
+                        FROM SessionTable
+                        ORDER BY sort_timestamp DESC
+                        LIMIT ?
+                        """,
+                        (int(limit),),
+                    ).fetchall()
+            finally:
+                sconn.close()
 
     filtered: list[Any] = []
     for r in rows:
@@ -4364,6 +4855,7 @@ def _collect_chat_messages(
     quote_usernames: list[str] = []
     pat_usernames: set[str] = set()
     has_more_any = False
+    render_cache_enabled = is_render_cache_enabled()
 
     contact_conn: Optional[sqlite3.Connection] = None
     alias_cache: dict[str, str] = {}
@@ -4432,16 +4924,54 @@ def _collect_chat_messages(
             # compress_content reliably.
             conn.text_factory = bytes
 
-            try:
-                rows = conn.execute(sql_with_join, (take_probe,)).fetchall()
-            except Exception:
-                rows = conn.execute(sql_no_join, (take_probe,)).fetchall()
+            # Rendered-row cache: probe the page's local_ids first; when every row is cached the message
+            # columns are never read or decoded.
+            cached_rows: dict[int, tuple[dict[str, Any], list[str]]] = {}
+            rows = None
+            if render_cache_enabled:
+                with stage("sqlite"):
+                    key_rows = conn.execute(
+                        f"SELECT m.local_id FROM {quoted_table} m "
+                        "ORDER BY m.create_time DESC, m.sort_seq DESC, m.local_id DESC "
+                        "LIMIT ?",
+                        (take_probe,),
+                    ).fetchall()
+                key_ids = {int(k["local_id"] or 0) for k in key_rows[:take]}
+                with stage("render_cache"):
+                    cached_rows = load_rendered_messages(account_dir.name, db_path.stem, table_name, key_ids)
+                if key_ids and all(i in cached_rows for i in key_ids):
+                    rows = key_rows
+
+            if rows is None:
+                with stage("sqlite"):
+                    try:
+                        rows = conn.execute(sql_with_join, (take_probe,)).fetchall()
+                    except Exception:
+                        rows = conn.execute(sql_no_join, (take_probe,)).fetchall()
             if len(rows) > take:
                 has_more_any = True
                 rows = rows[:take]
 
+            to_store: list[tuple[int, dict[str, Any], list[str]]] = []
+            decode_t0 = time.perf_counter()
             for r in rows:
                 local_id = int(r["local_id"] or 0)
+                if render_cache_enabled:
+                    hit = cached_rows.get(local_id)
+                    record_cache("render", hit=hit is not None)
+                    if hit is not None:
+                        msg, cached_pats = hit
+                        pat_usernames.update(cached_pats)
+                        if want_types is not None:
+                            if _normalize_render_type_key(msg.get("renderType")) not in want_types:
+                                continue
+                        if msg.get("senderUsername"):
+                            sender_usernames.append(str(msg.get("senderUsername")))
+                        if msg.get("quoteUsername"):
+                            quote_usernames.append(str(msg.get("quoteUsername")))
+                        merged.append(msg)
+                        continue
+
                 create_time = int(r["create_time"] or 0)
                 sort_seq = int(r["sort_seq"] or 0) if r["sort_seq"] is not None else 0
                 local_type = int(r["local_type"] or 0)
@@ -4526,6 +5056,7 @@ def _collect_chat_messages(
                 location_lng: Optional[float] = None
                 location_poiname = ""
                 location_label = ""
+                row_pats: set[str] = set()
 
                 if local_type == 10000:
                     render_type = "system"
@@ -4576,7 +5107,8 @@ def _collect_chat_messages(
                     template = _extract_xml_tag_text(raw_text, "template")
                     if template:
                         # import re
-                        pat_usernames.update({m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", template) if m.group(1)})
+                        row_pats = {m.group(1) for m in re.finditer(r"\$\{([^}]+)\}", template) if m.group(1)}
+                        pat_usernames.update(row_pats)
                         content_text = "[拍一拍]"
                     else:
                         content_text = "[拍一拍]"
@@ -4801,6 +5333,62 @@ def _collect_chat_messages(
                 if not content_text:
                     content_text = _infer_message_brief_by_local_type(local_type)
 
+                msg = {
+                    "id": f"{db_path.stem}:{table_name}:{local_id}",
+                    "localId": local_id,
+                    "serverId": int(r["server_id"] or 0),
+                    "serverIdStr": str(int(r["server_id"] or 0)) if int(r["server_id"] or 0) else "",
+                    "type": local_type,
+                    "createTime": create_time,
+                    "sortSeq": sort_seq,
+                    "senderUsername": sender_username,
+                    "isSent": bool(is_sent),
+                    "renderType": render_type,
+                    "content": content_text,
+                    "title": title,
+                    "url": url,
+                    "linkType": link_type,
+                    "linkStyle": link_style,
+                    "from": from_name,
+                    "fromUsername": from_username,
+                    "recordItem": record_item,
+                    "imageMd5": image_md5,
+                    "imageFileId": image_file_id,
+                    "emojiMd5": emoji_md5,
+                    "emojiUrl": emoji_url,
+                    "thumbUrl": thumb_url,
+                    "imageUrl": image_url,
+                    "videoMd5": video_md5,
+                    "videoThumbMd5": video_thumb_md5,
+                    "videoFileId": video_file_id,
+                    "videoThumbFileId": video_thumb_file_id,
+                    "videoUrl": video_url,
+                    "videoThumbUrl": video_thumb_url,
+                    "voiceLength": voice_length,
+                    "voipType": voip_type,
+                    "quoteUsername": str(quote_username).strip(),
+                    "quoteServerId": str(quote_server_id).strip(),
+                    "quoteType": str(quote_type).strip(),
+                    "quoteVoiceLength": str(quote_voice_length).strip(),
+                    "quoteTitle": quote_title,
+                    "quoteContent": quote_content,
+                    "quoteThumbUrl": quote_thumb_url,
+                    "amount": amount,
+                    "coverUrl": cover_url,
+                    "fileSize": file_size,
+                    "fileMd5": file_md5,
+                    "paySubType": pay_sub_type,
+                    "transferStatus": transfer_status,
+                    "transferId": transfer_id,
+                    "locationLat": location_lat,
+                    "locationLng": location_lng,
+                    "locationPoiname": location_poiname,
+                    "locationLabel": location_label,
+                    "_rawText": raw_text if local_type in (10000, 266287972401) else "",
+                }
+                if render_cache_enabled:
+                    to_store.append((local_id, dict(msg), sorted(row_pats)))
+
                 if want_types is not None:
                     rt_key = _normalize_render_type_key(render_type)
                     if rt_key not in want_types:
@@ -4811,61 +5399,11 @@ def _collect_chat_messages(
                 if quote_username:
                     quote_usernames.append(str(quote_username).strip())
 
-                merged.append(
-                    {
-                        "id": f"{db_path.stem}:{table_name}:{local_id}",
-                        "localId": local_id,
-                        "serverId": int(r["server_id"] or 0),
-                        "serverIdStr": str(int(r["server_id"] or 0)) if int(r["server_id"] or 0) else "",
-                        "type": local_type,
-                        "createTime": create_time,
-                        "sortSeq": sort_seq,
-                        "senderUsername": sender_username,
-                        "isSent": bool(is_sent),
-                        "renderType": render_type,
-                        "content": content_text,
-                        "title": title,
-                        "url": url,
-                        "linkType": link_type,
-                        "linkStyle": link_style,
-                        "from": from_name,
-                        "fromUsername": from_username,
-                        "recordItem": record_item,
-                        "imageMd5": image_md5,
-                        "imageFileId": image_file_id,
-                        "emojiMd5": emoji_md5,
-                        "emojiUrl": emoji_url,
-                        "thumbUrl": thumb_url,
-                        "imageUrl": image_url,
-                        "videoMd5": video_md5,
-                        "videoThumbMd5": video_thumb_md5,
-                        "videoFileId": video_file_id,
-                        "videoThumbFileId": video_thumb_file_id,
-                        "videoUrl": video_url,
-                        "videoThumbUrl": video_thumb_url,
-                        "voiceLength": voice_length,
-                        "voipType": voip_type,
-                        "quoteUsername": str(quote_username).strip(),
-                        "quoteServerId": str(quote_server_id).strip(),
-                        "quoteType": str(quote_type).strip(),
-                        "quoteVoiceLength": str(quote_voice_length).strip(),
-                        "quoteTitle": quote_title,
-                        "quoteContent": quote_content,
-                        "quoteThumbUrl": quote_thumb_url,
-                        "amount": amount,
-                        "coverUrl": cover_url,
-                        "fileSize": file_size,
-                        "fileMd5": file_md5,
-                        "paySubType": pay_sub_type,
-                        "transferStatus": transfer_status,
-                        "transferId": transfer_id,
-                        "locationLat": location_lat,
-                        "locationLng": location_lng,
-                        "locationPoiname": location_poiname,
-                        "locationLabel": location_label,
-                        "_rawText": raw_text if local_type in (10000, 266287972401) else "",
-                    }
-                )
+                merged.append(msg)
+            record_stage("decode", (time.perf_counter() - decode_t0) * 1000.0)
+            if to_store:
+                with stage("render_cache"):
+                    store_rendered_messages(account_dir.name, db_path.stem, table_name, to_store)
         finally:
             conn.close()
 
@@ -4902,7 +5440,7 @@ def get_chat_message_daily_counts(
         raise HTTPException(status_code=400, detail="Invalid year or month.")
 
     account_dir = _resolve_account_dir(account)
-    db_paths = _iter_message_db_paths(account_dir)
+    db_paths = conversation_message_db_paths(account_dir, username, start_time=start_ts, end_time=end_ts)
 
     counts: dict[str, int] = {}
 
@@ -4980,7 +5518,7 @@ def get_chat_message_anchor(
             raise HTTPException(status_code=400, detail="Invalid date.")
 
     account_dir = _resolve_account_dir(account)
-    db_paths = _iter_message_db_paths(account_dir)
+    db_paths = conversation_message_db_paths(account_dir, username, start_time=start_ts, end_time=end_ts)
 
     best_key: Optional[tuple[int, int, int]] = None
     best_anchor_id = ""
@@ -5083,7 +5621,7 @@ def list_chat_messages(
 
     db_paths: list[Path] = []
     if source_norm != "realtime":
-        db_paths = _iter_message_db_paths(account_dir)
+        db_paths = conversation_message_db_paths(account_dir, username)
         if not db_paths:
             return {
                 "status": "error",
@@ -6068,7 +6606,226 @@ def list_chat_messages(
     }
 
 
-async def _search_chat_messages_via_fts(
+_SEARCH_CACHE_MAX_KEYS = 5000
+
+
+def _build_search_fts_where(
+    fts_query: str,
+    *,
+    username: Optional[str],
+    session_type: Optional[str],
+    sender: Optional[str],
+    want_types: Optional[set[str]],
+    start_ts: Optional[int],
+    end_ts: Optional[int],
+    include_hidden: bool,
+    include_official: bool,
+) -> tuple[str, list[Any]]:
+    where_parts: list[str] = ["message_fts MATCH ?"]
+    params: list[Any] = [fts_query]
+
+    if username:
+        where_parts.append("username = ?")
+        params.append(str(username))
+    elif session_type == "group":
+        where_parts.append("username LIKE ?")
+        params.append("%@chatroom")
+    elif session_type == "single":
+        where_parts.append("username NOT LIKE ?")
+        params.append("%@chatroom")
+
+    if sender:
+        where_parts.append("sender_username = ?")
+        params.append(str(sender))
+
+    if want_types is not None:
+        types_sorted = sorted(want_types)
+        placeholders = ",".join(["?"] * len(types_sorted))
+        where_parts.append(f"render_type IN ({placeholders})")
+        params.extend(types_sorted)
+
+    if start_ts is not None:
+        where_parts.append("CAST(create_time AS INTEGER) >= ?")
+        params.append(int(start_ts))
+    if end_ts is not None:
+        where_parts.append("CAST(create_time AS INTEGER) <= ?")
+        params.append(int(end_ts))
+
+    if not include_hidden:
+        where_parts.append("CAST(is_hidden AS INTEGER) = 0")
+    if not include_official:
+        where_parts.append("CAST(is_official AS INTEGER) = 0")
+
+    return " AND ".join(where_parts), params
+
+
+def _parse_search_conversation_weights(value: Optional[str]) -> dict[str, float]:
+    """Parse `username:weight,username:weight`; weights > 1 boost a conversation, < 1 demote it."""
+
+    out: dict[str, float] = {}
+    for part in str(value or "").split(","):
+        name, sep, w = part.strip().rpartition(":")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        try:
+            weight = float(w)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid conversation weight: {part.strip()}")
+        if weight <= 0:
+            raise HTTPException(status_code=400, detail=f"Invalid conversation weight: {part.strip()}")
+        out[name] = weight
+    return out
+
+
+def _build_search_fts_rank(
+    sort: str,
+    *,
+    half_life_days: Optional[float],
+    conversation_weights: dict[str, float],
+    now: int,
+) -> tuple[str, list[Any]]:
+    """Rank expression (lower sorts first, ties broken by newest) and its params for a search mode.
+
+    `time` ranks every hit equally, i.e. newest first. `relevance` ranks by FTS5 `bm25()` (lower is
+    better), scaled by a hyperbolic recency decay (`1 / (1 + age / half_life)`, so a message
+    `half_life` old counts half) and a per-conversation weight. SQLite keeps only the top LIMIT rows
+    while sorting, so the first page does not sort every match.
+    """
+
+    if sort != "relevance":
+        return "0", []
+
+    score_sql = "bm25(message_fts)"
+    params: list[Any] = []
+    if half_life_days is not None and half_life_days > 0:
+        score_sql += " / (1.0 + MAX(0, ? - CAST(create_time AS INTEGER)) / ?)"
+        params.extend([int(now), float(half_life_days) * 86400.0])
+    if conversation_weights:
+        cases = " ".join(["WHEN ? THEN ?"] * len(conversation_weights))
+        score_sql += f" * (CASE username {cases} ELSE 1.0 END)"
+        for name in sorted(conversation_weights):
+            params.extend([name, float(conversation_weights[name])])
+    return score_sql, params
+
+
+_SEARCH_SHARD_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 2), thread_name_prefix="search-shard")
+
+
+def _search_hit_rank(row: Any) -> tuple[Any, ...]:
+    # Python mirror of the SQL ORDER BY, used to merge per-shard results.
+    return (float(row[5] or 0), -int(row[6] or 0), -int(row[7] or 0), -int(row[8] or 0), str(row[1] or ""))
+
+
+def _query_search_hit_keys(
+    index_db_paths: "Path | list[Path]",
+    *,
+    where_sql: str,
+    params: list[Any],
+    offset: int,
+    limit: int,
+    rank_sql: str = "0",
+    rank_params: Optional[list[Any]] = None,
+    cached: Optional[dict[str, Any]] = None,
+) -> tuple[dict[str, Any], list[tuple[str, str, str, int, int]]]:
+    """Ordered (username, db_stem, table_name, local_id, rowid) hit keys for a search, plus the requested page.
+
+    Up to `_SEARCH_CACHE_MAX_KEYS` keys are fetched in one query so later pages can be served from
+    `SEARCH_HIT_CACHE`; for larger result sets the total comes from COUNT(*) once. A page past the
+    fetched keys extends the window (`cached` is a previous entry for the same query): each index file
+    continues after the rows it already contributed, so neither the prefix nor the COUNT is re-run.
+    A sharded index is queried concurrently (each shard returns its own top rows) and the ordered
+    results are merged.
+    """
+
+    paths = [index_db_paths] if isinstance(index_db_paths, Path) else list(index_db_paths)
+    paths = [p for p in paths if p.exists()]
+    rank_params = list(rank_params or [])
+    select_sql = (
+        f"SELECT username, db_stem, table_name, local_id, rowid, {rank_sql} AS rank_score, "
+        "CAST(create_time AS INTEGER) AS ct, CAST(sort_seq AS INTEGER) AS ss, CAST(local_id AS INTEGER) AS lid "
+        f"FROM message_fts WHERE {where_sql} ORDER BY rank_score ASC, ct DESC, ss DESC, lid DESC LIMIT ? OFFSET ?"
+    )
+
+    def query_one(path: Path, n: int, skip: int, count_over: Optional[int]) -> tuple[list[Any], Optional[int]]:
+        conn = sqlite3.connect(str(path))
+        try:
+            rows = conn.execute(select_sql, rank_params + params + [int(n), int(skip)]).fetchall()
+            count = None
+            if count_over is not None and len(rows) > count_over:
+                total_row = conn.execute(f"SELECT COUNT(*) FROM message_fts WHERE {where_sql}", params).fetchone()
+                count = int(total_row[0] or 0) if total_row is not None else len(rows)
+            return rows, count
+        finally:
+            conn.close()
+
+    def query_all(n: int, taken: dict[str, int], count_over: Optional[int]) -> list[tuple[list[Any], Optional[int]]]:
+        if len(paths) <= 1:
+            return [query_one(p, n, taken.get(str(p), 0), count_over) for p in paths]
+        futures = [_SEARCH_SHARD_POOL.submit(query_one, p, n, taken.get(str(p), 0), count_over) for p in paths]
+        return [f.result() for f in futures]
+
+    def to_key(r: Any) -> tuple[str, str, str, int, int]:
+        return (
+            str(r[0] or "").strip(),
+            str(r[1] or "").strip(),
+            str(r[2] or "").strip(),
+            int(r[3] or 0),
+            int(r[4] or 0),
+        )
+
+    def take(results: list[tuple[list[Any], Optional[int]]], n: int, taken: dict[str, int]) -> list[Any]:
+        # Merge the per-file ordered rows and count how many each file contributed to the first `n`.
+        tagged = [[(r, str(p)) for r in rows] for p, (rows, _count) in zip(paths, results)]
+        out = list(itertools.islice(heapq.merge(*tagged, key=lambda t: _search_hit_rank(t[0])), n))
+        for _row, path_key in out:
+            taken[path_key] = taken.get(path_key, 0) + 1
+        return [to_key(row) for row, _path_key in out]
+
+    fts_t0 = time.perf_counter()
+    if cached is None:
+        taken: dict[str, int] = {}
+        results = query_all(_SEARCH_CACHE_MAX_KEYS + 1, taken, _SEARCH_CACHE_MAX_KEYS)
+        total = sum(count if count is not None else len(rows) for rows, count in results)
+        keys = take(results, _SEARCH_CACHE_MAX_KEYS, taken)
+        truncated = sum(len(rows) for rows, _count in results) > len(keys)
+        entry: dict[str, Any] = {"keys": keys, "total": total, "truncated": truncated, "taken": taken}
+    else:
+        entry = cached
+
+    if entry["truncated"] and offset + limit > len(entry["keys"]):
+        have = len(entry["keys"])
+        want = max(offset + limit, have + _SEARCH_CACHE_MAX_KEYS) - have
+        taken = dict(entry.get("taken") or {})
+        results = query_all(want + 1, taken, None)
+        more = take(results, want, taken)
+        # A new dict: the cached entry's key count is part of SEARCH_HIT_CACHE's budget.
+        entry = dict(
+            entry,
+            keys=entry["keys"] + more,
+            truncated=sum(len(rows) for rows, _count in results) > len(more),
+            taken=taken,
+        )
+    record_stage("fts", (time.perf_counter() - fts_t0) * 1000.0)
+
+    return entry, entry["keys"][offset : offset + limit]
+
+
+def _make_search_hit_snippet(hit: dict[str, Any], tokens: list[str]) -> str:
+    hay_items = [
+        str(hit.get("content") or ""),
+        str(hit.get("title") or ""),
+        str(hit.get("url") or ""),
+        str(hit.get("quoteTitle") or ""),
+        str(hit.get("quoteContent") or ""),
+        str(hit.get("amount") or ""),
+    ]
+    haystack = "\n".join([x for x in hay_items if x.strip()])
+    snippet_src = str(hit.get("content") or "").strip() or str(hit.get("title") or "").strip() or haystack
+    return _make_snippet(snippet_src, tokens)
+
+
+def _search_chat_messages_via_fts(
     request: Request,
     *,
     q: str,
@@ -6083,11 +6840,18 @@ async def _search_chat_messages_via_fts(
     render_types: Optional[str],
     include_hidden: bool,
     include_official: bool,
+    sort: str = "time",
+    half_life_days: Optional[float] = None,
+    conversation_weights: Optional[str] = None,
 ) -> dict[str, Any]:
     tokens = _make_search_tokens(q)
     if not tokens:
         raise HTTPException(status_code=400, detail="Missing q.")
 
+    sort = str(sort or "time").strip().lower()
+    if sort not in {"time", "relevance"}:
+        raise HTTPException(status_code=400, detail="Invalid sort, use time or relevance.")
+
     if limit <= 0:
         raise HTTPException(status_code=400, detail="Invalid limit.")
     if limit > 200:
@@ -6123,125 +6887,119 @@ async def _search_chat_messages_via_fts(
     contact_db_path = account_dir / "contact.db"
     head_image_db_path = account_dir / "head_image.db"
     base_url = str(request.base_url).rstrip("/")
+    note_chat_search_index_query(account_dir)
 
-    index_status = get_chat_search_index_status(account_dir)
-    index = dict(index_status.get("index") or {})
-    build = dict(index.get("build") or {})
-
-    index_exists = bool(index.get("exists"))
-    index_ready = bool(index.get("ready"))
-    build_status = str(build.get("status") or "").strip()
-
-    if (not index_ready) and build_status not in {"building", "error"}:
-        start_chat_search_index_build(account_dir, rebuild=bool(index_exists))
+    fts_query = _build_fts_query(q)
+    where_sql, params = _build_search_fts_where(
+        fts_query,
+        username=username,
+        session_type=session_type_norm,
+        sender=sender,
+        want_types=want_types,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        include_hidden=include_hidden,
+        include_official=include_official,
+    )
+    # Anchor the recency decay to the hour so repeated/paged relevance queries share a cache entry.
+    rank_sql, rank_params = _build_search_fts_rank(
+        sort,
+        half_life_days=half_life_days,
+        conversation_weights=_parse_search_conversation_weights(conversation_weights),
+        now=int(time.time()) // 3600 * 3600,
+    )
+    # Everything that determines the ordered hit list; the page window (offset/limit) is not part of it.
+    cache_key = (account_dir.name, where_sql, tuple(params), rank_sql, tuple(rank_params))
+    index_version = get_chat_search_index_version(account_dir) if fts_query else None
+    cached = SEARCH_HIT_CACHE.get(cache_key, index_version) if index_version is not None else None
+    record_cache("search_hits", hit=cached is not None)
+
+    if cached is not None:
+        index = dict(cached["index"])
+        index["build"] = get_chat_search_index_build_state(account_dir)
+    else:
         index_status = get_chat_search_index_status(account_dir)
         index = dict(index_status.get("index") or {})
         build = dict(index.get("build") or {})
-        build_status = str(build.get("status") or "").strip()
+
         index_exists = bool(index.get("exists"))
         index_ready = bool(index.get("ready"))
+        build_status = str(build.get("status") or "").strip()
 
-    if build_status == "error":
-        return {
-            "status": "index_error",
-            "account": account_dir.name,
-            "q": q,
-            "tokens": tokens,
-            "scope": "conversation" if username else "global",
-            "username": username,
-            "offset": int(offset),
-            "limit": int(limit),
-            "baseUrl": base_url,
-            "total": 0,
-            "hasMore": False,
-            "hits": [],
-            "index": index,
-            "message": str(build.get("error") or "Search index build failed."),
-        }
+        if (not index_ready) and build_status not in {"building", "error"}:
+            # Sharded layout: only the missing / unreadable shards are (re)built, not the whole index.
+            start_chat_search_index_build(
+                account_dir,
+                rebuild=bool(index_exists),
+                shards=pending_chat_search_index_shards(index) or None,
+            )
+            index_status = get_chat_search_index_status(account_dir)
+            index = dict(index_status.get("index") or {})
+            build = dict(index.get("build") or {})
+            build_status = str(build.get("status") or "").strip()
+            index_exists = bool(index.get("exists"))
+            index_ready = bool(index.get("ready"))
+        elif index.get("staleShards") and build_status != "building":
+            # Message DBs re-decrypted or synced since their shard was built: refresh those in the background.
+            refresh_chat_search_index_shards(account_dir, list(index["staleShards"]))
+
+        if build_status == "error":
+            return {
+                "status": "index_error",
+                "account": account_dir.name,
+                "q": q,
+                "tokens": tokens,
+                "scope": "conversation" if username else "global",
+                "username": username,
+                "offset": int(offset),
+                "limit": int(limit),
+                "baseUrl": base_url,
+                "total": 0,
+                "hasMore": False,
+                "hits": [],
+                "index": index,
+                "message": str(build.get("error") or "Search index build failed."),
+            }
 
-    if not index_ready:
-        return {
-            "status": "index_building",
-            "account": account_dir.name,
-            "q": q,
-            "tokens": tokens,
-            "scope": "conversation" if username else "global",
-            "username": username,
-            "offset": int(offset),
-            "limit": int(limit),
-            "baseUrl": base_url,
-            "total": 0,
-            "hasMore": False,
-            "hits": [],
-            "index": index,
-            "message": "Search index is building. Please retry in a moment.",
-        }
+        if not index_ready:
+            return {
+                "status": "index_building",
+                "account": account_dir.name,
+                "q": q,
+                "tokens": tokens,
+                "scope": "conversation" if username else "global",
+                "username": username,
+                "offset": int(offset),
+                "limit": int(limit),
+                "baseUrl": base_url,
+                "total": 0,
+                "hasMore": False,
+                "hits": [],
+                "index": index,
+                "message": "Search index is building. Please retry in a moment.",
+            }
 
-    fts_query = _build_fts_query(q)
-    if not fts_query:
-        raise HTTPException(status_code=400, detail="Missing q.")
+        if not fts_query:
+            raise HTTPException(status_code=400, detail="Missing q.")
+        index_version = get_chat_search_index_version(account_dir)
 
-    index_db_path = get_chat_search_index_db_path(account_dir)
-    conn = sqlite3.connect(str(index_db_path))
-    conn.row_factory = sqlite3.Row
-    try:
+    if cached is not None and (
+        (not cached["truncated"]) or int(offset) + int(limit) <= len(cached["keys"])
+    ):
+        total = int(cached["total"])
+        page_keys = cached["keys"][int(offset) : int(offset) + int(limit)]
+    else:
         try:
-            where_parts: list[str] = ["message_fts MATCH ?"]
-            params: list[Any] = [fts_query]
-
-            if username:
-                where_parts.append("username = ?")
-                params.append(str(username))
-            elif session_type_norm == "group":
-                where_parts.append("username LIKE ?")
-                params.append("%@chatroom")
-            elif session_type_norm == "single":
-                where_parts.append("username NOT LIKE ?")
-                params.append("%@chatroom")
-
-            if sender:
-                where_parts.append("sender_username = ?")
-                params.append(str(sender))
-
-            if want_types is not None:
-                types_sorted = sorted(want_types)
-                placeholders = ",".join(["?"] * len(types_sorted))
-                where_parts.append(f"render_type IN ({placeholders})")
-                params.extend(types_sorted)
-
-            if start_ts is not None:
-                where_parts.append("CAST(create_time AS INTEGER) >= ?")
-                params.append(int(start_ts))
-            if end_ts is not None:
-                where_parts.append("CAST(create_time AS INTEGER) <= ?")
-                params.append(int(end_ts))
-
-            if not include_hidden:
-                where_parts.append("CAST(is_hidden AS INTEGER) = 0")
-            if not include_official:
-                where_parts.append("CAST(is_official AS INTEGER) = 0")
-
-            where_sql = " AND ".join(where_parts)
-            total_row = conn.execute(f"SELECT COUNT(*) AS c FROM message_fts WHERE {where_sql}", params).fetchone()
-            total = int(total_row[0] or 0) if total_row is not None else 0
-
-            rows = conn.execute(
-                f"""
-                SELECT
-                    username,
-                    db_stem,
-                    table_name,
-                    local_id
-                FROM message_fts
-                WHERE {where_sql}
-                ORDER BY
-                    CAST(create_time AS INTEGER) DESC,
-                    CAST(sort_seq AS INTEGER) DESC,
-                    CAST(local_id AS INTEGER) DESC
-                LIMIT ? OFFSET ?
-                """,
-                params + [int(limit), int(offset)],
-            ).fetchall()
+            entry, page_keys = _query_search_hit_keys(
+                get_chat_search_index_db_paths(account_dir),
+                where_sql=where_sql,
+                params=params,
+                offset=int(offset),
+                limit=int(limit),
+                rank_sql=rank_sql,
+                rank_params=rank_params,
+                cached=cached,
+            )
         except Exception as e:
             logger.exception("Chat search index query failed")
             return {
@@ -6260,28 +7018,52 @@ async def _search_chat_messages_via_fts(
                 "index": index,
                 "message": str(e),
             }
-    finally:
-        conn.close()
+        total = int(entry["total"])
+        if entry is not cached and index_version is not None:
+            entry["index"] = index
+            SEARCH_HIT_CACHE.put(cache_key, index_version, entry)
 
     db_paths = _iter_message_db_paths(account_dir)
     stem_to_path = {p.stem: p for p in db_paths}
 
+    # Indexes built with the payload side table hydrate the whole page in one index query; rows
+    # without a payload (older indexes) are re-read from their message DB below.
+    payload_by_key: dict[tuple[str, int], dict[str, Any]] = {}
+    if index.get("hasPayloads") and page_keys:
+        with stage("hydrate"):
+            # FTS rowids are per index file: one lookup per shard (or one in total when unsharded).
+            rowids_by_path: dict[Path, list[int]] = {}
+            if index.get("sharded"):
+                shard_paths = get_chat_search_index_shard_paths(account_dir)
+                for k in page_keys:
+                    shard_path = shard_paths.get(k[1])
+                    if shard_path is not None:
+                        rowids_by_path.setdefault(shard_path, []).append(k[4])
+            else:
+                rowids_by_path[get_chat_search_index_db_path(account_dir)] = [k[4] for k in page_keys]
+            for index_path, rowids in rowids_by_path.items():
+                try:
+                    for rowid, payload_hit in load_search_hit_payloads(index_path, rowids).items():
+                        payload_by_key[(str(payload_hit.get("db") or ""), rowid)] = payload_hit
+                except Exception:
+                    logger.exception("Failed to load search hit payloads")
+
     groups: dict[tuple[Path, str, str], list[int]] = {}
     ordered_keys: list[tuple[Path, str, str, int]] = []
-    for r in rows:
-        conv_username = str(r["username"] or "").strip()
-        db_stem = str(r["db_stem"] or "").strip()
-        table_name = str(r["table_name"] or "").strip()
-        local_id = int(r["local_id"] or 0)
+    hit_by_key: dict[tuple[Path, str, str, int], dict[str, Any]] = {}
+    for conv_username, db_stem, table_name, local_id, rowid in page_keys:
         if not conv_username or not db_stem or not table_name or local_id <= 0:
             continue
         db_path = stem_to_path.get(db_stem)
         if db_path is None:
             continue
-        groups.setdefault((db_path, table_name, conv_username), []).append(local_id)
         ordered_keys.append((db_path, table_name, conv_username, local_id))
-
-    hit_by_key: dict[tuple[Path, str, str, int], dict[str, Any]] = {}
+        hit = payload_by_key.get((db_stem, rowid))
+        if hit is not None:
+            hit["snippet"] = _make_search_hit_snippet(hit, tokens)
+            hit_by_key[(db_path, table_name, conv_username, local_id)] = hit
+            continue
+        groups.setdefault((db_path, table_name, conv_username), []).append(local_id)
 
     for (db_path, table_name, conv_username), local_ids in groups.items():
         uniq_local_ids = list(dict.fromkeys([int(x) for x in local_ids if int(x) > 0]))
@@ -6348,21 +7130,7 @@ async def _search_chat_messages_via_fts(
                 except Exception:
                     continue
 
-                hay_items = [
-                    str(hit.get("content") or ""),
-                    str(hit.get("title") or ""),
-                    str(hit.get("url") or ""),
-                    str(hit.get("quoteTitle") or ""),
-                    str(hit.get("quoteContent") or ""),
-                    str(hit.get("amount") or ""),
-                ]
-                haystack = "\n".join([x for x in hay_items if x.strip()])
-                snippet_src = (
-                    str(hit.get("content") or "").strip()
-                    or str(hit.get("title") or "").strip()
-                    or haystack
-                )
-                hit["snippet"] = _make_snippet(snippet_src, tokens)
+                hit["snippet"] = _make_search_hit_snippet(hit, tokens)
                 hit_by_key[(db_path, table_name, conv_username, local_id)] = hit
         finally:
             msg_conn.close()
@@ -6560,6 +7328,7 @@ async def _search_chat_messages_via_fts(
         "tokens": tokens,
         "offset": int(offset),
         "limit": int(limit),
+        "sort": sort,
         "baseUrl": base_url,
         "total": int(total),
         "hasMore": bool(int(offset) + int(limit) < int(total)),
@@ -6583,11 +7352,15 @@ async def search_chat_messages(
     render_types: Optional[str] = None,
     include_hidden: bool = False,
     include_official: bool = False,
+    sort: str = "time",
+    half_life_days: Optional[float] = None,
+    conversation_weights: Optional[str] = None,
     session_limit: int = 200,
     per_chat_scan: int = 200,
     scan_limit: int = 20000,
 ):
-    return await _search_chat_messages_via_fts(
+    return await run_io(
+        _search_chat_messages_via_fts,
         request,
         q=q,
         account=account,
@@ -6601,6 +7374,9 @@ async def search_chat_messages(
         render_types=render_types,
         include_hidden=include_hidden,
         include_official=include_official,
+        sort=sort,
+        half_life_days=half_life_days,
+        conversation_weights=conversation_weights,
     )
 
     tokens = _make_search_tokens(q)
@@ -6678,7 +7454,10 @@ async def search_chat_messages(
         hits: list[dict[str, Any]] = []
         seen_ids: set[str] = set()
 
-        for db_path in db_paths:
+        conv_db_paths = conversation_message_db_paths(
+            account_dir, conv_username, start_time=start_ts, end_time=end_ts
+        )
+        for db_path in conv_db_paths:
             conn = sqlite3.connect(str(db_path))
             conn.row_factory = sqlite3.Row
             try:
@@ -6984,6 +7763,26 @@ async def get_chat_messages_around(
     account: Optional[str] = None,
     before: int = 20,
     after: int = 20,
+):
+    return await run_io(
+        _get_chat_messages_around,
+        request,
+        username=username,
+        anchor_id=anchor_id,
+        account=account,
+        before=before,
+        after=after,
+    )
+
+
+def _get_chat_messages_around(
+    request: Request,
+    *,
+    username: str,
+    anchor_id: str,
+    account: Optional[str],
+    before: int,
+    after: int,
 ):
     if not username:
         raise HTTPException(status_code=400, detail="Missing username.")
@@ -7123,7 +7922,11 @@ async def get_chat_messages_around(
     pat_usernames_all: set[str] = set()
     is_group = bool(username.endswith("@chatroom"))
 
-    for db_path in db_paths:
+    around_db_paths = conversation_message_db_paths(account_dir, username)
+    if anchor_db_path not in around_db_paths:
+        around_db_paths = [p for p in db_paths if p == anchor_db_path or p in around_db_paths]
+
+    for db_path in around_db_paths:
         conn: Optional[sqlite3.Connection] = None
         try:
             conn = sqlite3.connect(str(db_path))
@@ -7441,6 +8244,15 @@ async def resolve_nested_chat_history(
     while the full recordItem exists in the original app message (local_type=49, appmsg type=19) stored elsewhere.
     WeChat can open it by looking up the original message; we do the same here.
     """
+    return await run_io(_resolve_nested_chat_history, request, server_id=server_id, account=account)
+
+
+def _resolve_nested_chat_history(
+    request: Request,
+    *,
+    server_id: int,
+    account: Optional[str],
+):
     if not server_id:
         raise HTTPException(status_code=400, detail="Missing server_id.")
 
@@ -8144,6 +8956,7 @@ async def edit_chat_message(request: Request) -> dict[str, Any]:
                     conn_out.close()
                 except Exception:
                     pass
+            _note_message_row_updated(account_dir, msg_db_path_out, table_name_out, output_edits)
 
         # Sync message_resource key fields (best-effort).
         try:
@@ -8703,11 +9516,13 @@ async def repair_chat_message_sender(request: Request) -> dict[str, Any]:
                 conn_out.commit()
             finally:
                 conn_out.close()
+                _note_message_row_updated(account_dir, msg_db_path_out, table_name_out, {})
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to update output db: {e}")
 
+    invalidate_rendered_conversation(account_dir.name, session_id)
     return {
         "status": "success",
         "account": account_dir.name,
@@ -8885,6 +9700,7 @@ async def flip_chat_message_direction(request: Request) -> dict[str, Any]:
                     raise HTTPException(status_code=404, detail="Message not found in output database.")
             finally:
                 conn_out.close()
+                _note_message_row_updated(account_dir, msg_db_path_out, table_name_out, {})
         except HTTPException:
             if created_record:
                 try:
@@ -8923,6 +9739,7 @@ async def flip_chat_message_direction(request: Request) -> dict[str, Any]:
                     conn_rb.commit()
                 finally:
                     conn_rb.close()
+                    _note_message_row_updated(account_dir, msg_db_path_out, table_name_out, {})
             except Exception:
                 pass
 
@@ -9094,13 +9911,14 @@ def _restore_message_from_snapshot(
     # Restore output decrypted Msg_*.
     try:
         conn_out = sqlite3.connect(str(msg_db_path_out), timeout=5)
+        tnorm = ""
+        restore_out: dict[str, Any] = {}
         try:
             tnorm = _normalize_table_name_case(conn_out, table_name)
             if not tnorm:
                 raise HTTPException(status_code=404, detail="Message table not found.")
             cols = _table_info_columns(conn_out, tnorm)
             col_map = {str(c or "").strip().lower(): str(c) for c in cols if str(c or "").strip()}
-            restore_out: dict[str, Any] = {}
             for col_lc in sorted(edited_cols):
                 col = col_map.get(col_lc)
                 k = orig_key_map.get(col_lc)
@@ -9118,6 +9936,8 @@ def _restore_message_from_snapshot(
                 conn_out.commit()
         finally:
             conn_out.close()
+            if restore_out:
+                _note_message_row_updated(account_dir, msg_db_path_out, tnorm, restore_out)
     except HTTPException:
         raise
     except Exception as e:
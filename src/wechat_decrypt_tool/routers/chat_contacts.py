@@ -2,13 +2,14 @@ import csv
 import json
 import re
 import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
 from functools import lru_cache
 from pathlib import Path
 from typing import Any, Literal, Optional
 
 from fastapi import APIRouter, HTTPException, Request
-from pypinyin import Style, lazy_pinyin
 from pydantic import BaseModel, Field
 
 from ..chat_helpers import (
@@ -19,6 +20,7 @@ from ..chat_helpers import (
     _should_keep_session,
 )
 from ..path_fix import PathFixRoute
+from ..request_metrics import record_cache
 
 router = APIRouter(route_class=PathFixRoute)
 
@@ -117,6 +119,14 @@ _SURNAME_PINYIN_OVERRIDES: dict[str, str] = {
 }
 
 
+def _lazy_pinyin(text: str, *, errors: str) -> list[str]:
+    # pypinyin loads its phrase dictionaries on import (~0.3s); defer it until the contacts page
+    # actually needs sort keys so backend startup doesn't pay for it.
+    from pypinyin import Style, lazy_pinyin  # pylint: disable=import-outside-toplevel
+
+    return lazy_pinyin(text, style=Style.NORMAL, errors=errors)
+
+
 @lru_cache(maxsize=4096)
 def _build_contact_pinyin_key(name: str) -> str:
     text = _normalize_text(name)
@@ -130,9 +140,9 @@ def _build_contact_pinyin_key(name: str) -> str:
         rest = text[1:]
         parts = [override]
         if rest:
-            parts.extend(lazy_pinyin(rest, style=Style.NORMAL, errors="default"))
+            parts.extend(_lazy_pinyin(rest, errors="default"))
     else:
-        parts = lazy_pinyin(text, style=Style.NORMAL, errors="default")
+        parts = _lazy_pinyin(text, errors="default")
     out: list[str] = []
     for part in parts:
         cleaned = _PINYIN_CLEAN_RE.sub("", _normalize_text(part).lower())
@@ -158,7 +168,7 @@ def _build_contact_pinyin_initial(name: str) -> str:
         return override[0].upper()
 
     # For CJK, try to convert the first character to pinyin initial.
-    parts = lazy_pinyin(first, style=Style.NORMAL, errors="ignore")
+    parts = _lazy_pinyin(first, errors="ignore")
     if parts:
         m = _PINYIN_ALPHA_RE.search(parts[0])
         if m:
@@ -516,6 +526,182 @@ def _matches_keyword(contact: dict[str, Any], keyword: str) -> bool:
     return False
 
 
+@lru_cache(maxsize=4096)
+def _build_contact_pinyin_initials(name: str) -> str:
+    """Per-character initials for CJK names (张三 -> zs) so the search box accepts them."""
+
+    text = _normalize_text(name)
+    if (not text) or text.isascii():
+        return ""
+    first = text[0]
+    override = _SURNAME_PINYIN_OVERRIDES.get(first)
+    parts = ([override] + _lazy_pinyin(text[1:], errors="ignore")) if override else _lazy_pinyin(text, errors="ignore")
+    return "".join(_PINYIN_CLEAN_RE.sub("", _normalize_text(part).lower())[:1] for part in parts)
+
+
+_KEYWORD_FIELDS = (
+    "username",
+    "displayName",
+    "remark",
+    "nickname",
+    "alias",
+    "region",
+    "source",
+    "country",
+    "province",
+    "city",
+)
+_DIRECTORY_CACHE_MAX = 8
+_DIRECTORY_LOCK = threading.Lock()
+_DIRECTORY_CACHE: "OrderedDict[str, _ContactDirectory]" = OrderedDict()
+_SESSION_INFO_CACHE: "OrderedDict[str, tuple[tuple[int, int], dict[str, int], set[str]]]" = OrderedDict()
+
+
+def _file_sig(path: Path) -> tuple[int, int]:
+    try:
+        st = path.stat()
+    except Exception:
+        return 0, 0
+    return int(st.st_size), int(st.st_mtime_ns)
+
+
+def _iter_trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class _ContactDirectory:
+    """All contact.db contacts of one account with display fields, pinyin keys and a trigram search index.
+
+    Built once per contact.db version (size + mtime); requests only filter, sort and attach the avatar base URL.
+    """
+
+    __slots__ = ("sig", "entries", "sort_names", "haystacks", "trigrams", "known_usernames")
+
+    def __init__(self, sig: tuple[int, int], contact_rows: dict[str, dict[str, Any]], account_name: str) -> None:
+        self.sig = sig
+        self.known_usernames = frozenset(contact_rows)
+        self.entries: list[dict[str, Any]] = []
+        self.sort_names: list[tuple[str, str]] = []
+        self.haystacks: list[str] = []
+        self.trigrams: dict[str, list[int]] = {}
+
+        for username, row in contact_rows.items():
+            if not _is_valid_contact_username(username):
+                continue
+            contact_type = _infer_contact_type(username, row)
+            if contact_type is None:
+                continue
+
+            display_name = _pick_display_name(row, username) or username
+            country = _normalize_text(row.get("country"))
+            province = _normalize_text(row.get("province"))
+            city = _normalize_text(row.get("city"))
+            source_scene = _to_optional_int(row.get("source_scene"))
+            item = {
+                "username": username,
+                "displayName": display_name,
+                "remark": _normalize_text(row.get("remark")),
+                "nickname": _normalize_text(row.get("nick_name")),
+                "alias": _normalize_text(row.get("alias")),
+                "gender": _to_int(row.get("gender")),
+                "signature": _normalize_text(row.get("signature")),
+                "type": contact_type,
+                "country": country,
+                "province": province,
+                "city": city,
+                "region": _build_region(country, province, city),
+                "sourceScene": source_scene,
+                "source": _source_scene_label(source_scene),
+                # Path only; the request's base URL is prepended when the entry is returned.
+                "avatar": _build_avatar_url(account_name, username),
+                "avatarLink": _normalize_text(_pick_avatar_url(row) or ""),
+            }
+            name_for_pinyin = _normalize_text(display_name) or username
+            item["pinyinKey"] = _build_contact_pinyin_key(name_for_pinyin)
+            item["pinyinInitial"] = _build_contact_pinyin_initial(name_for_pinyin)
+
+            texts = [_normalize_text(item.get(f)).lower() for f in _KEYWORD_FIELDS]
+            texts.append(item["pinyinKey"])
+            texts.append(_build_contact_pinyin_initials(name_for_pinyin))
+            # Remark and nickname are searchable by pinyin too, not only the name shown in the list.
+            for other in (item["remark"], item["nickname"]):
+                if other and other != name_for_pinyin and not other.isascii():
+                    texts.append(_build_contact_pinyin_key(other))
+                    texts.append(_build_contact_pinyin_initials(other))
+            idx = len(self.entries)
+            self.entries.append(item)
+            self.sort_names.append((_normalize_text(display_name).lower(), username.lower()))
+            self.haystacks.append("\x00".join(texts))
+            for text in texts:
+                for gram in _iter_trigrams(text):
+                    postings = self.trigrams.get(gram)
+                    if postings is None:
+                        self.trigrams[gram] = [idx]
+                    elif postings[-1] != idx:
+                        postings.append(idx)
+
+    def search(self, keyword: Optional[str]) -> list[int]:
+        """Indexes of entries whose fields (or pinyin / initials) contain `keyword` (case-insensitive)."""
+
+        kw = _normalize_text(keyword).lower()
+        if not kw:
+            return list(range(len(self.entries)))
+        if len(kw) < 3:
+            return [i for i, hay in enumerate(self.haystacks) if kw in hay]
+
+        postings = sorted((self.trigrams.get(g) or [] for g in _iter_trigrams(kw)), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for plist in postings[1:]:
+            candidates.intersection_update(plist)
+            if not candidates:
+                return []
+        # Trigrams may come from different fields; confirm the whole keyword is a substring.
+        return sorted(i for i in candidates if kw in self.haystacks[i])
+
+
+def _get_contact_directory(account_dir: Path) -> _ContactDirectory:
+    key = str(account_dir)
+    sig = _file_sig(account_dir / "contact.db")
+    with _DIRECTORY_LOCK:
+        cached = _DIRECTORY_CACHE.get(key)
+        if cached is not None and cached.sig == sig:
+            _DIRECTORY_CACHE.move_to_end(key)
+            record_cache("contacts", hit=True)
+            return cached
+
+    record_cache("contacts", hit=False)
+    directory = _ContactDirectory(sig, _load_contact_rows_map(account_dir / "contact.db"), account_dir.name)
+    with _DIRECTORY_LOCK:
+        _DIRECTORY_CACHE[key] = directory
+        _DIRECTORY_CACHE.move_to_end(key)
+        while len(_DIRECTORY_CACHE) > _DIRECTORY_CACHE_MAX:
+            _DIRECTORY_CACHE.popitem(last=False)
+    return directory
+
+
+def _get_session_info(account_dir: Path) -> tuple[dict[str, int], set[str]]:
+    """(username -> session sort timestamp, group usernames seen in session.db), cached on the session.db version."""
+
+    session_db_path = account_dir / "session.db"
+    key = str(account_dir)
+    sig = _file_sig(session_db_path)
+    with _DIRECTORY_LOCK:
+        cached = _SESSION_INFO_CACHE.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1], cached[2]
+
+    ts_map = _load_session_sort_timestamps(session_db_path)
+    groups = _load_session_group_usernames(session_db_path)
+    with _DIRECTORY_LOCK:
+        _SESSION_INFO_CACHE[key] = (sig, ts_map, groups)
+        _SESSION_INFO_CACHE.move_to_end(key)
+        while len(_SESSION_INFO_CACHE) > _DIRECTORY_CACHE_MAX:
+            _SESSION_INFO_CACHE.popitem(last=False)
+    return ts_map, groups
+
+
 def _collect_contacts_for_account(
     *,
     account_dir: Path,
@@ -528,74 +714,32 @@ def _collect_contacts_for_account(
     if not (include_friends or include_groups or include_officials):
         return []
 
-    contact_db_path = account_dir / "contact.db"
-    session_db_path = account_dir / "session.db"
-    contact_rows = _load_contact_rows_map(contact_db_path)
-    session_ts_map = _load_session_sort_timestamps(session_db_path)
-    session_group_usernames = _load_session_group_usernames(session_db_path)
-
-    contacts: list[dict[str, Any]] = []
-    for username, row in contact_rows.items():
-        if not _is_valid_contact_username(username):
-            continue
-
-        contact_type = _infer_contact_type(username, row)
-        if contact_type is None:
-            continue
-        if contact_type == "friend" and not include_friends:
-            continue
-        if contact_type == "group" and not include_groups:
-            continue
-        if contact_type == "official" and not include_officials:
-            continue
-
-        display_name = _pick_display_name(row, username)
-        if not display_name:
-            display_name = username
-
-        avatar_link = _normalize_text(_pick_avatar_url(row) or "")
-        avatar = base_url + _build_avatar_url(account_dir.name, username)
-        country = _normalize_text(row.get("country"))
-        province = _normalize_text(row.get("province"))
-        city = _normalize_text(row.get("city"))
-        source_scene = _to_optional_int(row.get("source_scene"))
-        gender = _to_int(row.get("gender"))
-        signature = _normalize_text(row.get("signature"))
-
-        item = {
-            "username": username,
-            "displayName": display_name,
-            "remark": _normalize_text(row.get("remark")),
-            "nickname": _normalize_text(row.get("nick_name")),
-            "alias": _normalize_text(row.get("alias")),
-            "gender": gender,
-            "signature": signature,
-            "type": contact_type,
-            "country": country,
-            "province": province,
-            "city": city,
-            "region": _build_region(country, province, city),
-            "sourceScene": source_scene,
-            "source": _source_scene_label(source_scene),
-            "avatar": avatar,
-            "avatarLink": avatar_link,
-            "_sortTs": _to_int(session_ts_map.get(username, 0)),
-        }
+    directory = _get_contact_directory(account_dir)
+    session_ts_map, session_group_usernames = _get_session_info(account_dir)
+    allowed_types = {
+        t
+        for t, on in (("friend", include_friends), ("group", include_groups), ("official", include_officials))
+        if on
+    }
 
-        if not _matches_keyword(item, keyword or ""):
+    # (sort key, item) pairs; items are shallow copies so the cached entries stay untouched.
+    ranked: list[tuple[tuple[int, str, str], dict[str, Any]]] = []
+    for idx in directory.search(keyword):
+        entry = directory.entries[idx]
+        if entry["type"] not in allowed_types:
             continue
-        contacts.append(item)
+        item = dict(entry)
+        item["avatar"] = base_url + entry["avatar"]
+        name_l, user_l = directory.sort_names[idx]
+        ranked.append(((-_to_int(session_ts_map.get(entry["username"], 0)), name_l, user_l), item))
 
     if include_groups:
         for username in session_group_usernames:
-            if username in contact_rows:
+            if username in directory.known_usernames:
                 continue
             if not _is_valid_contact_username(username):
                 continue
 
-            avatar_link = ""
-            avatar = base_url + _build_avatar_url(account_dir.name, username)
-
             item = {
                 "username": username,
                 "displayName": username,
@@ -611,28 +755,19 @@ def _collect_contacts_for_account(
                 "region": "",
                 "sourceScene": None,
                 "source": "",
-                "avatar": avatar,
-                "avatarLink": avatar_link,
-                "_sortTs": _to_int(session_ts_map.get(username, 0)),
+                "avatar": base_url + _build_avatar_url(account_dir.name, username),
+                "avatarLink": "",
             }
 
             if not _matches_keyword(item, keyword or ""):
                 continue
-            contacts.append(item)
-
-    contacts.sort(
-        key=lambda x: (
-            -_to_int(x.get("_sortTs", 0)),
-            _normalize_text(x.get("displayName", "")).lower(),
-            _normalize_text(x.get("username", "")).lower(),
-        )
-    )
-    for item in contacts:
-        item.pop("_sortTs", None)
-        name_for_pinyin = _normalize_text(item.get("displayName")) or _normalize_text(item.get("username"))
-        item["pinyinKey"] = _build_contact_pinyin_key(name_for_pinyin)
-        item["pinyinInitial"] = _build_contact_pinyin_initial(name_for_pinyin)
-    return contacts
+            item["pinyinKey"] = _build_contact_pinyin_key(username)
+            item["pinyinInitial"] = _build_contact_pinyin_initial(username)
+            sort_key = (-_to_int(session_ts_map.get(username, 0)), username.lower(), username.lower())
+            ranked.append((sort_key, item))
+
+    ranked.sort(key=lambda x: x[0])
+    return [item for _, item in ranked]
 
 
 def _build_counts(contacts: list[dict[str, Any]]) -> dict[str, int]:
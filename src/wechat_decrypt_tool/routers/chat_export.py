@@ -1,18 +1,21 @@
 import asyncio
 import json
 import time
+from pathlib import Path
 from typing import Literal, Optional
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+from ..chat_export_chain import merge_export_chain
 from ..chat_export_service import CHAT_EXPORT_MANAGER
+from ..executors import run_io
 from ..path_fix import PathFixRoute
 
 router = APIRouter(route_class=PathFixRoute)
 
-ExportFormat = Literal["json", "txt", "html"]
+ExportFormat = Literal["json", "ndjson", "txt", "html"]
 ExportScope = Literal["selected", "all", "groups", "singles"]
 MediaKind = Literal["image", "emoji", "video", "video_thumb", "voice", "file"]
 MessageType = Literal[
@@ -36,7 +39,7 @@ class ChatExportCreateRequest(BaseModel):
     account: Optional[str] = Field(None, description="账号目录名（可选，默认使用第一个）")
     scope: ExportScope = Field("selected", description="导出范围：selected=指定会话；all=全部；groups=仅群聊；singles=仅单聊")
     usernames: list[str] = Field(default_factory=list, description="会话 username 列表（scope=selected 时使用）")
-    format: ExportFormat = Field("json", description="导出格式：json/txt/html（zip 内每个会话一个文件；html 可离线打开 index.html 查看）")
+    format: ExportFormat = Field("json", description="导出格式：json/ndjson/txt/html（zip 内每个会话一个文件；ndjson 每行一条消息并附按天字节偏移索引；html 可离线打开 index.html 查看）")
     start_time: Optional[int] = Field(None, description="起始时间（Unix 秒，含）")
     end_time: Optional[int] = Field(None, description="结束时间（Unix 秒，含）")
     include_hidden: bool = Field(False, description="是否包含隐藏会话（scope!=selected 时）")
@@ -68,11 +71,28 @@ class ChatExportCreateRequest(BaseModel):
         description="隐私模式导出：隐藏会话/用户名/内容，不打包头像与媒体",
     )
     file_name: Optional[str] = Field(None, description="导出 zip 文件名（可选，不含/含 .zip 都可）")
+    base_export: Optional[str] = Field(
+        None,
+        description="增量导出：上一次导出的 exportId 或 zip 路径（仅 json/ndjson/txt）；只导出其后的新消息与新媒体",
+    )
+
+
+class ChatExportMergeRequest(BaseModel):
+    archives: list[str] = Field(..., description="增量导出链：exportId 或 zip 路径，按从旧到新排列（首个通常为全量导出）")
+    output_path: Optional[str] = Field(None, description="合并后 zip 路径（可选；默认与最后一个 zip 同目录，文件名加 _merged）")
 
 
 @router.post("/api/chat/exports", summary="创建聊天记录导出任务（离线 zip）")
 async def create_chat_export(req: ChatExportCreateRequest):
-    job = CHAT_EXPORT_MANAGER.create_job(
+    try:
+        job = _create_job(req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "job": job.to_public_dict()}
+
+
+def _create_job(req: ChatExportCreateRequest):
+    return CHAT_EXPORT_MANAGER.create_job(
         account=req.account,
         scope=req.scope,
         usernames=req.usernames,
@@ -90,8 +110,22 @@ async def create_chat_export(req: ChatExportCreateRequest):
         html_page_size=req.html_page_size,
         privacy_mode=req.privacy_mode,
         file_name=req.file_name,
+        base_export=req.base_export,
     )
-    return {"status": "success", "job": job.to_public_dict()}
+
+
+@router.post("/api/chat/exports/merge", summary="合并增量导出链为一个 zip")
+async def merge_chat_exports(req: ChatExportMergeRequest):
+    paths = [CHAT_EXPORT_MANAGER.resolve_zip_path(ref) for ref in req.archives if str(ref or "").strip()]
+    if not paths:
+        raise HTTPException(status_code=400, detail="No export archives to merge.")
+    out_path = Path(req.output_path) if str(req.output_path or "").strip() else paths[-1].with_name(f"{paths[-1].stem}_merged.zip")
+    if out_path.resolve() in {p.resolve() for p in paths}:
+        raise HTTPException(status_code=400, detail="Output path must differ from the merged archives.")
+    try:
+        return await run_io(merge_export_chain, paths, out_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/api/chat/exports", summary="列出导出任务（内存）")
@@ -1,8 +1,10 @@
 import asyncio
+import base64
 from functools import lru_cache
 import hashlib
 import html
 import ipaddress
+import json
 import mimetypes
 import os
 import sqlite3
@@ -24,6 +26,7 @@ from ..avatar_cache import (
     cache_key_for_avatar_user,
     cache_key_for_avatar_url,
     get_avatar_cache_url_entry,
+    get_avatar_cache_user_entries,
     get_avatar_cache_user_entry,
     is_avatar_cache_enabled,
     normalize_avatar_source_url,
@@ -31,9 +34,9 @@ from ..avatar_cache import (
     upsert_avatar_cache_entry,
     write_avatar_cache_payload,
 )
+from ..executors import run_cpu, run_io
 from ..logging_config import get_logger
 from ..media_helpers import (
-    _convert_silk_to_browser_audio,
     _decrypt_emoticon_aes_cbc,
     _detect_image_extension,
     _detect_image_media_type,
@@ -60,6 +63,7 @@ from ..media_helpers import (
 )
 from ..chat_helpers import _extract_md5_from_packed_info, _load_contact_rows, _pick_avatar_url
 from ..path_fix import PathFixRoute
+from ..voice_transcode_cache import transcode_conversation_voices, transcode_voice_cached
 from ..wcdb_realtime import WCDB_REALTIME, get_avatar_urls as _wcdb_get_avatar_urls
 
 logger = get_logger(__name__)
@@ -319,13 +323,13 @@ def _fast_probe_video_path_by_md5(
     return None
 
 
-@router.get("/api/chat/avatar", summary="获取联系人头像")
-async def get_chat_avatar(username: str, account: Optional[str] = None):
-    if not username:
-        raise HTTPException(status_code=400, detail="Missing username.")
+def _load_local_chat_avatar(
+    account: Optional[str], username: str, user_key: str
+) -> tuple[Path, Optional[Response], Optional[dict], Optional[Path]]:
+    """Avatar from the on-disk cache or head_image.db; also returns the user cache entry for the remote fallback."""
+
     account_dir = _resolve_account_dir(account)
     account_name = str(account_dir.name or "").strip()
-    user_key = str(username or "").strip()
 
     # 1) Try on-disk cache first (fast path)
     user_entry = None
@@ -344,10 +348,15 @@ async def get_chat_avatar(username: str, account: Optional[str] = None):
         # No local head_image.db: allow fallback from cached/remote URL path.
         if cached_file is not None and user_entry:
             headers = build_avatar_cache_response_headers(user_entry)
-            return FileResponse(
-                str(cached_file),
-                media_type=str(user_entry.get("media_type") or "application/octet-stream"),
-                headers=headers,
+            return (
+                account_dir,
+                FileResponse(
+                    str(cached_file),
+                    media_type=str(user_entry.get("media_type") or "application/octet-stream"),
+                    headers=headers,
+                ),
+                user_entry,
+                cached_file,
             )
         raise HTTPException(status_code=404, detail="head_image.db not found.")
 
@@ -374,11 +383,12 @@ async def get_chat_avatar(username: str, account: Optional[str] = None):
                 if cached_md5 == db_md5 and cached_update == db_update_time:
                     touch_avatar_cache_entry(account_name, str(user_entry.get("cache_key") or ""))
                     headers = build_avatar_cache_response_headers(user_entry)
-                    return FileResponse(
+                    resp = FileResponse(
                         str(cached_file),
                         media_type=str(user_entry.get("media_type") or "application/octet-stream"),
                         headers=headers,
                     )
+                    return account_dir, resp, user_entry, cached_file
 
             # Refresh from blob (changed or first-load)
             row = conn.execute(
@@ -407,21 +417,37 @@ async def get_chat_avatar(username: str, account: Optional[str] = None):
                             f"[avatar_cache_download] kind=user account={account_name} username={user_key} src=head_image"
                         )
                         headers = build_avatar_cache_response_headers(entry)
-                        return FileResponse(str(out_path), media_type=media_type, headers=headers)
+                        resp = FileResponse(str(out_path), media_type=media_type, headers=headers)
+                        return account_dir, resp, user_entry, cached_file
 
                     # cache write failed: fallback to response bytes
                     logger.warning(
                         f"[avatar_cache_error] kind=user account={account_name} username={user_key} action=write_fallback"
                     )
-                    return Response(content=bytes(data), media_type=media_type)
+                    return account_dir, Response(content=bytes(data), media_type=media_type), user_entry, cached_file
 
         # meta not found (no local avatar blob)
         row = None
     finally:
         conn.close()
+    return account_dir, None, user_entry, cached_file
+
+
+@router.get("/api/chat/avatar", summary="获取联系人头像")
+async def get_chat_avatar(username: str, account: Optional[str] = None):
+    if not username:
+        raise HTTPException(status_code=400, detail="Missing username.")
+    user_key = str(username or "").strip()
+
+    account_dir, local_resp, user_entry, cached_file = await run_io(
+        _load_local_chat_avatar, account, username, user_key
+    )
+    account_name = str(account_dir.name or "").strip()
+    if local_resp is not None:
+        return local_resp
 
     # 2) Fallback: remote avatar URL (contact/WCDB), cache by URL.
-    remote_url = _resolve_avatar_remote_url(account_dir=account_dir, username=user_key)
+    remote_url = await run_io(_resolve_avatar_remote_url, account_dir=account_dir, username=user_key)
     if remote_url and is_avatar_cache_enabled():
         url_entry = get_avatar_cache_url_entry(account_name, remote_url)
         url_file = avatar_cache_entry_file_exists(account_name, url_entry)
@@ -629,6 +655,190 @@ async def get_chat_avatar(username: str, account: Optional[str] = None):
     raise HTTPException(status_code=404, detail="Avatar not found.")
 
 
+AVATAR_BATCH_MAX = 200
+
+
+class AvatarBatchRequest(BaseModel):
+    account: Optional[str] = Field(None, description="账号目录名（可选，默认使用第一个）")
+    usernames: list[str] = Field(..., description=f"联系人/群聊 username 列表（最多 {AVATAR_BATCH_MAX} 个）")
+    format: str = Field("json", description="json：base64 data URL；packed：清单 + 连续图片字节（二进制）")
+
+
+def _load_chat_avatars_batch(
+    account: Optional[str], usernames: list[str]
+) -> tuple[Path, list[dict[str, Any]], list[str]]:
+    """Avatars for many users with one avatar-cache query and one head_image.db connection.
+
+    Cached files whose source md5/update_time still match head_image are served as-is; changed or
+    uncached blobs are read in a single query and written to the cache. Users without a local blob
+    (remote-URL avatars) are reported as missing so the client can fall back to `/api/chat/avatar`.
+    """
+
+    account_dir = _resolve_account_dir(account)
+    account_name = str(account_dir.name or "").strip()
+    entries = get_avatar_cache_user_entries(account_name, usernames)
+
+    found: dict[str, dict[str, Any]] = {}
+    missing: list[str] = []
+
+    head_image_db_path = account_dir / "head_image.db"
+    conn = sqlite3.connect(str(head_image_db_path)) if head_image_db_path.exists() else None
+    try:
+        meta: dict[str, tuple[str, int]] = {}
+        if conn is not None:
+            for i in range(0, len(usernames), 500):
+                chunk = usernames[i : i + 500]
+                placeholders = ",".join(["?"] * len(chunk))
+                # Ascending update_time: the newest row per username wins.
+                for u, md5, update_time in conn.execute(
+                    f"SELECT username, md5, update_time FROM head_image WHERE username IN ({placeholders}) "
+                    "ORDER BY update_time ASC",
+                    chunk,
+                ).fetchall():
+                    try:
+                        ts = int(update_time or 0)
+                    except Exception:
+                        ts = 0
+                    meta[str(u)] = (str(md5 or "").strip().lower(), ts)
+
+        stale: list[str] = []
+        for u in usernames:
+            entry = entries.get(u)
+            cached_file = avatar_cache_entry_file_exists(account_name, entry) if entry else None
+            m = meta.get(u)
+            if cached_file is not None and entry:
+                cached_md5 = str(entry.get("source_md5") or "").strip().lower()
+                try:
+                    cached_update = int(entry.get("source_update_time") or 0)
+                except Exception:
+                    cached_update = 0
+                if m is None or (cached_md5 == m[0] and cached_update == m[1]):
+                    try:
+                        found[u] = {
+                            "data": cached_file.read_bytes(),
+                            "mediaType": str(entry.get("media_type") or "application/octet-stream"),
+                            "etag": str(entry.get("etag") or ""),
+                        }
+                        continue
+                    except Exception:
+                        pass
+            if m is not None:
+                stale.append(u)
+            else:
+                missing.append(u)
+
+        if stale and conn is not None:
+            blobs: dict[str, bytes] = {}
+            for i in range(0, len(stale), 500):
+                chunk = stale[i : i + 500]
+                placeholders = ",".join(["?"] * len(chunk))
+                for u, buf in conn.execute(
+                    f"SELECT username, image_buffer FROM head_image WHERE username IN ({placeholders}) "
+                    "ORDER BY update_time ASC",
+                    chunk,
+                ).fetchall():
+                    if buf is not None:
+                        blobs[str(u)] = bytes(buf)
+            for u in stale:
+                data = blobs.get(u) or b""
+                if not data:
+                    missing.append(u)
+                    continue
+                media_type = _detect_image_media_type(data)
+                media_type = media_type if media_type.startswith("image/") else "application/octet-stream"
+                md5, update_time = meta[u]
+                entry, _out_path = write_avatar_cache_payload(
+                    account_name,
+                    source_kind="user",
+                    username=u,
+                    payload=data,
+                    media_type=media_type,
+                    source_md5=md5,
+                    source_update_time=update_time,
+                    ttl_seconds=AVATAR_CACHE_TTL_SECONDS,
+                )
+                found[u] = {"data": data, "mediaType": media_type, "etag": str((entry or {}).get("etag") or "")}
+    finally:
+        if conn is not None:
+            conn.close()
+
+    items = [{"username": u, **found[u]} for u in usernames if u in found]
+    missing_set = set(missing)
+    return account_dir, items, [u for u in usernames if u in missing_set]
+
+
+def _pack_avatar_batch(account: str, items: list[dict[str, Any]], missing: list[str]) -> bytes:
+    """`<u32 big-endian manifest length><manifest JSON><image bytes...>`; offsets are relative to the image bytes."""
+
+    manifest: list[dict[str, Any]] = []
+    offset = 0
+    for it in items:
+        size = len(it["data"])
+        manifest.append(
+            {
+                "username": it["username"],
+                "offset": offset,
+                "length": size,
+                "mediaType": it["mediaType"],
+                "etag": it["etag"],
+            }
+        )
+        offset += size
+    head = json.dumps(
+        {"account": account, "avatars": manifest, "missing": missing}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    return b"".join([len(head).to_bytes(4, "big"), head, *(it["data"] for it in items)])
+
+
+@router.post("/api/chat/avatars", summary="批量获取联系人头像")
+async def get_chat_avatars_batch(request: AvatarBatchRequest):
+    """一次请求返回多个头像（会话列表/联系人页使用），避免逐个请求 `/api/chat/avatar`。
+
+    - format=json：`avatars[].dataUrl` 为 base64 data URL
+    - format=packed：`application/octet-stream`，4 字节大端清单长度 + 清单 JSON + 连续图片字节（按 offset/length 切分）
+    - `missing` 中的用户没有本地头像（远程 URL 头像），前端应回退到 `/api/chat/avatar`
+    """
+
+    fmt = str(request.format or "json").strip().lower()
+    if fmt not in {"json", "packed"}:
+        raise HTTPException(status_code=400, detail="Invalid format, use json or packed.")
+
+    usernames: list[str] = []
+    seen: set[str] = set()
+    for u in request.usernames or []:
+        u = str(u or "").strip()
+        if u and u not in seen:
+            seen.add(u)
+            usernames.append(u)
+    if not usernames:
+        raise HTTPException(status_code=400, detail="Missing usernames.")
+    if len(usernames) > AVATAR_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many usernames (max {AVATAR_BATCH_MAX}).")
+
+    account_dir, items, missing = await run_io(_load_chat_avatars_batch, request.account, usernames)
+
+    if fmt == "packed":
+        return Response(
+            content=_pack_avatar_batch(account_dir.name, items, missing),
+            media_type="application/octet-stream",
+        )
+
+    return {
+        "status": "success",
+        "account": account_dir.name,
+        "avatars": [
+            {
+                "username": it["username"],
+                "mediaType": it["mediaType"],
+                "etag": it["etag"],
+                "dataUrl": f"data:{it['mediaType']};base64,{base64.b64encode(it['data']).decode('ascii')}",
+            }
+            for it in items
+        ],
+        "missing": missing,
+    }
+
+
 class EmojiDownloadRequest(BaseModel):
     account: Optional[str] = Field(None, description="账号目录名（可选，默认使用第一个）")
     md5: str = Field(..., description="表情 MD5")
@@ -1296,6 +1506,48 @@ async def get_chat_image(
     if md5 and (not file_id) and (not _is_valid_md5(str(md5))):
         file_id = str(md5)
         md5 = None
+
+    # Lookup (sqlite + filesystem) runs on the I/O pool, decoding/decryption on the CPU pool.
+    account_dir, located = await run_io(
+        _locate_chat_image,
+        account,
+        md5=md5,
+        file_id=file_id,
+        server_id=server_id,
+        username=username,
+        deep_scan=deep_scan,
+    )
+    if isinstance(located, Response):
+        return located
+    md5, candidates, wxid_dir = located
+
+    data, media_type, chosen = await run_cpu(
+        _decode_chat_image_candidates, candidates, account_dir=account_dir, wxid_dir=wxid_dir
+    )
+    if not chosen:
+        raise HTTPException(status_code=422, detail="Image found but failed to decode/decrypt.")
+
+    # 仅在 md5 有效时缓存到 resource 目录；file_id 可能非常长，避免写入超长文件名
+    if md5 and media_type.startswith("image/"):
+        await run_io(_store_decrypted_chat_image, account_dir, str(md5).lower(), data)
+
+    logger.info(
+        f"chat_image: md5={md5} file_id={file_id} chosen={chosen} media_type={media_type} bytes={len(data)}"
+    )
+    return Response(content=data, media_type=media_type)
+
+
+def _locate_chat_image(
+    account: Optional[str],
+    *,
+    md5: Optional[str],
+    file_id: Optional[str],
+    server_id: Optional[int],
+    username: Optional[str],
+    deep_scan: bool,
+):
+    """`(account_dir, located)`: `located` is a cached `Response` or `(md5, ordered_candidates, wxid_dir)`."""
+
     account_dir = _resolve_account_dir(account)
 
     # Prefer resource md5 derived from message_resource.db for chat history / app messages.
@@ -1318,7 +1570,7 @@ async def get_chat_image(
             data = decrypted_path.read_bytes()
             media_type = _detect_image_media_type(data[:32])
             if media_type != "application/octet-stream" and _is_probably_valid_image(data, media_type):
-                return Response(content=data, media_type=media_type)
+                return account_dir, Response(content=data, media_type=media_type)
             # Corrupted cached file (e.g. wrong ext / partial data): remove and regenerate from source.
             try:
                 if decrypted_path.suffix.lower() in {".jpg", ".jpeg", ".png", ".gif", ".webp"}:
@@ -1420,10 +1672,14 @@ async def get_chat_image(
     candidates = _order_media_candidates(candidates)
 
     logger.info(f"chat_image: md5={md5} file_id={file_id} candidates={len(candidates)} first={p}")
+    return account_dir, (md5, candidates, wxid_dir)
 
+
+def _decode_chat_image_candidates(
+    candidates: list[Path], *, account_dir: Path, wxid_dir: Optional[Path]
+) -> tuple[bytes, str, Optional[Path]]:
     data = b""
     media_type = "application/octet-stream"
-    chosen: Optional[Path] = None
     for src_path in candidates:
         try:
             data, media_type = _read_and_maybe_decrypt_media(src_path, account_dir=account_dir, weixin_root=wxid_dir)
@@ -1434,28 +1690,19 @@ async def get_chat_image(
             continue
 
         if media_type != "application/octet-stream":
-            chosen = src_path
-            break
-
-    if not chosen:
-        raise HTTPException(status_code=422, detail="Image found but failed to decode/decrypt.")
+            return data, media_type, src_path
+    return data, media_type, None
 
-    # 仅在 md5 有效时缓存到 resource 目录；file_id 可能非常长，避免写入超长文件名
-    if md5 and media_type.startswith("image/"):
-        try:
-            out_md5 = str(md5).lower()
-            ext = _detect_image_extension(data)
-            out_path = _get_decrypted_resource_path(account_dir, out_md5, ext)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            if not out_path.exists():
-                out_path.write_bytes(data)
-        except Exception:
-            pass
 
-    logger.info(
-        f"chat_image: md5={md5} file_id={file_id} chosen={chosen} media_type={media_type} bytes={len(data)}"
-    )
-    return Response(content=data, media_type=media_type)
+def _store_decrypted_chat_image(account_dir: Path, md5: str, data: bytes) -> None:
+    try:
+        ext = _detect_image_extension(data)
+        out_path = _get_decrypted_resource_path(account_dir, md5, ext)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if not out_path.exists():
+            out_path.write_bytes(data)
+    except Exception:
+        pass
 
 
 @router.get("/api/chat/media/emoji", summary="获取表情消息资源")
@@ -1762,7 +2009,7 @@ async def get_chat_voice(server_id: int, account: Optional[str] = None):
     if not isinstance(data, (bytes, bytearray)):
         data = bytes(data)
 
-    payload, ext, media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+    payload, ext, media_type = await run_cpu(transcode_voice_cached, account_dir, data, preferred_format="mp3")
     if payload and ext != "silk":
         return Response(
             content=payload,
@@ -1778,6 +2025,16 @@ async def get_chat_voice(server_id: int, account: Optional[str] = None):
     )
 
 
+@router.post("/api/chat/media/voice/transcode", summary="批量转码会话中的语音消息（写入本地缓存）")
+async def transcode_chat_voices(username: str, account: Optional[str] = None, workers: Optional[int] = None):
+    if not str(username or "").strip():
+        raise HTTPException(status_code=400, detail="Missing username.")
+    # A whole conversation can hold a worker for a long time (in-process when workers=0): CPU pool, not the I/O one.
+    return await run_cpu(
+        lambda: transcode_conversation_voices(_resolve_account_dir(account), str(username).strip(), workers=workers)
+    )
+
+
 @router.post("/api/chat/media/open_folder", summary="在资源管理器中打开媒体文件所在位置")
 async def open_chat_media_folder(
     kind: str,
@@ -1821,7 +2078,7 @@ async def open_chat_media_folder(
         if not isinstance(data, (bytes, bytearray)):
             data = bytes(data)
 
-        payload, ext, _media_type = _convert_silk_to_browser_audio(data, preferred_format="mp3")
+        payload, ext, _media_type = transcode_voice_cached(account_dir, data, preferred_format="mp3")
         if not payload:
             payload = data
             ext = "silk"
@@ -10,8 +10,12 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from starlette.responses import StreamingResponse
 
+from ..account_registry import ACCOUNT_REGISTRY
+from ..chat_search_index import refresh_chat_search_index_shards
+from ..rendered_message_cache import drop_rendered_account
 from ..app_paths import get_output_databases_dir
 from ..logging_config import get_logger
+from ..message_shard_directory import build_message_shard_directory
 from ..path_fix import PathFixRoute
 from ..key_store import upsert_account_keys_in_store
 from ..wechat_decrypt import WeChatDatabaseDecryptor, decrypt_wechat_databases, scan_account_databases_from_path
@@ -254,6 +258,10 @@ async def decrypt_databases_stream(
                 if overall_current % 5 == 0:
                     await asyncio.sleep(0)
 
+            # Decrypted files are rewritten in place; drop cached account/path state and rendered rows for this account.
+            ACCOUNT_REGISTRY.invalidate(account)
+            drop_rendered_account(account)
+
             account_results[account] = {
                 "total": len(dbs),
                 "success": account_success,
@@ -300,6 +308,22 @@ async def decrypt_databases_stream(
                 except Exception as e:
                     account_results[account]["session_last_message"] = {"status": "error", "message": str(e)}
 
+            # Conversation -> message DB directory, so chat queries don't probe every shard.
+            try:
+                account_results[account]["message_shard_directory"] = await asyncio.to_thread(
+                    build_message_shard_directory, account_output_dir, rebuild=True
+                )
+            except Exception as e:
+                account_results[account]["message_shard_directory"] = {"status": "error", "message": str(e)}
+
+            # Re-decrypted message DBs: rebuild their shards of an existing (sharded) search index.
+            try:
+                refresh_chat_search_index_shards(
+                    account_output_dir, [Path(x).stem for x in account_processed], force=True
+                )
+            except Exception as e:
+                logger.warning(f"刷新搜索索引分片失败: {account}: {e}")
+
         status = "completed" if success_count > 0 else "failed"
         result = {
             "status": status,
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 
+from ..executors import run_cpu, run_io
 from ..logging_config import get_logger
 from ..media_helpers import (
     _collect_all_dat_files,
@@ -85,6 +86,42 @@ async def save_media_keys_api(request: MediaKeysSaveRequest):
     }
 
 
+def _decrypt_dat_files(
+    dat_files: list, account_dir, xor_key_int: int, aes_key16: Optional[bytes]
+) -> tuple[int, int, int, list[dict]]:
+    success_count = 0
+    skip_count = 0
+    fail_count = 0
+    failed_files: list[dict] = []
+
+    for dat_path, md5 in dat_files:
+        # 检查是否已解密
+        existing = _try_find_decrypted_resource(account_dir, md5)
+        if existing:
+            skip_count += 1
+            continue
+
+        # 解密并保存
+        success, msg = _decrypt_and_save_resource(
+            dat_path, md5, account_dir, xor_key_int, aes_key16
+        )
+
+        if success:
+            success_count += 1
+        else:
+            fail_count += 1
+            if len(failed_files) < 100:  # 只记录前100个失败
+                failed_files.append(
+                    {
+                        "file": str(dat_path),
+                        "md5": md5,
+                        "error": msg,
+                    }
+                )
+
+    return success_count, skip_count, fail_count, failed_files
+
+
 @router.post("/api/media/decrypt_all", summary="批量解密所有图片资源")
 async def decrypt_all_media(request: MediaDecryptRequest):
     """批量解密所有图片资源到 output/databases/{账号}/resource 目录
@@ -140,7 +177,7 @@ async def decrypt_all_media(request: MediaDecryptRequest):
 
     # 收集所有.dat文件
     logger.info(f"开始扫描 {wxid_dir} 中的.dat文件...")
-    dat_files = _collect_all_dat_files(wxid_dir)
+    dat_files = await run_io(_collect_all_dat_files, wxid_dir)
     total_files = len(dat_files)
     logger.info(f"共发现 {total_files} 个.dat文件")
 
@@ -156,38 +193,12 @@ async def decrypt_all_media(request: MediaDecryptRequest):
         }
 
     # 开始解密
-    success_count = 0
-    skip_count = 0
-    fail_count = 0
-    failed_files: list[dict] = []
-
     resource_dir = _get_resource_dir(account_dir)
     resource_dir.mkdir(parents=True, exist_ok=True)
 
-    for dat_path, md5 in dat_files:
-        # 检查是否已解密
-        existing = _try_find_decrypted_resource(account_dir, md5)
-        if existing:
-            skip_count += 1
-            continue
-
-        # 解密并保存
-        success, msg = _decrypt_and_save_resource(
-            dat_path, md5, account_dir, xor_key_int, aes_key16
-        )
-
-        if success:
-            success_count += 1
-        else:
-            fail_count += 1
-            if len(failed_files) < 100:  # 只记录前100个失败
-                failed_files.append(
-                    {
-                        "file": str(dat_path),
-                        "md5": md5,
-                        "error": msg,
-                    }
-                )
+    success_count, skip_count, fail_count, failed_files = await run_cpu(
+        _decrypt_dat_files, dat_files, account_dir, xor_key_int, aes_key16
+    )
 
     logger.info(f"解密完成: 成功={success_count}, 跳过={skip_count}, 失败={fail_count}")
 
@@ -214,12 +225,12 @@ async def get_decrypted_resource(md5: str, account: Optional[str] = None):
         raise HTTPException(status_code=400, detail="无效的MD5")
 
     account_dir = _resolve_account_dir(account)
-    p = _try_find_decrypted_resource(account_dir, md5.lower())
+    p = await run_io(_try_find_decrypted_resource, account_dir, md5.lower())
 
     if not p:
         raise HTTPException(status_code=404, detail="资源未找到，请先执行批量解密")
 
-    data = p.read_bytes()
+    data = await run_io(p.read_bytes)
     media_type = _detect_image_media_type(data[:32])
     return Response(content=data, media_type=media_type)
 
@@ -0,0 +1,177 @@
+"""Backend cold-start profiling (per-module import time).
+
+Usage:
+    uv run python -m wechat_decrypt_tool.startup_profile --top 30
+    uv run python -m wechat_decrypt_tool.startup_profile --budget-ms 2500 --json
+
+Runs a fresh interpreter with `-X importtime`, imports the target module (default: `wechat_decrypt_tool.api`)
+and reports the slowest modules by cumulative/self time. `main.py` runs the same report before starting
+uvicorn when `WECHAT_TOOL_PROFILE_STARTUP=1`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MODULE = "wechat_decrypt_tool.api"
+
+# `import time: self [us] | cumulative | imported package`
+_IMPORTTIME_RE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S.*)$")
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupProfile:
+    module: str
+    wall_ms: float
+    returncode: int
+    imports: list[ImportTiming] = field(default_factory=list)
+    stderr_tail: str = ""
+
+    @property
+    def import_ms(self) -> float:
+        """Cumulative import time of the target module itself (excludes interpreter boot)."""
+
+        for item in self.imports:
+            if item.module == self.module:
+                return item.cumulative_us / 1000.0
+        return 0.0
+
+    def loaded_modules(self) -> set[str]:
+        return {item.module for item in self.imports}
+
+    def top(self, n: int = 25, *, key: str = "cumulative") -> list[ImportTiming]:
+        if key == "self":
+            ordered = sorted(self.imports, key=lambda x: x.self_us, reverse=True)
+        else:
+            ordered = sorted(self.imports, key=lambda x: x.cumulative_us, reverse=True)
+        return ordered[: max(0, int(n))]
+
+    def to_dict(self, *, top_n: int = 25) -> dict:
+        return {
+            "module": self.module,
+            "wallMs": round(self.wall_ms, 1),
+            "importMs": round(self.import_ms, 1),
+            "returncode": int(self.returncode),
+            "moduleCount": len(self.imports),
+            "top": [
+                {
+                    "module": t.module,
+                    "selfMs": round(t.self_us / 1000.0, 2),
+                    "cumulativeMs": round(t.cumulative_us / 1000.0, 2),
+                }
+                for t in self.top(top_n)
+            ],
+        }
+
+
+def parse_importtime(text: str) -> list[ImportTiming]:
+    out: list[ImportTiming] = []
+    for line in str(text or "").splitlines():
+        m = _IMPORTTIME_RE.match(line.rstrip())
+        if not m:
+            continue
+        indent = len(m.group(3) or "")
+        out.append(
+            ImportTiming(
+                module=m.group(4).strip(),
+                self_us=int(m.group(1)),
+                cumulative_us=int(m.group(2)),
+                depth=max(0, (indent - 1) // 2),
+            )
+        )
+    return out
+
+
+def _src_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def profile_cold_import(
+    module: str = DEFAULT_MODULE,
+    *,
+    python: Optional[str] = None,
+    env: Optional[dict[str, str]] = None,
+    timeout_s: float = 120.0,
+) -> StartupProfile:
+    """Import `module` in a fresh interpreter and collect `-X importtime` output."""
+
+    run_env = dict(os.environ)
+    if env:
+        run_env.update(env)
+    src = str(_src_dir())
+    prev = run_env.get("PYTHONPATH", "")
+    run_env["PYTHONPATH"] = src + (os.pathsep + prev if prev else "")
+
+    cmd = [python or sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, env=run_env, capture_output=True, text=True, timeout=timeout_s)
+    wall_ms = (time.perf_counter() - t0) * 1000.0
+
+    stderr = str(proc.stderr or "")
+    tail = "\n".join([ln for ln in stderr.splitlines() if not ln.startswith("import time:")][-20:])
+    return StartupProfile(
+        module=module,
+        wall_ms=wall_ms,
+        returncode=int(proc.returncode),
+        imports=parse_importtime(stderr),
+        stderr_tail=tail,
+    )
+
+
+def format_report(profile: StartupProfile, *, top_n: int = 25) -> str:
+    lines = [
+        f"[startup-profile] module={profile.module} import_ms={profile.import_ms:.1f} "
+        f"wall_ms={profile.wall_ms:.1f} modules={len(profile.imports)}",
+        f"{'cumulative ms':>14} {'self ms':>10}  module",
+    ]
+    for t in profile.top(top_n):
+        lines.append(f"{t.cumulative_us / 1000.0:>14.1f} {t.self_us / 1000.0:>10.1f}  {t.module}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report per-module import time for backend cold start.")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="Exit with code 1 when import time exceeds this.")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table.")
+    args = parser.parse_args(argv)
+
+    profile = profile_cold_import(args.module)
+    if profile.returncode != 0:
+        print(profile.stderr_tail, file=sys.stderr)
+        return profile.returncode or 1
+
+    if args.json:
+        print(json.dumps(profile.to_dict(top_n=args.top), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(profile, top_n=args.top))
+
+    if args.budget_ms > 0 and profile.import_ms > args.budget_ms:
+        print(
+            f"[startup-profile] over budget: {profile.import_ms:.1f}ms > {args.budget_ms:.1f}ms",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
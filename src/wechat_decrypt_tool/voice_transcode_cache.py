@@ -0,0 +1,303 @@
+"""Content-addressed cache of voice messages transcoded for browsers.
+
+WeChat stores voice messages as SILK in `media_0.db.VoiceInfo`. Playing one means SILK -> WAV (pilk) and WAV -> MP3
+(an ffmpeg subprocess); the chat page, "open folder" and every export used to redo that on each request. Outputs are
+kept under the account's resource directory, keyed by the md5 of the SILK bytes:
+
+    <account_dir>/resource/voice/<md5[:2]>/<md5>.mp3   (or .wav when ffmpeg is unavailable)
+
+Failed conversions (raw SILK fallback) are never stored, so installing pilk/ffmpeg later takes effect.
+`transcode_conversation_voices` pre-fills the cache for a whole conversation, chunk by chunk, using worker processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from .chat_helpers import _quote_ident, _resolve_msg_table_name
+from .logging_config import get_logger
+from .media_helpers import _convert_silk_to_browser_audio, _find_ffmpeg_executable, _get_resource_dir
+from .message_shard_directory import conversation_message_db_paths
+from .request_metrics import record_cache
+
+logger = get_logger(__name__)
+
+_MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+_VOICE_LOCAL_TYPE = 34
+_MAX_WORKERS = 32
+
+
+def _env_int(name: str, default: int, *, min_v: int, max_v: int) -> int:
+    raw = str(os.environ.get(name, "") or "").strip()
+    try:
+        v = int(raw)
+    except Exception:
+        v = int(default)
+    return max(min_v, min(max_v, v))
+
+
+def get_voice_cache_dir(account_dir: Path) -> Path:
+    return _get_resource_dir(Path(account_dir)) / "voice"
+
+
+def _voice_key(voice_data: bytes) -> str:
+    return hashlib.md5(bytes(voice_data)).hexdigest()
+
+
+def _cache_path(account_dir: Path, key: str, ext: str) -> Path:
+    return get_voice_cache_dir(account_dir) / key[:2] / f"{key}.{ext}"
+
+
+def _as_bytes(value: Any) -> bytes:
+    if isinstance(value, (memoryview, bytearray)):
+        return bytes(value)
+    if isinstance(value, bytes):
+        return value
+    return bytes(value or b"")
+
+
+def load_transcoded_voice(
+    account_dir: Path,
+    voice_data: bytes,
+    *,
+    preferred_format: str = "mp3",
+) -> Optional[tuple[bytes, str, str]]:
+    """Cached `(payload, ext, media_type)` for `voice_data`, or None.
+
+    A cached WAV only counts for an MP3 request while ffmpeg is unavailable; otherwise the caller transcodes again
+    and the MP3 replaces it.
+    """
+
+    if not voice_data:
+        return None
+    key = _voice_key(voice_data)
+    exts = ["mp3", "wav"]
+    if str(preferred_format or "").strip().lower() == "mp3" and _find_ffmpeg_executable():
+        exts = ["mp3"]
+    for ext in exts:
+        p = _cache_path(account_dir, key, ext)
+        try:
+            payload = p.read_bytes()
+        except OSError:
+            continue
+        if payload:
+            return payload, ext, _MEDIA_TYPES[ext]
+    return None
+
+
+def store_transcoded_voice(account_dir: Path, voice_data: bytes, payload: bytes, ext: str) -> Optional[Path]:
+    """Persist a transcoding result. Best-effort; SILK fallbacks are ignored."""
+
+    if not voice_data or not payload or ext not in _MEDIA_TYPES:
+        return None
+    p = _cache_path(account_dir, _voice_key(voice_data), ext)
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(payload)
+        os.replace(tmp, p)
+        if ext == "mp3":
+            p.with_suffix(".wav").unlink(missing_ok=True)
+        return p
+    except Exception:
+        logger.warning("[voice_cache] store failed path=%s", p, exc_info=True)
+        try:
+            tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
+        return None
+
+
+def transcode_voice_cached(
+    account_dir: Path,
+    voice_data: bytes,
+    *,
+    preferred_format: str = "mp3",
+) -> tuple[bytes, str, str]:
+    """`_convert_silk_to_browser_audio` backed by the on-disk cache."""
+
+    data = _as_bytes(voice_data)
+    hit = load_transcoded_voice(account_dir, data, preferred_format=preferred_format)
+    record_cache("voice_transcode", hit=hit is not None)
+    if hit is not None:
+        return hit
+    payload, ext, media_type = _convert_silk_to_browser_audio(data, preferred_format=preferred_format)
+    if payload and ext != "silk":
+        store_transcoded_voice(account_dir, data, payload, ext)
+    return payload, ext, media_type
+
+
+def load_voice_data(media_db_path: Path, server_ids: Iterable[int]) -> dict[int, bytes]:
+    """{ server_id -> SILK bytes } from `media_0.db.VoiceInfo` (latest row per server id)."""
+
+    ids = list(dict.fromkeys(int(x) for x in server_ids if int(x or 0) > 0))
+    if not ids or not Path(media_db_path).exists():
+        return {}
+    out: dict[int, bytes] = {}
+    conn = sqlite3.connect(str(media_db_path))
+    try:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            placeholders = ",".join(["?"] * len(chunk))
+            try:
+                rows = conn.execute(
+                    f"SELECT svr_id, voice_data FROM VoiceInfo WHERE svr_id IN ({placeholders}) ORDER BY create_time ASC",
+                    chunk,
+                ).fetchall()
+            except Exception:
+                return out
+            for svr_id, voice_data in rows:
+                if voice_data is not None:
+                    out[int(svr_id)] = _as_bytes(voice_data)
+    finally:
+        conn.close()
+    return out
+
+
+def _conversation_voice_server_ids(
+    account_dir: Path,
+    username: str,
+    *,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+) -> list[int]:
+    where = "local_type = ? AND server_id > 0"
+    params: list[Any] = [_VOICE_LOCAL_TYPE]
+    if start_time is not None:
+        where += " AND create_time >= ?"
+        params.append(int(start_time))
+    if end_time is not None:
+        where += " AND create_time <= ?"
+        params.append(int(end_time))
+
+    out: list[int] = []
+    for db_path in conversation_message_db_paths(account_dir, username, start_time=start_time, end_time=end_time):
+        conn = sqlite3.connect(str(db_path))
+        try:
+            table = _resolve_msg_table_name(conn, username)
+            if not table:
+                continue
+            rows = conn.execute(f"SELECT server_id FROM {_quote_ident(table)} WHERE {where}", params).fetchall()
+            out.extend(int(r[0]) for r in rows)
+        except Exception:
+            logger.debug("[voice_cache] voice scan failed db=%s", db_path.name, exc_info=True)
+        finally:
+            conn.close()
+    return list(dict.fromkeys(out))
+
+
+def _transcode_worker(voice_data: bytes) -> tuple[bytes, str, str]:
+    # Module-level so it can be pickled into worker processes.
+    return _convert_silk_to_browser_audio(voice_data, preferred_format="mp3")
+
+
+def _transcode_workers(workers: Optional[int]) -> int:
+    if workers is None:
+        return _env_int("WECHAT_TOOL_VOICE_TRANSCODE_WORKERS", min(4, os.cpu_count() or 1), min_v=0, max_v=_MAX_WORKERS)
+    return max(0, min(_MAX_WORKERS, int(workers)))
+
+
+def transcode_conversation_voices(
+    account_dir: Path,
+    username: str,
+    *,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    workers: Optional[int] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+) -> dict[str, Any]:
+    """Transcode every not-yet-cached voice message of one conversation (optionally a create_time range) into the cache.
+
+    Conversions run in worker processes (`workers`, else `WECHAT_TOOL_VOICE_TRANSCODE_WORKERS`; clamped to 0..32,
+    0 = in-process) for chunks with at least `WECHAT_TOOL_VOICE_TRANSCODE_PROCESS_MIN` pending voices; pilk and the
+    ffmpeg round-trips are CPU-bound. Voices are loaded, converted and stored `WECHAT_TOOL_VOICE_TRANSCODE_CHUNK` at a
+    time so memory stays flat on long conversations; `should_cancel` is checked between chunks.
+    """
+
+    started = time.time()
+    account_dir = Path(account_dir)
+    server_ids = _conversation_voice_server_ids(account_dir, username, start_time=start_time, end_time=end_time)
+    workers = _transcode_workers(workers)
+    min_items = _env_int("WECHAT_TOOL_VOICE_TRANSCODE_PROCESS_MIN", 8, min_v=1, max_v=1_000_000)
+    chunk_size = _env_int("WECHAT_TOOL_VOICE_TRANSCODE_CHUNK", 64, min_v=1, max_v=10_000)
+
+    voices = 0
+    cached = 0
+    transcoded = 0
+    failed = 0
+    cancelled = False
+    pool: Optional[ProcessPoolExecutor] = None
+    pool_broken = False
+    seen: set[str] = set()
+    try:
+        for i in range(0, len(server_ids), chunk_size):
+            if should_cancel is not None and should_cancel():
+                cancelled = True
+                break
+            chunk = load_voice_data(account_dir / "media_0.db", server_ids[i : i + chunk_size])
+            voices += len(chunk)
+            pending: dict[str, bytes] = {}
+            for data in chunk.values():
+                key = _voice_key(data)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if load_transcoded_voice(account_dir, data) is not None:
+                    cached += 1
+                else:
+                    pending[key] = data
+            items = list(pending.values())
+            if not items:
+                continue
+
+            results: Optional[list[tuple[bytes, str, str]]] = None
+            if workers > 0 and len(items) >= min_items and not pool_broken:
+                try:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=workers)
+                    results = list(pool.map(_transcode_worker, items, chunksize=4))
+                except Exception:
+                    logger.exception("[voice_cache] worker pool failed; transcoding in-process")
+                    pool_broken = True
+                    results = None
+            if results is None:
+                results = [_transcode_worker(data) for data in items]
+
+            for data, (payload, ext, _media_type) in zip(items, results):
+                if payload and ext != "silk" and store_transcoded_voice(account_dir, data, payload, ext) is not None:
+                    transcoded += 1
+                else:
+                    failed += 1
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    used_workers = workers if (pool is not None and not pool_broken) else 0
+    duration = time.time() - started
+    logger.info(
+        "[voice_cache] conversation=%s voices=%s cached=%s transcoded=%s workers=%s cancelled=%s sec=%.2f",
+        username,
+        voices,
+        cached,
+        transcoded,
+        used_workers,
+        cancelled,
+        duration,
+    )
+    return {
+        "status": "cancelled" if cancelled else "success",
+        "username": username,
+        "voices": voices,
+        "missingData": (len(server_ids) - voices) if not cancelled else 0,
+        "cached": cached,
+        "transcoded": transcoded,
+        "failed": failed,
+        "workers": used_workers,
+        "durationSec": round(duration, 3),
+    }
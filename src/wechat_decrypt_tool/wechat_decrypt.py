@@ -20,6 +20,8 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from .account_registry import ACCOUNT_REGISTRY
+from .rendered_message_cache import drop_rendered_account
 from .app_paths import get_output_databases_dir
 
 # 注意：不再支持默认密钥，所有密钥必须通过参数传入
@@ -544,6 +546,10 @@ def decrypt_wechat_databases(db_storage_path: str = None, key: str = None) -> di
                 failed_files.append(db_path)
                 logger.error(f"解密失败: {account_name}/{db_name}")
 
+        # 解密输出是原地覆盖写入的，清掉该账号的缓存（账号列表 / 消息库列表 / 密钥 / 已渲染消息）
+        ACCOUNT_REGISTRY.invalidate(account_name)
+        drop_rendered_account(account_name)
+
         # 记录账号解密结果
         account_results[account_name] = {
             "total": len(databases),
@@ -572,6 +578,31 @@ def decrypt_wechat_databases(db_storage_path: str = None, key: str = None) -> di
                     "message": str(e),
                 }
 
+        # 构建“会话 -> 消息分库”目录：查询单个会话时只打开包含它的 message_N.db
+        try:
+            from .message_shard_directory import build_message_shard_directory
+
+            account_results[account_name]["message_shard_directory"] = build_message_shard_directory(
+                account_output_dir,
+                rebuild=True,
+            )
+        except Exception as e:
+            logger.warning(f"构建消息分库目录失败: {account_name}: {e}")
+            account_results[account_name]["message_shard_directory"] = {
+                "status": "error",
+                "message": str(e),
+            }
+
+        # 已有分片搜索索引时，重建刚重新解密的消息库对应的分片
+        try:
+            from .chat_search_index import refresh_chat_search_index_shards
+
+            refresh_chat_search_index_shards(
+                account_output_dir, [Path(x).stem for x in account_processed], force=True
+            )
+        except Exception as e:
+            logger.warning(f"刷新搜索索引分片失败: {account_name}: {e}")
+
         logger.info(f"账号 {account_name} 解密完成: 成功 {account_success}/{len(databases)}")
 
     # 返回结果
@@ -11,7 +11,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from .card_01_cyber_schedule import WeekdayHourHeatmap, compute_weekday_hour_heatmap
-from ...chat_search_index import get_chat_search_index_db_path
+from ...chat_search_index import open_chat_search_index_reader
 from ...chat_helpers import (
     _build_avatar_url,
     _decode_sqlite_text,
@@ -190,9 +190,8 @@ def compute_annual_daily_counts(*, account_dir: Path, year: int, sender_username
     sender = str(sender_username or "").strip()
 
     # Prefer using our unified search index if available; it's much faster than scanning all msg tables.
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute(
@@ -251,12 +250,11 @@ def compute_annual_daily_counts(*, account_dir: Path, year: int, sender_username
                     total += cnt
 
                 logger.info(
-                    "Wrapped annual heatmap computed (search index): account=%s year=%s total=%s sender=%s db=%s elapsed=%.2fs",
+                    "Wrapped annual heatmap computed (search index): account=%s year=%s total=%s sender=%s elapsed=%.2fs",
                     str(account_dir.name or "").strip(),
                     year,
                     total,
                     sender or "*",
-                    str(index_path.name),
                     time.time() - t0,
                 )
 
@@ -437,9 +435,8 @@ def compute_global_overview_stats(
     sender = str(sender_username).strip() if sender_username and str(sender_username).strip() else None
 
     # Prefer using the unified search index if available; it already merges all shards/tables.
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute(
@@ -611,13 +608,12 @@ def compute_global_overview_stats(
 
                 total_messages = int(sum(local_type_counts_i.values()))
                 logger.info(
-                    "Wrapped card#0 overview computed (search index): account=%s year=%s total=%s active_days=%s sender=%s db=%s elapsed=%.2fs",
+                    "Wrapped card#0 overview computed (search index): account=%s year=%s total=%s active_days=%s sender=%s elapsed=%.2fs",
                     str(account_dir.name or "").strip(),
                     year,
                     total_messages,
                     active_days_i,
                     sender or "*",
-                    str(index_path.name),
                     time.time() - t0,
                 )
 
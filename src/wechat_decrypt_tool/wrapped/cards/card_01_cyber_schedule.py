@@ -9,7 +9,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
-from ...chat_search_index import get_chat_search_index_db_path
+from ...chat_search_index import open_chat_search_index_reader
 from ...chat_helpers import (
     _build_avatar_url,
     _decode_sqlite_text,
@@ -153,11 +153,9 @@ def _compute_year_first_last_from_index(
     if not sender:
         return None, None
 
-    index_path = get_chat_search_index_db_path(account_dir)
-    if not index_path.exists():
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is None:
         return None, None
-
-    conn = sqlite3.connect(str(index_path))
     try:
         has_fts = (
             conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -375,11 +373,9 @@ def _compute_sent_moment_refs_from_index(
     if not sender:
         return None, None
 
-    index_path = get_chat_search_index_db_path(account_dir)
-    if not index_path.exists():
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is None:
         return None, None
-
-    conn = sqlite3.connect(str(index_path))
     try:
         has_fts = (
             conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -855,9 +851,8 @@ def compute_weekday_hour_heatmap(*, account_dir: Path, year: int, sender_usernam
     total = 0
 
     # Prefer using our unified search index if available; it's much faster than scanning all msg tables.
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute(
@@ -915,12 +910,11 @@ def compute_weekday_hour_heatmap(*, account_dir: Path, year: int, sender_usernam
                         total += cnt
 
                 logger.info(
-                    "Wrapped heatmap computed (search index): account=%s year=%s total=%s sender=%s db=%s elapsed=%.2fs",
+                    "Wrapped heatmap computed (search index): account=%s year=%s total=%s sender=%s elapsed=%.2fs",
                     str(account_dir.name or "").strip(),
                     year,
                     total,
                     str(sender_username).strip() if sender_username else "*",
-                    str(index_path.name),
                     time.time() - t0,
                 )
 
@@ -12,7 +12,7 @@ from typing import Any, Optional
 from pypinyin import lazy_pinyin, Style
 
 from ...chat_helpers import _decode_message_content, _decode_sqlite_text, _iter_message_db_paths, _quote_ident
-from ...chat_search_index import get_chat_search_index_db_path
+from ...chat_search_index import open_chat_search_index_reader
 from ...logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -239,9 +239,8 @@ def compute_keyboard_stats(*, account_dir: Path, year: int, sample_rate: float =
     used_index = False
 
     # 优先使用搜索索引（更快）
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -629,9 +628,8 @@ def compute_text_message_char_counts(*, account_dir: Path, year: int) -> tuple[i
     my_username = str(account_dir.name or "").strip()
 
     # Prefer search index when available.
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -16,8 +16,9 @@ from ...chat_helpers import (
     _should_keep_session,
 )
 from ...chat_search_index import (
-    get_chat_search_index_db_path,
     get_chat_search_index_status,
+    open_chat_search_index_reader,
+    pending_chat_search_index_shards,
     start_chat_search_index_build,
 )
 from ...logging_config import get_logger
@@ -99,8 +100,8 @@ def _compute_best_buddy_extras_from_index(*, account_dir: Path, year: int, buddy
     if not buddy:
         return {}
 
-    index_path = get_chat_search_index_db_path(account_dir)
-    if not index_path.exists():
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is None:
         return {}
 
     start_ts, end_ts = _year_range_epoch_seconds(int(year))
@@ -147,7 +148,6 @@ def _compute_best_buddy_extras_from_index(*, account_dir: Path, year: int, buddy
         "LIMIT 1"
     )
 
-    conn = sqlite3.connect(str(index_path))
     try:
         has_fts = (
             conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -319,9 +319,8 @@ def compute_reply_speed_stats(*, account_dir: Path, year: int) -> dict[str, Any]
     used_index = False
 
     # -------- Preferred path: unified search index --------
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -443,12 +442,11 @@ def compute_reply_speed_stats(*, account_dir: Path, year: int) -> dict[str, Any]
                 flush()
 
                 logger.info(
-                    "Wrapped card#3 reply_speed computed (search index): account=%s year=%s conversations_top=%s replies=%s db=%s elapsed=%.2fs",
+                    "Wrapped card#3 reply_speed computed (search index): account=%s year=%s conversations_top=%s replies=%s elapsed=%.2fs",
                     str(account_dir.name or "").strip(),
                     int(year),
                     len(top_heap),
                     int(total_replies),
-                    str(index_path.name),
                     time.time() - t0,
                 )
         finally:
@@ -485,7 +483,11 @@ def compute_reply_speed_stats(*, account_dir: Path, year: int) -> dict[str, Any]
             index_exists = bool(index.get("exists"))
 
             if (not index_ready) and build_status not in {"building", "error"}:
-                start_chat_search_index_build(account_dir, rebuild=bool(index_exists))
+                start_chat_search_index_build(
+                    account_dir,
+                    rebuild=bool(index_exists),
+                    shards=pending_chat_search_index_shards(index) or None,
+                )
                 index_status = get_chat_search_index_status(account_dir)
         except Exception:
             index_status = None
@@ -494,7 +496,7 @@ def compute_reply_speed_stats(*, account_dir: Path, year: int) -> dict[str, Any]
             "Wrapped card#3 reply_speed: search index missing/not ready; returning empty stats. account=%s year=%s index=%s",
             str(account_dir.name or "").strip(),
             int(year),
-            str(index_path),
+            str(dict((index_status or {}).get("index") or {}).get("path") or ""),
         )
 
     # Sort top buddies by score desc.
@@ -654,7 +656,9 @@ def compute_reply_speed_stats(*, account_dir: Path, year: int) -> dict[str, Any]
             per_user_daily_outgoing: dict[str, list[int]] = {}
             per_user_daily_incoming: dict[str, list[int]] = {}
             try:
-                conn2 = sqlite3.connect(str(index_path))
+                conn2 = open_chat_search_index_reader(account_dir)
+                if conn2 is None:
+                    raise RuntimeError("search index unavailable")
                 try:
                     rows = conn2.execute(sql_daily, (start_ts, end_ts)).fetchall()
                 finally:
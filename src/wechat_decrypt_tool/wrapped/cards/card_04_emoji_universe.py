@@ -24,7 +24,7 @@ from ...chat_helpers import (
     _resource_lookup_chat_id,
     _should_keep_session,
 )
-from ...chat_search_index import get_chat_search_index_db_path
+from ...chat_search_index import open_chat_search_index_reader
 from ...logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -509,9 +509,8 @@ def compute_emoji_universe_stats(*, account_dir: Path, year: int) -> dict[str, A
     emoji_regex, emoji_norm_to_key = _load_wechat_text_emoji_matcher()
     expression_id_to_asset, expression_id_to_label = _load_wechat_expression_catalog()
 
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute(
@@ -15,8 +15,9 @@ from ...chat_helpers import (
     _should_keep_session,
 )
 from ...chat_search_index import (
-    get_chat_search_index_db_path,
     get_chat_search_index_status,
+    open_chat_search_index_reader,
+    pending_chat_search_index_shards,
     start_chat_search_index_build,
 )
 from ...logging_config import get_logger
@@ -139,9 +140,8 @@ def compute_monthly_best_friends_wall_stats(*, account_dir: Path, year: int) ->
     used_index = False
     index_status: dict[str, Any] | None = None
 
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -257,7 +257,11 @@ def compute_monthly_best_friends_wall_stats(*, account_dir: Path, year: int) ->
             build_status = str(build.get("status") or "")
             index_exists = bool(index.get("exists"))
             if (not index_ready) and build_status not in {"building", "error"}:
-                start_chat_search_index_build(account_dir, rebuild=bool(index_exists))
+                start_chat_search_index_build(
+                    account_dir,
+                    rebuild=bool(index_exists),
+                    shards=pending_chat_search_index_shards(index) or None,
+                )
                 index_status = get_chat_search_index_status(account_dir)
         except Exception:
             index_status = None
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import hashlib
-import logging
 import math
 import random
 import re
@@ -12,16 +11,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import jieba
-
 from ...chat_helpers import _decode_message_content, _decode_sqlite_text, _iter_message_db_paths, _quote_ident
 from ...logging_config import get_logger
+from ..keyword_engine import KEYWORD_ENGINE, load_jieba
 
 logger = get_logger(__name__)
-try:
-    jieba.setLogLevel(logging.ERROR)
-except Exception:
-    pass
 
 
 _MD5_HEX_RE = re.compile(r"(?i)\b[0-9a-f]{32}\b")
@@ -45,6 +39,11 @@ _DATEISH_RE = re.compile(
 # WeFlow counts repeated *phrases* (full short sent messages), not jieba tokens.
 _WEFLOW_COMMON_PHRASE_LOCAL_TYPES = (1, 244813135921)
 
+# Card #6 examples: a large reservoir is scanned once per (account, year) and cached; each request then
+# draws a fresh random batch of `_EXAMPLE_POOL_SIZE` messages from it.
+_EXAMPLE_RESERVOIR_SIZE = 12_000
+_EXAMPLE_POOL_SIZE = 3000
+
 # Small but practical stopword list for chat keywords.
 _STOPWORDS_ZH = {
     "的",
@@ -282,7 +281,10 @@ def _normalize_token(tok: str) -> str:
     return ""
 
 
-def extract_keywords_jieba(texts: list[str], *, top_n: int = 40) -> list[dict[str, Any]]:
+def _count_keyword_tokens(texts: list[str]) -> Counter[str]:
+    """Segment `texts` with jieba and count normalized tokens."""
+
+    jieba = load_jieba()
     counter: Counter[str] = Counter()
     for raw in texts:
         s = _clean_text(raw)
@@ -311,7 +313,11 @@ def extract_keywords_jieba(texts: list[str], *, top_n: int = 40) -> list[dict[st
                     if not w:
                         continue
                     counter[w] += 1
+    return counter
 
+
+def extract_keywords_jieba(texts: list[str], *, top_n: int = 40) -> list[dict[str, Any]]:
+    counter = _count_keyword_tokens(list(texts or []))
     if not counter:
         return []
 
@@ -761,8 +767,9 @@ def _scan_message_pool(
     return pool, meta
 
 
-def build_card_05_keywords_wordcloud(*, account_dir: Path, year: int) -> dict[str, Any]:
-    title = "这一年，你把哪些话说了一遍又一遍？"
+def _compute_card_05_stats(*, account_dir: Path, year: int) -> dict[str, Any]:
+    """Deterministic (per account/year) part of card #6: phrase counts + a large example reservoir."""
+
     seed = _stable_seed(str(account_dir.name or ""), int(year))
 
     phrase_counts, scan_meta = _scan_common_phrase_counts(
@@ -790,7 +797,7 @@ def build_card_05_keywords_wordcloud(*, account_dir: Path, year: int) -> dict[st
             year=year,
             outgoing_only=use_outgoing_only,
             seed=seed ^ 0x9E37,
-            max_pool=3000,
+            max_pool=_EXAMPLE_RESERVOIR_SIZE,
             max_seen=120_000,
         )
         if (not example_pool) and use_outgoing_only:
@@ -799,11 +806,50 @@ def build_card_05_keywords_wordcloud(*, account_dir: Path, year: int) -> dict[st
                 year=year,
                 outgoing_only=False,
                 seed=seed ^ 0xA53C,
-                max_pool=3000,
+                max_pool=_EXAMPLE_RESERVOIR_SIZE,
                 max_seen=120_000,
             )
             pool_meta["outgoingOnlyFallback"] = True
 
+    return {
+        "phraseCounts": dict(phrase_counts),
+        "scanMeta": scan_meta,
+        "examplePool": example_pool,
+        "poolMeta": pool_meta,
+    }
+
+
+def prefetch_card_05_keywords_wordcloud(*, account_dir: Path, year: int) -> None:
+    """Compute the per-year phrase stats in the background (called when the deck manifest loads)."""
+
+    KEYWORD_ENGINE.prefetch_async(
+        account_dir=account_dir,
+        year=int(year),
+        compute=lambda: _compute_card_05_stats(account_dir=account_dir, year=int(year)),
+    )
+
+
+def build_card_05_keywords_wordcloud(*, account_dir: Path, year: int, refresh: bool = False) -> dict[str, Any]:
+    title = "这一年，你把哪些话说了一遍又一遍？"
+    seed = _stable_seed(str(account_dir.name or ""), int(year))
+
+    stats = KEYWORD_ENGINE.get_or_compute_stats(
+        account_dir=account_dir,
+        year=int(year),
+        compute=lambda: _compute_card_05_stats(account_dir=account_dir, year=int(year)),
+        refresh=refresh,
+    )
+    phrase_counts: Counter[str] = Counter(
+        {str(k): int(v or 0) for k, v in (stats.get("phraseCounts") or {}).items()}
+    )
+    scan_meta: dict[str, Any] = dict(stats.get("scanMeta") or {})
+    pool_meta: dict[str, Any] = dict(stats.get("poolMeta") or {})
+
+    # Only the random part runs per request: draw a fresh example batch from the cached reservoir.
+    reservoir = [str(x) for x in (stats.get("examplePool") or []) if x]
+    rnd = random.SystemRandom()
+    example_pool = rnd.sample(reservoir, min(_EXAMPLE_POOL_SIZE, len(reservoir)))
+
     payload = build_common_phrases_payload(
         phrase_counts=phrase_counts,
         seed=seed,
@@ -0,0 +1,193 @@
+"""Keyword engine for Wrapped card #6 (年度常用语/关键词).
+
+Why:
+- jieba builds its prefix dictionary on first `lcut` (several seconds on a cold machine). We keep the
+  marshalled prefix dict under `output/cache/` so it survives temp-dir cleanups.
+- Card #6 must return a fresh random batch of examples/bubbles on every request, so the card itself is
+  never cached. The expensive part (scanning every message shard for the year and counting phrases) is
+  deterministic though, so we cache those counts per (account, year), keyed by a signature of the
+  message shard files, and only run the random sampling per request.
+
+This module intentionally has no card-specific logic; `card_05_keywords_wordcloud.py` plugs its scan in.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from ..app_paths import get_output_dir
+from ..chat_helpers import _iter_message_db_paths
+from ..logging_config import get_logger
+from .storage import wrapped_cache_dir
+
+logger = get_logger(__name__)
+
+# Bump when the cached stats payload changes shape.
+_STATS_VERSION = 1
+_MEMORY_CACHE_MAX = 8
+
+
+def jieba_cache_dir() -> Path:
+    d = get_output_dir() / "cache"
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+    except Exception:
+        pass
+    return d
+
+
+_JIEBA_LOCK = threading.Lock()
+_JIEBA_READY = threading.Event()
+
+
+def load_jieba():
+    """Import jieba and load its prefix dictionary (from our persisted marshal cache when present)."""
+
+    import jieba  # pylint: disable=import-outside-toplevel
+
+    if _JIEBA_READY.is_set():
+        return jieba
+
+    with _JIEBA_LOCK:
+        if _JIEBA_READY.is_set():
+            return jieba
+        t0 = time.perf_counter()
+        try:
+            jieba.setLogLevel(logging.ERROR)
+        except Exception:
+            pass
+        try:
+            # jieba writes `jieba.cache` (marshalled prefix dict) into `tmp_dir`; keep it with our output data.
+            jieba.dt.tmp_dir = str(jieba_cache_dir())
+        except Exception:
+            pass
+        try:
+            jieba.initialize()
+        except Exception:
+            logger.exception("[wrapped-keywords] jieba initialize failed")
+        _JIEBA_READY.set()
+        logger.info("[wrapped-keywords] jieba ready ms=%.1f", (time.perf_counter() - t0) * 1000.0)
+    return jieba
+
+
+def message_db_signature(account_dir: Path) -> str:
+    """Cheap signature of the chat shard files (name/size/mtime); changes when any shard is rewritten."""
+
+    parts: list[str] = []
+    for p in _iter_message_db_paths(account_dir):
+        if p.name.lower().startswith("biz_message"):
+            continue
+        try:
+            st = p.stat()
+        except Exception:
+            continue
+        parts.append(f"{p.name}:{int(st.st_size)}:{int(st.st_mtime_ns)}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class KeywordEngine:
+    def __init__(self) -> None:
+        self._mu = threading.Lock()
+        self._locks: dict[str, threading.Lock] = {}
+        self._stats: "OrderedDict[str, tuple[str, dict[str, Any]]]" = OrderedDict()
+        self._prefetching: set[str] = set()
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._mu:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+
+    @staticmethod
+    def _stats_path(account_dir: Path, year: int) -> Path:
+        return wrapped_cache_dir(account_dir) / f"global_{int(year)}_card_6_stats_s{_STATS_VERSION}.json"
+
+    def get_or_compute_stats(
+        self,
+        *,
+        account_dir: Path,
+        year: int,
+        compute: Callable[[], dict[str, Any]],
+        refresh: bool = False,
+    ) -> dict[str, Any]:
+        key = f"{account_dir}|{int(year)}"
+        signature = message_db_signature(account_dir)
+        path = self._stats_path(account_dir, year)
+
+        with self._lock_for(key):
+            if not refresh:
+                with self._mu:
+                    hit = self._stats.get(key)
+                    if hit is not None and hit[0] == signature:
+                        self._stats.move_to_end(key)
+                        return hit[1]
+
+                try:
+                    obj = json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+                except Exception:
+                    obj = None
+                if isinstance(obj, dict) and obj.get("signature") == signature and isinstance(obj.get("stats"), dict):
+                    stats = obj["stats"]
+                    self._remember(key, signature, stats)
+                    return stats
+
+            t0 = time.perf_counter()
+            stats = compute()
+            logger.info(
+                "[wrapped-keywords] stats computed account=%s year=%s ms=%.1f",
+                account_dir.name,
+                int(year),
+                (time.perf_counter() - t0) * 1000.0,
+            )
+            try:
+                path.write_text(
+                    json.dumps({"signature": signature, "stats": stats}, ensure_ascii=False),
+                    encoding="utf-8",
+                )
+            except Exception:
+                logger.exception("Failed to write wrapped keyword stats cache: %s", path)
+            self._remember(key, signature, stats)
+            return stats
+
+    def _remember(self, key: str, signature: str, stats: dict[str, Any]) -> None:
+        with self._mu:
+            self._stats[key] = (signature, stats)
+            self._stats.move_to_end(key)
+            while len(self._stats) > _MEMORY_CACHE_MAX:
+                self._stats.popitem(last=False)
+
+    def prefetch_async(self, *, account_dir: Path, year: int, compute: Callable[[], dict[str, Any]]) -> None:
+        """Compute (or load) stats in a daemon thread so the card request finds them ready."""
+
+        key = f"{account_dir}|{int(year)}"
+        with self._mu:
+            if key in self._prefetching:
+                return
+            self._prefetching.add(key)
+
+        def _run() -> None:
+            try:
+                self.get_or_compute_stats(account_dir=account_dir, year=year, compute=compute)
+            except Exception:
+                logger.exception("[wrapped-keywords] prefetch failed account=%s year=%s", account_dir.name, year)
+            finally:
+                with self._mu:
+                    self._prefetching.discard(key)
+
+        threading.Thread(target=_run, name=f"wrapped-keywords-{account_dir.name}-{year}", daemon=True).start()
+
+    def clear(self) -> None:
+        with self._mu:
+            self._stats.clear()
+
+
+KEYWORD_ENGINE = KeywordEngine()
@@ -9,13 +9,13 @@ from pathlib import Path
 from typing import Any, Optional
 
 from ..chat_helpers import _decode_sqlite_text, _iter_message_db_paths, _quote_ident, _resolve_account_dir
-from ..chat_search_index import get_chat_search_index_db_path
+from ..chat_search_index import get_chat_search_index_db_paths, open_chat_search_index_reader
 from ..logging_config import get_logger
 from .storage import wrapped_cache_dir, wrapped_cache_path
 from .cards.card_00_global_overview import build_card_00_global_overview
 from .cards.card_01_cyber_schedule import WeekdayHourHeatmap, build_card_01_cyber_schedule, compute_weekday_hour_heatmap
 from .cards.card_02_message_chars import build_card_02_message_chars
-from .cards.card_05_keywords_wordcloud import build_card_05_keywords_wordcloud
+from .cards.card_05_keywords_wordcloud import build_card_05_keywords_wordcloud, prefetch_card_05_keywords_wordcloud
 from .cards.card_03_reply_speed import build_card_03_reply_speed
 from .cards.card_04_monthly_best_friends_wall import build_card_04_monthly_best_friends_wall
 from .cards.card_04_emoji_universe import build_card_04_emoji_universe
@@ -141,9 +141,9 @@ def list_wrapped_available_years(*, account_dir: Path) -> list[int]:
     cache_path = wrapped_cache_dir(account_dir) / "available_years.json"
     max_mtime = 0
     try:
-        index_path = get_chat_search_index_db_path(account_dir)
-        if index_path.exists():
-            max_mtime = max(max_mtime, int(index_path.stat().st_mtime))
+        for index_path in get_chat_search_index_db_paths(account_dir):
+            if index_path.exists():
+                max_mtime = max(max_mtime, int(index_path.stat().st_mtime))
     except Exception:
         pass
     try:
@@ -189,9 +189,8 @@ def list_wrapped_available_years(*, account_dir: Path) -> list[int]:
     )
 
     # Fast path: use our unified search index when available.
-    index_path = get_chat_search_index_db_path(account_dir)
-    if index_path.exists():
-        conn = sqlite3.connect(str(index_path))
+    conn = open_chat_search_index_reader(account_dir)
+    if conn is not None:
         try:
             has_fts = (
                 conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='message_fts' LIMIT 1").fetchone()
@@ -362,7 +361,7 @@ def build_wrapped_annual_response(
     card_message_chars = build_card_02_message_chars(account_dir=account_dir, year=y)
     cards.append(card_message_chars)
     # Page 5: annual keywords (bubble storm -> word cloud).
-    cards.append(build_card_05_keywords_wordcloud(account_dir=account_dir, year=y))
+    cards.append(build_card_05_keywords_wordcloud(account_dir=account_dir, year=y, refresh=refresh))
     # Page 6: reply speed / best chat buddy.
     card_reply_speed = build_card_03_reply_speed(account_dir=account_dir, year=y)
     cards.append(card_reply_speed)
@@ -429,6 +428,13 @@ def build_wrapped_annual_meta(
         # The manifest itself is static today, but we keep the flag for API symmetry.
         pass
 
+    # The deck is about to be shown: warm card#6 phrase stats in the background so the
+    # keywords page doesn't pay for the full-year scan when the user flips to it.
+    try:
+        prefetch_card_05_keywords_wordcloud(account_dir=account_dir, year=y)
+    except Exception:
+        logger.exception("Failed to schedule wrapped keyword prefetch")
+
     return {
         "account": account_dir.name,
         "year": y,
@@ -576,7 +582,7 @@ def build_wrapped_annual_card(
         elif cid == 2:
             card = build_card_02_message_chars(account_dir=account_dir, year=y)
         elif cid == 6:
-            card = build_card_05_keywords_wordcloud(account_dir=account_dir, year=y)
+            card = build_card_05_keywords_wordcloud(account_dir=account_dir, year=y, refresh=refresh)
         elif cid == 3:
             card = build_card_03_reply_speed(account_dir=account_dir, year=y)
         elif cid == 4:
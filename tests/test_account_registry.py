@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from fastapi import HTTPException  # noqa: E402
+
+from wechat_decrypt_tool import account_registry  # noqa: E402
+from wechat_decrypt_tool.account_registry import AccountRegistry  # noqa: E402
+
+
+def _make_db(path: Path) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _make_account(root: Path, name: str, *, message_dbs: int = 1) -> Path:
+    d = root / name
+    d.mkdir(parents=True)
+    _make_db(d / "session.db")
+    _make_db(d / "contact.db")
+    for i in range(message_dbs):
+        _make_db(d / f"message_{i}.db")
+    _make_db(d / "message_resource.db")
+    return d
+
+
+class TestAccountRegistry(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": self._td.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.root = Path(self._td.name) / "output" / "databases"
+        self.root.mkdir(parents=True)
+        _make_account(self.root, "wxid_a", message_dbs=2)
+        _make_account(self.root, "wxid_b")
+        (self.root / "not_an_account").mkdir()
+        self.reg = AccountRegistry()
+
+    def test_repeat_lookups_skip_header_probing(self):
+        self.assertEqual(self.reg.list_accounts(), ["wxid_a", "wxid_b"])
+        with mock.patch.object(account_registry, "_is_valid_decrypted_sqlite") as probe:
+            for _ in range(5):
+                self.assertEqual(self.reg.resolve_account_dir(None), (self.root / "wxid_a").resolve())
+                self.assertEqual(self.reg.resolve_account_dir("wxid_b").name, "wxid_b")
+            probe.assert_not_called()
+
+    def test_resolve_errors_match_previous_behaviour(self):
+        with self.assertRaises(HTTPException) as cm:
+            self.reg.resolve_account_dir("wxid_missing")
+        self.assertEqual(cm.exception.status_code, 404)
+        self.assertEqual(cm.exception.detail, "Account not found.")
+
+        with self.assertRaises(HTTPException):
+            self.reg.resolve_account_dir("not_an_account")
+
+    def test_new_and_deleted_accounts_are_noticed(self):
+        self.assertEqual(self.reg.list_accounts(), ["wxid_a", "wxid_b"])
+        _make_account(self.root, "wxid_c")
+        self.assertEqual(self.reg.list_accounts(), ["wxid_a", "wxid_b", "wxid_c"])
+
+        shutil.rmtree(self.root / "wxid_b")
+        self.assertEqual(self.reg.list_accounts(), ["wxid_a", "wxid_c"])
+        with self.assertRaises(HTTPException):
+            self.reg.resolve_account_dir("wxid_b")
+
+    def test_in_place_header_change_needs_invalidate(self):
+        broken = self.root / "wxid_c"
+        broken.mkdir()
+        (broken / "session.db").write_bytes(b"\0" * 32)
+        _make_db(broken / "contact.db")
+        self.assertNotIn("wxid_c", self.reg.list_accounts())
+
+        # Decrypt rewrites the file in place (directory mtime unchanged); it calls invalidate() afterwards.
+        with open(broken / "session.db", "r+b") as f:
+            f.write(b"SQLite format 3\x00")
+        self.reg.invalidate("wxid_c")
+        self.assertIn("wxid_c", self.reg.list_accounts())
+
+    def test_message_db_paths_cached_until_directory_changes(self):
+        d = self.reg.resolve_account_dir("wxid_a")
+        self.assertEqual([p.name for p in self.reg.message_db_paths(d)], ["message_0.db", "message_1.db"])
+        with mock.patch.object(account_registry, "scan_message_db_paths") as scan:
+            self.reg.message_db_paths(d)
+            scan.assert_not_called()
+
+        _make_db(d / "biz_message_0.db")
+        self.assertEqual(
+            [p.name for p in self.reg.message_db_paths(d)],
+            ["biz_message_0.db", "message_0.db", "message_1.db"],
+        )
+
+    def test_media_keys_follow_file_rewrites(self):
+        d = self.reg.resolve_account_dir("wxid_a")
+        self.assertEqual(self.reg.media_keys(d), {})
+
+        p = d / "_media_keys.json"
+        p.write_text(json.dumps({"xor": 1, "aes": "a" * 16}), encoding="utf-8")
+        self.assertEqual(self.reg.media_keys(d)["xor"], 1)
+
+        keys = self.reg.media_keys(d)
+        keys["xor"] = 99
+        self.assertEqual(self.reg.media_keys(d)["xor"], 1)
+
+        p.write_text(json.dumps({"xor": 200, "aes": ""}), encoding="utf-8")
+        st = p.stat()
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertEqual(self.reg.media_keys(d)["xor"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool.lazy_routers import LazyRouterRegistry  # noqa: E402  pylint: disable=wrong-import-position
+from wechat_decrypt_tool.startup_profile import parse_importtime, profile_cold_import  # noqa: E402  pylint: disable=wrong-import-position
+
+
+# Generous default so slow CI boxes don't flake; tighten locally via env.
+_DEFAULT_BUDGET_MS = 2500.0
+
+_HEAVY_MODULES = (
+    "jieba",
+    "pypinyin",
+    "wechat_decrypt_tool.chat_export_service",
+    "wechat_decrypt_tool.sns_export_service",
+    "wechat_decrypt_tool.routers.sns",
+    "wechat_decrypt_tool.wrapped.service",
+)
+
+
+class TestApiStartupImportBudget(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._td = TemporaryDirectory()
+        cls.profile = profile_cold_import(
+            "wechat_decrypt_tool.api",
+            env={"WECHAT_TOOL_DATA_DIR": cls._td.name, "WECHAT_TOOL_LAZY_ROUTERS": "1"},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._td.cleanup()
+
+    def test_api_imports_cleanly(self):
+        self.assertEqual(self.profile.returncode, 0, self.profile.stderr_tail)
+        self.assertGreater(self.profile.import_ms, 0.0)
+
+    def test_heavy_subsystems_are_not_imported_at_startup(self):
+        loaded = self.profile.loaded_modules()
+        for name in _HEAVY_MODULES:
+            self.assertNotIn(name, loaded)
+
+    def test_cold_import_within_budget(self):
+        raw = str(os.environ.get("WECHAT_TOOL_STARTUP_BUDGET_MS", "") or "").strip()
+        budget_ms = float(raw) if raw else _DEFAULT_BUDGET_MS
+        self.assertLessEqual(
+            self.profile.import_ms,
+            budget_ms,
+            f"api cold import took {self.profile.import_ms:.1f}ms (budget {budget_ms:.1f}ms)",
+        )
+
+
+class TestParseImportTime(unittest.TestCase):
+    def test_parses_self_cumulative_and_depth(self):
+        text = "\n".join(
+            [
+                "import time: self [us] | cumulative | imported package",
+                "import time:       316 |      64484 |     pypinyin.seg.simpleseg",
+                "import time:     11046 |    1460861 | wechat_decrypt_tool.api",
+                "something else",
+            ]
+        )
+        items = parse_importtime(text)
+        self.assertEqual([i.module for i in items], ["pypinyin.seg.simpleseg", "wechat_decrypt_tool.api"])
+        self.assertEqual(items[0].self_us, 316)
+        self.assertEqual(items[0].cumulative_us, 64484)
+        self.assertEqual(items[0].depth, 2)
+        self.assertEqual(items[1].depth, 0)
+
+
+class TestLazyRouterRegistry(unittest.TestCase):
+    def _build_app(self):
+        app = FastAPI()
+        calls = {"n": 0}
+
+        def load():
+            calls["n"] += 1
+            r = APIRouter()
+
+            @r.get("/api/heavy/ping")
+            async def ping():
+                return {"ok": True}
+
+            return r
+
+        registry = LazyRouterRegistry(app)
+        registry.register("heavy", ("/api/heavy",), load)
+
+        @app.middleware("http")
+        async def _lazy(request, call_next):
+            return await registry.middleware(request, call_next)
+
+        async def _spa(scope, receive, send):
+            await PlainTextResponse("spa")(scope, receive, send)
+
+        app.mount("/", _spa, name="ui")
+        return app, registry, calls
+
+    def test_router_is_loaded_on_first_matching_request(self):
+        app, registry, calls = self._build_app()
+        client = TestClient(app)
+
+        self.assertEqual(client.get("/api/other").text, "spa")
+        self.assertEqual(calls["n"], 0)
+
+        resp = client.get("/api/heavy/ping")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"ok": True})
+
+        client.get("/api/heavy/ping")
+        self.assertEqual(calls["n"], 1)
+        self.assertTrue(registry.status()[0]["loaded"])
+
+    def test_loaded_routes_stay_ahead_of_mounts(self):
+        app, registry, _ = self._build_app()
+        registry.load_all()
+        routes = app.router.routes
+        self.assertIsInstance(routes[-1], Mount)
+
+    def test_openapi_loads_everything(self):
+        app, registry, calls = self._build_app()
+        client = TestClient(app)
+        resp = client.get("/openapi.json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("/api/heavy/ping", resp.json().get("paths", {}))
+        self.assertEqual(calls["n"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
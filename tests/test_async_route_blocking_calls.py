@@ -0,0 +1,139 @@
+import ast
+import unittest
+from collections import Counter
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+ROUTERS_DIR = ROOT / "src" / "wechat_decrypt_tool" / "routers"
+
+# Calls that block the event loop when made directly in an `async def` route.
+BLOCKING_MODULE_CALLS = {
+    ("sqlite3", "connect"),
+    ("time", "sleep"),
+    ("subprocess", "run"),
+    ("subprocess", "check_output"),
+    ("subprocess", "Popen"),
+    ("shutil", "copy"),
+    ("shutil", "copy2"),
+    ("shutil", "copyfile"),
+    ("shutil", "move"),
+    ("shutil", "rmtree"),
+    ("os", "walk"),
+    ("os", "scandir"),
+    ("os", "listdir"),
+}
+BLOCKING_NAMES = {
+    "open",
+    "_read_and_maybe_decrypt_media",
+    "_collect_all_dat_files",
+    "_decrypt_and_save_resource",
+    "_search_chat_messages_via_fts",
+}
+BLOCKING_METHODS = {"read_bytes", "write_bytes", "read_text", "write_text", "rglob", "iterdir", "glob"}
+
+# Existing violations. Shrink this list when moving work onto `executors.run_io/run_cpu`; never grow it.
+KNOWN_BLOCKING = {
+    ("chat.py", "chat_search_index_senders", "sqlite3.connect"),
+    ("chat.py", "edit_chat_message", "sqlite3.connect"),
+    ("chat.py", "flip_chat_message_direction", "sqlite3.connect"),
+    ("chat.py", "repair_chat_message_sender", "sqlite3.connect"),
+    ("chat.py", "resolve_app_message", "sqlite3.connect"),
+    ("chat_media.py", "download_chat_emoji", ".write_bytes"),
+    ("chat_media.py", "get_chat_emoji", ".read_bytes"),
+    ("chat_media.py", "get_chat_emoji", ".write_bytes"),
+    ("chat_media.py", "get_chat_emoji", "_read_and_maybe_decrypt_media"),
+    ("chat_media.py", "get_chat_video", "_read_and_maybe_decrypt_media"),
+    ("chat_media.py", "get_chat_video", "open"),
+    ("chat_media.py", "get_chat_video_thumb", ".read_bytes"),
+    ("chat_media.py", "get_chat_video_thumb", "_read_and_maybe_decrypt_media"),
+    ("chat_media.py", "get_chat_voice", "sqlite3.connect"),
+    ("chat_media.py", "open_chat_media_folder", ".write_bytes"),
+    ("chat_media.py", "open_chat_media_folder", "open"),
+    ("chat_media.py", "open_chat_media_folder", "sqlite3.connect"),
+    ("chat_media.py", "open_chat_media_folder", "subprocess.Popen"),
+    ("decrypt.py", "generate_progress", ".write_text"),
+    ("media.py", "generate_progress", ".read_bytes"),
+    ("media.py", "generate_progress", "_collect_all_dat_files"),
+    ("media.py", "generate_progress", "_decrypt_and_save_resource"),
+    ("sns.py", "get_sns_media", "_read_and_maybe_decrypt_media"),
+}
+
+OFFLOADED_ROUTES = {
+    ("chat.py", "search_chat_messages"),
+    ("chat.py", "get_chat_messages_around"),
+    ("chat.py", "resolve_nested_chat_history"),
+    ("chat_media.py", "get_chat_avatar"),
+    ("chat_media.py", "get_chat_image"),
+    ("media.py", "decrypt_all_media"),
+}
+
+
+def _blocking_call_name(call: ast.Call):
+    fn = call.func
+    if isinstance(fn, ast.Name) and fn.id in BLOCKING_NAMES:
+        return fn.id
+    if isinstance(fn, ast.Attribute):
+        if isinstance(fn.value, ast.Name) and (fn.value.id, fn.attr) in BLOCKING_MODULE_CALLS:
+            return f"{fn.value.id}.{fn.attr}"
+        if fn.attr in BLOCKING_METHODS:
+            return f".{fn.attr}"
+    return None
+
+
+def _reachable_body(fn: ast.AsyncFunctionDef) -> list[ast.stmt]:
+    body: list[ast.stmt] = []
+    for stmt in fn.body:
+        body.append(stmt)
+        if isinstance(stmt, (ast.Return, ast.Raise)):
+            break
+    return body
+
+
+def scan_async_routes() -> set[tuple[str, str, str]]:
+    """(file, async function, blocking call) for calls made directly on the event loop.
+
+    Nested defs/lambdas are skipped: they are what gets handed to `run_io`/`run_cpu`/`asyncio.to_thread`.
+    """
+
+    found: set[tuple[str, str, str]] = set()
+    for path in sorted(ROUTERS_DIR.glob("*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.AsyncFunctionDef):
+                continue
+            stack: list[ast.AST] = list(_reachable_body(node))
+            while stack:
+                n = stack.pop()
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+                    continue
+                if isinstance(n, ast.Call):
+                    name = _blocking_call_name(n)
+                    if name:
+                        found.add((path.name, node.name, name))
+                stack.extend(ast.iter_child_nodes(n))
+    return found
+
+
+class TestAsyncRouteBlockingCalls(unittest.TestCase):
+    def test_no_new_blocking_calls_in_async_routes(self):
+        new = sorted(scan_async_routes() - KNOWN_BLOCKING)
+        self.assertEqual(
+            new,
+            [],
+            "Blocking call in async route; wrap it with `await run_io(...)`/`await run_cpu(...)` "
+            "(wechat_decrypt_tool.executors) or make the route a plain `def`.",
+        )
+
+    def test_known_list_has_no_stale_entries(self):
+        stale = sorted(KNOWN_BLOCKING - scan_async_routes())
+        self.assertEqual(stale, [], "Fixed violations should be removed from KNOWN_BLOCKING.")
+
+    def test_offloaded_routes_stay_clean(self):
+        hits = Counter((f, fn) for f, fn, _ in scan_async_routes())
+        for key in OFFLOADED_ROUTES:
+            self.assertEqual(hits.get(key, 0), 0, key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import hashlib
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.run_benchmarks import compare_results, select_benchmarks  # noqa: E402
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+def _db_digest(path: Path) -> str:
+    conn = sqlite3.connect(str(path))
+    try:
+        return hashlib.sha1("\n".join(conn.iterdump()).encode("utf-8")).hexdigest()
+    finally:
+        conn.close()
+
+
+class TestSyntheticAccount(unittest.TestCase):
+    def _spec(self, **kw):
+        base = dict(shards=2, conversations=6, messages_per_conversation=40, group_ratio=0.5, group_members=5)
+        base.update(kw)
+        return SyntheticAccountSpec(**base)
+
+    def test_layout_and_message_counts(self):
+        with TemporaryDirectory() as td:
+            acc = build_synthetic_account(Path(td), self._spec())
+            names = {p.name for p in acc.account_dir.iterdir()}
+            for expected in ("session.db", "contact.db", "head_image.db", "message_0.db", "message_1.db"):
+                self.assertIn(expected, names)
+            self.assertEqual(acc.total_messages, 6 * 40)
+            self.assertEqual(len(acc.groups), 3)
+
+            total = 0
+            for db in acc.message_db_paths:
+                conn = sqlite3.connect(str(db))
+                try:
+                    for conv in acc.conversations:
+                        table = msg_table_name(conv)
+                        if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (table,)).fetchone():
+                            total += int(conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0])
+                finally:
+                    conn.close()
+            self.assertEqual(total, acc.total_messages)
+
+    def test_same_seed_is_deterministic(self):
+        with TemporaryDirectory() as a, TemporaryDirectory() as b:
+            acc_a = build_synthetic_account(Path(a), self._spec())
+            acc_b = build_synthetic_account(Path(b), self._spec())
+            for name in ("message_0.db", "session.db", "contact.db"):
+                self.assertEqual(_db_digest(acc_a.account_dir / name), _db_digest(acc_b.account_dir / name))
+
+    def test_backend_reads_generated_account(self):
+        with TemporaryDirectory() as td:
+            acc = build_synthetic_account(Path(td), self._spec())
+            group = acc.groups[0]
+            with patch.object(chat_router, "_resolve_account_dir", return_value=acc.account_dir):
+                sessions = chat_router.list_chat_sessions(
+                    _DummyRequest(),
+                    account=acc.spec.account,
+                    limit=50,
+                    include_hidden=True,
+                    include_official=True,
+                    preview="session",
+                    source="",
+                )
+                messages = chat_router.list_chat_messages(
+                    _DummyRequest(),
+                    username=group,
+                    account=acc.spec.account,
+                    limit=100,
+                    offset=0,
+                    order="asc",
+                    render_types=None,
+                    source="",
+                )
+
+        self.assertEqual(sessions.get("status"), "success")
+        self.assertEqual({s.get("username") for s in sessions.get("sessions") or []}, set(acc.conversations))
+        self.assertEqual(messages.get("status"), "success")
+        msgs = messages.get("messages") or []
+        self.assertEqual(len(msgs), 40)
+        render_types = {m.get("renderType") for m in msgs}
+        self.assertIn("text", render_types)
+        # zstd-compressed appmsg XML must decode into structured render types, not raw bytes.
+        self.assertTrue(render_types & {"link", "quote", "image", "emoji", "voice"})
+
+
+class TestBenchmarkRunnerHelpers(unittest.TestCase):
+    def test_select_by_group_prefix(self):
+        names = [b.name for b in select_benchmarks("wrapped")]
+        self.assertEqual(names, [f"wrapped.card.{i}" for i in range(8)])
+        self.assertEqual([b.name for b in select_benchmarks("api.sessions")], ["api.sessions"])
+
+    def test_compare_flags_regressions(self):
+        base = {"results": [{"name": "a", "ok": True, "medianMs": 10.0}, {"name": "b", "ok": True, "medianMs": 10.0}]}
+        cur = {"results": [{"name": "a", "ok": True, "medianMs": 13.0}, {"name": "b", "ok": True, "medianMs": 10.5}]}
+        rows = {r["name"]: r for r in compare_results(cur, base, threshold=0.2)}
+        self.assertTrue(rows["a"]["regressed"])
+        self.assertFalse(rows["b"]["regressed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from fastapi import HTTPException
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool.routers import chat_media  # noqa: E402
+
+
+# 1x1 PNG
+PNG = bytes.fromhex(
+    "89504E470D0A1A0A"
+    "0000000D49484452000000010000000108060000001F15C489"
+    "0000000D49444154789C6360606060000000050001A5F64540"
+    "0000000049454E44AE426082"
+)
+
+
+def _unpack(blob: bytes) -> tuple[dict, bytes]:
+    size = int.from_bytes(blob[:4], "big")
+    return json.loads(blob[4 : 4 + size].decode("utf-8")), blob[4 + size :]
+
+
+class TestChatAvatarBatch(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(
+            os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root), "WECHAT_TOOL_AVATAR_CACHE_ENABLED": "1"}
+        )
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self._td.cleanup)
+
+        self.account_dir = self.root / "output" / "databases" / "wxid_test"
+        self.account_dir.mkdir(parents=True)
+        conn = sqlite3.connect(str(self.account_dir / "head_image.db"))
+        try:
+            conn.execute("CREATE TABLE head_image(username TEXT, md5 TEXT, image_buffer BLOB, update_time INTEGER)")
+            conn.executemany(
+                "INSERT INTO head_image VALUES (?, ?, ?, ?)",
+                [
+                    ("wxid_a", "old", sqlite3.Binary(b"stale"), 100),
+                    ("wxid_a", "aaaa", sqlite3.Binary(PNG), 200),
+                    ("wxid_b", "bbbb", sqlite3.Binary(PNG + b"\x00"), 300),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        patcher = mock.patch.object(chat_media, "_resolve_account_dir", return_value=self.account_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call(self, usernames, fmt="json"):
+        req = chat_media.AvatarBatchRequest(account="wxid_test", usernames=usernames, format=fmt)
+        return asyncio.run(chat_media.get_chat_avatars_batch(req))
+
+    def test_json_batch_uses_newest_blob_and_reports_missing(self):
+        resp = self._call(["wxid_b", "wxid_a", "wxid_remote_only", "wxid_a"])
+        self.assertEqual([a["username"] for a in resp["avatars"]], ["wxid_b", "wxid_a"])
+        self.assertEqual(resp["missing"], ["wxid_remote_only"])
+
+        a = resp["avatars"][1]
+        self.assertEqual(a["mediaType"], "image/png")
+        self.assertEqual(base64.b64decode(a["dataUrl"].split(",", 1)[1]), PNG)
+
+        cache_db = self.root / "output" / "avatar_cache" / "wxid_test" / "avatar_cache.db"
+        conn = sqlite3.connect(str(cache_db))
+        try:
+            n = conn.execute("SELECT COUNT(*) FROM avatar_cache_entries WHERE source_kind = 'user'").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual(n, 2)
+
+    def test_packed_batch_is_served_from_cache_once_warm(self):
+        self._call(["wxid_a", "wxid_b"])
+        with mock.patch.object(chat_media, "write_avatar_cache_payload") as write:
+            resp = self._call(["wxid_a", "wxid_b", "wxid_missing"], fmt="packed")
+        write.assert_not_called()
+
+        self.assertEqual(resp.media_type, "application/octet-stream")
+        manifest, data = _unpack(resp.body)
+        self.assertEqual(manifest["account"], "wxid_test")
+        self.assertEqual(manifest["missing"], ["wxid_missing"])
+        by_user = {m["username"]: data[m["offset"] : m["offset"] + m["length"]] for m in manifest["avatars"]}
+        self.assertEqual(by_user["wxid_a"], PNG)
+        self.assertEqual(by_user["wxid_b"], PNG + b"\x00")
+
+    def test_changed_head_image_refreshes_cache(self):
+        self._call(["wxid_a"])
+        conn = sqlite3.connect(str(self.account_dir / "head_image.db"))
+        try:
+            conn.execute("INSERT INTO head_image VALUES ('wxid_a', 'cccc', ?, 400)", (sqlite3.Binary(PNG * 2),))
+            conn.commit()
+        finally:
+            conn.close()
+        resp = self._call(["wxid_a"])
+        self.assertEqual(base64.b64decode(resp["avatars"][0]["dataUrl"].split(",", 1)[1]), PNG * 2)
+
+    def test_rejects_bad_requests(self):
+        for usernames, fmt in ((["  "], "json"), (["wxid_a"], "sprite"), ([f"u{i}" for i in range(201)], "json")):
+            with self.assertRaises(HTTPException) as cm:
+                self._call(usernames, fmt)
+            self.assertEqual(cm.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from wechat_decrypt_tool import chat_export_service as svc  # noqa: E402
+from wechat_decrypt_tool.chat_export_chain import merge_export_chain  # noqa: E402
+
+
+def _messages(zip_path: Path, fmt: str = "json") -> dict[str, list]:
+    out: dict[str, list] = {}
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for name in zf.namelist():
+            if fmt == "json" and name.endswith("/messages.json"):
+                out[name.rsplit("/", 1)[0]] = json.loads(zf.read(name).decode("utf-8"))["messages"]
+            elif fmt == "txt" and name.endswith("/messages.txt"):
+                out[name.rsplit("/", 1)[0]] = zf.read(name).decode("utf-8").split("\n\n", 1)[1].splitlines()
+    return out
+
+
+def _manifest(zip_path: Path) -> dict:
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        return json.loads(zf.read("manifest.json").decode("utf-8"))
+
+
+class TestChatExportDelta(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        spec = SyntheticAccountSpec(shards=2, conversations=3, messages_per_conversation=60, seed=11)
+        self.synthetic = build_synthetic_account(self.root, spec)
+        self.account = self.synthetic.account_dir.name
+        self.manager = svc.ChatExportManager()
+
+    def _export(self, fmt: str = "json", base_export=None, **overrides):
+        kwargs = dict(
+            account=self.account,
+            scope="selected",
+            usernames=list(self.synthetic.conversations),
+            export_format=fmt,
+            start_time=None,
+            end_time=None,
+            include_hidden=False,
+            include_official=False,
+            include_media=False,
+            media_kinds=[],
+            message_types=[],
+            output_dir=str(self.root / "exports"),
+            allow_process_key_extract=False,
+            download_remote_media=False,
+            privacy_mode=False,
+            file_name=None,
+            base_export=base_export,
+        )
+        kwargs.update(overrides)
+        job = self.manager.create_job(**kwargs)
+        for _ in range(400):
+            latest = self.manager.get_job(job.export_id)
+            if latest and latest.status in {"done", "error", "cancelled"}:
+                self.assertEqual(latest.status, "done", msg=latest.error)
+                return latest
+            time.sleep(0.05)
+        self.fail("export job did not finish in time")
+
+    def _append_messages(self, username: str, create_times: list[int]) -> None:
+        db_path = self.synthetic.message_db_paths[-1]
+        table = msg_table_name(username)
+        conn = sqlite3.connect(str(db_path))
+        try:
+            sender = conn.execute("SELECT rowid FROM Name2Id WHERE user_name = ?", (username,)).fetchone()[0]
+            conn.executemany(
+                f'INSERT INTO "{table}" (server_id, local_type, sort_seq, real_sender_id, create_time, status, source, '
+                "message_content) VALUES (?, 1, ?, ?, ?, 3, '', ?)",
+                [(9_000_000 + i, ct * 1000 + 999, sender, ct, f"new message {i}") for i, ct in enumerate(create_times)],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        st = db_path.stat()
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def _last_create_time(self, username: str) -> int:
+        latest = 0
+        for db_path in self.synthetic.message_db_paths:
+            conn = sqlite3.connect(str(db_path))
+            try:
+                row = conn.execute(f'SELECT MAX(create_time) FROM "{msg_table_name(username)}"').fetchone()
+                latest = max(latest, int(row[0] or 0))
+            except sqlite3.OperationalError:
+                pass
+            finally:
+                conn.close()
+        return latest
+
+    def test_delta_chain_exports_only_new_messages_and_merges(self):
+        full = self._export()
+        username = self.synthetic.conversations[0]
+        last_ts = self._last_create_time(username)
+        # One row in the watermark second itself, two after it.
+        self._append_messages(username, [last_ts, last_ts + 60, last_ts + 120])
+
+        delta = self._export(base_export=full.export_id)
+        delta_messages = _messages(delta.zip_path)
+        self.assertEqual(len(delta_messages), 1)
+        [(conv_dir, msgs)] = delta_messages.items()
+        self.assertEqual([m["renderType"] for m in msgs], ["text"] * 3)
+        self.assertEqual([m["createTime"] for m in msgs], [last_ts, last_ts + 60, last_ts + 120])
+        manifest = _manifest(delta.zip_path)
+        self.assertEqual(manifest["delta"]["baseExportId"], full.export_id)
+        self.assertEqual(len(manifest["conversations"]), len(self.synthetic.conversations))
+        self.assertIn(conv_dir, _messages(full.zip_path))
+
+        empty = self._export(base_export=str(delta.zip_path))
+        self.assertEqual(_messages(empty.zip_path), {})
+        self.assertEqual(_manifest(empty.zip_path)["delta"]["chain"], [full.export_id, delta.export_id])
+
+        merged_path = self.root / "merged.zip"
+        res = merge_export_chain([full.zip_path, delta.zip_path, empty.zip_path], merged_path)
+        self.assertEqual(res["exportId"], empty.export_id)
+        reference = _messages(self._export().zip_path)
+        merged = _messages(merged_path)
+        self.assertEqual(
+            {k.rsplit("_", 1)[-1]: [(m["localId"], m["createTime"]) for m in v] for k, v in merged.items()},
+            {k.rsplit("_", 1)[-1]: [(m["localId"], m["createTime"]) for m in v] for k, v in reference.items()},
+        )
+        with zipfile.ZipFile(merged_path, "r") as zf:
+            meta = json.loads(zf.read(f"{conv_dir}/meta.json").decode("utf-8"))
+        self.assertEqual(meta["messageCount"], len(merged[conv_dir]))
+
+        # The merged archive continues the chain.
+        self._append_messages(username, [last_ts + 180])
+        after_merge = self._export(base_export=str(merged_path))
+        self.assertEqual([m["createTime"] for m in _messages(after_merge.zip_path)[conv_dir]], [last_ts + 180])
+
+    def test_txt_delta_and_rejected_bases(self):
+        full = self._export("txt")
+        username = self.synthetic.conversations[1]
+        self._append_messages(username, [self._last_create_time(username) + 5])
+        delta = self._export("txt", base_export=full.export_id)
+        [lines] = _messages(delta.zip_path, "txt").values()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("new message 0", lines[0])
+
+        merged_path = self.root / "merged_txt.zip"
+        merge_export_chain([full.zip_path, delta.zip_path], merged_path)
+        merged = _messages(merged_path, "txt")
+        self.assertTrue(any(v[-1] == lines[0] for v in merged.values()))
+
+        with self.assertRaises(ValueError):
+            self._export("json", base_export=full.export_id)
+        with self.assertRaises(ValueError):
+            self._export("html", base_export=full.export_id)
+        with self.assertRaises(ValueError):
+            merge_export_chain([delta.zip_path, full.zip_path], self.root / "bad.zip")
+
+    def test_delta_options_must_match_base(self):
+        cutoff = self.synthetic.spec.start_ts + 86400
+        base = self._export(message_types=["text"], end_time=cutoff)
+        for overrides in (
+            {"message_types": []},
+            {"message_types": ["text", "image"]},
+            {"include_media": True, "media_kinds": ["image"], "message_types": ["text", "image"]},
+            {"start_time": self.synthetic.spec.start_ts},
+            {"end_time": cutoff - 60},
+        ):
+            with self.subTest(**overrides), self.assertRaises(ValueError):
+                self._export(base_export=base.export_id, **{"message_types": ["text"], **overrides})
+        # Same filters with a later end time continue the chain.
+        delta = self._export(base_export=base.export_id, message_types=["TEXT"], end_time=cutoff + 86400)
+        self.assertEqual(_manifest(delta.zip_path)["delta"]["baseExportId"], base.export_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool import chat_export_service as svc  # noqa: E402
+from wechat_decrypt_tool.media_helpers import _get_resource_dir  # noqa: E402
+
+
+_PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+_MD5_A = "a" * 32
+_MD5_B = "b" * 32
+_MD5_C = "c" * 32
+
+
+class TestChatExportMediaDedup(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        self.account_dir = self.root / "acct"
+        self.account_dir.mkdir()
+        self.zip_path = self.root / "out.zip"
+
+    def _put_resource(self, md5: str, ext: str, data: bytes) -> None:
+        p = _get_resource_dir(self.account_dir) / md5[:2] / f"{md5}.{ext}"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data)
+
+    def _materialize(self, zf, media_written, *, kind, md5):
+        return svc._materialize_media(
+            zf=zf,
+            account_dir=self.account_dir,
+            conv_username="wxid_friend",
+            kind=kind,
+            md5=md5,
+            file_id="",
+            media_written=media_written,
+            suggested_name="",
+        )
+
+    def test_same_content_is_stored_once(self):
+        # The same picture forwarded into two chats, stored under two md5 names.
+        self._put_resource(_MD5_A, "png", _PNG)
+        self._put_resource(_MD5_B, "png", _PNG)
+        media_written: dict[str, str] = {}
+        with zipfile.ZipFile(self.zip_path, "w") as zf:
+            arc_a, new_a = self._materialize(zf, media_written, kind="image", md5=_MD5_A)
+            arc_b, new_b = self._materialize(zf, media_written, kind="image", md5=_MD5_B)
+        self.assertEqual((arc_b, new_a, new_b), (arc_a, True, False))
+        self.assertEqual(media_written[f"image:{_MD5_B}"], arc_a)
+        with zipfile.ZipFile(self.zip_path) as zf:
+            self.assertEqual(len([n for n in zf.namelist() if n.startswith("media/")]), 1)
+
+    def test_source_is_decrypted_once_per_job(self):
+        self._put_resource(_MD5_C, "dat", b"\x07\x08encrypted")
+        media_written: dict[str, str] = {}
+        with (
+            mock.patch.object(svc, "_read_and_maybe_decrypt_media", return_value=(_PNG, "image/png")) as decrypt,
+            zipfile.ZipFile(self.zip_path, "w") as zf,
+        ):
+            arc_image, _ = self._materialize(zf, media_written, kind="image", md5=_MD5_C)
+            arc_emoji, is_new = self._materialize(zf, media_written, kind="emoji", md5=_MD5_C)
+        self.assertEqual(decrypt.call_count, 1)
+        self.assertEqual((arc_emoji, is_new), (arc_image, False))
+        self.assertTrue(arc_image.endswith(".png"))
+
+    def test_forwarded_voice_is_stored_once(self):
+        conn = sqlite3.connect(str(self.account_dir / "media_0.db"))
+        try:
+            conn.execute("CREATE TABLE VoiceInfo (svr_id INTEGER, create_time INTEGER, voice_data BLOB)")
+            conn.executemany("INSERT INTO VoiceInfo VALUES (?, 1, ?)", [(101, b"SILK-x"), (202, b"SILK-x"), (303, b"SILK-y")])
+            conn.commit()
+        finally:
+            conn.close()
+
+        media_written: dict[str, str] = {}
+        with (
+            mock.patch.object(svc, "load_transcoded_voice", return_value=None),
+            mock.patch.object(svc, "store_transcoded_voice"),
+            mock.patch.object(svc, "_convert_silk_to_browser_audio", side_effect=lambda d, **_: (b"ID3" + d, "mp3", "audio/mpeg")) as convert,
+            zipfile.ZipFile(self.zip_path, "w") as zf,
+        ):
+            arcs = [
+                svc._materialize_voice(
+                    zf=zf,
+                    account_dir=self.account_dir,
+                    media_db_path=self.account_dir / "media_0.db",
+                    server_id=sid,
+                    media_written=media_written,
+                )
+                for sid in (101, 202, 303)
+            ]
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual([is_new for _, is_new in arcs], [True, False, True])
+        self.assertEqual(arcs[1][0], arcs[0][0])
+        self.assertNotEqual(arcs[2][0], arcs[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
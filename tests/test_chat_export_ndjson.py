@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+import time
+import unittest
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import chat_export_service as svc  # noqa: E402
+from wechat_decrypt_tool.chat_export_chain import merge_export_chain  # noqa: E402
+
+
+def _conversation_files(zip_path: Path) -> dict[str, tuple[bytes, dict]]:
+    out: dict[str, tuple[bytes, dict]] = {}
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for name in zf.namelist():
+            if name.endswith("/messages.ndjson"):
+                conv_dir = name.rsplit("/", 1)[0]
+                index = json.loads(zf.read(f"{conv_dir}/messages.index.json").decode("utf-8"))
+                out[conv_dir] = (zf.read(name), index)
+    return out
+
+
+class TestChatExportNdjson(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        spec = SyntheticAccountSpec(shards=3, conversations=3, messages_per_conversation=150, span_days=20, seed=5)
+        self.synthetic = build_synthetic_account(self.root, spec)
+        self.manager = svc.ChatExportManager()
+
+    def _export(self, *, end_time=None, base_export=None):
+        job = self.manager.create_job(
+            account=self.synthetic.account_dir.name,
+            scope="selected",
+            usernames=list(self.synthetic.conversations),
+            export_format="ndjson",
+            start_time=None,
+            end_time=end_time,
+            include_hidden=False,
+            include_official=False,
+            include_media=False,
+            media_kinds=[],
+            message_types=[],
+            output_dir=str(self.root / "exports"),
+            allow_process_key_extract=False,
+            download_remote_media=False,
+            privacy_mode=False,
+            file_name=None,
+            base_export=base_export,
+        )
+        for _ in range(400):
+            latest = self.manager.get_job(job.export_id)
+            if latest and latest.status in {"done", "error", "cancelled"}:
+                self.assertEqual(latest.status, "done", msg=latest.error)
+                return latest
+            time.sleep(0.05)
+        self.fail("export job did not finish in time")
+
+    def test_one_message_per_line_with_day_ranges(self):
+        job = self._export()
+        files = _conversation_files(job.zip_path)
+        self.assertEqual(len(files), len(self.synthetic.conversations))
+        for payload, index in files.values():
+            lines = payload.splitlines(keepends=True)
+            header = json.loads(lines[0])
+            self.assertEqual((header["format"], index["headerBytes"]), ("ndjson", len(lines[0])))
+            self.assertEqual(index["bytes"], len(payload))
+            self.assertEqual(index["messages"], len(lines) - 1)
+            self.assertGreater(len(index["days"]), 1)
+
+            # Each day range can be parsed on its own.
+            for day in index["days"]:
+                chunk = payload[day["offset"] : day["offset"] + day["length"]]
+                msgs = [json.loads(line) for line in chunk.splitlines()]
+                self.assertEqual(len(msgs), day["messages"])
+                dates = {datetime.fromtimestamp(m["createTime"]).strftime("%Y-%m-%d") for m in msgs}
+                self.assertEqual(dates, {day["date"]})
+
+    def test_delta_chain_merge_rebuilds_index(self):
+        cutoff = self.synthetic.spec.start_ts + 10 * 86400
+        first = self._export(end_time=cutoff)
+        delta = self._export(base_export=first.export_id)
+        merged_path = self.root / "merged.zip"
+        merge_export_chain([first.zip_path, delta.zip_path], merged_path)
+
+        reference = _conversation_files(self._export().zip_path)
+        merged = _conversation_files(merged_path)
+        self.assertEqual(merged.keys(), reference.keys())
+        for conv_dir, (payload, index) in merged.items():
+            ref_payload, ref_index = reference[conv_dir]
+            self.assertEqual(payload.splitlines()[1:], ref_payload.splitlines()[1:])
+            strip = lambda idx: [(d["date"], d["length"], d["messages"]) for d in idx["days"]]  # noqa: E731
+            self.assertEqual(strip(index), strip(ref_index))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,6 +53,8 @@ class TestChatListMessagesReScope(unittest.TestCase):
 
             with patch.object(chat, "_resolve_account_dir", return_value=account_dir), patch.object(
                 chat, "_iter_message_db_paths", return_value=[account_dir / "msg_0.db"]
+            ), patch.object(
+                chat, "conversation_message_db_paths", return_value=[account_dir / "msg_0.db"]
             ), patch.object(chat, "_collect_chat_messages", side_effect=fake_collect_chat_messages), patch.object(
                 chat, "_postprocess_transfer_messages", lambda _merged: None
             ), patch.object(chat, "_extract_xml_tag_text", return_value="${wxid_abc}"), patch.object(
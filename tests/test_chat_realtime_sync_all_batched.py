@@ -0,0 +1,171 @@
+import os
+import shutil
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from benchmarks.wcdb_standin import LocalWCDBStandIn  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+def _dump_tables(account_dir: Path, usernames: list[str]) -> dict:
+    out = {}
+    for p in sorted(account_dir.glob("message_*.db")):
+        conn = sqlite3.connect(str(p))
+        try:
+            for u in usernames:
+                t = msg_table_name(u)
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (t,)).fetchone():
+                    out[(p.name, u)] = conn.execute(
+                        f'SELECT local_id, server_id, real_sender_id, create_time, message_content FROM "{t}" ORDER BY local_id'
+                    ).fetchall()
+        finally:
+            conn.close()
+    conn = sqlite3.connect(str(account_dir / "session.db"))
+    try:
+        out["session_last_message"] = conn.execute(
+            "SELECT username, local_id, create_time, preview, db_stem FROM session_last_message ORDER BY username"
+        ).fetchall()
+    finally:
+        conn.close()
+    return out
+
+
+def _live_rows(standin: LocalWCDBStandIn, username: str) -> list:
+    out = []
+    t = msg_table_name(username)
+    for p in sorted(standin.message_dir.glob("message_*.db")):
+        conn = sqlite3.connect(str(p))
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (t,)).fetchone():
+                out.append(
+                    (
+                        p,
+                        conn.execute(
+                            f'SELECT local_id, server_id, real_sender_id, create_time, message_content FROM "{t}" ORDER BY local_id'
+                        ).fetchall(),
+                    )
+                )
+        finally:
+            conn.close()
+    return out
+
+
+class TestBatchedRealtimeSyncAll(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(root)})
+        env.start()
+        self.addCleanup(env.stop)
+        spec = SyntheticAccountSpec(shards=2, conversations=12, messages_per_conversation=30, seed=7)
+        self.synthetic = build_synthetic_account(root, spec)
+        self.account_dir = self.synthetic.account_dir
+        self.standin = LocalWCDBStandIn.from_decrypted_account(self.account_dir, root / "db_storage")
+        # First pass builds session_last_message and the watermarks.
+        self._sync_all()
+
+    def _sync_all(self, *, batched: bool = True, account_dir=None):
+        env = {"WECHAT_TOOL_REALTIME_SYNC_BATCHED": "1" if batched else "0"}
+        account_dir = account_dir or self.account_dir
+        with (
+            self.standin.patch(chat_router),
+            mock.patch.dict(os.environ, env),
+            mock.patch.object(chat_router, "_resolve_account_dir", return_value=account_dir),
+        ):
+            return chat_router.sync_chat_realtime_messages_all(None, account=account_dir.name, max_scan=50)
+
+    def test_batched_matches_per_session(self):
+        changed = self.synthetic.conversations[::3]
+        self.standin.append_messages(changed, count=4)
+
+        per_session_dir = Path(self._td.name) / "per_session" / self.account_dir.name
+        shutil.copytree(self.account_dir, per_session_dir)
+
+        batched = self._sync_all(batched=True)
+        per_session = self._sync_all(batched=False, account_dir=per_session_dir)
+
+        self.assertTrue(batched["batched"])
+        self.assertFalse(per_session["batched"])
+        self.assertEqual(batched["errors"], [])
+        self.assertEqual(batched["sessionsNeedSync"], len(changed))
+        self.assertEqual(batched["insertedTotal"], 4 * len(changed))
+        self.assertEqual(per_session["insertedTotal"], batched["insertedTotal"])
+        self.assertEqual(
+            _dump_tables(self.account_dir, self.synthetic.conversations),
+            _dump_tables(per_session_dir, self.synthetic.conversations),
+        )
+
+    def test_one_bulk_fetch_per_message_db(self):
+        changed = self.synthetic.conversations[:6]
+        self.standin.append_messages(changed, count=2)
+        # Every live shard holding one of the changed conversations is fetched once.
+        dbs = {p.name for u in changed for p, _ in _live_rows(self.standin, u)}
+        real_exec = self.standin.exec_query
+        bulk_calls = []
+
+        def _exec(handle, *, kind, path, sql):
+            if "_tbl" in sql:
+                bulk_calls.append(Path(path).name)
+            return real_exec(handle, kind=kind, path=path, sql=sql)
+
+        with (
+            mock.patch.object(self.standin, "exec_query", side_effect=_exec),
+            mock.patch.object(self.standin, "get_messages", side_effect=AssertionError("per-session fetch")),
+        ):
+            res = self._sync_all()
+        self.assertEqual(res["errors"], [])
+        self.assertEqual(res["insertedTotal"], 12)
+        self.assertEqual(sorted(bulk_calls), sorted(dbs))
+
+    def test_conversation_split_across_live_shards(self):
+        u = self.synthetic.conversations[0]
+        self.standin.append_messages([u], count=3)
+        self.standin.append_messages([u], count=2, db_name="message_1.db")
+
+        res = self._sync_all()
+        self.assertEqual(res["errors"], [])
+        self.assertEqual((res["sessionsSynced"], res["insertedTotal"]), (1, 5))
+        for live_path, rows in _live_rows(self.standin, u):
+            self.assertEqual(_dump_tables(self.account_dir, [u])[(live_path.name, u)], rows)
+        newest = max(r[3] for _, rows in _live_rows(self.standin, u) for r in rows)
+        self.assertIn((u, newest, "message_1"), [(r[0], r[2], r[4]) for r in _dump_tables(self.account_dir, [u])["session_last_message"]])
+
+    def test_watermark_tracks_fetched_messages(self):
+        self.assertEqual(self._sync_all()["sessionsNeedSync"], 0)
+
+        # Pinning or drafting only moves sort_timestamp: not a reason to sync.
+        u = self.synthetic.conversations[0]
+        self.standin._sessions[u]["sort_timestamp"] = int(self.standin._sessions[u]["sort_timestamp"]) + 100
+        self.assertEqual(self._sync_all()["sessionsNeedSync"], 0)
+
+        # A last_timestamp bump without a fetchable message is re-checked, but the watermark only moves to the
+        # newest message WCDB returned.
+        bumped = int(self.standin._sessions[u]["last_timestamp"]) + 100
+        self.standin._sessions[u]["last_timestamp"] = bumped
+        first = self._sync_all()
+        self.assertEqual((first["sessionsNeedSync"], first["insertedTotal"]), (1, 0))
+        conn = sqlite3.connect(str(self.account_dir / "session.db"))
+        try:
+            watermark = conn.execute(
+                f"SELECT last_timestamp FROM {chat_router._REALTIME_SYNC_WATERMARK_TABLE} WHERE username = ?", (u,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        self.assertLess(watermark, bumped)
+        self.assertEqual(self._sync_all()["sessionsNeedSync"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import chat_search_index  # noqa: E402
+from wechat_decrypt_tool.chat_search_index import SEARCH_HIT_CACHE, SearchHitCache  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+class TestSearchHitCacheLru(unittest.TestCase):
+    def test_version_mismatch_and_key_budget(self):
+        cache = SearchHitCache(max_entries=3, max_total_keys=5)
+        cache.put(("acc", "a"), 1, {"keys": [1, 2, 3]})
+        self.assertIsNotNone(cache.get(("acc", "a"), 1))
+        self.assertIsNone(cache.get(("acc", "a"), 2))
+        self.assertIsNone(cache.get(("acc", "a"), 1))
+
+        cache.put(("acc", "a"), 1, {"keys": [1, 2, 3]})
+        cache.put(("acc", "b"), 1, {"keys": [1, 2]})
+        cache.put(("acc", "c"), 1, {"keys": [1]})  # over the key budget -> evicts the oldest
+        self.assertIsNone(cache.get(("acc", "a"), 1))
+        self.assertIsNotNone(cache.get(("acc", "b"), 1))
+
+        cache.invalidate_account("acc")
+        self.assertIsNone(cache.get(("acc", "b"), 1))
+
+
+class TestChatSearchHitCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._td = TemporaryDirectory()
+        cls._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = cls._td.name
+        spec = SyntheticAccountSpec(shards=2, conversations=8, messages_per_conversation=120, seed=11)
+        cls.account = build_synthetic_account(Path(cls._td.name), spec)
+        chat_search_index._build_worker(cls.account.account_dir, False)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = cls._prev_data_dir
+        cls._td.cleanup()
+
+    def setUp(self):
+        SEARCH_HIT_CACHE.clear()
+        patcher = mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account.account_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, q, **kw):
+        args = dict(
+            q=q,
+            account=None,
+            username=None,
+            sender=None,
+            session_type=None,
+            limit=20,
+            offset=0,
+            start_time=None,
+            end_time=None,
+            render_types=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        args.update(kw)
+        return chat_router._search_chat_messages_via_fts(_DummyRequest(), **args)
+
+    def test_pages_are_served_from_cached_hit_keys(self):
+        with mock.patch.object(
+            chat_router, "_query_search_hit_keys", wraps=chat_router._query_search_hit_keys
+        ) as query:
+            first = self._search("好的", limit=20, offset=0)
+            second = self._search("好的", limit=20, offset=20)
+            self._search("好的", limit=5, offset=3)
+            self.assertEqual(query.call_count, 1)
+
+            # Different filters are a different hit list.
+            self._search("好的", session_type="group")
+            self.assertEqual(query.call_count, 2)
+
+        self.assertEqual(first["status"], "success")
+        self.assertGreater(first["total"], 40)
+        self.assertEqual(second["total"], first["total"])
+
+        SEARCH_HIT_CACHE.clear()
+        full = self._search("好的", limit=40, offset=0)
+        key = lambda h: (h["username"], h["id"])  # noqa: E731
+        self.assertEqual([key(h) for h in full["hits"]], [key(h) for h in first["hits"] + second["hits"]])
+
+    def test_rebuilt_index_invalidates_cached_hits(self):
+        self._search("收到")
+        self.assertEqual(len(SEARCH_HIT_CACHE._entries), 1)
+        chat_search_index._build_worker(self.account.account_dir, True)
+        self.assertEqual(len(SEARCH_HIT_CACHE._entries), 0)
+
+        with mock.patch.object(
+            chat_router, "_query_search_hit_keys", wraps=chat_router._query_search_hit_keys
+        ) as query:
+            self._search("收到")
+            self.assertEqual(query.call_count, 1)
+
+    def test_truncated_hit_list_falls_back_to_sql_paging(self):
+        with mock.patch.object(chat_router, "_SEARCH_CACHE_MAX_KEYS", 10):
+            SEARCH_HIT_CACHE.clear()
+            deep = self._search("好的", limit=5, offset=12)
+            SEARCH_HIT_CACHE.clear()
+        reference = self._search("好的", limit=5, offset=12)
+        self.assertEqual(deep["total"], reference["total"])
+        self.assertEqual([h["id"] for h in deep["hits"]], [h["id"] for h in reference["hits"]])
+
+    def test_truncated_hit_list_extends_cached_window(self):
+        reference = self._search("好的", limit=50, offset=0)
+        SEARCH_HIT_CACHE.clear()
+
+        with mock.patch.object(chat_router, "_SEARCH_CACHE_MAX_KEYS", 10):
+            self._search("好的", limit=5, offset=0)
+            (entry,) = [v for _version, v in SEARCH_HIT_CACHE._entries.values()]
+            self.assertTrue(entry["truncated"])
+            prefix = list(entry["keys"])
+            # The extension keeps the cached total instead of re-running COUNT(*).
+            entry["total"] = 12345
+
+            deep = self._search("好的", limit=5, offset=12)
+            (entry,) = [v for _version, v in SEARCH_HIT_CACHE._entries.values()]
+            self.assertEqual(entry["keys"][:10], prefix)
+            self.assertEqual(len(entry["keys"]), 20)
+            self.assertEqual(sum(entry["taken"].values()), 20)
+            self.assertEqual(deep["total"], 12345)
+
+            with mock.patch.object(
+                chat_router, "_query_search_hit_keys", wraps=chat_router._query_search_hit_keys
+            ) as query:
+                within = self._search("好的", limit=5, offset=15)
+                self.assertEqual(query.call_count, 0)
+
+        ids = [h["id"] for h in reference["hits"]]
+        self.assertEqual([h["id"] for h in deep["hits"]], ids[12:17])
+        self.assertEqual([h["id"] for h in within["hits"]], ids[15:20])
+
+
+if __name__ == "__main__":
+    unittest.main()
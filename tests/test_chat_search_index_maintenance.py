@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import sys
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool import chat_search_index  # noqa: E402
+from wechat_decrypt_tool.chat_helpers import _build_fts_query, _to_char_token_text  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+def _write_fragmented_index(account_dir: Path, *, batches: int) -> None:
+    conn = sqlite3.connect(str(account_dir / "chat_search_index.db"))
+    try:
+        chat_search_index._init_index_db(conn)
+        # Keep every committed batch as its own segment, like a long series of incremental appends.
+        conn.execute("INSERT INTO message_fts(message_fts, rank) VALUES('automerge', 0)")
+        conn.commit()
+        local_id = 0
+        for b in range(batches):
+            rows = []
+            for i in range(50):
+                local_id += 1
+                text = "好的收到" if i % 5 == 0 else f"消息{b}-{i}"
+                rows.append((_to_char_token_text(text), f"wxid_{i % 7}", 1_700_000_000 + local_id, local_id))
+            conn.executemany(
+                "INSERT INTO message_fts(text, username, render_type, create_time, sort_seq, local_id, server_id, "
+                "local_type, db_stem, table_name, sender_username, is_hidden, is_official) "
+                "VALUES (?, ?, 'text', ?, 0, ?, 0, 1, 'message_0', 'Msg_x', '', 0, 0)",
+                rows,
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+class TestChatSearchIndexMaintenance(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.account_dir = Path(self._td.name) / "wxid_me"
+        self.account_dir.mkdir()
+        _write_fragmented_index(self.account_dir, batches=12)
+        self.key = self.account_dir.name
+        for d in (chat_search_index._BUILD_STATE, chat_search_index._MAINT_STATE, chat_search_index._LAST_QUERY_AT):
+            d.pop(self.key, None)
+
+    def _hit_keys(self):
+        where_sql, params = chat_router._build_search_fts_where(
+            _build_fts_query("好的"),
+            username=None,
+            session_type=None,
+            sender=None,
+            want_types=None,
+            start_ts=None,
+            end_ts=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        entry, _ = chat_router._query_search_hit_keys(
+            chat_search_index.get_chat_search_index_db_path(self.account_dir),
+            where_sql=where_sql,
+            params=params,
+            offset=0,
+            limit=10,
+        )
+        return entry["keys"]
+
+    def _segments(self):
+        return chat_search_index.get_chat_search_index_status(self.account_dir)["index"]["segmentCount"]
+
+    def test_optimize_merges_segments_and_keeps_results(self):
+        status = chat_search_index.get_chat_search_index_status(self.account_dir)["index"]
+        self.assertEqual(status["segmentCount"], 12)
+        self.assertGreater(status["sizeBytes"], 0)
+        before = self._hit_keys()
+
+        result = chat_search_index.optimize_chat_search_index(self.account_dir)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual((result["segmentsBefore"], result["segmentsAfter"]), (12, 1))
+        self.assertEqual(self._segments(), 1)
+        self.assertEqual(self._hit_keys(), before)
+
+        maintenance = chat_search_index.get_chat_search_index_status(self.account_dir)["index"]["maintenance"]
+        self.assertEqual(maintenance["lastResult"], "success")
+
+    def test_merge_mode_does_incremental_work(self):
+        result = chat_search_index.optimize_chat_search_index(self.account_dir, mode="merge", vacuum=False)
+        self.assertEqual(result["status"], "success")
+        self.assertLess(result["segmentsAfter"], 12)
+
+    def test_skipped_while_building(self):
+        chat_search_index._BUILD_STATE[self.key] = {"status": "building"}
+        self.addCleanup(chat_search_index._BUILD_STATE.pop, self.key, None)
+        self.assertEqual(chat_search_index.optimize_chat_search_index(self.account_dir)["status"], "skipped")
+        self.assertEqual(self._segments(), 12)
+
+    def test_scheduled_maintenance_runs_once_idle(self):
+        env = {"WECHAT_TOOL_SEARCH_INDEX_IDLE_SEC": "0", "WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS": "20"}
+        with mock.patch.dict(os.environ, env):
+            self.assertFalse(chat_search_index.schedule_chat_search_index_maintenance(self.account_dir))
+        env["WECHAT_TOOL_SEARCH_INDEX_MAX_SEGMENTS"] = "8"
+        with mock.patch.dict(os.environ, env):
+            chat_search_index.note_chat_search_index_query(self.account_dir)
+            self.assertTrue(chat_search_index.schedule_chat_search_index_maintenance(self.account_dir))
+            deadline = time.time() + 10
+            while chat_search_index._MAINT_STATE[self.key].get("scheduled") and time.time() < deadline:
+                time.sleep(0.02)
+        self.assertEqual(self._segments(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import chat_search_index  # noqa: E402
+from wechat_decrypt_tool.chat_search_index import SEARCH_HIT_CACHE  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+class TestChatSearchPayloads(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._td = TemporaryDirectory()
+        cls._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = cls._td.name
+        spec = SyntheticAccountSpec(shards=2, conversations=6, messages_per_conversation=80, seed=5)
+        cls.account = build_synthetic_account(Path(cls._td.name), spec)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = cls._prev_data_dir
+        cls._td.cleanup()
+
+    def setUp(self):
+        SEARCH_HIT_CACHE.clear()
+        patcher = mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account.account_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _build(self, payloads: bool):
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_PAYLOADS": "1" if payloads else "0"}):
+            chat_search_index._build_worker(self.account.account_dir, True)
+
+    def _search(self, q, **kw):
+        args = dict(
+            q=q,
+            account=None,
+            username=None,
+            sender=None,
+            session_type=None,
+            limit=30,
+            offset=0,
+            start_time=None,
+            end_time=None,
+            render_types=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        args.update(kw)
+        return chat_router._search_chat_messages_via_fts(_DummyRequest(), **args)
+
+    def test_payload_hits_match_source_db_hydration(self):
+        self._build(payloads=False)
+        status = chat_search_index.get_chat_search_index_status(self.account.account_dir)
+        self.assertFalse(status["index"]["hasPayloads"])
+        expected = self._search("好的")
+        expected_conv = self._search("好的", username=expected["hits"][0]["username"])
+
+        self._build(payloads=True)
+        status = chat_search_index.get_chat_search_index_status(self.account.account_dir)
+        self.assertTrue(status["index"]["hasPayloads"])
+        with mock.patch.object(chat_router, "_row_to_search_hit") as row_to_hit:
+            got = self._search("好的")
+            got_conv = self._search("好的", username=expected["hits"][0]["username"])
+        row_to_hit.assert_not_called()
+
+        self.assertGreater(len(expected["hits"]), 0)
+        self.assertEqual(got["total"], expected["total"])
+        self.assertEqual(got["hits"], expected["hits"])
+        self.assertEqual(got_conv["hits"], expected_conv["hits"])
+
+    def test_payloads_are_compact_and_share_fts_rowids(self):
+        self._build(payloads=True)
+        conn = sqlite3.connect(str(chat_search_index.get_chat_search_index_db_path(self.account.account_dir)))
+        try:
+            n_fts = conn.execute("SELECT COUNT(*) FROM message_fts").fetchone()[0]
+            n_payload = conn.execute(
+                "SELECT COUNT(*) FROM message_payload p JOIN message_fts f ON f.rowid = p.rowid"
+            ).fetchone()[0]
+            payload = conn.execute("SELECT payload FROM message_payload LIMIT 1").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual(n_payload, n_fts)
+        self.assertNotIn('"localId"', payload)
+        self.assertNotIn('"quoteThumbUrl":""', payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
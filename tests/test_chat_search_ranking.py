@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from fastapi import HTTPException
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import chat_search_index  # noqa: E402
+from wechat_decrypt_tool.chat_helpers import _build_fts_query, _to_char_token_text  # noqa: E402
+from wechat_decrypt_tool.chat_search_index import SEARCH_HIT_CACHE  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+NOW = 1_700_000_000
+DAY = 86400
+
+
+class TestSearchRankOrder(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.index_path = Path(self._td.name) / "chat_search_index.db"
+        conn = sqlite3.connect(str(self.index_path))
+        try:
+            chat_search_index._init_index_db(conn)
+            rows = [
+                ("wxid_recent", NOW, 1, "今天天气很好的我们一起去公园散步吧好的"),
+                ("wxid_short", NOW - DAY, 2, "好的"),
+                ("wxid_old", NOW - 400 * DAY, 3, "好的好的好的"),
+                ("wxid_other", NOW, 4, "收到"),
+            ]
+            conn.executemany(
+                "INSERT INTO message_fts(text, username, render_type, create_time, sort_seq, local_id, server_id, "
+                "local_type, db_stem, table_name, sender_username, is_hidden, is_official) "
+                "VALUES (?, ?, 'text', ?, 0, ?, 0, 1, 'message_0', 'Msg_x', '', 0, 0)",
+                [(_to_char_token_text(text), u, ts, lid) for u, ts, lid, text in rows],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _order(self, sort, *, half_life_days=None, weights=None):
+        where_sql, params = chat_router._build_search_fts_where(
+            _build_fts_query("好的"),
+            username=None,
+            session_type=None,
+            sender=None,
+            want_types=None,
+            start_ts=None,
+            end_ts=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        rank_sql, rank_params = chat_router._build_search_fts_rank(
+            sort, half_life_days=half_life_days, conversation_weights=weights or {}, now=NOW
+        )
+        entry, page = chat_router._query_search_hit_keys(
+            self.index_path,
+            where_sql=where_sql,
+            params=params,
+            offset=0,
+            limit=10,
+            rank_sql=rank_sql,
+            rank_params=rank_params,
+        )
+        self.assertEqual(entry["total"], 3)
+        return [k[0] for k in page]
+
+    def test_time_order(self):
+        self.assertEqual(self._order("time"), ["wxid_recent", "wxid_short", "wxid_old"])
+
+    def test_bm25_prefers_denser_matches(self):
+        self.assertEqual(self._order("relevance"), ["wxid_old", "wxid_short", "wxid_recent"])
+
+    def test_recency_decay_and_conversation_weight(self):
+        self.assertEqual(self._order("relevance", half_life_days=7), ["wxid_short", "wxid_recent", "wxid_old"])
+        self.assertEqual(
+            self._order("relevance", half_life_days=7, weights={"wxid_recent": 50.0}),
+            ["wxid_recent", "wxid_short", "wxid_old"],
+        )
+
+    def test_parse_conversation_weights(self):
+        self.assertEqual(
+            chat_router._parse_search_conversation_weights("a@chatroom:2, wxid_b:0.5,"),
+            {"a@chatroom": 2.0, "wxid_b": 0.5},
+        )
+        for bad in ("wxid_a:x", "wxid_a:0"):
+            with self.assertRaises(HTTPException):
+                chat_router._parse_search_conversation_weights(bad)
+
+
+class TestRelevanceSearchRoute(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._td = TemporaryDirectory()
+        cls._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = cls._td.name
+        spec = SyntheticAccountSpec(shards=2, conversations=6, messages_per_conversation=80, seed=3)
+        cls.account = build_synthetic_account(Path(cls._td.name), spec)
+        chat_search_index._build_worker(cls.account.account_dir, False)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = cls._prev_data_dir
+        cls._td.cleanup()
+
+    def setUp(self):
+        SEARCH_HIT_CACHE.clear()
+        patcher = mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account.account_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, **kw):
+        args = dict(
+            q="好的",
+            account=None,
+            username=None,
+            sender=None,
+            session_type=None,
+            limit=200,
+            offset=0,
+            start_time=None,
+            end_time=None,
+            render_types=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        args.update(kw)
+        return chat_router._search_chat_messages_via_fts(_DummyRequest(), **args)
+
+    def test_relevance_returns_same_hits_in_a_different_order(self):
+        by_time = self._search()
+        ranked = self._search(sort="relevance", half_life_days=30)
+        self.assertEqual(ranked["sort"], "relevance")
+        self.assertEqual(ranked["total"], by_time["total"])
+        ids = lambda r: [h["id"] for h in r["hits"]]  # noqa: E731
+        self.assertEqual(sorted(ids(ranked)), sorted(ids(by_time)))
+        self.assertEqual(len(SEARCH_HIT_CACHE._entries), 2)
+
+    def test_invalid_sort_is_rejected(self):
+        with self.assertRaises(HTTPException) as cm:
+            self._search(sort="random")
+        self.assertEqual(cm.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
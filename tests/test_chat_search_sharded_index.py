@@ -0,0 +1,160 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import chat_search_index  # noqa: E402
+from wechat_decrypt_tool.chat_helpers import _iter_message_db_paths  # noqa: E402
+from wechat_decrypt_tool.chat_search_index import SEARCH_HIT_CACHE  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+class TestShardedSearchIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._td = TemporaryDirectory()
+        cls._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = cls._td.name
+        spec = SyntheticAccountSpec(shards=3, conversations=8, messages_per_conversation=90, seed=21)
+        cls.account = build_synthetic_account(Path(cls._td.name), spec)
+        chat_search_index._build_worker(cls.account.account_dir, True)
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1"}):
+            chat_search_index._build_worker(cls.account.account_dir, True)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = cls._prev_data_dir
+        cls._td.cleanup()
+
+    def setUp(self):
+        SEARCH_HIT_CACHE.clear()
+        patcher = mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account.account_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, *, sharded: bool, **kw):
+        args = dict(
+            q="好的",
+            account=None,
+            username=None,
+            sender=None,
+            session_type=None,
+            limit=25,
+            offset=0,
+            start_time=None,
+            end_time=None,
+            render_types=None,
+            include_hidden=False,
+            include_official=False,
+        )
+        args.update(kw)
+        SEARCH_HIT_CACHE.clear()
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1" if sharded else "0"}):
+            return chat_router._search_chat_messages_via_fts(_DummyRequest(), **args)
+
+    def test_one_ready_shard_per_message_db(self):
+        stems = sorted(p.stem for p in _iter_message_db_paths(self.account.account_dir))
+        self.assertEqual(sorted(chat_search_index.get_chat_search_index_shard_paths(self.account.account_dir)), stems)
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1"}):
+            index = chat_search_index.get_chat_search_index_status(self.account.account_dir)["index"]
+        self.assertTrue(index["ready"])
+        self.assertTrue(index["sharded"])
+        self.assertEqual([s["stem"] for s in index["shards"]], stems)
+        self.assertEqual(index["missingShards"], [])
+
+    def test_merged_shard_results_match_single_index(self):
+        single = self._search(sharded=False, limit=200)
+        sharded = self._search(sharded=True, limit=200)
+        self.assertEqual(sharded["total"], single["total"])
+        self.assertEqual(sharded["hits"], single["hits"])
+        self.assertGreater(len({h["db"] for h in sharded["hits"]}), 1)
+
+        with mock.patch.object(chat_router, "_SEARCH_CACHE_MAX_KEYS", 10):
+            deep_single = self._search(sharded=False, offset=17, limit=6)
+            deep_sharded = self._search(sharded=True, offset=17, limit=6)
+        self.assertEqual([h["id"] for h in deep_sharded["hits"]], [h["id"] for h in deep_single["hits"]])
+        self.assertEqual(deep_sharded["total"], deep_single["total"])
+
+    def test_reader_view_covers_every_shard(self):
+        sql = "SELECT db_stem, COUNT(1) FROM message_fts GROUP BY db_stem ORDER BY db_stem"
+        counts = {}
+        for sharded in (False, True):
+            with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1" if sharded else "0"}):
+                conn = chat_search_index.open_chat_search_index_reader(self.account.account_dir)
+            self.assertIsNotNone(conn)
+            try:
+                counts[sharded] = conn.execute(sql).fetchall()
+            finally:
+                conn.close()
+        self.assertEqual(counts[True], counts[False])
+        self.assertGreater(len(counts[True]), 1)
+
+        path = chat_search_index.get_chat_search_index_shard_paths(self.account.account_dir)[self.account.message_db_paths[-1].stem]
+        moved = path.with_name(path.name + ".moved")
+        path.rename(moved)
+        self.addCleanup(moved.rename, path)
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1"}):
+            self.assertIsNone(chat_search_index.open_chat_search_index_reader(self.account.account_dir))
+
+    def test_rebuilding_one_shard_leaves_the_others_alone(self):
+        paths = chat_search_index.get_chat_search_index_shard_paths(self.account.account_dir)
+        before = {stem: p.stat().st_mtime_ns for stem, p in paths.items()}
+        target = sorted(paths)[0]
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1"}):
+            chat_search_index._build_worker(self.account.account_dir, True, [target])
+        after = {stem: p.stat().st_mtime_ns for stem, p in paths.items()}
+        self.assertNotEqual(after[target], before[target])
+        self.assertEqual({k: v for k, v in after.items() if k != target}, {k: v for k, v in before.items() if k != target})
+
+    def test_search_builds_only_missing_shards(self):
+        path = chat_search_index.get_chat_search_index_shard_paths(self.account.account_dir)[self.account.message_db_paths[-1].stem]
+        moved = path.with_name(path.name + ".moved")
+        path.rename(moved)
+        self.addCleanup(moved.rename, path)
+        with mock.patch.object(chat_router, "start_chat_search_index_build", return_value={}) as start:
+            res = self._search(sharded=True)
+        self.assertEqual(res["status"], "index_building")
+        self.assertEqual(start.call_args.kwargs["shards"], [path.stem])
+
+    def test_changed_message_db_marks_shard_stale(self):
+        db_path = self.account.message_db_paths[0]
+        st = db_path.stat()
+        os.utime(db_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.addCleanup(os.utime, db_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SEARCH_INDEX_SHARDED": "1"}):
+            index = chat_search_index.get_chat_search_index_status(self.account.account_dir)["index"]
+            self.assertTrue(index["ready"])
+            self.assertEqual(index["staleShards"], [db_path.stem])
+            with mock.patch.object(chat_search_index, "start_chat_search_index_build") as start:
+                # Just built: throttled unless forced (as after a re-decrypt).
+                self.assertFalse(chat_search_index.refresh_chat_search_index_shards(self.account.account_dir, [db_path.stem]))
+                self.assertTrue(
+                    chat_search_index.refresh_chat_search_index_shards(self.account.account_dir, [db_path.stem], force=True)
+                )
+            start.assert_called_once_with(self.account.account_dir, rebuild=True, shards=[db_path.stem])
+
+        with mock.patch.object(chat_router, "refresh_chat_search_index_shards") as refresh:
+            res = self._search(sharded=True)
+        self.assertEqual(res["status"], "success")
+        refresh.assert_called_once_with(self.account.account_dir, [db_path.stem])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool.routers import chat_contacts  # noqa: E402
+
+
+def _write_contact_db(path: Path, rows: list[tuple]) -> None:
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute(
+            "CREATE TABLE contact(username TEXT, remark TEXT, nick_name TEXT, alias TEXT, local_type INTEGER, "
+            "verify_flag INTEGER, big_head_url TEXT, small_head_url TEXT)"
+        )
+        conn.executemany("INSERT INTO contact VALUES (?, ?, ?, ?, ?, 0, '', '')", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _write_session_db(path: Path, rows: list[tuple[str, int]]) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute("CREATE TABLE SessionTable(username TEXT, sort_timestamp INTEGER, last_timestamp INTEGER)")
+        conn.executemany("INSERT INTO SessionTable VALUES (?, ?, ?)", [(u, ts, ts) for u, ts in rows])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestContactDirectory(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.account_dir = Path(self._td.name) / "wxid_me"
+        self.account_dir.mkdir()
+        _write_contact_db(
+            self.account_dir / "contact.db",
+            [
+                ("wxid_zhang", "", "张三", "zs_alias", 1),
+                ("wxid_zeng", "老曾", "曾小明", "", 1),
+                ("wxid_bob", "", "Bob Smith", "bobby", 1),
+                ("123@chatroom", "", "家庭群", "", 2),
+            ],
+        )
+        _write_session_db(self.account_dir / "session.db", [("wxid_bob", 300), ("999@chatroom", 200)])
+        chat_contacts._DIRECTORY_CACHE.clear()
+        chat_contacts._SESSION_INFO_CACHE.clear()
+
+    def _search(self, keyword=None, **flags):
+        kwargs = {"include_friends": True, "include_groups": True, "include_officials": True, **flags}
+        items = chat_contacts._collect_contacts_for_account(
+            account_dir=self.account_dir, base_url="http://testserver", keyword=keyword, **kwargs
+        )
+        return [x["username"] for x in items], items
+
+    def test_listing_is_sorted_by_session_time_and_carries_pinyin(self):
+        usernames, items = self._search()
+        self.assertEqual(usernames[:2], ["wxid_bob", "999@chatroom"])
+        self.assertEqual(len(usernames), 5)
+        by_user = {x["username"]: x for x in items}
+        self.assertEqual(by_user["wxid_zhang"]["pinyinKey"], "zhangsan")
+        self.assertEqual(by_user["wxid_zhang"]["pinyinInitial"], "Z")
+        self.assertTrue(by_user["wxid_bob"]["avatar"].startswith("http://testserver/api/chat/avatar?"))
+
+    def test_keyword_matches_fields_pinyin_and_initials(self):
+        self.assertEqual(self._search("张")[0], ["wxid_zhang"])
+        self.assertEqual(self._search("zhangsan")[0], ["wxid_zhang"])
+        self.assertEqual(self._search("zs")[0], ["wxid_zhang"])
+        self.assertEqual(self._search("BOBBY")[0], ["wxid_bob"])
+        self.assertEqual(self._search("zengxiao")[0], ["wxid_zeng"])
+        self.assertEqual(self._search("老曾")[0], ["wxid_zeng"])
+        self.assertEqual(self._search("chatroom")[0], ["999@chatroom", "123@chatroom"])
+        self.assertEqual(self._search("nomatch")[0], [])
+        self.assertEqual(self._search("bob", include_friends=False)[0], [])
+
+    def test_directory_is_reused_until_contact_db_changes(self):
+        with mock.patch.object(
+            chat_contacts, "_load_contact_rows_map", wraps=chat_contacts._load_contact_rows_map
+        ) as load:
+            self._search()
+            self._search("zs")
+            self.assertEqual(load.call_count, 1)
+
+            _write_contact_db(self.account_dir / "contact.db", [("wxid_li", "", "李四", "", 1)])
+            st = (self.account_dir / "contact.db").stat()
+            os.utime(self.account_dir / "contact.db", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            self.assertEqual(self._search("lisi")[0], ["wxid_li"])
+            self.assertEqual(load.call_count, 2)
+
+    def test_returned_items_do_not_alias_the_cache(self):
+        _, items = self._search()
+        items[0]["displayName"] = "changed"
+        _, again = self._search()
+        self.assertNotEqual(again[0]["displayName"], "changed")
+
+
+if __name__ == "__main__":
+    unittest.main()
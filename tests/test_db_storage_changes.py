@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool.db_storage_changes import DbStorageChangeBroadcaster  # noqa: E402
+
+
+def _touch(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(b"x")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestDbStorageChangeBroadcaster(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name) / "db_storage"
+        _touch(self.root / "message" / "message_0.db")
+        _touch(self.root / "session" / "session.db")
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_FS_WATCH": "poll"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.hub = DbStorageChangeBroadcaster()
+        self.addCleanup(self.hub.close_all)
+
+    def test_sse_subscribers_share_one_producer(self):
+        async def scenario():
+            a = self.hub.subscribe_async("wxid_me", self.root, interval_ms=100)
+            b = self.hub.subscribe_async("wxid_me", self.root, interval_ms=300)
+            self.assertIs(a.producer, b.producer)
+            status = self.hub.status()
+            self.assertEqual(len(status), 1)
+            self.assertEqual(status[0]["asyncSubscribers"], 2)
+
+            first = [await a.get(timeout=3), await b.get(timeout=3)]
+            for ev in first:
+                self.assertTrue(ev["initial"])
+                self.assertEqual(ev["buckets"], ["message", "session"])
+
+            _touch(self.root / "message" / "message_0.db-wal")
+            got = [await a.get(timeout=3), await b.get(timeout=3)]
+            for ev in got:
+                self.assertEqual(ev["type"], "change")
+                self.assertEqual(ev["buckets"], ["message"])
+                self.assertFalse(ev["initial"])
+            self.assertEqual(got[0]["seq"], got[1]["seq"])
+
+            self.hub.unsubscribe(a)
+            self.hub.unsubscribe(b)
+            self.assertEqual(self.hub.status(), [])
+
+        asyncio.run(scenario())
+
+    def test_poll_subscriber_sees_events_from_shared_watcher(self):
+        first = self.hub.subscribe_poll("wxid_me", self.root, interval_ms=0)
+        self.assertEqual(first.poll(), {"message", "session"})
+        self.assertEqual(first.poll(), set())
+
+        # A late subscriber still gets an initial snapshot of the known buckets.
+        late = self.hub.subscribe_poll("wxid_me", self.root, interval_ms=0)
+        self.assertEqual(late.poll(), {"message", "session"})
+
+        _touch(self.root / "session" / "session.db")
+        self.assertEqual(first.poll(), {"session"})
+        self.assertEqual(late.poll(), {"session"})
+        self.assertEqual(self.hub.status()[0]["pollSubscribers"], 2)
+
+    def test_full_queue_folds_buckets_into_newest_event(self):
+        async def scenario():
+            sub = self.hub.subscribe_async("wxid_me", self.root, interval_ms=5000)
+            await sub.get(timeout=3)
+            for i in range(sub.queue.maxsize):
+                sub._offer({"type": "change", "buckets": ["head_image"], "seq": i})
+            sub._offer({"type": "change", "buckets": ["message"], "seq": 99})
+            self.assertEqual(sub.queue.qsize(), sub.queue.maxsize)
+            events = [sub.queue.get_nowait() for _ in range(sub.queue.maxsize)]
+            self.assertEqual(events[-1]["seq"], 99)
+            self.assertEqual(events[-1]["buckets"], ["head_image", "message"])
+            self.hub.unsubscribe(sub)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool import chat_realtime_autosync  # noqa: E402
+from wechat_decrypt_tool.db_storage_watch import (  # noqa: E402
+    InotifyWatcher,
+    MtimeTreeWatcher,
+    create_db_storage_watcher,
+)
+
+
+def _touch(path: Path, data: bytes = b"x") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(data)
+    st = path.stat()
+    # Make the change visible even on filesystems with coarse mtime resolution.
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def _make_db_storage(root: Path) -> Path:
+    db_storage = root / "db_storage"
+    _touch(db_storage / "message" / "message_0.db")
+    _touch(db_storage / "session" / "session.db")
+    _touch(db_storage / "head_image" / "head_image.db")
+    _touch(db_storage / "message" / "notes.txt")
+    return db_storage
+
+
+class _WatcherCases:
+    def make_watcher(self, root: Path):
+        raise NotImplementedError
+
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.db_storage = _make_db_storage(Path(self._td.name))
+        self.watcher = self.make_watcher(self.db_storage)
+        self.addCleanup(self.watcher.close)
+
+    def test_first_poll_reports_buckets_then_settles(self):
+        self.assertEqual(self.watcher.poll(), {"message", "session", "head_image"})
+        self.assertEqual(self.watcher.poll(), set())
+
+    def test_reports_only_the_changed_bucket(self):
+        self.watcher.poll()
+        _touch(self.db_storage / "message" / "message_0.db-wal")
+        self.assertEqual(self.watcher.poll(), {"message"})
+        _touch(self.db_storage / "head_image" / "head_image.db")
+        self.assertEqual(self.watcher.poll(), {"head_image"})
+        _touch(self.db_storage / "message" / "notes.txt")
+        self.assertEqual(self.watcher.poll(), set())
+
+    def test_new_subdirectory_is_picked_up(self):
+        self.watcher.poll()
+        _touch(self.db_storage / "message" / "fts" / "message_fts.db")
+        self.assertEqual(self.watcher.poll(), {"message"})
+        _touch(self.db_storage / "message" / "fts" / "message_fts.db")
+        self.assertEqual(self.watcher.poll(), {"message"})
+
+
+class TestMtimeTreeWatcher(_WatcherCases, unittest.TestCase):
+    def make_watcher(self, root: Path):
+        return MtimeTreeWatcher(root)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+class TestInotifyWatcher(_WatcherCases, unittest.TestCase):
+    def make_watcher(self, root: Path):
+        return InotifyWatcher(root)
+
+
+class TestCreateWatcher(unittest.TestCase):
+    def test_poll_mode_forces_mtime_tree(self):
+        with TemporaryDirectory() as td:
+            w = create_db_storage_watcher(Path(td), mode="poll")
+            self.assertIsInstance(w, MtimeTreeWatcher)
+            w.close()
+
+
+class TestAutoSyncTick(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.db_storage = _make_db_storage(Path(self._td.name))
+        status = {"dll_present": True, "key_present": True, "db_storage_dir": str(self.db_storage)}
+        for target, kw in (
+            ("_list_decrypted_accounts", {"return_value": ["wxid_me"]}),
+            ("_resolve_account_dir", {"return_value": Path(self._td.name)}),
+        ):
+            p = mock.patch.object(chat_realtime_autosync, target, **kw)
+            p.start()
+            self.addCleanup(p.stop)
+        p = mock.patch.object(chat_realtime_autosync.WCDB_REALTIME, "get_status", return_value=status)
+        p.start()
+        self.addCleanup(p.stop)
+
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_FS_WATCH": "poll", "WECHAT_TOOL_REALTIME_AUTOSYNC_DEBOUNCE_MS": "0"}):
+            self.svc = chat_realtime_autosync.ChatRealtimeAutoSyncService()
+        self.svc._debounce_ms = 0
+        self.svc._interval_ms = 0
+        self.svc._min_sync_interval_ms = 0
+        self.synced: list[str] = []
+        p = mock.patch.object(self.svc, "_sync_account", side_effect=lambda acc: self.synced.append(acc) or {})
+        p.start()
+        self.addCleanup(p.stop)
+        self.addCleanup(lambda: [self.svc._close_watcher(st) for st in self.svc._states.values()])
+
+    def _tick_and_wait(self):
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_FS_WATCH": "poll"}):
+            self.svc._tick()
+        for st in self.svc._states.values():
+            if st.thread is not None:
+                st.thread.join(timeout=5)
+
+    def test_only_message_or_session_changes_trigger_sync(self):
+        self._tick_and_wait()
+        self.assertEqual(self.synced, ["wxid_me"])
+        self.assertEqual(self.svc._states["wxid_me"].changes.kind, "mtime-tree")
+
+        _touch(self.db_storage / "head_image" / "head_image.db")
+        self._tick_and_wait()
+        self.assertEqual(self.synced, ["wxid_me"])
+
+        _touch(self.db_storage / "session" / "session.db")
+        self._tick_and_wait()
+        self.assertEqual(self.synced, ["wxid_me", "wxid_me"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+from fastapi import HTTPException
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool.executors import BoundedExecutor, ExecutorSaturatedError  # noqa: E402
+from wechat_decrypt_tool.request_metrics import record_stage, request_trace  # noqa: E402
+
+
+class TestBoundedExecutor(unittest.TestCase):
+    def test_runs_off_the_event_loop_thread(self):
+        ex = BoundedExecutor("test", max_workers=2, max_queue=8)
+
+        async def main():
+            loop_thread = threading.get_ident()
+            worker_thread = await ex.run(threading.get_ident)
+            return loop_thread, worker_thread
+
+        loop_thread, worker_thread = asyncio.run(main())
+        self.assertNotEqual(loop_thread, worker_thread)
+        stats = ex.stats()
+        self.assertEqual(stats["submitted"], 1)
+        self.assertEqual(stats["completed"], 1)
+        self.assertEqual(stats["failed"], 0)
+
+    def test_request_trace_and_exceptions_propagate(self):
+        ex = BoundedExecutor("io", max_workers=1, max_queue=8)
+
+        def work():
+            record_stage("sqlite", 2.0)
+            return "ok"
+
+        def boom():
+            raise HTTPException(status_code=404, detail="missing")
+
+        async def main():
+            with request_trace() as trace:
+                self.assertEqual(await ex.run(work), "ok")
+                with self.assertRaises(HTTPException) as cm:
+                    await ex.run(boom)
+                self.assertEqual(cm.exception.status_code, 404)
+                return trace.snapshot()[0]
+
+        stages = asyncio.run(main())
+        self.assertEqual(stages["sqlite"], [2.0, 1])
+        self.assertIn("io_wait", stages)
+        self.assertEqual(ex.stats()["failed"], 1)
+
+    def test_full_queue_fails_fast_with_503(self):
+        ex = BoundedExecutor("cpu", max_workers=1, max_queue=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        try:
+            ex.submit(blocker)
+            self.assertTrue(started.wait(5))
+            ex.submit(lambda: None)  # fills the queue behind the busy worker
+            with self.assertRaises(ExecutorSaturatedError):
+                ex.submit(lambda: None)
+
+            async def main():
+                await ex.run(lambda: None)
+
+            with self.assertRaises(HTTPException) as cm:
+                asyncio.run(main())
+            self.assertEqual(cm.exception.status_code, 503)
+
+            stats = ex.stats()
+            self.assertEqual(stats["rejected"], 2)
+            self.assertEqual(stats["queueDepth"], 1)
+            self.assertEqual(stats["running"], 1)
+            self.assertEqual(stats["maxQueueDepthSeen"], 1)
+        finally:
+            release.set()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_chatroom_ext_buffer, build_synthetic_account  # noqa: E402
+from wechat_decrypt_tool import group_member_names as gmn  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+_ROOM = "123456@chatroom"
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+def _write_contact_db(path: Path, contacts: list[tuple[str, str, str]], members: dict[str, str]) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        for table in ("contact", "stranger"):
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}(username TEXT PRIMARY KEY, remark TEXT, nick_name TEXT, alias TEXT, "
+                "big_head_url TEXT, small_head_url TEXT)"
+            )
+        conn.execute("CREATE TABLE IF NOT EXISTS chat_room(id INTEGER PRIMARY KEY, username TEXT, owner TEXT, ext_buffer BLOB)")
+        conn.execute("DELETE FROM contact")
+        conn.execute("DELETE FROM chat_room")
+        conn.executemany("INSERT INTO contact VALUES (?, ?, ?, '', '', '')", contacts)
+        conn.execute("INSERT INTO chat_room VALUES (1, ?, '', ?)", (_ROOM, build_chatroom_ext_buffer(members)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestGroupMemberNames(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        self.contact_db = self.root / "contact.db"
+        gmn.clear_chatroom_member_names_cache()
+        self.addCleanup(gmn.clear_chatroom_member_names_cache)
+
+    def test_display_name_priority(self):
+        _write_contact_db(
+            self.contact_db,
+            [("wxid_a", "备注A", "昵称A"), ("wxid_b", "", "昵称B"), ("wxid_c", "", "昵称C")],
+            {"wxid_a": "群名片A", "wxid_b": "群名片B", "wxid_c": ""},
+        )
+        names = gmn.get_chatroom_member_names(self.contact_db, _ROOM)
+        self.assertEqual(
+            names.display_names(["wxid_a", "wxid_b", "wxid_c", "wxid_gone"]),
+            {"wxid_a": "备注A", "wxid_b": "群名片B", "wxid_c": "昵称C", "wxid_gone": "wxid_gone"},
+        )
+        self.assertEqual(names.nicknames_for(["wxid_a", "wxid_c", ""]), {"wxid_a": "群名片A"})
+
+    def test_parsed_once_until_contact_db_changes(self):
+        _write_contact_db(self.contact_db, [("wxid_a", "", "昵称A")], {"wxid_a": "群名片A"})
+        first = gmn.get_chatroom_member_names(self.contact_db, _ROOM)
+        self.assertEqual(first.display_name("wxid_a"), "群名片A")
+
+        with mock.patch.object(gmn, "_load_chat_room_member_nicknames", side_effect=AssertionError("parsed again")):
+            self.assertIs(gmn.get_chatroom_member_names(self.contact_db, _ROOM), first)
+            with mock.patch.object(gmn, "_load_contact_rows", side_effect=AssertionError("contact rows reloaded")):
+                self.assertEqual(first.display_name("wxid_a"), "群名片A")
+
+        _write_contact_db(self.contact_db, [("wxid_a", "新备注", "昵称A")], {"wxid_a": "新群名片"})
+        st = self.contact_db.stat()
+        os.utime(self.contact_db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        second = gmn.get_chatroom_member_names(self.contact_db, _ROOM)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.display_name("wxid_a"), "新备注")
+        self.assertEqual(second.nicknames_for(["wxid_a"]), {"wxid_a": "新群名片"})
+
+    def test_cache_is_bounded(self):
+        _write_contact_db(self.contact_db, [], {})
+        with mock.patch.object(gmn, "_CACHE_MAX", 3):
+            for i in range(5):
+                gmn.get_chatroom_member_names(self.contact_db, f"{i}@chatroom")
+            self.assertEqual([k[1] for k in gmn._CACHE], ["2@chatroom", "3@chatroom", "4@chatroom"])
+
+    def test_chat_pages_share_parsed_chatroom(self):
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)}):
+            synthetic = build_synthetic_account(
+                self.root, SyntheticAccountSpec(shards=1, conversations=3, messages_per_conversation=40, seed=3)
+            )
+            group = synthetic.groups[0]
+            real_parse = gmn._load_chat_room_member_nicknames
+            with (
+                mock.patch.object(chat_router, "_resolve_account_dir", return_value=synthetic.account_dir),
+                mock.patch.object(gmn, "_load_chat_room_member_nicknames", side_effect=real_parse) as parse,
+            ):
+                for offset in (0, 20):
+                    res = chat_router.list_chat_messages(
+                        _DummyRequest(),
+                        username=group,
+                        account=synthetic.account_dir.name,
+                        limit=20,
+                        offset=offset,
+                        order="asc",
+                        render_types=None,
+                        source="",
+                    )
+                    self.assertEqual(res.get("status"), "success")
+            self.assertEqual(parse.call_count, 1)
+            nicknames = gmn.get_chatroom_member_names(synthetic.account_dir / "contact.db", group).group_nicknames
+            shown = {m["senderUsername"]: m["senderDisplayName"] for m in res["messages"] if m.get("senderUsername")}
+            self.assertTrue(any(nicknames.get(u) == name for u, name in shown.items()))
+
+
+if __name__ == "__main__":
+    unittest.main()
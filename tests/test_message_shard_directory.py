@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from benchmarks.wcdb_standin import LocalWCDBStandIn  # noqa: E402
+from wechat_decrypt_tool import message_shard_directory as msd  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+def _probe(account_dir: Path, username: str) -> list[str]:
+    out = []
+    for p in sorted(account_dir.glob("*message_*.db")):
+        if p.name == "message_resource.db":
+            continue
+        conn = sqlite3.connect(str(p))
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (msg_table_name(username),)).fetchone():
+                out.append(p.stem)
+        finally:
+            conn.close()
+    return out
+
+
+def _time_range(db_path: Path, username: str) -> tuple[int, int]:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        lo, hi = conn.execute(f'SELECT MIN(create_time), MAX(create_time) FROM "{msg_table_name(username)}"').fetchone()
+        return int(lo), int(hi)
+    finally:
+        conn.close()
+
+
+class TestMessageShardDirectory(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        spec = SyntheticAccountSpec(shards=3, conversations=9, messages_per_conversation=20, seed=11)
+        self.synthetic = build_synthetic_account(self.root, spec)
+        self.account_dir = self.synthetic.account_dir
+        self.addCleanup(msd._CACHE.clear)
+        res = msd.build_message_shard_directory(self.account_dir, rebuild=True)
+        self.assertEqual(res["status"], "success")
+
+    def test_directory_matches_probing(self):
+        for u in self.synthetic.conversations:
+            tables = msd.conversation_message_tables(self.account_dir, u)
+            self.assertEqual([p.stem for p, _ in tables or []], _probe(self.account_dir, u))
+            for p, table_name in tables or []:
+                self.assertEqual(table_name.lower(), msg_table_name(u).lower())
+                self.assertTrue(p.exists())
+
+        self.assertIsNone(msd.conversation_message_tables(self.account_dir, "wxid_not_in_any_shard"))
+
+    def test_time_range_skips_shards(self):
+        u = self.synthetic.conversations[0]
+        ranges = {p.stem: _time_range(p, u) for p, _ in msd.conversation_message_tables(self.account_dir, u)}
+        self.assertGreater(len(ranges), 1)
+        for lo, hi in ranges.values():
+            got = [p.stem for p, _ in msd.conversation_message_tables(self.account_dir, u, start_time=lo, end_time=hi)]
+            want = [stem for stem, (lo2, hi2) in ranges.items() if hi2 >= lo and lo2 <= hi]
+            self.assertEqual(got, want)
+        top = max(hi for _, hi in ranges.values())
+        self.assertEqual(msd.conversation_message_tables(self.account_dir, u, start_time=top + 1), [])
+
+    def test_persisted_and_refreshed_per_shard(self):
+        msd._CACHE.clear()
+        with mock.patch.object(msd, "_scan_shard", side_effect=AssertionError("should load from session.db")):
+            self.assertIsNotNone(msd.get_message_shard_directory(self.account_dir))
+
+        # An outside write to one shard rescans only that shard.
+        u = self.synthetic.conversations[0]
+        (db_path, table_name), *_ = msd.conversation_message_tables(self.account_dir, u)
+        conn = sqlite3.connect(str(db_path))
+        try:
+            conn.execute(f'INSERT INTO "{table_name}" (local_id, local_type, create_time) VALUES (999999, 1, 1)')
+            conn.commit()
+        finally:
+            conn.close()
+        real_scan = msd._scan_shard
+        with mock.patch.object(msd, "_scan_shard", side_effect=real_scan) as scan:
+            entries = msd.get_message_shard_directory(self.account_dir).by_md5
+            self.assertEqual([c.args[0].stem for c in scan.call_args_list], [db_path.stem])
+        entry = next(e for e in sum(entries.values(), []) if e.table_name == table_name)
+        self.assertEqual(entry.min_create_time, 1)
+
+    def test_realtime_sync_keeps_directory_current(self):
+        standin = LocalWCDBStandIn.from_decrypted_account(self.account_dir, self.root / "db_storage")
+        changed = self.synthetic.conversations[:2]
+        standin.append_messages(changed, count=3)
+
+        before = {u: msd.conversation_message_tables(self.account_dir, u) for u in changed}
+        with (
+            standin.patch(chat_router),
+            mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account_dir),
+        ):
+            chat_router.sync_chat_realtime_messages_all(None, account=self.account_dir.name, max_scan=50)
+
+        with mock.patch.object(msd, "_scan_shard", side_effect=AssertionError("no rescan after realtime writes")):
+            d = msd.get_message_shard_directory(self.account_dir)
+        for u in changed:
+            (db_path, table_name), *_ = before[u]
+            entry = next(e for e in sum(d.by_md5.values(), []) if e.table_name == table_name)
+            conn = sqlite3.connect(str(db_path))
+            try:
+                cnt, hi = conn.execute(f'SELECT COUNT(1), MAX(create_time) FROM "{table_name}"').fetchone()
+            finally:
+                conn.close()
+            self.assertEqual(entry.row_count, int(cnt))
+            self.assertEqual(entry.max_create_time, int(hi))
+
+    def test_in_place_edit_restamps_shard(self):
+        u = self.synthetic.conversations[0]
+        (db_path, table_name), *_ = msd.conversation_message_tables(self.account_dir, u)
+        conn = sqlite3.connect(str(db_path))
+        try:
+            local_id = conn.execute(f'SELECT MIN(local_id) FROM "{table_name}"').fetchone()[0]
+            conn.execute(f'UPDATE "{table_name}" SET create_time = 5 WHERE local_id = ?', (local_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        chat_router._note_message_row_updated(self.account_dir, db_path, table_name, {"create_time": 5})
+
+        with mock.patch.object(msd, "_scan_shard", side_effect=AssertionError("no rescan after an edit")):
+            d = msd.get_message_shard_directory(self.account_dir)
+        entry = next(e for e in sum(d.by_md5.values(), []) if e.table_name == table_name)
+        self.assertEqual(entry.min_create_time, 5)
+
+    def test_daily_counts_open_only_owning_shard(self):
+        u = self.synthetic.conversations[0]
+        start_ts, end_ts = chat_router._local_month_range_epoch_seconds(year=2024, month=1)
+        owning = []
+        for stem in _probe(self.account_dir, u):
+            lo, hi = _time_range(self.account_dir / f"{stem}.db", u)
+            if hi >= start_ts and lo < end_ts:
+                owning.append(stem)
+        self.assertLess(len(owning), len(_probe(self.account_dir, u)))
+        opened: list[str] = []
+        real_connect = sqlite3.connect
+
+        def spy(path, *a, **kw):
+            opened.append(Path(str(path)).stem)
+            return real_connect(path, *a, **kw)
+
+        with (
+            mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account_dir),
+            mock.patch.object(chat_router.sqlite3, "connect", side_effect=spy),
+        ):
+            res = chat_router.get_chat_message_daily_counts(u, year=2024, month=1, account=self.account_dir.name)
+        self.assertEqual(res["status"], "success")
+        self.assertEqual([s for s in opened if "message" in s], owning)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.message_xml_corpus import message_xml_corpus, regex_lookups, render_probe  # noqa: E402
+from wechat_decrypt_tool.message_xml import MessageXml, regex_attr, regex_tag_text  # noqa: E402
+
+
+class TestMessageXml(unittest.TestCase):
+    def test_renderer_output_matches_regex_lookups(self):
+        for name, local_type, text in message_xml_corpus():
+            with self.subTest(name):
+                got = render_probe(local_type, text)
+                with regex_lookups():
+                    want = render_probe(local_type, text)
+                self.assertEqual(got, want)
+
+    def test_regex_semantics_are_preserved(self):
+        doc = MessageXml(
+            '<img cdnthumbmd5="aaa" md5 = \' bbb \'/><Title>x</title><title a="1">y</title>'
+            "<des><![CDATA[<title>in cdata</title>]]></des><type>5<type>6</type>"
+        )
+        # Attribute names match as a suffix, first occurrence wins, values are stripped.
+        self.assertEqual(doc.attr("md5"), "aaa")
+        self.assertEqual(doc.attr("MD5"), "aaa")
+        self.assertEqual(doc.attr("thumbmd5"), "aaa")
+        # Case-insensitive tags; only the attribute-less opening matches; nested unclosed opening is kept.
+        self.assertEqual(doc.tag_text("title"), "x")
+        self.assertEqual(doc.tag_text("type"), "5<type>6")
+        self.assertEqual(doc.tag_text("des"), "<![CDATA[<title>in cdata</title>]]>")
+        self.assertEqual(doc.tag_text("missing"), "")
+        self.assertEqual(doc.attr("missing"), "")
+
+    def test_random_tag_soup_matches_reference(self):
+        rng = random.Random(1234)
+        names = ["a", "A", "b", "md5", "thumbmd5", "x:y", "t-1", "标题"]
+        pieces = ["<", ">", "/", "=", '"', "'", " ", "\n", "<![CDATA[", "]]>", "v", "值", "&amp;"]
+        for _ in range(400):
+            parts = []
+            for _ in range(rng.randint(1, 30)):
+                r = rng.random()
+                n = rng.choice(names)
+                if r < 0.25:
+                    parts.append(f"<{n}>")
+                elif r < 0.45:
+                    parts.append(f"</{n}>")
+                elif r < 0.6:
+                    q = rng.choice("\"'")
+                    parts.append(f"{n}{rng.choice(['', ' '])}={rng.choice(['', ' '])}{q}{rng.choice(pieces)}v{q}")
+                else:
+                    parts.append(rng.choice(pieces))
+            text = "".join(parts)
+            doc = MessageXml(text)
+            for n in names + ["", "a b", "a>", "=", "md5="]:
+                self.assertEqual(doc.tag_text(n), regex_tag_text(text, n), (text, n))
+                self.assertEqual(doc.attr(n), regex_attr(text, n), (text, n))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from wechat_decrypt_tool import chat_edit_store  # noqa: E402
+from wechat_decrypt_tool import rendered_message_cache as rmc  # noqa: E402
+from wechat_decrypt_tool.routers import chat as chat_router  # noqa: E402
+
+
+class _DummyRequest:
+    base_url = "http://testserver/"
+
+
+class TestRenderedMessageCache(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        spec = SyntheticAccountSpec(shards=2, conversations=4, messages_per_conversation=30, seed=5)
+        self.synthetic = build_synthetic_account(self.root, spec)
+        self.account_dir = self.synthetic.account_dir
+        self.account = self.account_dir.name
+        self.group = self.synthetic.groups[0]
+        resolve = mock.patch.object(chat_router, "_resolve_account_dir", return_value=self.account_dir)
+        resolve.start()
+        self.addCleanup(resolve.stop)
+
+    def _list(self, username: str, **kw):
+        params = {"limit": 20, "offset": 0, "order": "asc", "render_types": None, "source": ""}
+        params.update(kw)
+        res = chat_router.list_chat_messages(_DummyRequest(), username=username, account=self.account, **params)
+        self.assertEqual(res.get("status"), "success")
+        return res
+
+    def _cached(self, username: str) -> dict[tuple[str, int], dict]:
+        out = {}
+        for p in sorted(self.account_dir.glob("message_*.db")):
+            if p.name == "message_resource.db":
+                continue
+            hits = rmc.load_rendered_messages(self.account, p.stem, msg_table_name(username), range(1, 10000))
+            out.update({(p.stem, local_id): msg for local_id, (msg, _pats) in hits.items()})
+        return out
+
+    def test_second_read_skips_decoding(self):
+        first = self._list(self.group)
+        self.assertTrue(self._cached(self.group))
+
+        with mock.patch.object(chat_router, "_decode_message_content", side_effect=AssertionError("decoded again")):
+            second = self._list(self.group)
+        self.assertEqual(second["messages"], first["messages"])
+        self.assertEqual(second["hasMore"], first["hasMore"])
+
+        # Render-type filtering still applies to cached rows.
+        with mock.patch.object(chat_router, "_decode_message_content", side_effect=AssertionError("decoded again")):
+            texts = self._list(self.group, render_types="text")
+        self.assertTrue(texts["messages"])
+        self.assertEqual({m["renderType"] for m in texts["messages"]}, {"text"})
+
+    def test_disabled_by_env(self):
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_RENDER_CACHE_ENABLED": "0"}):
+            self._list(self.group)
+        self.assertFalse((rmc.get_render_cache_root_dir() / self.account).exists())
+
+    def test_edit_store_writes_invalidate_conversation(self):
+        other = next(u for u in self.synthetic.conversations if u != self.group)
+        self._list(self.group)
+        self._list(other)
+        db_stem, local_id = min(self._cached(self.group))
+
+        chat_edit_store.upsert_original_once(
+            account=self.account,
+            session_id=self.group,
+            db=db_stem,
+            table_name=msg_table_name(self.group),
+            local_id=local_id,
+            original_msg={"local_id": local_id},
+            original_resource=None,
+        )
+        self.assertEqual(self._cached(self.group), {})
+        self.assertTrue(self._cached(other))
+
+    def test_row_invalidation_is_per_row(self):
+        self._list(self.group)
+        cached = self._cached(self.group)
+        key = min(cached)
+        db_stem, table_name, local_id = cached[key]["id"].split(":")
+
+        # Table-name case differs between shards/realtime writers; keys are case-insensitive.
+        rmc.invalidate_rendered_rows(self.account, db_stem, table_name.upper()[:4] + table_name[4:], [int(local_id)])
+        self.assertEqual(set(self._cached(self.group)), set(cached) - {key})
+
+    def test_renderer_version_bump_drops_entries(self):
+        self._list(self.group)
+        self.assertTrue(self._cached(self.group))
+        rmc._SCHEMA_READY.clear()
+        with mock.patch.object(rmc, "RENDERER_VERSION", rmc.RENDERER_VERSION + 1):
+            self.assertEqual(self._cached(self.group), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+from wechat_decrypt_tool import request_metrics  # noqa: E402
+from wechat_decrypt_tool.request_metrics import (  # noqa: E402
+    RequestMetrics,
+    current_trace,
+    record_cache,
+    record_stage,
+    stage,
+)
+
+
+def _build_app(metrics: RequestMetrics, logger: logging.Logger) -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def _metrics(request, call_next):
+        return await request_metrics.request_metrics_middleware(logger, request, call_next)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        # Sync endpoint -> runs in the threadpool; the trace must still be visible.
+        with stage("sqlite"):
+            time.sleep(0.002)
+        record_stage("decode", 1.5)
+        record_cache("avatar", hit=True)
+        record_cache("avatar", hit=False)
+        return {"id": item_id}
+
+    @app.get("/threaded")
+    async def threaded():
+        def work():
+            with stage("media_decrypt"):
+                return 1
+
+        await asyncio.to_thread(work)
+        return {"ok": True}
+
+    return app
+
+
+class TestRequestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        self.logger = logging.getLogger("test.request_metrics")
+        patcher = mock.patch.object(request_metrics, "REQUEST_METRICS", self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(_build_app(self.metrics, self.logger))
+
+    def test_server_timing_lists_stages_and_cache(self):
+        resp = self.client.get("/items/3")
+        self.assertEqual(resp.status_code, 200)
+        timing = resp.headers.get("Server-Timing", "")
+        self.assertIn("app;dur=", timing)
+        self.assertIn("sqlite;dur=", timing)
+        self.assertIn("decode;dur=1.5", timing)
+        self.assertIn('cache_avatar;desc="hit=1 miss=1"', timing)
+        self.assertEqual(resp.headers.get("Timing-Allow-Origin"), "*")
+
+    def test_to_thread_work_is_attributed_to_request(self):
+        resp = self.client.get("/threaded")
+        self.assertIn("media_decrypt;dur=", resp.headers.get("Server-Timing", ""))
+
+    def test_histogram_is_keyed_by_route_template(self):
+        for i in range(3):
+            self.client.get(f"/items/{i}")
+        self.client.get("/api/missing")
+
+        snap = self.metrics.snapshot()
+        routes = snap["routes"]
+        self.assertIn("GET /items/{item_id}", routes)
+        self.assertNotIn("GET /items/1", routes)
+        self.assertIn("GET <unmatched>", routes)
+
+        item = routes["GET /items/{item_id}"]
+        self.assertEqual(item["count"], 3)
+        self.assertEqual(sum(item["histogram"].values()), 3)
+        self.assertGreater(item["stageMs"]["sqlite"], 0.0)
+        self.assertEqual(item["cache"]["avatar"], {"hit": 3, "miss": 3})
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()["routes"], {})
+
+    def test_slow_request_log(self):
+        with mock.patch.dict(os.environ, {"WECHAT_TOOL_SLOW_REQUEST_MS": "0.001"}):
+            with self.assertLogs(self.logger, level="WARNING") as logs:
+                self.client.get("/items/1")
+        self.assertTrue(any("[slow-request]" in line and "/items/{item_id}" in line for line in logs.output))
+
+    def test_helpers_are_noops_outside_requests(self):
+        self.assertIsNone(current_trace())
+        with stage("sqlite"):
+            pass
+        record_stage("decode", 1.0)
+        record_cache("avatar", hit=True)
+        self.assertIsNone(current_trace())
+
+
+if __name__ == "__main__":
+    unittest.main()
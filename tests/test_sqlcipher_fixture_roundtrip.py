@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.decrypt_benchmark import corrupt_pages  # noqa: E402
+from benchmarks.sqlcipher_fixture import (  # noqa: E402
+    DEFAULT_KEY_HEX,
+    PAGE_SIZE,
+    RESERVE_SIZE,
+    copy_with_reserve,
+    encrypt_sqlite_database,
+    verify_round_trip,
+)
+
+
+def _seed_plain_db(path: Path) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute("CREATE TABLE Msg(local_id INTEGER PRIMARY KEY AUTOINCREMENT, create_time INTEGER, message_content TEXT)")
+        conn.execute("CREATE INDEX Msg_time ON Msg(create_time)")
+        conn.executemany(
+            "INSERT INTO Msg(create_time, message_content) VALUES (?, ?)",
+            [(1700000000 + i, f"消息 {i} " * 20) for i in range(1500)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestSqlcipherFixture(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = self._td.name
+        self.root = Path(self._td.name)
+        self.plain = self.root / "plain.db"
+        _seed_plain_db(self.plain)
+
+    def tearDown(self):
+        if self._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = self._prev_data_dir
+        self._td.cleanup()
+
+    def test_copy_with_reserve_keeps_content(self):
+        staged = self.root / "reserve.db"
+        copy_with_reserve(self.plain, staged)
+        raw = staged.read_bytes()
+        self.assertEqual(raw[20], RESERVE_SIZE)
+        self.assertTrue(verify_round_trip(self.plain, staged)["ok"])
+
+    def test_decryptor_round_trip(self):
+        from wechat_decrypt_tool.wechat_decrypt import WeChatDatabaseDecryptor
+
+        enc = self.root / "enc.db"
+        stats = encrypt_sqlite_database(self.plain, enc, DEFAULT_KEY_HEX, seed=7)
+        self.assertEqual(stats["bytes"] % PAGE_SIZE, 0)
+        self.assertNotEqual(enc.read_bytes()[:16], b"SQLite format 3\x00")
+
+        out = self.root / "dec.db"
+        self.assertTrue(WeChatDatabaseDecryptor(DEFAULT_KEY_HEX).decrypt_database(str(enc), str(out)))
+        result = verify_round_trip(self.plain, out)
+        self.assertEqual(result, {"ok": True, "integrity": "ok", "contentMatches": True})
+
+    def test_seeded_fixture_is_reproducible(self):
+        a = self.root / "a.db"
+        b = self.root / "b.db"
+        encrypt_sqlite_database(self.plain, a, DEFAULT_KEY_HEX, seed=3)
+        encrypt_sqlite_database(self.plain, b, DEFAULT_KEY_HEX, seed=3)
+        self.assertEqual(a.read_bytes(), b.read_bytes())
+
+    def test_hmac_failures_drop_pages(self):
+        from wechat_decrypt_tool.wechat_decrypt import WeChatDatabaseDecryptor
+
+        enc = self.root / "enc.db"
+        encrypt_sqlite_database(self.plain, enc, DEFAULT_KEY_HEX, seed=7)
+        pages = enc.stat().st_size // PAGE_SIZE
+
+        wrong = self.root / "wrong.db"
+        WeChatDatabaseDecryptor("ff" * 32).decrypt_database(str(enc), str(wrong))
+        self.assertEqual(wrong.stat().st_size // PAGE_SIZE, 0)
+
+        damaged_src = self.root / "damaged.db"
+        damaged = corrupt_pages(enc, damaged_src, ratio=0.25)
+        self.assertGreater(damaged, 0)
+        out = self.root / "damaged_out.db"
+        WeChatDatabaseDecryptor(DEFAULT_KEY_HEX).decrypt_database(str(damaged_src), str(out))
+        self.assertEqual(out.stat().st_size // PAGE_SIZE, pages - damaged)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+
+
+from benchmarks.synthetic_account import SyntheticAccountSpec, build_synthetic_account, msg_table_name  # noqa: E402
+from wechat_decrypt_tool import chat_export_service as svc  # noqa: E402
+from wechat_decrypt_tool import voice_transcode_cache as vtc  # noqa: E402
+
+
+def _fake_transcode(voice_data: bytes, preferred_format: str = "mp3") -> tuple[bytes, str, str]:
+    if voice_data.startswith(b"BROKEN"):
+        return voice_data, "silk", "audio/silk"
+    return b"ID3" + voice_data, "mp3", "audio/mpeg"
+
+
+def _fake_worker(voice_data: bytes) -> tuple[bytes, str, str]:
+    # Module-level (picklable) stand-in for the pilk/ffmpeg worker.
+    return _fake_transcode(voice_data)
+
+
+class TestVoiceTranscodeCache(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self.addCleanup(self._td.cleanup)
+        self.root = Path(self._td.name)
+        env = mock.patch.dict(os.environ, {"WECHAT_TOOL_DATA_DIR": str(self.root)})
+        env.start()
+        self.addCleanup(env.stop)
+        ffmpeg = mock.patch.object(vtc, "_find_ffmpeg_executable", return_value="ffmpeg")
+        ffmpeg.start()
+        self.addCleanup(ffmpeg.stop)
+        self.account_dir = self.root / "acct"
+        self.account_dir.mkdir()
+
+    def _build_account_with_voices(self) -> tuple[Path, str, list[int]]:
+        spec = SyntheticAccountSpec(shards=2, conversations=2, messages_per_conversation=400, seed=9)
+        synthetic = build_synthetic_account(self.root, spec)
+        username = synthetic.conversations[0]
+        server_ids: list[int] = []
+        for db_path in synthetic.message_db_paths:
+            conn = sqlite3.connect(str(db_path))
+            try:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (msg_table_name(username),)).fetchone():
+                    rows = conn.execute(
+                        f'SELECT server_id FROM "{msg_table_name(username)}" WHERE local_type = 34'
+                    ).fetchall()
+                    server_ids.extend(int(r[0]) for r in rows)
+            finally:
+                conn.close()
+        self.assertGreater(len(server_ids), 2)
+
+        conn = sqlite3.connect(str(synthetic.account_dir / "media_0.db"))
+        try:
+            conn.execute("CREATE TABLE VoiceInfo (svr_id INTEGER, create_time INTEGER, voice_data BLOB)")
+            conn.executemany(
+                "INSERT INTO VoiceInfo VALUES (?, 1, ?)",
+                [(sid, (b"BROKEN" if i == 0 else b"SILK") + str(sid).encode()) for i, sid in enumerate(server_ids)],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return synthetic.account_dir, username, server_ids
+
+    def test_second_play_reads_cache(self):
+        with mock.patch.object(vtc, "_convert_silk_to_browser_audio", side_effect=_fake_transcode) as convert:
+            first = vtc.transcode_voice_cached(self.account_dir, b"SILK-1")
+            second = vtc.transcode_voice_cached(self.account_dir, memoryview(b"SILK-1"))
+        self.assertEqual(first, (b"ID3SILK-1", "mp3", "audio/mpeg"))
+        self.assertEqual(second, first)
+        self.assertEqual(convert.call_count, 1)
+        self.assertEqual(len(list(vtc.get_voice_cache_dir(self.account_dir).rglob("*.mp3"))), 1)
+
+        # Failed conversions are not pinned in the cache.
+        with mock.patch.object(vtc, "_convert_silk_to_browser_audio", side_effect=_fake_transcode) as convert:
+            vtc.transcode_voice_cached(self.account_dir, b"BROKEN")
+            vtc.transcode_voice_cached(self.account_dir, b"BROKEN")
+        self.assertEqual(convert.call_count, 2)
+
+    def test_wav_is_replaced_once_ffmpeg_is_available(self):
+        vtc.store_transcoded_voice(self.account_dir, b"SILK-2", b"RIFF....", "wav")
+        with mock.patch.object(vtc, "_find_ffmpeg_executable", return_value=""):
+            self.assertEqual(vtc.load_transcoded_voice(self.account_dir, b"SILK-2")[1], "wav")
+        self.assertIsNone(vtc.load_transcoded_voice(self.account_dir, b"SILK-2"))
+        vtc.store_transcoded_voice(self.account_dir, b"SILK-2", b"ID3", "mp3")
+        self.assertEqual([p.suffix for p in vtc.get_voice_cache_dir(self.account_dir).rglob("*.*")], [".mp3"])
+
+    def test_conversation_batch_in_worker_processes(self):
+        account_dir, username, server_ids = self._build_account_with_voices()
+        env = {"WECHAT_TOOL_VOICE_TRANSCODE_PROCESS_MIN": "1"}
+        with mock.patch.dict(os.environ, env), mock.patch.object(vtc, "_transcode_worker", _fake_worker):
+            res = vtc.transcode_conversation_voices(account_dir, username, workers=2)
+            again = vtc.transcode_conversation_voices(account_dir, username, workers=2)
+        self.assertEqual(res["voices"], len(server_ids))
+        self.assertEqual((res["transcoded"], res["failed"], res["workers"]), (len(server_ids) - 1, 1, 2))
+        self.assertEqual((again["cached"], again["transcoded"]), (len(server_ids) - 1, 0))
+
+        # Export reuses the batch output instead of transcoding again.
+        media_written: dict[str, str] = {}
+        with (
+            mock.patch.object(svc, "_convert_silk_to_browser_audio", side_effect=AssertionError("transcoded again")),
+            zipfile.ZipFile(self.root / "out.zip", "w") as zf,
+        ):
+            arc, is_new = svc._materialize_voice(
+                zf=zf,
+                account_dir=account_dir,
+                media_db_path=account_dir / "media_0.db",
+                server_id=server_ids[1],
+                media_written=media_written,
+            )
+            self.assertTrue(is_new)
+            self.assertEqual(zf.read(arc), b"ID3SILK" + str(server_ids[1]).encode())
+
+    def test_conversation_batch_is_chunked_and_cancellable(self):
+        account_dir, username, server_ids = self._build_account_with_voices()
+        self.assertEqual((vtc._transcode_workers(10_000), vtc._transcode_workers(-3)), (32, 0))
+
+        checks = []
+        env = {"WECHAT_TOOL_VOICE_TRANSCODE_CHUNK": "2"}
+        with mock.patch.dict(os.environ, env), mock.patch.object(vtc, "_transcode_worker", _fake_worker):
+            stopped = vtc.transcode_conversation_voices(
+                account_dir, username, workers=0, should_cancel=lambda: checks.append(1) or len(checks) > 1
+            )
+            self.assertEqual((stopped["status"], stopped["voices"], stopped["transcoded"]), ("cancelled", 2, 1))
+
+            res = vtc.transcode_conversation_voices(account_dir, username, workers=0)
+        self.assertEqual(res["status"], "success")
+        self.assertEqual((res["voices"], res["cached"], res["transcoded"]), (len(server_ids), 1, len(server_ids) - 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+# Ensure "src/" is importable when running tests from repo root.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def _seed_account(account_dir: Path, *, year: int) -> None:
+    account_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(account_dir / "message_0.db"))
+    try:
+        conn.execute("CREATE TABLE Name2Id(user_name TEXT)")
+        conn.execute("INSERT INTO Name2Id(rowid, user_name) VALUES (1, ?)", (account_dir.name,))
+        conn.execute("INSERT INTO Name2Id(rowid, user_name) VALUES (2, 'wxid_friend')")
+        conn.execute(
+            "CREATE TABLE Msg_demo(local_id INTEGER PRIMARY KEY, local_type INTEGER, create_time INTEGER, "
+            "real_sender_id INTEGER, message_content TEXT, compress_content BLOB)"
+        )
+        ts = int(datetime(year, 6, 1, 12, 0, 0).timestamp())
+        rows = [("好的", 1), ("好的", 1), ("好的收到", 1), ("在吗", 1), ("在吗", 1), ("别人说的话", 2)]
+        for i, (text, sender) in enumerate(rows):
+            conn.execute(
+                "INSERT INTO Msg_demo(local_type, create_time, real_sender_id, message_content) VALUES (1, ?, ?, ?)",
+                (ts + i, sender, text),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class TestWrappedKeywordEngine(unittest.TestCase):
+    def setUp(self):
+        self._td = TemporaryDirectory()
+        self._prev_data_dir = os.environ.get("WECHAT_TOOL_DATA_DIR")
+        os.environ["WECHAT_TOOL_DATA_DIR"] = self._td.name
+
+        from wechat_decrypt_tool.wrapped.keyword_engine import KEYWORD_ENGINE
+
+        KEYWORD_ENGINE.clear()
+        self.engine = KEYWORD_ENGINE
+        self.year = 2024
+        self.account_dir = Path(self._td.name) / "output" / "databases" / "wxid_me"
+        _seed_account(self.account_dir, year=self.year)
+
+    def tearDown(self):
+        self.engine.clear()
+        if self._prev_data_dir is None:
+            os.environ.pop("WECHAT_TOOL_DATA_DIR", None)
+        else:
+            os.environ["WECHAT_TOOL_DATA_DIR"] = self._prev_data_dir
+        self._td.cleanup()
+
+    def test_phrase_stats_are_cached_per_account_year(self):
+        from wechat_decrypt_tool.wrapped.cards import card_05_keywords_wordcloud as card05
+
+        real_scan = card05._scan_common_phrase_counts
+        with mock.patch.object(card05, "_scan_common_phrase_counts", side_effect=real_scan) as scan:
+            first = card05.build_card_05_keywords_wordcloud(account_dir=self.account_dir, year=self.year)
+            second = card05.build_card_05_keywords_wordcloud(account_dir=self.account_dir, year=self.year)
+            self.assertEqual(scan.call_count, 1)
+
+            # Memory cache dropped -> still served from the on-disk stats file.
+            self.engine.clear()
+            card05.build_card_05_keywords_wordcloud(account_dir=self.account_dir, year=self.year)
+            self.assertEqual(scan.call_count, 1)
+
+        words = {k["word"]: k["count"] for k in first["data"]["keywords"]}
+        self.assertEqual(words, {"好的": 2, "在吗": 2})
+        self.assertEqual(first["data"]["keywords"], second["data"]["keywords"])
+        self.assertTrue(first["data"]["examples"])
+
+    def test_stats_invalidated_when_message_db_changes(self):
+        from wechat_decrypt_tool.wrapped.cards import card_05_keywords_wordcloud as card05
+
+        card05.build_card_05_keywords_wordcloud(account_dir=self.account_dir, year=self.year)
+
+        conn = sqlite3.connect(str(self.account_dir / "message_0.db"))
+        try:
+            ts = int(datetime(self.year, 7, 1).timestamp())
+            for i in range(3):
+                conn.execute(
+                    "INSERT INTO Msg_demo(local_type, create_time, real_sender_id, message_content) VALUES (1, ?, 1, ?)",
+                    (ts + i, "晚安"),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+        os.utime(self.account_dir / "message_0.db", ns=(1, 1))
+
+        card = card05.build_card_05_keywords_wordcloud(account_dir=self.account_dir, year=self.year)
+        words = {k["word"]: k["count"] for k in card["data"]["keywords"]}
+        self.assertEqual(words.get("晚安"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()